@@ -12,7 +12,12 @@ import collections
 import os
 import shutil
 import sys
+import time
 
+# The profiler is imported first so that `pfo --profile` can record the import spans below
+from pfo.shared import profiler
+
+_import_start = time.perf_counter()
 import click
 
 # Settings
@@ -22,16 +27,25 @@ sys.path.append(_imp)
 from halo import Halo
 from src import config
 from src.tools import docstrings, mac_only, network_check
+profiler.add_span("import click, halo, src.tools", "import", _import_start, time.perf_counter() - _import_start)
 
 # We want to ensure a network connection before any of the Doppler functions run
 # The following imports require a network connection - this is for better messaging
-network_check()
-
-from pfo.shared.commands import update_cli
-from src.github import repo
-from src.package import package
-from src.kubernetes import k8s
-from applications import app
+with profiler.span("network_check", "network"):
+    network_check()
+
+with profiler.span("import pfo.shared.commands", "import"):
+    from pfo.shared.commands import update_cli
+with profiler.span("import src.github", "import"):
+    from src.github import repo
+with profiler.span("import src.package", "import"):
+    from src.package import package
+with profiler.span("import src.kubernetes", "import"):
+    from src.kubernetes import k8s
+with profiler.span("import applications", "import"):
+    from applications import app
+with profiler.span("import src.doctor", "import"):
+    from src.doctor import doctor
 
 global metadata
 metadata = config.MetaData()
@@ -87,11 +101,28 @@ check_for_required_directories_and_files() # Ensure the required directories and
     is_flag=True,
     help="Update the CLI to the latest version.",
 )
+@click.option(
+    "--profile",
+    "profile",
+    default=False,
+    is_flag=True,
+    help="Print a timing report (imports, setup, subprocesses, HTTP calls, sleeps) when the command finishes.",
+)
+@click.option(
+    "--profile-output",
+    "profile_output",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Also write the profile as Chrome trace-event JSON to this file (chrome://tracing, Perfetto).",
+)
 @click.version_option(package_name=metadata._name)
 @docstrings(metadata._name)
 @click.pass_context
 def cli(ctx, **params: dict) -> None:
     """{0} CLI tool"""
+    if params["profile"] or params["profile_output"]:
+        profiler.enable(output=params["profile_output"])
+
     if params["update"] == True:
         update_cli()
         exit()
@@ -106,6 +137,7 @@ cli.add_command(package)
 cli.add_command(repo)
 cli.add_command(app)
 cli.add_command(k8s)
+cli.add_command(doctor)
 
 if __name__ == "__main__":
     cli()
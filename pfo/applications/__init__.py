@@ -1,15 +1,34 @@
 import os
+import json
+import time
 import click
+import yaml
+import subprocess
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
 
 from halo import Halo
 from click_option_group import optgroup
 from cookiecutter.main import cookiecutter
 from pfo.shared.commands import OrderedGroup
+from pfo.shared import templates
 from src.tools import print_help_msg
 
 
 spinner = Halo(text_color="blue", spinner="dots")
 template_remote = "https://github.com/pyflowops/repo_additions.git"
+template_revision = os.environ.get("PFO_TEMPLATE_REVISION", "main") # Pin the scaffolds to a branch, tag or commit SHA
+
+# The app types of a manifest, and the template directory each is scaffolded from
+APP_TYPES: dict[str, str] = {"click": "click", "cli": "click", "fastapi": "fastapi", "api": "fastapi"}
+# The defaults of the prompts, which manifest entries fall back to
+APP_DEFAULTS: dict[str, str] = {
+    "description": "A PyFlowOps application",
+    "author": "PyFlowOps Team",
+    "email": "email@notarealdomain.com",
+    "github_org": "pyflowops",
+}
 
 
 @click.group(cls=OrderedGroup, invoke_without_command=True)
@@ -20,8 +39,49 @@ template_remote = "https://github.com/pyflowops/repo_additions.git"
     is_flag=True,
     help=f"This creates a CLI app based on the PyFlowOps template.",
 )
+@optgroup.option(
+    "--api",
+    required=False,
+    is_flag=True,
+    help=f"This creates a FastAPI app based on the PyFlowOps template.",
+)
+@optgroup.option(
+    "--manifest",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+    help=f"Creates every app listed in the YAML/JSON manifest, without prompting.",
+)
+@optgroup.option(
+    "--summary",
+    required=False,
+    type=click.Path(dir_okay=False),
+    help=f"With --manifest, writes the generated paths and timings to this JSON file.",
+)
+@optgroup.group(f"Template", help=f"The template the apps are scaffolded from.")
+@optgroup.option(
+    "--revision",
+    required=False,
+    default=template_revision,
+    show_default=True,
+    help=f"The template branch, tag or commit SHA to scaffold from - a commit SHA is never fetched again.",
+)
+@optgroup.option(
+    "--offline",
+    required=False,
+    is_flag=True,
+    help=f"Only use the locally cached template (also PFO_OFFLINE=1).",
+)
 def app(**params: dict) -> None:
     """This is the pfo applications builder, maintenance tool."""
+    if params.get("manifest"):
+        _results = create_from_manifest(
+            params["manifest"],
+            revision=params.get("revision"),
+            offline=params.get("offline", False),
+            summary=params.get("summary"),
+        )
+        exit(0 if all(r["ok"] for r in _results) else 1)
+
     # If the user wants to create a CLI app, we will call the create_cli function
     appname: str = click.prompt(
         "Please enter the name of your CLI app",
@@ -54,33 +114,52 @@ def app(**params: dict) -> None:
         type=str
     )
 
-    if params["cli"]:
+    if params.get("cli"):
         create_cli(
             appname=appname,
             description=description,
             author=author,
             email=email,
-            github_org=github_org
+            github_org=github_org,
+            revision=params.get("revision"),
+            offline=params.get("offline", False),
             )
 
-    if params["api"]:
-        create_cli(
+    if params.get("api"):
+        create_api(
             appname=appname,
             description=description,
             author=author,
             email=email,
-            github_org=github_org
+            github_org=github_org,
+            revision=params.get("revision"),
+            offline=params.get("offline", False),
             )
 
-    if params["strealit"]:
+    if params.get("strealit"):
         pass
 
-    if params["reflex"]:
+    if params.get("reflex"):
         pass
     
     print_help_msg(app)
 
 
+def template(revision: str|None = None, offline: bool = False) -> str:
+    """Returns the local copy of the repo_additions template at the revision.
+
+    The template is kept in a local mirror (see pfo.shared.templates), so scaffolding several apps in a row, or
+    offline, does not download it again.
+    """
+    try:
+        _dir, _sha = templates.checkout(template_remote, revision or template_revision, offline=offline)
+    except (subprocess.SubprocessError, OSError) as e:
+        spinner.fail(f"Failed to get the app template ({revision or template_revision}): {e}")
+        exit()
+
+    return _dir
+
+
 def create_cli(**kwargs) -> None:
     # This function will create a core app in the current directory
     if not kwargs:
@@ -103,12 +182,12 @@ def create_cli(**kwargs) -> None:
         )
         exit()
     
-    # This is the path to the cookiecutter template
+    # This is the path to the cookiecutter template, from the local template cache
+    _template = template(kwargs.get("revision"), kwargs.get("offline", False))
+
     try:
         cookiecutter(
-            template_remote,
-            # The template MUST be in the repo at the 'main' branch
-            checkout="main",
+            _template,
             # The app type is the directory name in the cookiecutter template
             directory=app_type,
             no_input=True,
@@ -151,12 +230,12 @@ def create_api(**kwargs) -> None:
         )
         exit()
     
-    # This is the path to the cookiecutter template
+    # This is the path to the cookiecutter template, from the local template cache
+    _template = template(kwargs.get("revision"), kwargs.get("offline", False))
+
     try:
         cookiecutter(
-            template_remote,
-            # The template MUST be in the repo at the 'main' branch
-            checkout="main",
+            _template,
             # The app type is the directory name in the cookiecutter template
             directory=app_type,
             no_input=True,
@@ -175,3 +254,120 @@ def create_api(**kwargs) -> None:
             f"Error creating FastAPI app: {e}"
         )
         exit()
+
+
+def load_manifest(path: str) -> list[dict[str, str]]:
+    """Loads the apps of a manifest - YAML or JSON, with an `apps` list and optional `defaults`.
+
+    Example:
+        defaults:
+          author: PyFlowOps Team
+          github_org: pyflowops
+        apps:
+          - name: billing-api
+            type: fastapi
+          - name: ops-cli
+            type: click
+            description: Operations CLI
+
+    Returns:
+        list: One dict per app, with every cookiecutter field and its `type` (click or fastapi).
+
+    Raises:
+        ValueError: The manifest is not valid.
+    """
+    with open(path, "r") as f:
+        _data = yaml.safe_load(f) or {} # JSON is YAML too
+
+    if isinstance(_data, list):
+        _data = {"apps": _data}
+    if not isinstance(_data, dict) or not isinstance(_data.get("apps"), list) or not _data["apps"]:
+        raise ValueError(f"{path} must list the apps to create under `apps`.")
+
+    _defaults = {**APP_DEFAULTS, **(_data.get("defaults") or {})}
+    _apps, _names = [], set()
+    for i, _entry in enumerate(_data["apps"]):
+        if not isinstance(_entry, dict) or not _entry.get("name"):
+            raise ValueError(f"App #{i + 1} in {path} has no name.")
+        _type = str(_entry.get("type", _defaults.get("type", "click"))).lower()
+        if _type not in APP_TYPES:
+            raise ValueError(f"App {_entry['name']} in {path} has an unknown type {_type} - use one of: click, fastapi.")
+        if _entry["name"] in _names:
+            raise ValueError(f"App {_entry['name']} is listed more than once in {path}.")
+        _names.add(_entry["name"])
+
+        _app = {k: str(_entry.get(k, _defaults[k])) for k in APP_DEFAULTS}
+        _apps.append({"name": str(_entry["name"]), "type": APP_TYPES[_type], **_app})
+
+    return _apps
+
+
+def _render_app(template_dir: str, app: dict[str, str], output_dir: str) -> dict[str, Any]:
+    """Renders one app - runs in a worker process, as cookiecutter changes the working directory while rendering."""
+    _start = time.perf_counter()
+    _result: dict[str, Any] = {"name": app["name"], "type": app["type"]}
+    try:
+        _result["path"] = cookiecutter(
+            template_dir,
+            directory=app["type"],
+            no_input=True,
+            extra_context={k: v for k, v in app.items() if k != "type"},
+            output_dir=output_dir,
+        )
+        _result["ok"] = True
+    except Exception as e:
+        _result["ok"], _result["error"] = False, f"{type(e).__name__}: {e}"
+
+    _result["seconds"] = round(time.perf_counter() - _start, 3)
+    return _result
+
+
+def create_from_manifest(manifest: str, revision: str|None = None, offline: bool = False, summary: str|None = None, max_workers: int = 4) -> list[dict[str, Any]]:
+    """Creates every app in the manifest, concurrently, from one cached copy of the template.
+
+    Returns:
+        list: The result of each app - name, type, path, seconds, ok (and error).
+    """
+    if not os.path.exists(os.path.join(os.getcwd(), ".git")):
+        spinner.fail(
+            "You need to run this command from within a git repo. Please navigate to the repo you want to create the apps in first. \n" \
+            "If you want to create a new repo, please run `pfo repo --init` first."
+        )
+        exit()
+
+    try:
+        _apps = load_manifest(manifest)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        spinner.fail(f"Invalid app manifest: {e}")
+        exit(1)
+
+    _start = time.perf_counter()
+    _template = template(revision, offline) # Fetched once for all of the apps
+    _results: list[dict[str, Any]] = []
+
+    spinner.start(f"Creating {len(_apps)} app(s) from {manifest}...")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(_apps))) as pool:
+        _futures = [pool.submit(_render_app, _template, _app, os.getcwd()) for _app in _apps]
+        for _future in as_completed(_futures):
+            _result = _future.result()
+            _results.append(_result)
+            if _result["ok"]:
+                spinner.succeed(f"{_result['name']} ({_result['type']}) created in {_result['path']} ({_result['seconds']:.1f}s)")
+            else:
+                spinner.fail(f"{_result['name']} ({_result['type']}) failed: {_result['error']}")
+
+    _order = [a["name"] for a in _apps]
+    _results.sort(key=lambda r: _order.index(r["name"]))
+    _failed = [r["name"] for r in _results if not r["ok"]]
+    _seconds = time.perf_counter() - _start
+
+    if summary:
+        with open(summary, "w") as f:
+            json.dump({"manifest": os.path.abspath(manifest), "seconds": round(_seconds, 3), "apps": _results}, f, indent=2)
+
+    if _failed:
+        spinner.fail(f"Created {len(_apps) - len(_failed)} of {len(_apps)} apps in {_seconds:.1f}s - failed: {', '.join(_failed)}")
+    else:
+        spinner.succeed(f"Created {len(_apps)} apps in {_seconds:.1f}s")
+
+    return _results
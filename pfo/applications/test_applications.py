@@ -0,0 +1,80 @@
+import os
+import json
+import pytest
+
+from unittest.mock import patch
+from pfo import applications
+
+@pytest.fixture
+def template_dir(tmp_path):
+    """A minimal repo_additions template with a click and a fastapi app."""
+    for _type in ("click", "fastapi"):
+        _dir = tmp_path / "repo_additions" / _type
+        (_dir / "{{cookiecutter.name}}").mkdir(parents=True)
+        (_dir / "cookiecutter.json").write_text(json.dumps({"name": "app", "description": "", "author": "", "email": "", "github_org": ""}))
+        (_dir / "{{cookiecutter.name}}" / "README.md").write_text(_type + ": {{cookiecutter.name}} by {{cookiecutter.author}}\n")
+    return str(tmp_path / "repo_additions")
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    _repo = tmp_path / "monorepo"
+    (_repo / ".git").mkdir(parents=True)
+    monkeypatch.chdir(_repo)
+    return _repo
+
+def _manifest(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+class TestLoadManifest:
+
+    def test_defaults(self, tmp_path):
+        """Test that apps fall back to the manifest defaults, then to the prompt defaults."""
+        _apps = applications.load_manifest(_manifest(tmp_path / "apps.json", {
+            "defaults": {"author": "Ops"},
+            "apps": [{"name": "billing", "type": "api"}, {"name": "ops", "type": "click", "author": "Me"}],
+        }))
+
+        assert [(a["name"], a["type"], a["author"]) for a in _apps] == [("billing", "fastapi", "Ops"), ("ops", "click", "Me")]
+        assert _apps[0]["github_org"] == "pyflowops"
+
+    @pytest.mark.parametrize("data", [
+        {"apps": []},
+        {"apps": [{"type": "click"}]},
+        {"apps": [{"name": "a", "type": "django"}]},
+        {"apps": [{"name": "a"}, {"name": "a"}]},
+    ])
+    def test_invalid(self, tmp_path, data):
+        """Test that invalid manifests are rejected before anything is rendered."""
+        with pytest.raises(ValueError):
+            applications.load_manifest(_manifest(tmp_path / "apps.json", data))
+
+class TestCreateFromManifest:
+
+    @patch('pfo.applications.spinner')
+    def test_create_from_manifest(self, mock_spinner, template_dir, repo, tmp_path):
+        """Test that every app is rendered from one template checkout, and summarised."""
+        _path = _manifest(tmp_path / "apps.json", {"apps": [{"name": f"app{i}", "type": "fastapi" if i % 2 else "click"} for i in range(4)]})
+
+        with patch('pfo.applications.template', return_value=template_dir) as mock_template:
+            _results = applications.create_from_manifest(_path, summary=str(tmp_path / "summary.json"))
+
+        mock_template.assert_called_once()
+        assert [r["name"] for r in _results] == ["app0", "app1", "app2", "app3"]
+        assert all(r["ok"] for r in _results)
+        assert (repo / "app1" / "README.md").read_text() == "fastapi: app1 by PyFlowOps Team\n"
+
+        _summary = json.load(open(tmp_path / "summary.json"))
+        assert [a["path"] for a in _summary["apps"]] == [str(repo / f"app{i}") for i in range(4)]
+
+    @patch('pfo.applications.spinner')
+    def test_existing_app_fails_alone(self, mock_spinner, template_dir, repo, tmp_path):
+        """Test that an app that already exists is reported, and the others are still created."""
+        (repo / "app0").mkdir()
+        _path = _manifest(tmp_path / "apps.json", {"apps": [{"name": "app0"}, {"name": "app1"}]})
+
+        with patch('pfo.applications.template', return_value=template_dir):
+            _results = applications.create_from_manifest(_path)
+
+        assert [r["ok"] for r in _results] == [False, True]
+        assert os.path.isfile(repo / "app1" / "README.md")
@@ -8,47 +8,60 @@ import urllib3
 from typing import Optional
 
 from halo import Halo
-from pfo.k8s import k8s_config, _tempdir
+from pfo.shared import runner
+from pfo.k8s import k8s_config
+from pfo.k8s import pipeline
+from pfo.shared import clusters
 
 _argocd_spinner = Halo(text_color="blue", spinner="dots")
 argocd_config = k8s_config["argocd"]
 
+IMAGE_UPDATER_URL: str = "https://raw.githubusercontent.com/argoproj-labs/argocd-image-updater/stable/manifests/install.yaml"
+
 # Suppress only the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def install() -> None:
-    """This function will install ArgoCD in the Kind cluster."""
+def install() -> bool:
+    """This function will install ArgoCD in the Kind cluster - returns True if it was installed."""
     # Now we will install ArgoCD in the Kind cluster
     # This will install ArgoCD in the argocd namespace
-    install_argocd()  # Install ArgoCD
-    install_image_updater()  # Install the ArgoCD Image Updater
+    _installed = install_argocd()  # Install ArgoCD
+    _installed = install_image_updater() and _installed  # Install the ArgoCD Image Updater
     time.sleep(15) # Wait for ArgoCD to be fully deployed
+    return _installed
+
+def install_manifest_url() -> str:
+    """The ArgoCD manifest of the configured version."""
+    return f"https://raw.githubusercontent.com/argoproj/argo-cd/{argocd_config['version']}/manifests/install.yaml"
 
-def install_argocd() -> None:
-    """This function will install ArgoCD in the Kind cluster."""
+def install_argocd() -> bool:
+    """This function will install ArgoCD in the Kind cluster - returns True if it was installed."""
     # Now we will install ArgoCD in the Kind cluster
     # This will install ArgoCD in the argocd namespace
-    _argo_deployment = ["kubectl", "apply", "-n", "argocd", "-f", f"https://raw.githubusercontent.com/argoproj/argo-cd/{argocd_config['version']}/manifests/install.yaml"]
+    _argo_deployment = ["kubectl", "apply", "-n", "argocd", "-f", pipeline.resolve(install_manifest_url())]
     try:
-        _resp = subprocess.run(_argo_deployment, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _resp = runner.run(_argo_deployment, timeout=runner.APPLY_TIMEOUT)
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to install ArgoCD: {e}")
-        return
+        return False
     
     if _resp.returncode != 0:
         _argocd_spinner.fail(f"Failed to install ArgoCD: {_resp.stderr}")
-        return
+        return False
 
     _argocd_spinner.succeed("ArgoCD deployment installed successfully!")
+    return True
 
-def install_image_updater() -> None:
-    """This function will install the ArgoCD Image Updater in the Kind cluster."""
-    _imupd_deployment = ["kubectl", "apply", "-n", "argocd", "-f", "https://raw.githubusercontent.com/argoproj-labs/argocd-image-updater/stable/manifests/install.yaml"]
+def install_image_updater() -> bool:
+    """This function will install the ArgoCD Image Updater in the Kind cluster - returns True if it was installed."""
+    _imupd_deployment = ["kubectl", "apply", "-n", "argocd", "-f", pipeline.resolve(IMAGE_UPDATER_URL)]
     try:
-        _resp = subprocess.run(_imupd_deployment, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _resp = runner.run(_imupd_deployment, timeout=runner.APPLY_TIMEOUT)
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to install ArgoCD: {e}")
-        return
+        return False
+
+    return True
 
 def get_argocd_default_password() -> Optional[str]:
     """
@@ -64,7 +77,7 @@ def get_argocd_default_password() -> Optional[str]:
     """Retrieves the default password for the ArgoCD admin user."""
     _p1_cmd = ["kubectl", "-n", "argocd", "get", "secret", "argocd-initial-admin-secret", "-o", "jsonpath='{.data.password}'"]
     try:
-        _resp = subprocess.run(_p1_cmd, check=True, capture_output=True, text=True)
+        _resp = runner.run(_p1_cmd)
         _data = _resp.stdout.strip()
         
         if type(_data) == bytes:
@@ -76,7 +89,7 @@ def get_argocd_default_password() -> Optional[str]:
             _pass = base64.b64decode(_data).decode("utf-8")  # Remove the single quotes around the data
             return _pass
         
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to get ArgoCD initial admin - {e}")
         return
 
@@ -98,10 +111,10 @@ def install_with_helm() -> None:
     _helm_install = ["helm", "install", "argocd", "argo/argo-cd", "-n", "argocd", "--create-namespace"]
 
     try:
-        subprocess.run(_helm_repo_add, check=True)
-        subprocess.run(_helm_repo_update, check=True)
-        subprocess.run(_helm_install, check=True)
-    except subprocess.CalledProcessError as e:
+        runner.run(_helm_repo_add)
+        runner.run(_helm_repo_update)
+        runner.run(_helm_install, timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_argocd_spinner)
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to install ArgoCD with Helm: {e}")
         return
 
@@ -111,11 +124,11 @@ def restart_argocd_server() -> None:
     """Restart the ArgoCD server to apply changes."""
     _restart_cmd = ["kubectl", "-n", "argocd", "rollout", "restart", "deployment/argocd-server"]
     try:
-        _resp = subprocess.run(_restart_cmd, check=True, capture_output=True, text=True)
+        _resp = runner.run(_restart_cmd, timeout=runner.APPLY_TIMEOUT)
         if _resp.returncode != 0:
             _argocd_spinner.fail(f"Failed to restart ArgoCD server: {_resp.stderr}")
             return
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to restart ArgoCD server: {e}")
         return
 
@@ -154,8 +167,8 @@ def wait_for_argocd_projects() -> None:
     
     while _attempt < _max:
         try:
-            _resp = subprocess.run(_crdcmd, check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
+            _resp = runner.run(_crdcmd)
+        except subprocess.SubprocessError as e:
             _attempt += 1
             time.sleep(5)  # Wait for 5 seconds before retrying
 
@@ -175,7 +188,7 @@ def wait_for_argocd_deployment() -> None:
     count = 0
     while True:
         try:
-            _res = subprocess.run(["kubectl", "get", "secrets", "--namespace", "argocd", "argocd-initial-admin-secret", "-o", "json"], check=True, capture_output=True, text=True)
+            _res = runner.run(["kubectl", "get", "secrets", "--namespace", "argocd", "argocd-initial-admin-secret", "-o", "json"])
             if _res.returncode == 0:
                 _argocd_spinner.succeed("Kind cluster is ready!")
                 break
@@ -186,34 +199,39 @@ def wait_for_argocd_deployment() -> None:
                     _argocd_spinner.fail("Kind cluster is not ready after 15 attempts. Exiting...")
                     exit(1)
 
-        except subprocess.CalledProcessError:
+        except subprocess.SubprocessError:
             if count < 15:
                 count += 1
                 time.sleep(10)  
 
-def update() -> None:
-    """Updates the ArgoCD installation (configure with Kustomize) in the Kind cluster."""
+def update(manifest: Optional[str] = None) -> None:
+    """Updates the ArgoCD installation (configure with Kustomize) in the Kind cluster.
+
+    Args:
+        manifest (str): The already rendered configuration (i.e. by `pfo k8s --plan`) - built with kustomize if None.
+    """
     _argocd_spinner.start("Configuring ArgoCD...")
-    _argocd_basedir = os.path.expanduser(argocd_config.get("basedir", "~/.pfo/k8s/pyops/overlays/argocd"))
+    _argocd_basedir = clusters.path(argocd_config.get("basedir", "~/.pfo/k8s/{env}/overlays/argocd"))
     
-    if not os.path.exists(_tempdir):
-        os.makedirs(_tempdir, exist_ok=True)
+    _tempdir = clusters.tempdir() # The active cluster's temp directory
+    _config_file = manifest or os.path.join(_tempdir, "argocd-config.yaml")
 
-    try:
-        _res = subprocess.run(["kustomize", "build", _argocd_basedir], check=True, capture_output=True, text=True)
-        with open(os.path.join(_tempdir, "argocd-config.yaml"), "w+") as f:
-            f.write(_res.stdout)
-        _argocd_spinner.succeed("ArgoCD configuration file created successfully.")
-    except subprocess.CalledProcessError as e:
-        _argocd_spinner.fail(f"Failed to update ArgoCD: {e}")
-        return
+    if manifest is None:
+        try:
+            _res = runner.run(["kustomize", "build", _argocd_basedir], timeout=runner.BUILD_TIMEOUT)
+            with open(_config_file, "w+") as f:
+                f.write(_res.stdout)
+            _argocd_spinner.succeed("ArgoCD configuration file created successfully.")
+        except subprocess.SubprocessError as e:
+            _argocd_spinner.fail(f"Failed to update ArgoCD: {e}")
+            return
 
     try:
-        _res = subprocess.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "argocd-config.yaml")], check=True, capture_output=True, text=True)
+        _res = runner.run(["kubectl", "apply", "-f", _config_file], timeout=runner.APPLY_TIMEOUT)
         if _res.returncode != 0:
             _argocd_spinner.fail(f"Failed to apply ArgoCD configuration: {_res.stderr}")
             return
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _argocd_spinner.fail(f"Failed to apply ArgoCD configuration: {e}")
         return
 
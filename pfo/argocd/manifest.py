@@ -4,14 +4,13 @@ import subprocess
 
 from halo import Halo
 from pfo.k8s import k8s_config
+from pfo.shared import clusters
 
-_env = "pyops"
 _manspinner = Halo(spinner="dots", text_color="blue")
 
 argocd_config = k8s_config["argocd"] # Load the ArgoCD configuration from the k8s_config.json file
 _private_ssh_key: str = os.path.expanduser(argocd_config["github_ssh_priv"])
 #_public_ssh_key: str = os.path.expanduser(argocd_config["github_ssh_pub"])
-#_manifest_path: str = os.path.join(os.path.expanduser("~"), ".pfo", "k8s", _env, "overlays", "argocd")
 _secret_manifests: list = argocd_config.get("secret_manifests", [])
 
 # Read the private SSH key contents
@@ -38,7 +37,7 @@ def add_ssh_privkey_to_secret_manifest() -> None:
         return
     
     for manifest in _secret_manifests:
-        _current_manifest = os.path.expanduser(manifest)
+        _current_manifest = clusters.path(manifest)
 
         with open(_current_manifest, "r") as f:
             _mdata = yaml.safe_load(f.read())
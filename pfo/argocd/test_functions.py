@@ -4,10 +4,11 @@ import subprocess
 
 from unittest.mock import patch, MagicMock
 from pfo.argocd.functions import install_image_updater, wait_for_argocd_server
+from pfo.shared import runner
 
 class TestInstallImageUpdater:
     
-    @patch('pfo.argocd.functions.subprocess.run')
+    @patch('pfo.argocd.functions.runner.run')
     @patch('pfo.argocd.functions._argocd_spinner')
     def test_install_image_updater_success(self, mock_spinner, mock_subprocess_run):
         """Test successful installation of ArgoCD Image Updater."""
@@ -15,18 +16,17 @@ class TestInstallImageUpdater:
         mock_subprocess_run.return_value = MagicMock(returncode=0)
         
         # Act
-        install_image_updater()
+        result = install_image_updater()
         
         # Assert
         mock_subprocess_run.assert_called_once_with(
             ["kubectl", "apply", "-n", "argocd", "-f", "https://raw.githubusercontent.com/argoproj-labs/argocd-image-updater/stable/manifests/install.yaml"],
-            check=True,
-            capture_output=True,
-            text=True
+            timeout=runner.APPLY_TIMEOUT
         )
         mock_spinner.fail.assert_not_called()
+        assert result is True
 
-    @patch('pfo.argocd.functions.subprocess.run')
+    @patch('pfo.argocd.functions.runner.run')
     @patch('pfo.argocd.functions._argocd_spinner')
     def test_install_image_updater_subprocess_error(self, mock_spinner, mock_subprocess_run):
         """Test installation failure due to subprocess error."""
@@ -40,14 +40,12 @@ class TestInstallImageUpdater:
         # Assert
         mock_subprocess_run.assert_called_once_with(
             ["kubectl", "apply", "-n", "argocd", "-f", "https://raw.githubusercontent.com/argoproj-labs/argocd-image-updater/stable/manifests/install.yaml"],
-            check=True,
-            capture_output=True,
-            text=True
+            timeout=runner.APPLY_TIMEOUT
         )
         mock_spinner.fail.assert_called_once()
-        assert result is None
+        assert result is False
 
-    @patch('pfo.argocd.functions.subprocess.run')
+    @patch('pfo.argocd.functions.runner.run')
     @patch('pfo.argocd.functions._argocd_spinner')
     def test_install_image_updater_correct_command(self, mock_spinner, mock_subprocess_run):
         """Test that the correct kubectl command is executed."""
@@ -64,9 +62,7 @@ class TestInstallImageUpdater:
         ]
         mock_subprocess_run.assert_called_once_with(
             expected_command,
-            check=True,
-            capture_output=True,
-            text=True
+            timeout=runner.APPLY_TIMEOUT
         )
 
 class TestWaitForArgoCdServer:
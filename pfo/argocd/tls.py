@@ -10,6 +10,7 @@ from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.x509.oid import NameOID
 from halo import Halo
+from pfo.shared import clusters
 
 def load_argocd_config():
     """
@@ -24,7 +25,6 @@ def load_argocd_config():
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.join(BASE, "..", "k8s", "k8s_config.json")
-_env = "pyops"
 _data = load_argocd_config()  # Load the configuration data from the JSON file, specifically for ArgoCD.
 _cert_file = os.path.expanduser(_data.get("tls_cert", ""))
 _key_file =  os.path.expanduser(_data.get("tls_key", ""))
@@ -137,14 +137,14 @@ def get_tls_key_contents() -> str:
 
     return key_data.strip()
 
-def add_cert_data_to_secret():
+def add_cert_data_to_secret() -> bool:
     """
-    Add the TLS certificate and key data to the ArgoCD secret.
+    Add the TLS certificate and key data to the ArgoCD secret - returns True if they were added.
     """
     _tls_spinner.start("Adding TLS certificate and key to ArgoCD secret...")
 
     try:
-        _secret_yaml_file = _data.get("secret_manifest", f"~/.pfo/k8s/{_env}/overlays/argocd/argocd-ssl-certs.yaml")  # The name of the secret in Kubernetes
+        _secret_yaml_file = clusters.path(_data.get("secret_manifest", "~/.pfo/k8s/{env}/overlays/argocd/argocd-ssl-certs.yaml"))  # The name of the secret in Kubernetes
 
         # We need to get the contents of the secret manifest file.
         with open(os.path.expanduser(_secret_yaml_file), "r") as f:
@@ -169,16 +169,32 @@ def add_cert_data_to_secret():
 
     except Exception as e:
         _tls_spinner.fail(f"Failed to add TLS certificate and key to ArgoCD secret: {e}")
-        return
+        return False
 
     _tls_spinner.succeed("TLS certificate and keys added to ArgoCD secret.")
-    return
+    return True
+
+def is_installed() -> bool:
+    """
+    Check if the TLS certificate and key exist, and are in the ArgoCD secret manifest.
+    """
+    _secret_yaml_file = clusters.path(_data.get("secret_manifest", "~/.pfo/k8s/{env}/overlays/argocd/argocd-ssl-certs.yaml"))  # The name of the secret in Kubernetes
+    if not check_tls_config_exists():
+        return False
 
-def install():
+    try:
+        with open(os.path.expanduser(_secret_yaml_file), "r") as f:
+            _secret_data = yaml.safe_load(f.read())["data"]
+    except (OSError, yaml.YAMLError, TypeError, KeyError):
+        return False
+
+    return bool(_secret_data.get("tls.crt")) and bool(_secret_data.get("tls.key"))
+
+def install() -> bool:
     """
-    Install the TLS configuration for ArgoCD.
+    Install the TLS configuration for ArgoCD - returns True if the secret manifest has the certificate and key.
     """
-    _secret_yaml_file = _data.get("secret_manifest", f"~/.pfo/k8s/{_env}/overlays/argocd/argocd-ssl-certs.yaml")  # The name of the secret in Kubernetes
+    _secret_yaml_file = clusters.path(_data.get("secret_manifest", "~/.pfo/k8s/{env}/overlays/argocd/argocd-ssl-certs.yaml"))  # The name of the secret in Kubernetes
 
     if not check_tls_config_exists():
         create_tls_config() # Create the TLS configuration if it does not exist
@@ -192,3 +208,5 @@ def install():
         add_cert_data_to_secret()  # Add the certificate and key to the ArgoCD
     else:
         _tls_spinner.info("TLS certificate and key already present in the secret manifest. Skipping addition.")
+
+    return is_installed()
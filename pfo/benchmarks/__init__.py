@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the pfo CLI - startup, package commands, register() and a simulated Cluster.create().
+
+The benchmarks run against the fake toolchain in pfo.testing, so they need neither a network nor a Docker daemon.
+They are not collected by the normal test run; use `make bench`. Results are kept in ~/.pfo/benchmarks/history.json
+(PFO_BENCH_HISTORY), and a benchmark fails if it is slower than the median of its last recorded runs.
+"""
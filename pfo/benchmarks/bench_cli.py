@@ -0,0 +1,51 @@
+import os
+import json
+import subprocess
+
+import pytest
+
+
+class TestStartup:
+
+    def test_bench_import(self, bench, scenario):
+        """Time to import the pfo package (MetaData setup included)."""
+        bench(lambda: scenario("import"))
+
+    def test_bench_help(self, bench, scenario):
+        """Wall time of `pfo --help`."""
+        bench(lambda: scenario("cli", "--help"))
+
+
+class TestPackage:
+
+    @pytest.fixture
+    def package_dir(self, tmp_path, bench_env):
+        """A registered package at the root of its own git repository."""
+        _git = lambda *a: subprocess.run(["git", *a], cwd=tmp_path, env=bench_env, check=True, capture_output=True)
+        _git("init", "-q")
+        _git("config", "user.name", "pfo-bench")
+        _git("config", "user.email", "bench@pyflowops.local")
+        _git("remote", "add", "origin", "https://github.com/pyflowops/bench-package.git")
+        (tmp_path / "pfo.json").write_text(json.dumps({"name": "bench-package", "version": "0.0.1", "docker": {}}, indent=2))
+        return tmp_path
+
+    def test_bench_package_version(self, bench, scenario, package_dir):
+        """Wall time of `pfo package --version`."""
+        bench(lambda: scenario("cli", "package", "--version", cwd=str(package_dir)))
+
+    def test_bench_package_patch(self, bench, scenario, package_dir):
+        """Wall time of `pfo package --patch`."""
+        bench(lambda: scenario("cli", "package", "--patch", cwd=str(package_dir)))
+
+    def test_bench_register_large_repo(self, bench, scenario, large_repo):
+        """In-process time of register() for one package of a large monorepo."""
+        _pkg = large_repo / "packages" / "pkg0001"
+        bench(lambda: scenario("register", cwd=str(_pkg)))
+        os.remove(_pkg / "pfo.json")
+
+
+class TestCluster:
+
+    def test_bench_cluster_create(self, bench, scenario, toolchain):
+        """In-process time of a simulated Cluster.create() against the fake toolchain (sleeps skipped)."""
+        bench(lambda: scenario("create"), rounds=3)
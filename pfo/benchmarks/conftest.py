@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from pfo.benchmarks import harness
+from pfo.testing import FakeToolchain, seed_home
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+_scenarios = os.path.join(BASE, "scenarios.py")
+
+
+@pytest.fixture(scope="session")
+def history():
+    """The benchmark history - accepted results are saved at the end of the session."""
+    _history = harness.History()
+    yield _history
+    _history.save()
+
+
+@pytest.fixture(scope="session")
+def toolchain(tmp_path_factory):
+    """Fake kind, kubectl, kustomize, helm, gh, docker and doppler, first on PATH for the scenarios."""
+    return FakeToolchain(str(tmp_path_factory.mktemp("toolchain"))).install()
+
+
+@pytest.fixture(scope="session")
+def bench_env(toolchain, tmp_path_factory):
+    """The environment the scenarios run with - a throwaway HOME and the fake toolchain."""
+    _home = seed_home(str(tmp_path_factory.mktemp("home")))
+    _env = toolchain.env()
+    _env["HOME"] = _home
+    _env["GIT_CONFIG_GLOBAL"] = os.path.join(_home, ".gitconfig")
+    return _env
+
+
+@pytest.fixture(scope="session")
+def scenario(bench_env):
+    """Returns a function running a scenario in a fresh interpreter; returns the in-process seconds, if reported."""
+    def _run(name: str, *args: str, cwd: str = None) -> float | None:
+        _res = subprocess.run(
+            [sys.executable, _scenarios, name, *args],
+            cwd=cwd, env=bench_env, capture_output=True, text=True, timeout=600,
+        )
+        if _res.returncode != 0:
+            raise AssertionError(f"Scenario {name} {' '.join(args)} failed:\n{_res.stdout}\n{_res.stderr}")
+
+        _last = _res.stdout.strip().splitlines()[-1] if _res.stdout.strip() else ""
+        if _last.startswith("{\"seconds\""):
+            return json.loads(_last)["seconds"]
+        return None
+
+    return _run
+
+
+@pytest.fixture
+def bench(history, request):
+    """Measures a callable, fails on a regression against the history and records the accepted result."""
+    def _bench(fn, rounds: int = 5, warmup: int = 1, name: str = None) -> dict:
+        _name = name or request.node.name
+        _result = harness.measure(fn, rounds=rounds, warmup=warmup)
+        print(f"\n{_name}: median {_result['median']:.3f}s (min {_result['min']:.3f}s, max {_result['max']:.3f}s)")
+
+        if os.environ.get("PFO_BENCH_UPDATE") != "1":
+            history.check(_name, _result)
+
+        history.record(_name, _result)
+        return _result
+
+    return _bench
+
+
+@pytest.fixture(scope="session")
+def large_repo(tmp_path_factory, bench_env):
+    """A git repository with many packages, each with a docker/ folder - like a large monorepo."""
+    _root = tmp_path_factory.mktemp("monorepo")
+    _packages = int(os.environ.get("PFO_BENCH_PACKAGES", "500"))
+
+    for i in range(_packages):
+        _pkg = _root / "packages" / f"pkg{i:04d}"
+        for _img in ("api", "worker"):
+            (_pkg / "docker" / _img).mkdir(parents=True)
+            (_pkg / "docker" / _img / "Dockerfile").write_text("FROM scratch\n")
+        (_pkg / "manifests").mkdir()
+        (_pkg / "manifests" / "kustomization.yaml").write_text("resources: []\n")
+        (_pkg / "src.py").write_text(f"VALUE = {i}\n")
+
+    _git = lambda *a: subprocess.run(["git", *a], cwd=_root, env=bench_env, check=True, capture_output=True)
+    _git("init", "-q")
+    _git("config", "user.name", "pfo-bench")
+    _git("config", "user.email", "bench@pyflowops.local")
+    _git("remote", "add", "origin", "https://github.com/pyflowops/bench-monorepo.git")
+    _git("add", "-A")
+    _git("commit", "-q", "-m", "bench")
+
+    return _root
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+from typing import Any, Callable, Optional
+
+# Where the results of previous runs are kept - one history per machine/python, so that numbers are comparable
+HISTORY_FILE: str = os.environ.get(
+    "PFO_BENCH_HISTORY",
+    os.path.join(os.path.expanduser("~"), ".pfo", "benchmarks", "history.json"),
+)
+TOLERANCE: float = float(os.environ.get("PFO_BENCH_TOLERANCE", "0.25")) # 25% slower than the baseline is a regression
+MIN_DELTA: float = float(os.environ.get("PFO_BENCH_MIN_DELTA", "0.05")) # ...and at least 50ms slower, to ignore noise
+BASELINE_RUNS: int = 5 # The baseline is the median of the last N accepted runs
+KEEP_RUNS: int = 50
+
+
+class BenchmarkRegression(AssertionError):
+    """Raised when a benchmark is slower than its recorded baseline."""
+
+
+def machine_key() -> str:
+    """Returns the key the history is stored under for this machine and interpreter."""
+    return f"{platform.node()}|{platform.system()}-{platform.machine()}|py{platform.python_version()}"
+
+
+def measure(fn: Callable[[], Any], rounds: int = 5, warmup: int = 1) -> dict[str, Any]:
+    """Runs fn `warmup` + `rounds` times and returns the timing statistics of the measured rounds.
+
+    If fn returns a number, it is used as the measured time in seconds (i.e. timed in-process by a scenario),
+    otherwise the wall time of the call is used.
+    """
+    for _ in range(warmup):
+        fn()
+
+    _times = []
+    for _ in range(rounds):
+        _t0 = time.perf_counter()
+        _res = fn()
+        _elapsed = time.perf_counter() - _t0
+        _times.append(float(_res) if isinstance(_res, (int, float)) and not isinstance(_res, bool) else _elapsed)
+
+    return {
+        "median": statistics.median(_times),
+        "min": min(_times),
+        "max": max(_times),
+        "rounds": rounds,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class History:
+    """The recorded benchmark results (HISTORY_FILE)."""
+
+    def __init__(self, path: str = HISTORY_FILE) -> None:
+        self.path: str = path
+        self.data: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                self.data = json.load(f)
+
+    def runs(self, name: str) -> list[dict[str, Any]]:
+        return self.data.get(machine_key(), {}).get(name, [])
+
+    def baseline(self, name: str) -> Optional[float]:
+        """Returns the baseline median for the benchmark, or None if it has never been recorded."""
+        _runs = self.runs(name)[-BASELINE_RUNS:]
+        if not _runs:
+            return None
+
+        return statistics.median(r["median"] for r in _runs)
+
+    def check(self, name: str, result: dict[str, Any]) -> None:
+        """Raises BenchmarkRegression if the result is slower than the baseline."""
+        _baseline = self.baseline(name)
+        if _baseline is None:
+            return
+
+        _limit = max(_baseline * (1 + TOLERANCE), _baseline + MIN_DELTA)
+        if result["median"] > _limit:
+            raise BenchmarkRegression(
+                f"{name}: median {result['median']:.3f}s is slower than the baseline {_baseline:.3f}s "
+                f"(limit {_limit:.3f}s). Set PFO_BENCH_UPDATE=1 to accept the new timing."
+            )
+
+    def record(self, name: str, result: dict[str, Any]) -> None:
+        _runs = self.data.setdefault(machine_key(), {}).setdefault(name, [])
+        _runs.append({**result, "date": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": _git_commit()})
+        del _runs[:-KEEP_RUNS]
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.data, f, indent=2)
+            f.write("\n")
@@ -0,0 +1,63 @@
+"""
+Benchmark scenarios, run in a fresh interpreter by the benchmark suite:
+
+    python pfo/benchmarks/scenarios.py import
+    python pfo/benchmarks/scenarios.py cli package --version
+    python pfo/benchmarks/scenarios.py register
+    python pfo/benchmarks/scenarios.py create
+
+This file is run as a script (never imported as pfo.benchmarks.scenarios), because pfo must be imported after the
+offline bootstrap in pfo/testing/offline.py. The in-process scenarios print {"seconds": <float>} as their last line of output.
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "testing")))
+from offline import import_pfo, patch_cluster_flow # Stdlib only - pfo itself is imported by the scenarios
+
+
+def _done(seconds: float) -> None:
+    print(json.dumps({"seconds": seconds}))
+
+
+def scenario_import(args: list) -> None:
+    _t0 = time.perf_counter()
+    import_pfo()
+    _done(time.perf_counter() - _t0)
+
+
+def scenario_cli(args: list) -> None:
+    pfo = import_pfo()
+    pfo.cli.main(args, prog_name="pfo")
+
+
+def scenario_register(args: list) -> None:
+    import_pfo()
+    from src import tools
+
+    _pfo_file = os.path.join(os.getcwd(), "pfo.json")
+    if os.path.exists(_pfo_file):
+        os.remove(_pfo_file)
+
+    _t0 = time.perf_counter()
+    tools.register()
+    _done(time.perf_counter() - _t0)
+
+
+def scenario_create(args: list) -> None:
+    import_pfo()
+    from src import kubernetes
+
+    # The sleeps in the create flow wait on real pods - scale them (default: skip them entirely)
+    patch_cluster_flow(float(os.environ.get("PFO_BENCH_SLEEP_SCALE", "0")))
+
+    _t0 = time.perf_counter()
+    kubernetes.Cluster(env="pyops").create()
+    _done(time.perf_counter() - _t0)
+
+
+if __name__ == "__main__":
+    _name, _args = sys.argv[1], sys.argv[2:]
+    globals()[f"scenario_{_name}"](_args)
@@ -9,11 +9,13 @@ _k8s_config_file = os.path.join(BASE, "k8s_config.json")
 with open(_k8s_config_file, "r") as f:
     k8s_config = json.load(f)
 
-_tempdir = k8s_config.get("base", {}).get("tempdir", "/tmp/pyops")
-
-if not os.path.exists(_tempdir):
-    os.makedirs(_tempdir, exist_ok=True)
-
+import k8s.pipeline as pipeline
+import k8s.images as images
+import k8s.watch as watch
 import k8s.traefik as traefik
 import k8s.metallb as metallb
+import k8s.snapshot as snapshot
+import k8s.plan as plan
+import k8s.components as components
+import k8s.kindconfig as kindconfig
 from pfo import argocd
@@ -0,0 +1,124 @@
+# Notes:
+# The components pfo installs into a cluster (MetalLB, Traefik, ArgoCD, and the Prometheus, Grafana and Loki
+# monitoring stack) can be left out - with "enabled": false in k8s_config.json, or with `--components` on the command
+# line, which wins over the config. The selection a cluster was created with is recorded in its state (cluster.json),
+# so --update, --plan, --restore and --info only touch what the cluster has.
+# The overlays of the components that are not selected are left out of the overlays build - their namespaces and CRDs
+# are not in the cluster.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import shutil
+
+import yaml
+
+from typing import Iterable, Optional
+
+from k8s import k8s_config
+from k8s import snapshot
+from pfo.shared import clusters
+
+# Names that stand for several components on the command line
+GROUPS: dict[str, tuple] = {
+    "all": tuple(snapshot.COMPONENTS),
+    "monitoring": ("prometheus", "grafana", "loki"),
+}
+
+# The directory of each component's manifests in the overlays of the k8s-installs template
+OVERLAYS: dict[str, str] = {
+    "metallb": "metallb",
+    "traefik": "traefik",
+    "argocd": "argocd",
+    "prometheus": "monitoring",
+    "grafana": "monitoring",
+    "loki": "monitoring",
+}
+KUSTOMIZATIONS: tuple = ("kustomization.yaml", "kustomization.yml", "Kustomization")
+
+
+def _ordered(names: Iterable[str]) -> list[str]:
+    """Returns the components in install order."""
+    _names = set(names)
+    return [c for c in snapshot.COMPONENTS if c in _names]
+
+
+def enabled() -> list[str]:
+    """Returns the components that are enabled in k8s_config.json - the ones without "enabled": false."""
+    _enabled = []
+    for _component, _path in snapshot.COMPONENTS.items():
+        _section = k8s_config
+        for _key in _path:
+            _section = _section.get(_key, {})
+        if _section.get("enabled", True):
+            _enabled.append(_component)
+
+    return _enabled
+
+
+def parse(values: Iterable[str]) -> list[str]:
+    """Returns the components named on the command line - comma separated and/or repeated, groups expanded.
+
+    Raises:
+        ValueError: A name is not a component, or a group of them.
+    """
+    _names = [n.strip().lower() for v in values for n in v.split(",") if n.strip()]
+    _unknown = [n for n in _names if n not in snapshot.COMPONENTS and n not in GROUPS and n != "none"]
+    if _unknown:
+        raise ValueError(
+            f"Unknown component(s): {', '.join(_unknown)} - choose from {', '.join([*snapshot.COMPONENTS, *GROUPS, 'none'])}"
+        )
+
+    return _ordered(c for n in _names for c in GROUPS.get(n, (n,)) if c != "none")
+
+
+def selected(values: Optional[Iterable[str]] = None, recorded: bool = True, cluster: Optional[str] = None) -> list[str]:
+    """Returns the components to act on - the ones named on the command line, else the ones the cluster was created
+    with (if recorded), else the ones enabled in k8s_config.json.
+    """
+    if values:
+        return parse(values)
+
+    if recorded:
+        _recorded = clusters.load_state(cluster).get("components")
+        if _recorded is not None:
+            return _ordered(_recorded)
+
+    return enabled()
+
+
+def record(components: Iterable[str], cluster: Optional[str] = None) -> None:
+    """Records the components the cluster was created with."""
+    clusters.save_state({**clusters.load_state(cluster), "components": _ordered(components)}, cluster)
+
+
+def skipped_overlays(components: Iterable[str]) -> set[str]:
+    """Returns the overlay directories none of whose components are selected."""
+    _selected = set(components)
+    return {o for o in OVERLAYS.values() if not any(c in _selected for c, d in OVERLAYS.items() if d == o)}
+
+
+def overlays(directory: str, components: Iterable[str], workdir: str) -> str:
+    """Returns the overlays directory to build for the selected components.
+
+    When the overlays' kustomization lists the directory of a component that is not selected, a copy of the overlays
+    without it is written to workdir (a sibling of the overlays, so relative paths still resolve), and returned.
+    """
+    _file = next((os.path.join(directory, k) for k in KUSTOMIZATIONS if os.path.isfile(os.path.join(directory, k))), None)
+    if _file is None:
+        return directory
+
+    with open(_file, "r") as f:
+        _kustomization = yaml.safe_load(f) or {}
+    _skipped = skipped_overlays(components)
+    _lists = {k: _kustomization[k] or [] for k in ("resources", "bases") if k in _kustomization}
+    _kept = {k: [r for r in v if os.path.normpath(r).split(os.sep)[0] not in _skipped] for k, v in _lists.items()}
+    if _kept == _lists:
+        return directory
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    shutil.copytree(directory, workdir, symlinks=True)
+    with open(os.path.join(workdir, os.path.basename(_file)), "w") as f:
+        yaml.safe_dump({**_kustomization, **_kept}, f, sort_keys=False)
+
+    return workdir
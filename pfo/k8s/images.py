@@ -0,0 +1,160 @@
+# Notes:
+# The pods of a new cluster all pull their images at once, as soon as they are scheduled - a slow and bursty start,
+# with the odd ImagePullBackOff. Before the components are installed, the container images of every manifest the create
+# applies (see pfo.k8s.pipeline.manifests) are collected into one deduplicated index (images.json in the cluster's
+# state directory), and prefetched into the kind nodes concurrently: an image in the local Docker cache is loaded with
+# `kind load docker-image`, any other one is pulled by each node's containerd (`crictl pull`). Images a node already
+# has are skipped - a restored snapshot has them all.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import contextvars
+import subprocess
+
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Optional
+
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared.files import atomic_write
+
+CONTAINER_KEYS: tuple = ("containers", "initContainers", "ephemeralContainers")
+
+
+def _images(node: Any) -> set[str]:
+    """Returns the images of every container spec in a (part of a) Kubernetes object."""
+    _found = set()
+    if isinstance(node, dict):
+        for _key, _value in node.items():
+            if _key in CONTAINER_KEYS and isinstance(_value, list):
+                _found.update(c["image"] for c in _value if isinstance(c, dict) and isinstance(c.get("image"), str))
+            else:
+                _found.update(_images(_value))
+    elif isinstance(node, list):
+        for _item in node:
+            _found.update(_images(_item))
+
+    return _found
+
+
+def extract(manifest: str) -> set[str]:
+    """Returns the container images referenced by a multi-document manifest."""
+    return set().union(*(_images(d) for d in yaml.safe_load_all(manifest)))
+
+
+def normalize(image: str) -> str:
+    """Returns the fully qualified reference of an image - nginx -> docker.io/library/nginx:latest - as containerd
+    lists it.
+    """
+    _name, _digest = image.split("@", 1) if "@" in image else (image, None)
+    _parts = _name.split("/")
+    if len(_parts) == 1 or not ("." in _parts[0] or ":" in _parts[0] or _parts[0] == "localhost"):
+        _parts = ["docker.io", *(["library"] if len(_parts) == 1 else []), *_parts]
+    _name = "/".join(_parts)
+    if _digest:
+        return f"{_name}@{_digest}"
+
+    return _name if ":" in _parts[-1] else f"{_name}:latest"
+
+
+def _index_file(cluster: Optional[str] = None) -> str:
+    return os.path.join(clusters.state_dir(cluster), "images.json")
+
+
+def index(manifests: Iterable[str], cluster: Optional[str] = None) -> dict[str, list[str]]:
+    """Returns the images of the manifest files - image -> the files that reference it - and writes it to images.json.
+
+    A file that cannot be read or parsed is left out - the apply reports it.
+    """
+    _index: dict[str, list[str]] = {}
+    for _manifest in manifests:
+        try:
+            with open(_manifest, "r") as f:
+                _found = extract(f.read())
+        except (OSError, yaml.YAMLError):
+            continue
+        for _image in _found:
+            _index.setdefault(_image, []).append(os.path.basename(_manifest))
+
+    _index = {i: sorted(s) for i, s in sorted(_index.items())}
+    atomic_write(_index_file(cluster), json.dumps(_index, indent=2, sort_keys=True))
+    return _index
+
+
+def _node_images(node: str) -> set[str]:
+    """Returns the images the node's containerd has."""
+    try:
+        _images = json.loads(runner.run(["docker", "exec", node, "crictl", "images", "-o", "json"]).stdout or "{}").get("images", [])
+    except (subprocess.SubprocessError, json.JSONDecodeError, AttributeError):
+        return set()
+
+    return {normalize(r) for i in _images for r in (i.get("repoTags") or []) + (i.get("repoDigests") or [])}
+
+
+def _local_images() -> set[str]:
+    """Returns the images in the local Docker cache."""
+    try:
+        _res = runner.run(["docker", "images", "--format", "{{.Repository}}:{{.Tag}}"])
+    except subprocess.SubprocessError:
+        return set()
+
+    return {normalize(i) for i in _res.stdout.split() if not i.endswith(":<none>")}
+
+
+def _run(cmd: list[str], result: str) -> str:
+    try:
+        runner.run(cmd, timeout=runner.INSTALL_TIMEOUT)
+        return result
+    except subprocess.SubprocessError as e:
+        return f"failed: {str(getattr(e, 'stderr', None) or e).strip()}"
+
+
+def prefetch(images: Iterable[str], cluster: Optional[str] = None, max_workers: int = 4) -> dict[str, str]:
+    """Prefetches the images into every node of the kind cluster, concurrently.
+
+    Returns:
+        dict: image -> present (every node has it), loaded (from the local Docker cache), pulled, or failed: <why>.
+    """
+    _cluster = cluster or clusters.name()
+    try:
+        _nodes = runner.run(["kind", "get", "nodes", "--name", _cluster]).stdout.split()
+    except subprocess.SubprocessError:
+        return {}
+
+    _images = sorted(set(images))
+    if not _nodes or not _images:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(_nodes))), thread_name_prefix="pfo-images") as pool:
+        _futures = [pool.submit(contextvars.copy_context().run, _node_images, n) for n in _nodes] # The caller's context
+        _present = {n: f.result() for n, f in zip(_nodes, _futures)}
+    _local = _local_images()
+
+    _results, _work = {}, {}
+    for _image in _images:
+        _missing = [n for n in _nodes if normalize(_image) not in _present[n]]
+        if _missing:
+            _work[_image] = _missing
+        else:
+            _results[_image] = "present"
+
+    # A cached image is loaded into all the nodes that miss it at once, any other one is pulled by each node
+    _commands = []
+    for _image, _missing in _work.items():
+        if normalize(_image) in _local:
+            _commands.append((_image, ["kind", "load", "docker-image", _image, "--name", _cluster, "--nodes", ",".join(_missing)], "loaded"))
+        else:
+            _commands.extend((_image, ["docker", "exec", n, "crictl", "pull", _image], "pulled") for n in _missing)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(_commands) or 1)), thread_name_prefix="pfo-images") as pool:
+        _futures = [(i, pool.submit(contextvars.copy_context().run, _run, c, r)) for i, c, r in _commands]
+        for _image, _future in _futures:
+            _result = _future.result()
+            if not _results.get(_image, "").startswith("failed"): # One node that failed fails the image
+                _results[_image] = _result
+
+    return dict(sorted(_results.items()))
@@ -0,0 +1,121 @@
+# Notes:
+# The kind config of a cluster comes from the k8s-installs template (kind-config.yaml), and is sized to the machine
+# before the cluster is created - with the settings in k8s_config.json["kind"]. The number of workers is derived from
+# the CPUs and memory Docker can give the node containers (or set), the Traefik NodePorts are mapped to the host, the
+# containerd registry mirrors are configured, and kube-proxy mode and the kubelet eviction thresholds are set.
+# The kubelets of kind nodes all see the whole machine, so the memory eviction threshold is a share of the machine's
+# memory - pods are evicted before the machine runs out of it, instead of the node containers being OOM killed.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import copy
+import json
+import subprocess
+
+from typing import Any, Optional
+
+from halo import Halo
+from k8s import k8s_config
+from pfo.shared import runner
+
+_kind_spinner = Halo(text_color="blue", spinner="dots")
+
+NODE_CPUS: int = 2 # What one kind node needs to run its share of the components
+NODE_MEMORY: int = 2 * 1024 ** 3
+HOST_MEMORY: int = 2 * 1024 ** 3 # Memory left for the machine itself, outside of the cluster
+EVICTION_SHARE: float = 0.1 # The share of the machine's memory the kubelets keep free
+MIN_EVICTION: int = 512 * 1024 ** 2
+
+DEFAULTS: dict[str, Any] = {
+    "workers": "auto",
+    "max_workers": 3,
+    "kube_proxy_mode": "iptables",
+    "registry_mirrors": {},
+    "port_mappings": [{"containerPort": 30080, "hostPort": 30080}, {"containerPort": 30443, "hostPort": 30443}],
+}
+
+
+def settings() -> dict[str, Any]:
+    """Returns the kind settings in k8s_config.json, with the defaults for the ones that are not set."""
+    return {**DEFAULTS, **k8s_config.get("kind", {})}
+
+
+def resources() -> dict[str, int]:
+    """Returns the CPUs and memory (bytes) the node containers can use - what Docker has, else what the machine has.
+
+    Docker Desktop runs the containers in a VM, which usually has less than the machine.
+    """
+    try:
+        _info = json.loads(runner.run(["docker", "info", "--format", "{{json .}}"]).stdout or "{}")
+        if _info.get("NCPU") and _info.get("MemTotal"):
+            return {"cpus": int(_info["NCPU"]), "memory": int(_info["MemTotal"])}
+    except (subprocess.SubprocessError, OSError, json.JSONDecodeError, TypeError, ValueError):
+        pass # Docker is not running - the cluster cannot be created either, but the config can be
+
+    try:
+        _memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        _memory = 0
+
+    return {"cpus": os.cpu_count() or 1, "memory": _memory}
+
+
+def workers(host: dict[str, int], kind_settings: dict[str, Any]) -> int:
+    """Returns the number of workers - as set, or as many as fit next to the control plane (at least one)."""
+    _fit = min(
+        (host["memory"] - HOST_MEMORY) // NODE_MEMORY - 1,
+        host["cpus"] // NODE_CPUS - 1,
+    )
+    if kind_settings["workers"] != "auto":
+        _workers = int(kind_settings["workers"])
+        if _workers > _fit:
+            _kind_spinner.warn(f"{_workers} kind workers oversubscribe this machine - {max(_fit, 0)} fit.")
+        return _workers
+
+    return max(1, min(_fit, int(kind_settings["max_workers"])))
+
+
+def eviction(host: dict[str, int]) -> dict[str, str]:
+    """Returns the kubelet's hard eviction thresholds."""
+    _memory = max(int(host["memory"] * EVICTION_SHARE), MIN_EVICTION)
+    return {"memory.available": f"{_memory // 1024 ** 2}Mi", "nodefs.available": "10%", "imagefs.available": "10%"}
+
+
+def _mirror_patch(registry: str, endpoint: str) -> str:
+    return f'[plugins."io.containerd.grpc.v1.cri".registry.mirrors."{registry}"]\n  endpoint = ["{endpoint}"]'
+
+
+def generate(kind_config: dict[str, Any], kind_settings: Optional[dict[str, Any]] = None, host: Optional[dict[str, int]] = None) -> dict[str, Any]:
+    """Returns the kind config sized to the machine - see the notes at the top of this file.
+
+    The control-plane nodes of the template are kept, and its first worker is the model of every worker.
+    """
+    _settings = kind_settings or settings()
+    _resources = host or resources()
+    _config = copy.deepcopy(kind_config)
+
+    _nodes = _config.get("nodes") or [{"role": "control-plane"}]
+    _control_planes = [n for n in _nodes if n.get("role") == "control-plane"] or [{"role": "control-plane"}]
+    _worker = next((n for n in _nodes if n.get("role") == "worker"), {"role": "worker"})
+    _config["nodes"] = _control_planes + [copy.deepcopy(_worker) for _ in range(workers(_resources, _settings))]
+
+    _mappings = _control_planes[0].setdefault("extraPortMappings", [])
+    _mapped = {m.get("containerPort") for m in _mappings}
+    _mappings.extend(dict(m) for m in _settings["port_mappings"] if m["containerPort"] not in _mapped)
+
+    _config.setdefault("networking", {})["kubeProxyMode"] = _settings["kube_proxy_mode"]
+
+    if _settings["registry_mirrors"]:
+        _patches = _config.setdefault("containerdConfigPatches", [])
+        _patches.extend(p for p in (_mirror_patch(r, e) for r, e in sorted(_settings["registry_mirrors"].items())) if p not in _patches)
+
+    _kubelet = "kind: KubeletConfiguration\nevictionHard:\n" + "".join(f'  {k}: "{v}"\n' for k, v in eviction(_resources).items())
+    _config["kubeadmConfigPatches"] = [p for p in _config.get("kubeadmConfigPatches", []) if "kind: KubeletConfiguration" not in p] + [_kubelet]
+
+    return _config
+
+
+def inputs() -> dict[str, Any]:
+    """Returns what the generated kind config depends on - a cluster's kind config is generated again when it changes."""
+    return {"settings": settings(), "resources": resources()}
@@ -4,64 +4,80 @@ import json
 import time
 
 from halo import Halo
-from k8s import k8s_config, _tempdir
+from k8s import k8s_config
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared import toolchain
+from k8s import pipeline
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 
 _metallb_spinner = Halo(text_color="blue", spinner="dots")
-_kubectl = ["command", "-v", "kubectl"]
 
 metallb_config = k8s_config.get("metallb", {})
 
+def native_manifest_url() -> str:
+    """The MetalLB manifest of the configured version."""
+    return f"https://raw.githubusercontent.com/metallb/metallb/{metallb_config['version']}/config/manifests/metallb-native.yaml"
+
 def is_kubectl_installed() -> bool:
     """Check if kubectl is installed."""
-    _res = subprocess.run(_kubectl, check=True, capture_output=True, text=True)
-    if _res.returncode == 0:
-        return True
-    
-    return False
+    return toolchain.is_installed("kubectl")
 
-def install() -> None:
-    """Install MetalLB in the Kubernetes cluster."""
+def install() -> bool:
+    """Install MetalLB in the Kubernetes cluster - returns True if it was installed."""
     if not is_kubectl_installed():
         _metallb_spinner.fail("kubectl is not installed. Please install kubectl to proceed.")
+        return False
     
     _metallb_spinner.start("Installing MetalLB...")
 
     try:
         # Apply the MetalLB manifest
-        _res = subprocess.run(["kubectl", "apply", "-f", f"https://raw.githubusercontent.com/metallb/metallb/{metallb_config['version']}/config/manifests/metallb-native.yaml"], check=True, capture_output=True, text=True)
+        _res = runner.run(["kubectl", "apply", "-f", pipeline.resolve(native_manifest_url())], timeout=runner.APPLY_TIMEOUT)
         _metallb_spinner.succeed("MetalLB installed successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _metallb_spinner.fail(f"Failed to install MetalLB: {e}")
+        return False
 
     if _res.returncode != 0:
         _metallb_spinner.fail("MetalLb installation reponse code was not 0. Please check the kubectl output for details.")
+        return False
+
+    return True
 
-def update() -> None:
-    """Configure MetalLB with a specific IP address pool."""
+def update(manifest: str|None = None) -> bool:
+    """Configure MetalLB with a specific IP address pool - returns True if it was configured.
+
+    Args:
+        manifest (str): The already rendered configuration (i.e. by `pfo k8s --plan`) - built with kustomize if None.
+    """
     _metallb_spinner.start("Configuring MetalLB...")
-    _metallb_basedir = os.path.expanduser(metallb_config.get("basedir", "~/.pfo/k8s/pyops/overlays/metallb"))
+    _metallb_basedir = clusters.path(metallb_config.get("basedir", "~/.pfo/k8s/{env}/overlays/metallb"))
 
-    if not os.path.exists(_tempdir):
-        os.makedirs(_tempdir, exist_ok=True)
+    _tempdir = clusters.tempdir() # The active cluster's temp directory
+    _config_file = manifest or os.path.join(_tempdir, "metallb-config.yaml")
 
     # Create a MetalLB configuration file
-    try:
-        _res = subprocess.run(["kustomize", "build", _metallb_basedir], check=True, capture_output=True, text=True)
-        with open(os.path.join(_tempdir, "metallb-config.yaml"), "w+") as f:
-            f.write(_res.stdout)
-        _metallb_spinner.succeed("MetalLB configuration file created successfully.")
-    except subprocess.CalledProcessError as e:
-        _metallb_spinner.fail(f"Failed to create MetalLB configuration file: {e}")
-        return
+    if manifest is None:
+        try:
+            _res = runner.run(["kustomize", "build", _metallb_basedir], timeout=runner.BUILD_TIMEOUT)
+            with open(_config_file, "w+") as f:
+                f.write(_res.stdout)
+            _metallb_spinner.succeed("MetalLB configuration file created successfully.")
+        except subprocess.SubprocessError as e:
+            _metallb_spinner.fail(f"Failed to create MetalLB configuration file: {e}")
+            return False
 
     # Apply the MetalLB configuration
     try:
-        _res = subprocess.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "metallb-config.yaml")], check=True, capture_output=True, text=True)
+        _res = runner.run(["kubectl", "apply", "-f", _config_file], timeout=runner.APPLY_TIMEOUT)
         if _res.returncode != 0:
             _metallb_spinner.fail("MetalLB configuration response code was not 0. Please check the kubectl output for details.")
-    except subprocess.CalledProcessError as e:
+            return False
+    except subprocess.SubprocessError as e:
         _metallb_spinner.fail(f"Failed to apply MetalLB configuration: {e}")
+        return False
 
     _metallb_spinner.succeed("MetalLB configured successfully.")
+    return True
@@ -0,0 +1,216 @@
+# Notes:
+# `pfo k8s --create` spends most of a minute waiting for the kind nodes to boot. The host-side work of the create is
+# started before that, and runs while the nodes boot: the kustomize builds (prereqs, base, overlays, MetalLB), the
+# remote manifests the installers apply (MetalLB, Traefik CRDs, ArgoCD), and the Helm charts they install - each pulled
+# once its repository is added. The installers only block on what they need, when they first need it, and use what
+# was prefetched - resolve() returns the local copy of a manifest URL or a chart, and built() the built manifest.
+# A build is only used while the files it was built from are unchanged. With ArgoCD, the overlays are not prefetched -
+# the argocd-tls step writes the certificate into them, so they are built after it.
+# The charts are also rendered with `helm template` and their install values, so manifests() has every object the
+# create applies - pfo.k8s.images reads the images to prefetch into the nodes from them.
+# Anything that could not be prefetched is left to the installer, which fetches or builds it as it always did.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import glob
+import shutil
+import hashlib
+import threading
+import contextvars
+
+import requests
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared import templates
+
+_active: dict[str, "Pipeline"] = {} # cluster -> its running pipeline
+_active_lock = threading.Lock()
+
+
+def _work(components: Iterable[str], k8s_dir: str) -> dict[str, Any]:
+    """Returns what a create of the components can prefetch - the overlays to build, the URLs to download, the Helm
+    repositories and charts to pull, and the releases to render.
+    """
+    from k8s import metallb, traefik
+    from pfo.argocd import functions as argocd
+    from pfo.monitoring import prometheus, grafana, loki
+
+    _components = set(components)
+    _builds = {n: os.path.join(k8s_dir, n) for n in ("prereqs", "base", "overlays")}
+    _urls, _charts, _releases = [], {}, {}
+    if "metallb" in _components:
+        _builds["metallb"] = clusters.path(metallb.metallb_config.get("basedir", "~/.pfo/k8s/{env}/overlays/metallb"))
+        _urls.append(metallb.native_manifest_url())
+    if "traefik" in _components:
+        _urls.append(traefik.CRDS_URL)
+        _charts[traefik.REPOSITORY] = [traefik.CRDS_CHART, traefik.CHART]
+        _releases["traefik"] = (traefik.CHART, traefik.helm_args())
+    if "argocd" in _components:
+        del _builds["overlays"] # Built once the argocd-tls step wrote the certificate into them
+        _urls.extend([argocd.install_manifest_url(), argocd.IMAGE_UPDATER_URL])
+    for _component, _release, _module in (("prometheus", "prometheus", prometheus), ("grafana", "grafana", grafana), ("loki", "loki-stack", loki)):
+        if _component in _components:
+            _charts.setdefault(_module.REPOSITORY, []).append(_module.CHART)
+            _releases[_release] = (_module.CHART, _module.helm_args())
+
+    return {"builds": _builds, "urls": _urls, "charts": _charts, "releases": _releases}
+
+
+def _inputs(path: str) -> str:
+    """Returns a hash of what a build is built from - the path and content of every file under its directory."""
+    _hash = hashlib.sha256()
+    _paths = []
+    for _root, _, _files in os.walk(path):
+        _paths.extend(os.path.join(_root, f) for f in _files)
+
+    for _path in sorted(_paths):
+        with open(_path, "rb") as f:
+            _hash.update(_path.encode("utf-8") + b"\0" + f.read())
+
+    return _hash.hexdigest()
+
+
+class Pipeline():
+    """The host-side work of a create, run concurrently with the kind node boot."""
+
+    def __init__(self, k8s_dir: str, components: Iterable[str], cluster: Optional[str] = None, max_workers: int = 4) -> None:
+        self.cluster: str = cluster or clusters.name()
+        self.components: list[str] = list(components)
+        self.dir: str = os.path.join(clusters.state_dir(self.cluster), "prefetch")
+        self.work: dict[str, Any] = _work(self.components, k8s_dir)
+        self.max_workers: int = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: dict[str, Future] = {} # prefetched item (a build, URL, chart or release) -> its local path
+        self._inputs: dict[str, str] = {} # build -> the hash of the files it was built from
+
+    def _submit(self, key: str, fn: Callable, *args: Any) -> Future:
+        self._futures[key] = self._pool.submit(contextvars.copy_context().run, fn, *args)
+        return self._futures[key]
+
+    def start(self) -> "Pipeline":
+        """Starts prefetching, and makes this the pipeline resolve() and built() use for the cluster."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pfo-prefetch")
+        for _name, _path in self.work["builds"].items():
+            self._submit(f"build:{_name}", self._build, _name, _path)
+        if not templates.is_offline(): # Offline, the installers fetch what they need from their caches themselves
+            for _url in self.work["urls"]:
+                self._submit(_url, self._download, _url)
+            for _repository, _charts in self.work["charts"].items():
+                _added = self._submit(f"repo:{_repository[0]}", self._add_repository, *_repository)
+                for _chart in _charts:
+                    self._submit(_chart, self._pull, _chart, _added)
+            for _release, (_chart, _args) in self.work["releases"].items():
+                self._submit(f"template:{_release}", self._template, _release, _chart, _args)
+
+        with _active_lock:
+            _active[self.cluster] = self
+        return self
+
+    def stop(self) -> None:
+        """Stops prefetching - what did not start yet is cancelled, and the installers fetch it themselves."""
+        with _active_lock:
+            if _active.get(self.cluster) is self:
+                del _active[self.cluster]
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def get(self, key: str, timeout: Optional[float] = runner.INSTALL_TIMEOUT) -> Optional[str]:
+        """Waits for a prefetched item, and returns its local path - None if it was not prefetched, or failed."""
+        _future = self._futures.get(key)
+        if _future is None or _future.cancelled():
+            return None
+
+        try:
+            return _future.result(timeout=timeout)
+        except Exception: # Anything the prefetch ran into, the installer runs into again - and reports
+            return None
+
+    def built(self, name: str, timeout: Optional[float] = runner.INSTALL_TIMEOUT) -> Optional[str]:
+        """Waits for a build, and returns its manifest - None if it was not built, failed, or its files changed since."""
+        _file = self.get(f"build:{name}", timeout=timeout)
+        if _file is None or self._inputs.get(name) != _inputs(self.work["builds"][name]):
+            return None
+
+        return _file
+
+    def manifests(self) -> list[str]:
+        """Waits for the builds, downloads and rendered releases, and returns the manifests that were prefetched."""
+        _keys = [k for k in self._futures if k.startswith(("build:", "template:")) or k in self.work["urls"]]
+        return [p for p in (self.get(k) for k in _keys) if p]
+
+    def _build(self, name: str, path: str) -> str:
+        self._inputs[name] = _inputs(path) # Before the build - a file changed while it runs makes it stale
+        if name == "overlays": # Without the overlays of the components that are not selected
+            from k8s import components as cluster_components
+            path = cluster_components.overlays(path, self.components, os.path.join(os.path.dirname(path), ".overlays-prefetch"))
+        _res = runner.run(["kustomize", "build", path], timeout=runner.BUILD_TIMEOUT)
+        _file = os.path.join(self.dir, f"{name}-config.yaml")
+        with open(_file, "w") as f:
+            f.write(_res.stdout)
+        return _file
+
+    def _download(self, url: str) -> str:
+        _res = requests.get(url, timeout=runner.DEFAULT_TIMEOUT)
+        _res.raise_for_status()
+        _file = os.path.join(self.dir, "downloads", f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]}-{os.path.basename(url)}")
+        os.makedirs(os.path.dirname(_file), exist_ok=True)
+        with open(_file, "wb") as f:
+            f.write(_res.content)
+        return _file
+
+    def _add_repository(self, name: str, url: str) -> str:
+        runner.run(["helm", "repo", "add", "--force-update", name, url])
+        runner.run(["helm", "repo", "update", name])
+        return name
+
+    def _pull(self, chart: str, added: Future) -> str:
+        added.result() # The chart's repository has to be added first
+        _dir = os.path.join(self.dir, "charts", chart.replace("/", "_"))
+        os.makedirs(_dir, exist_ok=True)
+        runner.run(["helm", "pull", chart, "--destination", _dir], timeout=runner.INSTALL_TIMEOUT)
+        _archives = glob.glob(os.path.join(_dir, "*.tgz"))
+        if not _archives:
+            raise FileNotFoundError(f"helm pull {chart} did not write a chart archive")
+        return _archives[0]
+
+    def _template(self, release: str, chart: str, args: list[str]) -> str:
+        _chart = self.get(chart) or chart # The pulled archive - else the chart in its (added) repository
+        _res = runner.run(["helm", "template", release, _chart, *args], timeout=runner.BUILD_TIMEOUT)
+        _file = os.path.join(self.dir, f"{release}-release.yaml")
+        with open(_file, "w") as f:
+            f.write(_res.stdout)
+        return _file
+
+
+def active(cluster: Optional[str] = None) -> Optional[Pipeline]:
+    """Returns the running pipeline of the cluster (default: the active one), if there is one."""
+    with _active_lock:
+        return _active.get(cluster or clusters.name())
+
+
+def resolve(ref: str) -> str:
+    """Returns the local copy of a manifest URL or a Helm chart, once it is prefetched - else the URL or chart itself."""
+    _pipeline = active()
+    return (_pipeline.get(ref) if _pipeline else None) or ref
+
+
+def manifests() -> list[str]:
+    """Returns every manifest the running pipeline of the active cluster prefetched - empty if there is none."""
+    _pipeline = active()
+    return _pipeline.manifests() if _pipeline else []
+
+
+def built(name: str) -> Optional[str]:
+    """Returns the built manifest of prereqs, base, overlays or metallb, once it is built - None if it was not, or its
+    files changed since it was built.
+    """
+    _pipeline = active()
+    return _pipeline.built(name) if _pipeline else None
@@ -0,0 +1,183 @@
+# Notes:
+# `pfo k8s --plan` shows what `pfo k8s --update` would change, without changing anything. Each component update()
+# touches is rendered the way update() renders it - `kustomize build` of its overlay, or `helm template` of its release
+# with the same values - and compared with the cluster by a server-side dry-run (`kubectl diff --server-side`). The
+# components are planned concurrently.
+# The plan is kept in the cluster's state directory (plan/plan.json, and the rendered manifests next to it). An update
+# run within PLAN_TTL seconds reuses it: unchanged components are skipped, and the rendered overlays are applied as
+# they are instead of being built again. A component whose inputs changed since it was planned is updated as usual.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import contextvars
+import subprocess
+
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from halo import Halo
+from k8s import k8s_config
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared.files import atomic_write
+
+_plan_spinner = Halo(text_color="blue", spinner="dots")
+
+PLAN_TTL: int = 600 # Seconds a plan can be reused by the following update
+
+
+def _plan_dir(cluster: Optional[str] = None) -> str:
+    return os.path.join(clusters.state_dir(cluster), "plan")
+
+def _plan_file(cluster: Optional[str] = None) -> str:
+    return os.path.join(_plan_dir(cluster), "plan.json")
+
+def _helm_values(component: str) -> str:
+    """The values file of the component's Helm release - the same one its update() upgrades with."""
+    if component == "traefik":
+        from k8s import traefik
+        return traefik.traefik_values_file()
+
+    from pfo.monitoring import grafana
+    return grafana.grafana_values_file()
+
+def _profile_values(chart: str) -> str:
+    """The overrides of the monitoring profile the chart is upgraded with - see pfo.monitoring.profiles."""
+    from pfo.monitoring import profiles
+    return profiles.values_file(chart)
+
+def components() -> dict[str, dict[str, Any]]:
+    """Returns what Cluster.update() updates, and how each component is rendered - in the active cluster."""
+    return {
+        "metallb": {"kustomize": clusters.path(k8s_config.get("metallb", {}).get("basedir", "~/.pfo/k8s/{env}/overlays/metallb"))},
+        "traefik": {"helm": ["traefik", "traefik/traefik", "--namespace", "traefik", "-f", _helm_values("traefik")]},
+        "argocd": {"kustomize": clusters.path(k8s_config.get("argocd", {}).get("basedir", "~/.pfo/k8s/{env}/overlays/argocd"))},
+        "grafana": {"helm": ["grafana", "grafana/grafana", "--namespace", "monitoring", "--values", _helm_values("grafana"), "--values", _profile_values("grafana")]},
+    }
+
+def _inputs(spec: dict[str, Any]) -> str:
+    """Returns a hash of what the component is rendered from - the files of its overlay, or its Helm values."""
+    _hash = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8"))
+    _paths = []
+    if "kustomize" in spec:
+        for _root, _, _files in os.walk(spec["kustomize"]):
+            _paths.extend(os.path.join(_root, f) for f in _files)
+    else:
+        _paths = [a for a in spec["helm"] if os.path.isfile(a)]
+
+    for _path in sorted(_paths):
+        with open(_path, "rb") as f:
+            _hash.update(_path.encode("utf-8") + b"\0" + f.read())
+
+    return _hash.hexdigest()
+
+def _render(spec: dict[str, Any]) -> str:
+    if "kustomize" in spec:
+        return runner.run(["kustomize", "build", spec["kustomize"]], timeout=runner.BUILD_TIMEOUT).stdout
+
+    return runner.run(["helm", "template", *spec["helm"]], timeout=runner.BUILD_TIMEOUT).stdout
+
+def _objects(manifest: str) -> int:
+    """Returns how many objects the manifest has."""
+    return len([d for d in yaml.safe_load_all(manifest) if isinstance(d, dict) and d.get("kind")])
+
+def summarize_diff(diff: str, objects: int) -> dict[str, int]:
+    """Counts the created, changed and unchanged objects in the output of `kubectl diff`.
+
+    kubectl diff prints one `diff -u -N <live> <merged>` per object that would change - a created object has no live
+    version, so its first hunk starts at -0,0.
+    """
+    _created, _changed, _current = 0, 0, None
+    for _line in diff.splitlines() + ["diff -u -N"]:
+        if _line.startswith("diff -u -N"):
+            if _current is not None:
+                _created, _changed = (_created + 1, _changed) if _current else (_created, _changed + 1)
+            _current = False
+        elif _current is False and _line.startswith("@@ -0,0 "):
+            _current = True
+
+    return {"created": _created, "changed": _changed, "unchanged": max(objects - _created - _changed, 0)}
+
+def _plan_component(name: str, spec: dict[str, Any]) -> dict[str, Any]:
+    _entry: dict[str, Any] = {"inputs": _inputs(spec), "manifest": os.path.join(_plan_dir(), f"{name}.yaml")}
+    try:
+        _manifest = _render(spec)
+        with open(_entry["manifest"], "w") as f:
+            f.write(_manifest)
+
+        # kubectl diff returns 1 when there are differences, anything above is an error
+        _res = runner.run(["kubectl", "diff", "--server-side", "--force-conflicts", "-f", _entry["manifest"]], timeout=runner.APPLY_TIMEOUT, check=False)
+        if _res.returncode > 1:
+            raise subprocess.CalledProcessError(_res.returncode, _res.args, output=_res.stdout, stderr=_res.stderr)
+        _entry.update(summarize_diff(_res.stdout, _objects(_manifest)))
+    except (subprocess.SubprocessError, OSError, yaml.YAMLError) as e:
+        _entry["error"] = str(getattr(e, "stderr", None) or e).strip()
+
+    return _entry
+
+def make(selected: Optional[list[str]] = None, max_workers: int = 4) -> dict[str, Any]:
+    """Plans the update of the active cluster - every component (or the selected ones) is rendered and diffed concurrently.
+
+    Returns:
+        dict: The plan - component -> its rendered manifest, the hash of its inputs, and the created, changed and
+        unchanged object counts (or the error it could not be planned with).
+    """
+    shutil.rmtree(_plan_dir(), ignore_errors=True)
+    os.makedirs(_plan_dir(), exist_ok=True)
+
+    _components = {n: s for n, s in components().items() if selected is None or n in selected}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(_components))), thread_name_prefix="pfo-plan") as pool:
+        _futures = {n: pool.submit(contextvars.copy_context().run, _plan_component, n, s) for n, s in _components.items()}
+        _plan = {"cluster": clusters.name(), "created": time.time(), "components": {n: f.result() for n, f in _futures.items()}}
+
+    atomic_write(_plan_file(), json.dumps(_plan, indent=2, sort_keys=True))
+    return _plan
+
+def load(ttl: int = PLAN_TTL) -> Optional[dict[str, Any]]:
+    """Returns the plan of the active cluster, if there is one younger than ttl seconds."""
+    if not os.path.isfile(_plan_file()):
+        return None
+
+    try:
+        with open(_plan_file(), "r") as f:
+            _plan = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    return _plan if time.time() - _plan.get("created", 0) < ttl else None
+
+def planned(plan: Optional[dict[str, Any]], component: str) -> Optional[dict[str, Any]]:
+    """Returns the component's plan entry, if it is still valid - it was planned without error, from the same inputs."""
+    _entry = (plan or {}).get("components", {}).get(component)
+    _spec = components().get(component)
+    if _entry is None or _spec is None or "error" in _entry or not os.path.isfile(_entry["manifest"]):
+        return None
+
+    return _entry if _entry["inputs"] == _inputs(_spec) else None
+
+def is_unchanged(entry: Optional[dict[str, Any]]) -> bool:
+    """Check if the plan entry has nothing to create or change."""
+    return entry is not None and entry["created"] == 0 and entry["changed"] == 0
+
+def clear() -> None:
+    """Removes the plan of the active cluster - once an update used it, it is out of date."""
+    shutil.rmtree(_plan_dir(), ignore_errors=True)
+
+def print_summary(plan: dict[str, Any]) -> None:
+    """Prints one line per component - what the update would create and change."""
+    for _name, _entry in plan["components"].items():
+        if "error" in _entry:
+            _plan_spinner.fail(f"{plan['cluster']}/{_name}: could not be planned - {_entry['error']}")
+        elif is_unchanged(_entry):
+            _plan_spinner.info(f"{plan['cluster']}/{_name}: no changes ({_entry['unchanged']} unchanged)")
+        else:
+            _plan_spinner.warn(
+                f"{plan['cluster']}/{_name}: {_entry['created']} to create, {_entry['changed']} to change, {_entry['unchanged']} unchanged"
+            )
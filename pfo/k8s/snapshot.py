@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import subprocess
+
+from typing import Iterable, Optional
+
+from halo import Halo
+from k8s import k8s_config
+from pfo.shared import runner
+from pfo.shared import clusters
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+
+_snapshot_spinner = Halo(text_color="blue", spinner="dots")
+_snapshot_root = os.path.join(os.path.expanduser("~"), ".pfo", "snapshots")
+
+# The components a snapshot captures, and where their settings live in k8s_config.json
+COMPONENTS: dict[str, tuple] = {
+    "metallb": ("metallb",),
+    "traefik": ("traefik",),
+    "argocd": ("argocd",),
+    "prometheus": ("monitoring", "prometheus"),
+    "grafana": ("monitoring", "grafana"),
+    "loki": ("monitoring", "loki"),
+}
+
+def _snapshot_dir(name: str) -> str:
+    return os.path.join(_snapshot_root, name)
+
+def _manifest_file(name: str) -> str:
+    return os.path.join(_snapshot_dir(name), "manifest.json")
+
+def _image(name: str, node: str) -> str:
+    return f"pfo-snapshot/{name}:{node}"
+
+def _secrets() -> list[str]:
+    """The generated secrets that belong to a provisioned cluster - the ArgoCD TLS certificate and key."""
+    _argocd = k8s_config.get("argocd", {})
+    return [os.path.expanduser(_argocd[i]) for i in ("tls_cert", "tls_key") if _argocd.get(i)]
+
+def component_hashes() -> dict[str, str]:
+    """Returns a hash of each component's current settings in k8s_config.json.
+
+    The settings of a nested component include the plain settings of the sections it is in - i.e. the monitoring
+    profile, for Prometheus, Grafana and Loki.
+    """
+    _hashes = {}
+    for _component, _path in COMPONENTS.items():
+        _section, _inherited = k8s_config, {}
+        for _key in _path[:-1]:
+            _section = _section.get(_key, {})
+            _inherited.update({k: v for k, v in _section.items() if not isinstance(v, dict)})
+        _section = _section.get(_path[-1], {})
+        _settings = {**_inherited, **_section} if _inherited else _section # Top-level components hash as before
+        _hashes[_component] = hashlib.sha256(json.dumps(_settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return _hashes
+
+def exists(name: str) -> bool:
+    """Check if there is a snapshot for the cluster."""
+    return os.path.isfile(_manifest_file(name))
+
+def load(name: str) -> dict|None:
+    """Returns the snapshot manifest for the cluster, if there is one."""
+    if not exists(name):
+        return None
+
+    with open(_manifest_file(name), "r") as f:
+        return json.load(f)
+
+def changed_components(name: str) -> set[str]:
+    """Returns the components the snapshot does not have as they are now - the ones the cluster was not provisioned
+    with when the snapshot was taken, and the ones whose settings in k8s_config.json differ since.
+    """
+    _manifest = load(name) or {}
+    _saved = _manifest.get("components", {})
+    _installed = set(_manifest.get("installed", COMPONENTS)) # Snapshots from before the list was kept had everything
+    return {c for c, h in component_hashes().items() if c not in _installed or _saved.get(c) != h}
+
+def _failed(results: list) -> list:
+    return [r for r in results if isinstance(r, Exception)]
+
+def _node_spec(inspect: dict) -> dict:
+    """Keeps the parts of `docker inspect` that are needed to recreate a kind node container."""
+    _networks = inspect.get("NetworkSettings", {}).get("Networks", {})
+    _network = "kind" if "kind" in _networks else next(iter(_networks), "kind")
+    return {
+        "name": inspect["Name"].lstrip("/"),
+        "hostname": inspect["Config"].get("Hostname", inspect["Name"].lstrip("/")),
+        "labels": inspect["Config"].get("Labels") or {},
+        "ports": inspect.get("HostConfig", {}).get("PortBindings") or {},
+        "network": _network,
+        "ip": _networks.get(_network, {}).get("IPAddress", ""),
+    }
+
+def save(name: str, components: Optional[Iterable[str]] = None) -> bool:
+    """Snapshots a provisioned kind cluster - the node containers as committed images, their /var, and the secrets.
+
+    kind keeps the node state (etcd, containerd images) on a /var volume, which `docker commit` leaves out, so /var
+    is copied out separately. The nodes are stopped while this happens, so etcd is consistent. The components the
+    cluster was provisioned with (default: all of them) are recorded, so a restore installs the ones it did not have.
+    """
+    _snapshot_spinner.start(f"Snapshotting Kind cluster {name}...")
+    _start = time.perf_counter()
+    _dir = _snapshot_dir(name)
+
+    try:
+        _nodes = runner.run(["kind", "get", "nodes", "--name", name]).stdout.split()
+        if not _nodes:
+            _snapshot_spinner.fail(f"Kind cluster {name} has no nodes to snapshot.")
+            return False
+        _inspect = json.loads(runner.run(["docker", "inspect", *_nodes]).stdout)
+    except (subprocess.SubprocessError, json.JSONDecodeError) as e:
+        _snapshot_spinner.fail(f"Failed to inspect Kind cluster {name}: {e}")
+        return False
+
+    shutil.rmtree(_dir, ignore_errors=True)
+    for _node in _nodes:
+        os.makedirs(os.path.join(_dir, _node), exist_ok=True)
+
+    try:
+        runner.run(["docker", "stop", *_nodes], timeout=runner.APPLY_TIMEOUT)
+
+        _results = runner.run_many([["docker", "commit", n, _image(name, n)] for n in _nodes], timeout=runner.INSTALL_TIMEOUT)
+        _results += runner.run_many([["docker", "cp", f"{n}:/var", os.path.join(_dir, n, "var")] for n in _nodes], timeout=runner.INSTALL_TIMEOUT)
+        if _failed(_results):
+            raise _failed(_results)[0]
+    except (subprocess.SubprocessError, OSError) as e:
+        _snapshot_spinner.fail(f"Failed to snapshot Kind cluster {name}: {e}")
+        shutil.rmtree(_dir, ignore_errors=True)
+        return False
+    finally:
+        try:
+            runner.run(["docker", "start", *_nodes], timeout=runner.APPLY_TIMEOUT)
+        except subprocess.SubprocessError as e:
+            _snapshot_spinner.warn(f"Failed to restart the Kind nodes after the snapshot: {e}")
+
+    os.makedirs(os.path.join(_dir, "secrets"), exist_ok=True)
+    for _secret in _secrets():
+        if os.path.isfile(_secret):
+            shutil.copy2(_secret, os.path.join(_dir, "secrets", os.path.basename(_secret)))
+
+    try:
+        with open(os.path.join(_dir, "kubeconfig"), "w") as f:
+            f.write(runner.run(["kind", "get", "kubeconfig", "--name", name]).stdout)
+    except subprocess.SubprocessError as e:
+        _snapshot_spinner.warn(f"Failed to save the kubeconfig for {name}: {e}")
+
+    _manifest = {
+        "name": name,
+        "created": time.time(),
+        "nodes": [dict(_node_spec(i), image=_image(name, _node_spec(i)["name"])) for i in _inspect],
+        "components": component_hashes(),
+        "installed": sorted(COMPONENTS if components is None else set(components) & set(COMPONENTS)),
+    }
+    with open(_manifest_file(name), "w") as f:
+        json.dump(_manifest, f, indent=2)
+
+    _snapshot_spinner.succeed(f"Kind cluster {name} snapshot saved to {_dir} ({time.perf_counter() - _start:.1f}s).")
+    return True
+
+def _create_cmd(node: dict) -> list[str]:
+    """The `docker create` command for a kind node, with the flags kind itself uses."""
+    _cmd = [
+        "docker", "create", "--name", node["name"], "--hostname", node["hostname"], "--tty",
+        "--privileged", "--security-opt", "seccomp=unconfined", "--security-opt", "apparmor=unconfined",
+        "--tmpfs", "/tmp", "--tmpfs", "/run", "--volume", "/var", "--volume", "/lib/modules:/lib/modules:ro",
+        "--cgroupns=private", "--restart=on-failure:1", "--network", node["network"],
+    ]
+    if node.get("ip"):
+        _cmd += ["--ip", node["ip"]] # Same IP address, so the certificates and kubeconfig stay valid
+
+    for _key, _value in node["labels"].items():
+        _cmd += ["--label", f"{_key}={_value}"]
+
+    for _port, _bindings in node["ports"].items():
+        for _b in _bindings or []:
+            _host = f"{_b['HostIp']}:" if _b.get("HostIp") else ""
+            _cmd += ["--publish", f"{_host}{_b.get('HostPort', '')}:{_port}"]
+
+    return _cmd + [node["image"]]
+
+def restore(name: str) -> bool:
+    """Recreates a kind cluster from its snapshot.
+
+    Returns:
+        bool: True if the cluster was restored - on failure, the half-restored node containers are removed.
+    """
+    _manifest = load(name)
+    if _manifest is None:
+        _snapshot_spinner.fail(f"There is no snapshot for Kind cluster {name}.")
+        return False
+
+    _snapshot_spinner.start(f"Restoring Kind cluster {name} from its snapshot...")
+    _start = time.perf_counter()
+    _dir = _snapshot_dir(name)
+    _nodes = [n["name"] for n in _manifest["nodes"]]
+
+    try:
+        _results = runner.run_many([_create_cmd(n) for n in _manifest["nodes"]], timeout=runner.APPLY_TIMEOUT)
+        _results += runner.run_many([["docker", "cp", os.path.join(_dir, n, "var"), f"{n}:/"] for n in _nodes], timeout=runner.INSTALL_TIMEOUT)
+        if _failed(_results):
+            raise _failed(_results)[0]
+
+        runner.run(["docker", "start", *_nodes], timeout=runner.APPLY_TIMEOUT)
+        runner.run(["kind", "export", "kubeconfig", "--name", name])
+        runner.run(["kubectl", "wait", "--for=condition=Ready", "nodes", "--all", "--timeout=180s", "--context", clusters.context(name)], timeout=runner.INSTALL_TIMEOUT)
+    except (subprocess.SubprocessError, OSError) as e:
+        _snapshot_spinner.fail(f"Failed to restore Kind cluster {name}: {e}")
+        runner.run(["docker", "rm", "--force", *_nodes], check=False)
+        return False
+
+    for _secret in _secrets():
+        _saved = os.path.join(_dir, "secrets", os.path.basename(_secret))
+        if os.path.isfile(_saved):
+            os.makedirs(os.path.dirname(_secret), exist_ok=True)
+            shutil.copy2(_saved, _secret)
+
+    _snapshot_spinner.succeed(f"Kind cluster {name} restored from its snapshot ({time.perf_counter() - _start:.1f}s).")
+    return True
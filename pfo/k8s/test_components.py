@@ -0,0 +1,81 @@
+import json
+import yaml
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import components
+from pfo.shared import clusters
+
+_CONFIG = {
+    "metallb": {"enabled": True},
+    "traefik": {"enabled": True},
+    "argocd": {"enabled": True},
+    "monitoring": {
+        "prometheus": {"enabled": False},
+        "grafana": {"enabled": False},
+        "loki": {"enabled": False},
+    },
+}
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+class TestComponents:
+
+    def test_enabled(self):
+        """Test that the components with "enabled": false are left out."""
+        with patch.dict(components.k8s_config, json.loads(json.dumps(_CONFIG))):
+            assert components.enabled() == ["metallb", "traefik", "argocd"]
+
+    def test_parse(self):
+        """Test that names are comma separated and repeated, groups are expanded, and the install order is kept."""
+        assert components.parse(["argocd,metallb", "monitoring"]) == ["metallb", "argocd", "prometheus", "grafana", "loki"]
+        assert components.parse(["all"]) == list(components.snapshot.COMPONENTS)
+        assert components.parse(["none"]) == []
+
+    def test_parse_unknown(self):
+        """Test that an unknown name is reported with the valid ones."""
+        with pytest.raises(ValueError, match="istio"):
+            components.parse(["traefik,istio"])
+
+    def test_selected(self, home):
+        """Test that the command line wins over the recorded selection, which wins over the enabled flags."""
+        with patch.dict(components.k8s_config, json.loads(json.dumps(_CONFIG))):
+            assert components.selected(cluster="pyops") == ["metallb", "traefik", "argocd"]
+
+            components.record(["traefik", "metallb"], "pyops")
+            assert components.selected(cluster="pyops") == ["metallb", "traefik"]
+            assert components.selected(recorded=False, cluster="pyops") == ["metallb", "traefik", "argocd"]
+            assert components.selected(["grafana"], cluster="pyops") == ["grafana"]
+
+    def test_record_keeps_state(self, home):
+        """Test that recording the selection keeps the rest of the cluster's state."""
+        clusters.save_state({"name": "pyops", "port_offset": 10}, "pyops")
+        components.record(["argocd"], "pyops")
+
+        assert clusters.load_state("pyops") == {"name": "pyops", "port_offset": 10, "components": ["argocd"]}
+
+    def test_skipped_overlays(self):
+        """Test that an overlay is skipped only when none of its components is selected."""
+        assert components.skipped_overlays(["traefik", "grafana"]) == {"metallb", "argocd"}
+        assert components.skipped_overlays(components.snapshot.COMPONENTS) == set()
+
+    def test_overlays(self, tmp_path):
+        """Test that the overlays of components that are not selected are left out of a copy - and nothing is copied
+        when every listed overlay is selected.
+        """
+        _overlays = tmp_path / "overlays"
+        for _dir in ("metallb", "argocd", "monitoring"):
+            (_overlays / _dir).mkdir(parents=True)
+            (_overlays / _dir / "kustomization.yaml").write_text("resources: []\n")
+        (_overlays / "kustomization.yaml").write_text("namespace: pyops\nresources:\n  - ./metallb\n  - argocd/\n  - monitoring\n  - ../base\n")
+
+        assert components.overlays(str(_overlays), components.snapshot.COMPONENTS, str(tmp_path / ".selected")) == str(_overlays)
+        assert not (tmp_path / ".selected").exists()
+
+        _dir = components.overlays(str(_overlays), ["traefik", "loki"], str(tmp_path / ".selected"))
+        assert _dir == str(tmp_path / ".selected")
+        assert yaml.safe_load((tmp_path / ".selected" / "kustomization.yaml").read_text()) == {"namespace": "pyops", "resources": ["monitoring", "../base"]}
+        assert (_overlays / "kustomization.yaml").read_text().count("argocd") == 1 # The rendered overlays are left alone
@@ -0,0 +1,105 @@
+import json
+import subprocess
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import images # The same module object that src.kubernetes uses
+from pfo.shared import clusters
+
+_MANIFEST = """apiVersion: apps/v1
+kind: Deployment
+spec:
+  template:
+    spec:
+      initContainers:
+        - name: init
+          image: busybox:1.36
+      containers:
+        - name: app
+          image: ghcr.io/pyflowops/app:1.0.0
+---
+apiVersion: v1
+kind: List
+items:
+  - kind: Pod
+    spec:
+      containers:
+        - name: sidecar
+          image: busybox:1.36
+---
+apiVersion: v1
+kind: ConfigMap
+data:
+  image: not-an-image
+"""
+
+class TestImages:
+
+    def test_extract(self):
+        """Test that the images of every container spec are found - in lists and templates, deduplicated."""
+        assert images.extract(_MANIFEST) == {"busybox:1.36", "ghcr.io/pyflowops/app:1.0.0"}
+
+    @pytest.mark.parametrize("image, expected", [
+        ("nginx", "docker.io/library/nginx:latest"),
+        ("bitnami/redis:7", "docker.io/bitnami/redis:7"),
+        ("quay.io/argoproj/argocd:v2.10.3", "quay.io/argoproj/argocd:v2.10.3"),
+        ("localhost:5000/app", "localhost:5000/app:latest"),
+        ("nginx@sha256:abc", "docker.io/library/nginx@sha256:abc"),
+    ])
+    def test_normalize(self, image, expected):
+        assert images.normalize(image) == expected
+
+    def test_index(self, tmp_path, monkeypatch):
+        """Test that the index maps each image to the manifests that use it, and is written to the cluster's state."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        (tmp_path / "a.yaml").write_text(_MANIFEST)
+        (tmp_path / "b.yaml").write_text("kind: Pod\nspec:\n  containers:\n    - image: busybox:1.36\n")
+
+        _index = images.index([str(tmp_path / "a.yaml"), str(tmp_path / "b.yaml"), str(tmp_path / "missing.yaml")], "pyops")
+
+        assert _index == {"busybox:1.36": ["a.yaml", "b.yaml"], "ghcr.io/pyflowops/app:1.0.0": ["a.yaml"]}
+        with open(tmp_path / ".pfo" / "clusters" / "pyops" / "images.json") as f:
+            assert json.load(f) == _index
+
+    def test_prefetch(self):
+        """Test that images the nodes have are skipped, cached ones are loaded, and the others pulled on each node."""
+        _calls = []
+        def _run(cmd, **kwargs):
+            _calls.append(cmd)
+            _stdout = ""
+            if cmd[:3] == ["kind", "get", "nodes"]:
+                _stdout = "pyops-control-plane\npyops-worker\n"
+            elif cmd[-3:] == ["images", "-o", "json"]:
+                _stdout = json.dumps({"images": [{"repoTags": ["docker.io/library/busybox:1.36"]}]})
+            elif cmd[:2] == ["docker", "images"]:
+                _stdout = "ghcr.io/pyflowops/app:1.0.0\n<none>:<none>\n"
+            elif cmd[-2:] == ["pull", "nginx:1.25"] and cmd[2] == "pyops-worker":
+                raise subprocess.CalledProcessError(1, cmd, stderr="not found")
+            return subprocess.CompletedProcess(cmd, 0, stdout=_stdout, stderr="")
+
+        with patch.object(images.runner, "run", side_effect=_run):
+            _results = images.prefetch(["busybox:1.36", "ghcr.io/pyflowops/app:1.0.0", "nginx:1.25", "redis:7"], "pyops")
+
+        assert _results == {
+            "busybox:1.36": "present",
+            "ghcr.io/pyflowops/app:1.0.0": "loaded",
+            "nginx:1.25": "failed: not found",
+            "redis:7": "pulled",
+        }
+        assert ["kind", "load", "docker-image", "ghcr.io/pyflowops/app:1.0.0", "--name", "pyops", "--nodes", "pyops-control-plane,pyops-worker"] in _calls
+        assert len([c for c in _calls if c[-2:] == ["pull", "redis:7"]]) == 2
+
+    def test_prefetch_active_cluster(self):
+        """Test that the node and pull commands run for the cluster that is active where prefetch is called."""
+        _seen = []
+        def _run(cmd, **kwargs):
+            _seen.append(clusters.name())
+            _stdout = "dev-control-plane\ndev-worker\n" if cmd[:3] == ["kind", "get", "nodes"] else ""
+            if cmd[-3:] == ["images", "-o", "json"]:
+                _stdout = json.dumps({"images": []})
+            return subprocess.CompletedProcess(cmd, 0, stdout=_stdout, stderr="")
+
+        with patch.object(images.runner, "run", side_effect=_run), clusters.use("dev"):
+            assert images.prefetch(["redis:7"]) == {"redis:7": "pulled"}
+
+        assert set(_seen) == {"dev"}
@@ -0,0 +1,51 @@
+import yaml
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import kindconfig
+
+_TEMPLATE = yaml.safe_load("""kind: Cluster
+apiVersion: kind.x-k8s.io/v1alpha4
+nodes:
+  - role: control-plane
+    extraPortMappings:
+      - containerPort: 30080
+        hostPort: 30080
+  - role: worker
+    labels:
+      ingress-ready: "true"
+""")
+_GiB = 1024 ** 3
+
+class TestKindConfig:
+
+    @pytest.mark.parametrize("cpus, memory, expected", [(2, 4 * _GiB, 1), (8, 16 * _GiB, 3), (6, 64 * _GiB, 2), (16, 9 * _GiB, 2)])
+    def test_workers_fit_the_machine(self, cpus, memory, expected):
+        """Test that auto sizing is bounded by the CPUs, the memory and max_workers - with at least one worker."""
+        assert kindconfig.workers({"cpus": cpus, "memory": memory}, kindconfig.DEFAULTS) == expected
+
+    def test_workers_set(self):
+        """Test that a set worker count is kept, with a warning when it does not fit."""
+        with patch.object(kindconfig, "_kind_spinner") as mock_spinner:
+            assert kindconfig.workers({"cpus": 2, "memory": 4 * _GiB}, {**kindconfig.DEFAULTS, "workers": 4}) == 4
+        mock_spinner.warn.assert_called_once()
+
+    def test_generate(self):
+        """Test that the template is sized, and the port mappings, mirrors, kube-proxy mode and evictions are set."""
+        _settings = {**kindconfig.DEFAULTS, "registry_mirrors": {"docker.io": "http://kind-registry:5000"}, "kube_proxy_mode": "ipvs"}
+        _config = kindconfig.generate(_TEMPLATE, _settings, {"cpus": 8, "memory": 16 * _GiB})
+
+        assert [n["role"] for n in _config["nodes"]] == ["control-plane", "worker", "worker", "worker"]
+        assert all(n["labels"] == {"ingress-ready": "true"} for n in _config["nodes"][1:])
+        assert [m["containerPort"] for m in _config["nodes"][0]["extraPortMappings"]] == [30080, 30443]
+        assert _config["networking"]["kubeProxyMode"] == "ipvs"
+        assert _config["containerdConfigPatches"] == ['[plugins."io.containerd.grpc.v1.cri".registry.mirrors."docker.io"]\n  endpoint = ["http://kind-registry:5000"]']
+        assert yaml.safe_load(_config["kubeadmConfigPatches"][0])["evictionHard"]["memory.available"] == "1638Mi"
+        assert len(_TEMPLATE["nodes"]) == 2 # The template is not changed
+
+    def test_resources_without_docker(self):
+        """Test that the machine's resources are used when Docker does not answer."""
+        with patch.object(kindconfig.runner, "run", side_effect=FileNotFoundError("docker")):
+            _resources = kindconfig.resources()
+
+        assert _resources["cpus"] >= 1 and _resources["memory"] > 0
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import pytest
+
+from unittest.mock import patch, MagicMock
+from pfo.k8s import pipeline # The same module object the installers use
+from pfo.shared import clusters
+
+_URL = "https://example.com/manifests/install.yaml"
+
+@pytest.fixture
+def k8s_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("PFO_OFFLINE", raising=False)
+    return str(tmp_path / "k8s")
+
+def _runner(calls: list):
+    """Returns a fake runner.run - kustomize prints a manifest, helm pull writes a chart archive."""
+    def _run(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[:2] == ["helm", "pull"]:
+            _dir = cmd[cmd.index("--destination") + 1]
+            open(os.path.join(_dir, f"{cmd[2].split('/')[-1]}-1.0.0.tgz"), "w").close()
+        return subprocess.CompletedProcess(cmd, 0, stdout=f"# built {cmd[-1]}\n" if cmd[0] == "kustomize" else "", stderr="")
+    return _run
+
+class TestPipeline:
+
+    def _pipeline(self, k8s_dir, work):
+        with patch.object(pipeline, "_work", return_value=work):
+            return pipeline.Pipeline(k8s_dir, [], "pyops")
+
+    def test_prefetch(self, k8s_dir):
+        """Test that the overlays are built, the URLs downloaded, and the charts pulled after their repository, then rendered."""
+        _calls = []
+        _work = {"builds": {"prereqs": os.path.join(k8s_dir, "prereqs")}, "urls": [_URL], "charts": {("traefik", "https://traefik.github.io/charts"): ["traefik/traefik"]}, "releases": {"traefik": ("traefik/traefik", ["--namespace", "traefik"])}}
+        with patch.object(pipeline.runner, "run", side_effect=_runner(_calls)), \
+             patch.object(pipeline.requests, "get", return_value=MagicMock(content=b"kind: Namespace\n")), \
+             clusters.use("pyops"):
+            _pipeline = self._pipeline(k8s_dir, _work).start()
+            try:
+                _built = pipeline.built("prereqs")
+                _download = pipeline.resolve(_URL)
+                _chart = pipeline.resolve("traefik/traefik")
+                _manifests = pipeline.manifests()
+            finally:
+                _pipeline.stop()
+
+        assert open(_built).read() == f"# built {os.path.join(k8s_dir, 'prereqs')}\n"
+        assert open(_download).read() == "kind: Namespace\n"
+        assert _chart.endswith("traefik-1.0.0.tgz")
+        _helm = [c[:3] for c in _calls if c[0] == "helm"]
+        assert _helm.index(["helm", "repo", "add"]) < _helm.index(["helm", "pull", "traefik/traefik"])
+        assert ["helm", "template", "traefik", _chart, "--namespace", "traefik"] in _calls # Rendered from the pulled chart
+        assert sorted(os.path.basename(m) for m in _manifests) == sorted([os.path.basename(_download), "prereqs-config.yaml", "traefik-release.yaml"])
+
+    def test_stale(self, k8s_dir):
+        """Test that a build whose files changed after it was built is not used - the installer builds it again."""
+        _overlays = os.path.join(k8s_dir, "overlays")
+        os.makedirs(os.path.join(_overlays, "argocd"))
+        with open(os.path.join(_overlays, "argocd", "argocd-ssl-certs.yaml"), "w") as f:
+            f.write("data:\n  tls.crt: \"\"\n")
+        _work = {"builds": {"overlays": _overlays}, "urls": [], "charts": {}, "releases": {}}
+        with patch.object(pipeline.runner, "run", side_effect=_runner([])), clusters.use("pyops"):
+            _pipeline = self._pipeline(k8s_dir, _work).start()
+            try:
+                assert pipeline.built("overlays") is not None
+                with open(os.path.join(_overlays, "argocd", "argocd-ssl-certs.yaml"), "w") as f:
+                    f.write("data:\n  tls.crt: Y2VydA==\n") # The argocd-tls step writes the certificate
+                assert pipeline.built("overlays") is None
+            finally:
+                _pipeline.stop()
+
+    def test_overlays_after_tls(self, k8s_dir):
+        """Test that the overlays are not prefetched with ArgoCD - the argocd-tls step writes the certificate into them."""
+        with clusters.use("pyops"):
+            assert "overlays" not in pipeline._work(["argocd"], k8s_dir)["builds"]
+            assert "overlays" in pipeline._work(["traefik"], k8s_dir)["builds"]
+
+    def test_fallback(self, k8s_dir):
+        """Test that what could not be prefetched, or was not asked for, resolves to itself."""
+        _work = {"builds": {}, "urls": [_URL], "charts": {}, "releases": {}}
+        with patch.object(pipeline.requests, "get", side_effect=OSError("no network")), clusters.use("pyops"):
+            _pipeline = self._pipeline(k8s_dir, _work).start()
+            try:
+                assert pipeline.resolve(_URL) == _URL
+                assert pipeline.resolve("grafana/grafana") == "grafana/grafana"
+                assert pipeline.built("base") is None
+            finally:
+                _pipeline.stop()
+
+        with clusters.use("pyops"):
+            assert pipeline.active() is None
+            assert pipeline.resolve(_URL) == _URL # Nothing is resolved once the create is over
+
+    def test_offline(self, k8s_dir, monkeypatch):
+        """Test that nothing is downloaded or pulled offline."""
+        monkeypatch.setenv("PFO_OFFLINE", "1")
+        _work = {"builds": {}, "urls": [_URL], "charts": {("grafana", "https://grafana.github.io/helm-charts"): ["grafana/grafana"]}, "releases": {"grafana": ("grafana/grafana", [])}}
+        with patch.object(pipeline.requests, "get") as mock_get, patch.object(pipeline.runner, "run") as mock_run, clusters.use("pyops"):
+            _pipeline = self._pipeline(k8s_dir, _work).start()
+            _pipeline.stop()
+
+        mock_get.assert_not_called()
+        mock_run.assert_not_called()
@@ -0,0 +1,90 @@
+import json
+import threading
+import subprocess
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import plan # The same module object that src.kubernetes uses
+
+_DIFF = """diff -u -N /tmp/LIVE-1/v1.ConfigMap.metallb-system.config /tmp/MERGED-1/v1.ConfigMap.metallb-system.config
+--- /tmp/LIVE-1/v1.ConfigMap.metallb-system.config
++++ /tmp/MERGED-1/v1.ConfigMap.metallb-system.config
+@@ -0,0 +1,4 @@
++apiVersion: v1
++kind: ConfigMap
+diff -u -N /tmp/LIVE-1/metallb.io.v1beta1.IPAddressPool.metallb-system.pool /tmp/MERGED-1/metallb.io.v1beta1.IPAddressPool.metallb-system.pool
+--- /tmp/LIVE-1/metallb.io.v1beta1.IPAddressPool.metallb-system.pool
++++ /tmp/MERGED-1/metallb.io.v1beta1.IPAddressPool.metallb-system.pool
+@@ -6,3 +6,3 @@
+-  - 172.18.255.200-172.18.255.250
++  - 172.18.255.100-172.18.255.150
+"""
+_MANIFEST = "apiVersion: v1\nkind: ConfigMap\n---\napiVersion: metallb.io/v1beta1\nkind: IPAddressPool\n---\napiVersion: v1\nkind: Secret\n"
+
+@pytest.fixture
+def k8s_dir(tmp_path, monkeypatch):
+    """The rendered overlays and values files of the pyops cluster."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    _overlays = tmp_path / ".pfo" / "k8s" / "pyops" / "overlays"
+    for _name, _file in (("metallb", "kustomization.yaml"), ("argocd", "kustomization.yaml"), ("traefik", "traefik-values.yaml"), ("grafana", "values.yaml")):
+        (_overlays / _name).mkdir(parents=True)
+        (_overlays / _name / _file).write_text(f"# {_name}\n")
+    return _overlays
+
+def _cluster(threads: list):
+    """Returns a fake runner.run - MetalLB has changes, nothing else does."""
+    def _run(cmd, **kwargs):
+        threads.append(threading.current_thread().name)
+        if cmd[:2] in (["kustomize", "build"], ["helm", "template"]):
+            return subprocess.CompletedProcess(cmd, 0, stdout=_MANIFEST, stderr="")
+        if cmd[:2] == ["kubectl", "diff"] and "metallb" in cmd[-1]:
+            return subprocess.CompletedProcess(cmd, 1, stdout=_DIFF, stderr="")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    return _run
+
+class TestPlan:
+
+    def test_summarize_diff(self):
+        """Test that created (no live object) and changed objects are told apart."""
+        assert plan.summarize_diff(_DIFF, 3) == {"created": 1, "changed": 1, "unchanged": 1}
+        assert plan.summarize_diff("", 3) == {"created": 0, "changed": 0, "unchanged": 3}
+
+    def test_make(self, k8s_dir):
+        """Test that every component is rendered and diffed server-side, concurrently, and the plan is kept."""
+        _threads = []
+        with patch.object(plan.runner, 'run', side_effect=_cluster(_threads)) as mock_run:
+            _plan = plan.make()
+
+        assert {n: (c["created"], c["changed"], c["unchanged"]) for n, c in _plan["components"].items()} == {
+            "metallb": (1, 1, 1), "traefik": (0, 0, 3), "argocd": (0, 0, 3), "grafana": (0, 0, 3),
+        }
+        assert ["helm", "template", "traefik", "traefik/traefik", "--namespace", "traefik", "-f", str(k8s_dir / "traefik" / "traefik-values.yaml")] in [c.args[0] for c in mock_run.call_args_list]
+        assert all(c.args[0][:3] == ["kubectl", "diff", "--server-side"] for c in mock_run.call_args_list if c.args[0][0] == "kubectl")
+        assert all(t.startswith("pfo-plan") for t in _threads)
+        assert plan.load() == json.loads(json.dumps(_plan))
+
+    def test_errors_are_reported_per_component(self, k8s_dir):
+        """Test that a component that cannot be rendered is reported, and the others are still planned."""
+        def _run(cmd, **kwargs):
+            if cmd[:2] == ["helm", "template"] and cmd[2] == "grafana":
+                raise subprocess.CalledProcessError(1, cmd, output="", stderr="Error: repo grafana not found")
+            return _cluster([])(cmd, **kwargs)
+
+        with patch.object(plan.runner, 'run', side_effect=_run):
+            _plan = plan.make()
+
+        assert _plan["components"]["grafana"]["error"] == "Error: repo grafana not found"
+        assert plan.planned(_plan, "grafana") is None
+        assert plan.planned(_plan, "argocd") is not None
+
+    def test_planned_inputs_changed(self, k8s_dir):
+        """Test that a plan entry is only reused while the component's inputs are the same, and the plan is fresh."""
+        with patch.object(plan.runner, 'run', side_effect=_cluster([])):
+            _plan = plan.make()
+
+        (k8s_dir / "argocd" / "kustomization.yaml").write_text("# argocd, edited\n")
+
+        assert plan.is_unchanged(plan.planned(_plan, "traefik")) is True
+        assert plan.planned(_plan, "argocd") is None
+        assert plan.load(ttl=0) is None
@@ -0,0 +1,107 @@
+import json
+import subprocess
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import snapshot # The same module object that src.kubernetes uses
+
+_inspect = [
+    {
+        "Name": "/pyops-control-plane",
+        "Config": {"Hostname": "pyops-control-plane", "Labels": {"io.x-k8s.kind.cluster": "pyops", "io.x-k8s.kind.role": "control-plane"}},
+        "HostConfig": {"PortBindings": {"6443/tcp": [{"HostIp": "127.0.0.1", "HostPort": "41234"}]}},
+        "NetworkSettings": {"Networks": {"kind": {"IPAddress": "172.18.0.2"}}},
+    },
+    {
+        "Name": "/pyops-worker",
+        "Config": {"Hostname": "pyops-worker", "Labels": {"io.x-k8s.kind.cluster": "pyops", "io.x-k8s.kind.role": "worker"}},
+        "HostConfig": {"PortBindings": {}},
+        "NetworkSettings": {"Networks": {"kind": {"IPAddress": "172.18.0.3"}}},
+    },
+]
+
+def _docker(failing: str = ""):
+    """Returns a fake runner.run for the kind and docker commands of a snapshot."""
+    def _run(cmd, **kwargs):
+        if failing and " ".join(cmd).startswith(failing):
+            raise subprocess.CalledProcessError(1, cmd, output="", stderr="injected failure")
+        if cmd[:3] == ["kind", "get", "nodes"]:
+            return subprocess.CompletedProcess(cmd, 0, stdout="pyops-control-plane\npyops-worker\n", stderr="")
+        if cmd[:2] == ["docker", "inspect"]:
+            return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(_inspect), stderr="")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    return _run
+
+@pytest.fixture(autouse=True)
+def snapshot_root(tmp_path):
+    with patch.object(snapshot, '_snapshot_root', str(tmp_path / "snapshots")), patch.object(snapshot, '_secrets', return_value=[]):
+        yield tmp_path / "snapshots"
+
+class TestSnapshot:
+
+    @patch.object(snapshot, '_snapshot_spinner')
+    def test_save(self, mock_spinner, snapshot_root):
+        """Test that save commits and copies every node, restarts them and writes the manifest."""
+        with patch.object(snapshot.runner, 'run', side_effect=_docker()) as mock_run:
+            assert snapshot.save("pyops") is True
+
+        _cmds = [c.args[0] for c in mock_run.call_args_list]
+        assert ["docker", "stop", "pyops-control-plane", "pyops-worker"] in _cmds
+        assert ["docker", "commit", "pyops-worker", "pfo-snapshot/pyops:pyops-worker"] in _cmds
+        assert ["docker", "start", "pyops-control-plane", "pyops-worker"] in _cmds
+
+        _manifest = snapshot.load("pyops")
+        assert [n["ip"] for n in _manifest["nodes"]] == ["172.18.0.2", "172.18.0.3"]
+        assert snapshot.changed_components("pyops") == set()
+
+    @patch.object(snapshot, '_snapshot_spinner')
+    def test_save_failure_restarts_nodes(self, mock_spinner, snapshot_root):
+        """Test that a failing commit leaves no snapshot behind, and still restarts the nodes."""
+        with patch.object(snapshot.runner, 'run', side_effect=_docker(failing="docker commit")) as mock_run:
+            assert snapshot.save("pyops") is False
+
+        assert ["docker", "start", "pyops-control-plane", "pyops-worker"] in [c.args[0] for c in mock_run.call_args_list]
+        assert snapshot.exists("pyops") is False
+
+    @patch.object(snapshot, '_snapshot_spinner')
+    def test_changed_components(self, mock_spinner, snapshot_root):
+        """Test that a changed component setting in k8s_config.json is detected."""
+        with patch.object(snapshot.runner, 'run', side_effect=_docker()):
+            snapshot.save("pyops")
+
+        _config = json.loads(json.dumps(snapshot.k8s_config))
+        _config["traefik"]["version"] = "v99.0.0"
+        with patch.object(snapshot, 'k8s_config', _config):
+            assert snapshot.changed_components("pyops") == {"traefik"}
+
+    @patch.object(snapshot, '_snapshot_spinner')
+    def test_partial_snapshot(self, mock_spinner, snapshot_root):
+        """Test that the components a cluster was not provisioned with are not in its snapshot."""
+        with patch.object(snapshot.runner, 'run', side_effect=_docker()):
+            snapshot.save("pyops", ["metallb"])
+
+        assert snapshot.load("pyops")["installed"] == ["metallb"]
+        assert snapshot.changed_components("pyops") == {"traefik", "argocd", "prometheus", "grafana", "loki"}
+
+    def test_create_cmd(self):
+        """Test that a node is recreated with its IP address, labels and published ports."""
+        _node = dict(snapshot._node_spec(_inspect[0]), image="pfo-snapshot/pyops:pyops-control-plane")
+
+        _cmd = snapshot._create_cmd(_node)
+
+        assert _cmd[-1] == "pfo-snapshot/pyops:pyops-control-plane"
+        assert _cmd[_cmd.index("--ip") + 1] == "172.18.0.2"
+        assert "io.x-k8s.kind.cluster=pyops" in _cmd
+        assert "127.0.0.1:41234:6443/tcp" in _cmd
+
+    @patch.object(snapshot, '_snapshot_spinner')
+    def test_restore_failure_removes_nodes(self, mock_spinner, snapshot_root):
+        """Test that a failed restore removes the node containers it created."""
+        with patch.object(snapshot.runner, 'run', side_effect=_docker()):
+            snapshot.save("pyops")
+
+        with patch.object(snapshot.runner, 'run', side_effect=_docker(failing="docker start")) as mock_run:
+            assert snapshot.restore("pyops") is False
+
+        assert mock_run.call_args.args[0] == ["docker", "rm", "--force", "pyops-control-plane", "pyops-worker"]
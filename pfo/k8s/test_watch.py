@@ -0,0 +1,113 @@
+import json
+import tarfile
+import subprocess
+import pytest
+
+from unittest.mock import patch
+from pfo.k8s import watch # The same module object that src.kubernetes uses
+from pfo.shared import buildcontext
+from pfo.shared.pfoconfig import PfoConfig
+
+@pytest.fixture
+def package(tmp_path):
+    """A package with two images - docker/api and docker/worker."""
+    for _image in ("api", "worker"):
+        (tmp_path / "docker" / _image).mkdir(parents=True)
+        (tmp_path / "docker" / _image / "Dockerfile").write_text("FROM scratch\n")
+    _config = PfoConfig({
+        "name": "shop",
+        "version": "1.0.0",
+        "docker": {i: {"base_path": "docker", "image": i, "repo_path": f"docker/{i}", "dockerfile": "Dockerfile"} for i in ("api", "worker")},
+    })
+    return tmp_path, watch.Watcher(_config, str(tmp_path), "pyops")
+
+_DEPLOYMENTS = {"items": [
+    {"metadata": {"namespace": "shop", "name": "api"}, "spec": {"template": {"spec": {"containers": [{"image": "api:local"}]}}}},
+    {"metadata": {"namespace": "shop", "name": "api-migrate"}, "spec": {"template": {"spec": {"containers": [{"image": "busybox"}], "initContainers": [{"image": "api:local"}]}}}},
+    {"metadata": {"namespace": "shop", "name": "worker"}, "spec": {"template": {"spec": {"containers": [{"image": "worker:local"}]}}}},
+]}
+
+class TestWatch:
+
+    def test_changed(self, package):
+        """Test that added, modified and removed files are changes, and ignored directories are not scanned."""
+        _root, _watcher = package
+        _before = watch.scan(_watcher.directories.values())
+        (_root / "docker" / "api" / "app.py").write_text("print('hi')\n")
+        (_root / "docker" / "worker" / "Dockerfile").unlink()
+        (_root / "docker" / "api" / "__pycache__").mkdir()
+        (_root / "docker" / "api" / "__pycache__" / "app.pyc").write_text("")
+
+        assert watch.changed(_before, watch.scan(_watcher.directories.values())) == {
+            str(_root / "docker" / "api" / "app.py"),
+            str(_root / "docker" / "worker" / "Dockerfile"),
+        }
+
+    def test_affected(self, package):
+        """Test that a change maps to the image of its docker directory only."""
+        _root, _watcher = package
+        assert _watcher.affected([str(_root / "docker" / "api" / "app.py")]) == ["api"]
+        assert _watcher.affected([str(_root / "docker" / "api-v2" / "app.py"), str(_root / "README.md")]) == []
+
+    def test_cycle(self, package):
+        """Test that only the changed image is built with the cache, loaded, and its deployments restarted."""
+        _root, _watcher = package
+        _calls = []
+        def _run(cmd, **kwargs):
+            _calls.append(cmd)
+            return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(_DEPLOYMENTS) if cmd[:2] == ["kubectl", "get"] else "", stderr="")
+
+        with patch.object(watch.runner, "run", side_effect=_run), patch.object(watch, "_watch_spinner"):
+            _results = _watcher.cycle([str(_root / "docker" / "api" / "app.py")])
+
+        _digest = _watcher.context("api").digest
+        assert _results == {"api": [("shop", "api"), ("shop", "api-migrate")]}
+        _build = next(c for c in _calls if c[:2] == ["docker", "build"])
+        assert _build == ["docker", "build", "-t", "api:local", "-f", "docker/api/Dockerfile", "--label", f"{buildcontext.LABEL}={_digest}", "--build-arg", f"CACHE_BREAKER={_digest}", "-"]
+        assert "--no-cache" not in _build
+        assert ["kind", "load", "docker-image", "api:local", "--name", "pyops"] in _calls
+        assert [c[3] for c in _calls if c[:3] == ["kubectl", "rollout", "restart"]] == ["deployment/api", "deployment/api-migrate"]
+
+    def test_build_context(self, package):
+        """Test that only the files the Dockerfile needs are streamed to the build, and an unchanged context is not rebuilt."""
+        _root, _watcher = package
+        (_root / "docker" / "api" / "Dockerfile").write_text("FROM scratch\nCOPY docker/api/app.py /app.py\n")
+        (_root / "docker" / "api" / "app.py").write_text("print('hi')\n")
+        (_root / "docker" / "api" / "notes.md").write_text("not copied\n")
+        _sent = []
+        def _run(cmd, **kwargs):
+            if cmd[:2] == ["docker", "build"]:
+                with tarfile.open(fileobj=kwargs["stdin"]) as tar:
+                    _sent.append(sorted(tar.getnames()))
+            _stdout = _watcher.context("api").digest if cmd[:3] == ["docker", "image", "inspect"] and _sent else ""
+            return subprocess.CompletedProcess(cmd, 0, stdout=_stdout if cmd[0] == "docker" else "{}", stderr="")
+
+        with patch.object(watch.runner, "run", side_effect=_run), patch.object(watch, "_watch_spinner"):
+            _watcher.cycle([str(_root / "docker" / "api" / "app.py")])
+            (_root / "docker" / "api" / "notes.md").write_text("still not copied\n")
+            assert _watcher.cycle([str(_root / "docker" / "api" / "notes.md")]) == {"api": []}
+
+        assert _sent == [["docker/api/Dockerfile", "docker/api/app.py"]] # Built once
+
+    def test_build_failure(self, package):
+        """Test that an image that does not build is neither loaded nor restarted."""
+        _root, _watcher = package
+        with patch.object(watch.runner, "run", side_effect=subprocess.CalledProcessError(1, ["docker"], stderr="syntax error")) as mock_run, \
+             patch.object(watch, "_watch_spinner"):
+            assert _watcher.cycle([str(_root / "docker" / "worker" / "Dockerfile")]) == {"worker": None}
+        assert [c.args[0][:2] for c in mock_run.call_args_list] == [["docker", "image"], ["docker", "build"]] # Not loaded
+
+    def test_debounce(self, package):
+        """Test that changes in consecutive scans are one cycle, run once the directories are quiet."""
+        _root, _watcher = package
+        _ticks = iter(range(100))
+        _edits = {1: "v1", 2: "v2"} # Saved twice in a row
+        def _sleep(seconds):
+            _tick = next(_ticks)
+            if _tick in _edits:
+                (_root / "docker" / "api" / "app.py").write_text(_edits[_tick])
+
+        with patch.object(watch, "DEBOUNCE", 0), patch.object(_watcher, "cycle") as mock_cycle, patch.object(watch, "_watch_spinner"):
+            _watcher.run(until=lambda: mock_cycle.called, sleep=_sleep)
+
+        mock_cycle.assert_called_once_with({str(_root / "docker" / "api" / "app.py")})
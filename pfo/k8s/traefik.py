@@ -3,34 +3,37 @@ import subprocess
 import json
 
 from halo import Halo
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared import toolchain
+from k8s import pipeline
 from k8s import k8s_config
 
-_env = "pyops"
 _traefik_spinner = Halo(text_color="blue", spinner="dots")
 
-_helm = ["command", "-v", "helm"]
-_kubectl = ["command", "-v", "kubectl"]
-
 BASE = os.path.dirname(os.path.abspath(__file__))
 
 traefik_config = k8s_config.get("traefik", {})
-traefik_values_file = os.path.expanduser(k8s_config.get("traefik", {}).get("values_file", f"~/.pfo/k8s/{_env}/overlays/traefik/values.yaml"))
+REPOSITORY: tuple = ("traefik", "https://traefik.github.io/charts")
+CHART: str = "traefik/traefik"
+CRDS_CHART: str = "traefik/traefik-crds"
+CRDS_URL: str = "https://raw.githubusercontent.com/traefik/traefik/v2.11/docs/content/reference/dynamic-configuration/kubernetes-crd-definition-v1.yml"
+
+def traefik_values_file() -> str:
+    """The Traefik values file of the active cluster."""
+    return clusters.path(traefik_config.get("values_file", "~/.pfo/k8s/{env}/overlays/traefik/values.yaml"))
+
+def helm_args() -> list[str]:
+    """The namespace and values the Traefik release is installed and upgraded with."""
+    return ["--namespace", "traefik", "-f", traefik_values_file()]
 
 def is_helm_installed() -> bool:
     """Check if Helm is installed."""
-    _res = subprocess.run(_helm, check=True, capture_output=True, text=True)
-    if _res.returncode == 0:
-        return True
-    
-    return False
+    return toolchain.is_installed("helm")
 
 def is_kubectl_installed() -> bool:
     """Check if kubectl is installed."""
-    _res = subprocess.run(_kubectl, check=True, capture_output=True, text=True)
-    if _res.returncode == 0:
-        return True
-    
-    return False
+    return toolchain.is_installed("kubectl")
 
 if not is_helm_installed():
     _traefik_spinner.fail("Helm is not installed. Please install Helm to proceed.")
@@ -41,8 +44,8 @@ if not is_kubectl_installed():
 def create_traefik_namespace() -> None:
     """Create the Traefik namespace if it doesn't exist."""
     try:
-        _res = subprocess.run(["kubectl", "create", "namespace", "traefik"], check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _res = runner.run(["kubectl", "create", "namespace", "traefik"], timeout=runner.APPLY_TIMEOUT)
+    except subprocess.SubprocessError as e:
         if "AlreadyExists" in str(e):
             _traefik_spinner.succeed("Traefik namespace already exists. Skipping creation.")
         else:
@@ -56,33 +59,33 @@ def create_traefik_namespace() -> None:
 def add_repo_to_helm() -> None:
     """Add the Traefik Helm repository."""
     try:
-        _res = subprocess.run(["helm", "repo", "add", "traefik", "https://traefik.github.io/charts"], check=True, capture_output=True, text=True)
-        _res2 = subprocess.run(["helm", "repo", "update"], check=True, capture_output=True, text=True)
+        _res = runner.run(["helm", "repo", "add", *REPOSITORY])
+        _res2 = runner.run(["helm", "repo", "update"])
         #_traefik_spinner.succeed("Traefik Helm repository added successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         raise RuntimeError(f"Failed to add Traefik Helm repository: {e}")
 
     if _res.returncode != 0 or _res2.returncode != 0:
         _traefik_spinner.fail("Failed to add Traefik Helm repository. Please check the Helm output for details.")
 
-def check_values_file(traefik_values_file: str) -> bool:
+def check_values_file(values_file: str) -> bool:
     """Check if the Traefik values file exists."""
-    return os.path.isfile(os.path.expanduser(traefik_values_file))
+    return os.path.isfile(os.path.expanduser(values_file))
 
 def _install_crds() -> None:
     """Install Traefik CRDs if they are not already installed."""
     try:
-        _res = subprocess.run(["helm", "install", "traefik-crds", "traefik/traefik-crds", "--namespace", "traefik"], check=True, capture_output=True, text=True)
-        _res = subprocess.run(["kubectl", "apply", "-f", "https://raw.githubusercontent.com/traefik/traefik/v2.11/docs/content/reference/dynamic-configuration/kubernetes-crd-definition-v1.yml"], check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _res = runner.run(["helm", "install", "traefik-crds", pipeline.resolve(CRDS_CHART), "--namespace", "traefik"], timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_traefik_spinner)
+        _res = runner.run(["kubectl", "apply", "-f", pipeline.resolve(CRDS_URL)], timeout=runner.APPLY_TIMEOUT)
+    except subprocess.SubprocessError as e:
         if ("AlreadyExists" not in str(e)) or ("cannot re-use a name that is still in use") not in str(e):
             _traefik_spinner.fail(f"Failed to install Traefik CRDs: {e}")
     
     if _res.returncode != 0:
         _traefik_spinner.fail("Failed to install Traefik CRDs. Please check the Helm output for details.")
 
-def install() -> None:
-    """Install Traefik using Helm with the specified values file."""
+def install() -> bool:
+    """Install Traefik using Helm with the specified values file - returns True if it was installed."""
     _traefik_spinner.start("Installing Traefik...")
 
     # Let's ensure the Helm traefik repository is added
@@ -95,30 +98,33 @@ def install() -> None:
     _install_crds()
 
     # Check if the values file exists
-    if not check_values_file(traefik_values_file):
-        raise FileNotFoundError(f"Values file '{traefik_values_file}' does not exist.")
+    if not check_values_file(traefik_values_file()):
+        raise FileNotFoundError(f"Values file '{traefik_values_file()}' does not exist.")
 
     # Install Traefik with the specified values
     try:
-        _cmd = ["helm", "install", "traefik", "traefik/traefik", "--namespace", "traefik", "-f", traefik_values_file]
-        _res = subprocess.run(_cmd, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _cmd = ["helm", "install", "traefik", pipeline.resolve(CHART), *helm_args()]
+        _res = runner.run(_cmd, timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_traefik_spinner)
+    except subprocess.SubprocessError as e:
         _traefik_spinner.fail(f"Failed to install Traefik: {e}")
+        return False
     
     if _res.returncode != 0:
         _traefik_spinner.fail("Failed to install Traefik. Please check the Helm output for details.")
+        return False
 
     _traefik_spinner.succeed("Traefik installed successfully.")
     _traefik_spinner.stop()
+    return True
 
 def update() -> None:
     """Update Traefik using Helm with the specified values file."""
     _traefik_spinner.start("Updating Traefik...")
     # Let's ensure the Helm traefik repository is added
     try:
-        _cmd = ["helm", "upgrade", "traefik", "traefik/traefik", "--namespace", "traefik", "-f", traefik_values_file]
-        _res = subprocess.run(_cmd, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
+        _cmd = ["helm", "upgrade", "traefik", CHART, *helm_args()]
+        _res = runner.run(_cmd, timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_traefik_spinner)
+    except subprocess.SubprocessError as e:
         _traefik_spinner.fail(f"Failed to install Traefik: {e}")
     
     if _res.returncode != 0:
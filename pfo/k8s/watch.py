@@ -0,0 +1,188 @@
+# Notes:
+# `pfo k8s --watch` is the inner dev loop of a package: run it next to the package's pfo.json, and every change to one of
+# its docker directories (docker.<image>.repo_path) rebuilds that image only - with the build cache, so only the layers
+# after the change are built again - loads it into the kind cluster, and restarts only the deployments that run it.
+# The image is built from its minimal build context (pfo.shared.buildcontext), streamed to `docker build -`, and the
+# context's hash is its cache key: a change outside of the context (an ignored file, one the Dockerfile does not copy)
+# rebuilds, loads and restarts nothing.
+# The directories are polled (the standard library has no file events), and changes are debounced: a save that
+# touches several files, or an editor writing a file in steps, is one rebuild.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import time
+import subprocess
+
+from typing import Any, Callable, Iterable, Optional
+
+from halo import Halo
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared import buildcontext
+from pfo.shared.pfoconfig import PfoConfig
+
+_watch_spinner = Halo(text_color="blue", spinner="dots")
+
+POLL_INTERVAL: float = 0.5 # Seconds between two scans of the docker directories
+DEBOUNCE: float = 0.5 # Seconds without changes before a rebuild starts
+IGNORED: set[str] = {".git", "__pycache__", "node_modules", ".venv", ".pytest_cache"}
+
+
+def scan(directories: Iterable[str]) -> dict[str, tuple[int, int]]:
+    """Returns the modification time and size of every file in the directories."""
+    _files = {}
+    for _directory in directories:
+        for _root, _dirs, _names in os.walk(_directory):
+            _dirs[:] = [d for d in _dirs if d not in IGNORED]
+            for _name in _names:
+                _path = os.path.join(_root, _name)
+                try:
+                    _stat = os.stat(_path)
+                except OSError:
+                    continue # Removed while it was scanned
+                _files[_path] = (_stat.st_mtime_ns, _stat.st_size)
+
+    return _files
+
+
+def changed(before: dict[str, tuple[int, int]], after: dict[str, tuple[int, int]]) -> set[str]:
+    """Returns the files that were added, removed or modified between two scans."""
+    return {p for p in before.keys() | after.keys() if before.get(p) != after.get(p)}
+
+
+class Watcher():
+    """Rebuilds, loads and restarts the images of a package when their docker directories change."""
+
+    def __init__(self, pfo_config: PfoConfig, root: str, cluster: Optional[str] = None) -> None:
+        self.config: PfoConfig = pfo_config
+        self.root: str = os.path.abspath(root)
+        self.cluster: str = cluster or clusters.name()
+        # image -> its docker directory
+        self.directories: dict[str, str] = {
+            d["image"]: os.path.join(self.root, d["repo_path"]) for d in pfo_config.docker.values()
+        }
+
+    def affected(self, paths: Iterable[str]) -> list[str]:
+        """Returns the images whose docker directory has one of the paths."""
+        _paths = [os.path.abspath(p) for p in paths]
+        return sorted(i for i, d in self.directories.items() if any(p == d or p.startswith(d + os.sep) for p in _paths))
+
+    def context(self, image: str) -> Optional[buildcontext.Context]:
+        """Returns the build context of the image - the files of the package its Dockerfile needs."""
+        _data = next(d for d in self.config.docker.values() if d["image"] == image)
+        try:
+            return buildcontext.Context(self.root, os.path.join(_data["repo_path"], _data["dockerfile"] or "Dockerfile"))
+        except (OSError, ValueError) as e:
+            _watch_spinner.fail(f"{image}:local could not be built: {e}")
+            return None
+
+    def built_from(self, image: str) -> Optional[str]:
+        """Returns the hash of the build context the local image was built from - None if there is no such image."""
+        try:
+            _res = runner.run(["docker", "image", "inspect", "--format", f'{{{{index .Config.Labels "{buildcontext.LABEL}"}}}}', f"{image}:local"], check=False)
+        except subprocess.SubprocessError:
+            return None
+
+        if _res.returncode != 0:
+            return None
+
+        return _res.stdout.strip() or None
+
+    def build(self, image: str, context: buildcontext.Context) -> bool:
+        """Builds the image from its build context with the build cache - only the layers after the change are built again."""
+        try:
+            with context.archive() as _archive:
+                runner.run(
+                    ["docker", "build", "-t", f"{image}:local", "-f", context.dockerfile, "--label", f"{buildcontext.LABEL}={context.digest}", "--build-arg", f"CACHE_BREAKER={context.digest}", "-"],
+                    timeout=runner.BUILD_TIMEOUT,
+                    env={**os.environ, "DOCKER_BUILDKIT": "1"},
+                    stdin=_archive,
+                )
+        except subprocess.SubprocessError as e:
+            _watch_spinner.fail(f"{image}:local could not be built: {str(getattr(e, 'stderr', None) or e).strip()}")
+            return False
+
+        return True
+
+    def load(self, image: str) -> bool:
+        """Loads the image into every node of the kind cluster."""
+        try:
+            runner.run(["kind", "load", "docker-image", f"{image}:local", "--name", self.cluster], timeout=runner.INSTALL_TIMEOUT)
+        except subprocess.SubprocessError as e:
+            _watch_spinner.fail(f"{image}:local could not be loaded into {self.cluster}: {str(getattr(e, 'stderr', None) or e).strip()}")
+            return False
+
+        return True
+
+    def deployments(self, image: str) -> list[tuple[str, str]]:
+        """Returns the (namespace, name) of every deployment with a container that runs the image."""
+        try:
+            _items = json.loads(runner.run(["kubectl", "get", "deployments", "--all-namespaces", "-o", "json"]).stdout or "{}").get("items", [])
+        except (subprocess.SubprocessError, json.JSONDecodeError):
+            return []
+
+        _deployments = []
+        for _item in _items:
+            _spec = _item.get("spec", {}).get("template", {}).get("spec", {})
+            _images = [c.get("image", "") for c in _spec.get("containers", []) + _spec.get("initContainers", [])]
+            if any(i == f"{image}:local" or i.endswith(f"/{image}:local") for i in _images):
+                _deployments.append((_item["metadata"]["namespace"], _item["metadata"]["name"]))
+
+        return sorted(_deployments)
+
+    def restart(self, image: str) -> list[tuple[str, str]]:
+        """Restarts the deployments that run the image, and returns them."""
+        _deployments = self.deployments(image)
+        for _namespace, _name in _deployments:
+            try:
+                runner.run(["kubectl", "rollout", "restart", f"deployment/{_name}", "--namespace", _namespace], timeout=runner.APPLY_TIMEOUT)
+            except subprocess.SubprocessError as e:
+                _watch_spinner.fail(f"{_namespace}/{_name} could not be restarted: {e}")
+
+        return _deployments
+
+    def cycle(self, paths: Iterable[str]) -> dict[str, Any]:
+        """Rebuilds, loads and restarts the images the changed paths belong to.
+
+        Returns:
+            dict: image -> the deployments it restarted (none if it was up to date), or None if it could not be built or loaded.
+        """
+        _results = {}
+        for _image in self.affected(paths):
+            _start = time.perf_counter()
+            _watch_spinner.start(f"{_image} changed - rebuilding...")
+            _context = self.context(_image)
+            if _context is not None and self.built_from(_image) == _context.digest:
+                _watch_spinner.info(f"{_image}:local is up to date - the change is not in its build context.")
+                _results[_image] = []
+                continue
+            if not (_context is not None and self.build(_image, _context) and self.load(_image)):
+                _results[_image] = None
+                continue
+            _results[_image] = self.restart(_image)
+            _restarted = ", ".join(f"{n}/{d}" for n, d in _results[_image]) or "no deployments run it yet"
+            _watch_spinner.succeed(f"{_image}:local rebuilt and loaded in {time.perf_counter() - _start:.1f}s - restarted {_restarted}.")
+
+        return _results
+
+    def run(self, until: Optional[Callable[[], bool]] = None, sleep: Callable[[float], None] = time.sleep) -> None:
+        """Watches the docker directories until interrupted (or until() is True), and runs a cycle per debounced change."""
+        _directories = list(self.directories.values())
+        _last = scan(_directories)
+        _pending: set[str] = set()
+        _quiet_since = time.monotonic()
+        _watch_spinner.info(f"Watching {', '.join(os.path.relpath(d, self.root) for d in _directories)} - Ctrl+C to stop.")
+
+        while until is None or not until():
+            sleep(POLL_INTERVAL)
+            _now = scan(_directories)
+            _changes = changed(_last, _now)
+            _last = _now
+            if _changes:
+                _pending |= _changes
+                _quiet_since = time.monotonic()
+            elif _pending and time.monotonic() - _quiet_since >= DEBOUNCE:
+                self.cycle(_pending)
+                _pending = set()
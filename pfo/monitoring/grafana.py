@@ -2,55 +2,70 @@ import os
 import subprocess
 import base64
 from halo import Halo
+from pfo.shared import runner
+from pfo.shared import clusters
 from pfo.monitoring import monitoring_config
-from pfo.k8s import _tempdir
+from pfo.monitoring import profiles
+from pfo.k8s import pipeline
 from k8s import k8s_config
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 
-_env = "pyops"
 _grafana_spinner = Halo(text_color="blue", spinner="dots")
 grafana_config = monitoring_config.get("grafana", {})
-grafana_values_file = os.path.expanduser(grafana_config.get("values_file", f"~/.pfo/k8s/{_env}/overlays/grafana/values.yaml"))
+REPOSITORY: tuple = ("grafana", "https://grafana.github.io/helm-charts")
+CHART: str = "grafana/grafana"
+
+def grafana_values_file() -> str:
+    """The Grafana values file of the active cluster."""
+    return clusters.path(grafana_config.get("values_file", "~/.pfo/k8s/{env}/overlays/grafana/values.yaml"))
+
+def helm_args() -> list[str]:
+    """The namespace and values the Grafana release is installed and upgraded with."""
+    return ["--namespace", "monitoring", "--values", grafana_values_file(), "--values", profiles.values_file("grafana")]
 
 def add_repository() -> None:
     """Add the Grafana Helm repository."""
     _grafana_spinner.start("Adding Grafana Helm repository...")
 
     try:
-        _res = subprocess.run(["helm", "repo", "add", "grafana", "https://grafana.github.io/helm-charts"], check=True, capture_output=True, text=True)
+        _res = runner.run(["helm", "repo", "add", *REPOSITORY])
         _grafana_spinner.succeed("Grafana Helm repository added successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _grafana_spinner.fail(f"Failed to add Grafana Helm repository: {e}")
 
     if _res.returncode != 0:
         _grafana_spinner.fail("Grafana Helm repository addition response code was not 0. Please check the Helm output for details.")
 
-def install() -> None:
-    """Install Grafana in the Kubernetes cluster."""
+def install() -> bool:
+    """Install Grafana in the Kubernetes cluster - returns True if it was installed."""
     _grafana_spinner.start("Installing Grafana...")
     add_repository()  # Ensure the Grafana Helm repository is added
 
     try:
-        _res = subprocess.run(["helm", "install", "grafana", "grafana/grafana", "--namespace", "monitoring", "--values", grafana_values_file], check=True, capture_output=True, text=True)
+        _res = runner.run(["helm", "install", "grafana", pipeline.resolve(CHART), *helm_args()], timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_grafana_spinner)
         _grafana_spinner.succeed("Grafana installed successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _grafana_spinner.fail(f"Failed to install Grafana: {e}")
+        return False
 
     if _res.returncode != 0:
         _grafana_spinner.fail("Grafana installation response code was not 0. Please check the Helm output for details.")
+        return False
+
+    return True
 
 def get_grafana_default_password() -> str:
     """Retrieve the Grafana admin password."""
     try:
-        _res = subprocess.run(["kubectl", "get", "secret", "grafana", "--namespace", "monitoring", "-o", "jsonpath='{.data.admin-password}'"], check=True, capture_output=True, text=True)
+        _res = runner.run(["kubectl", "get", "secret", "grafana", "--namespace", "monitoring", "-o", "jsonpath='{.data.admin-password}'"])
         if _res.returncode != 0:
             _grafana_spinner.fail("Failed to retrieve Grafana admin password. Please check the kubectl output for details.")
             return ""
         
         password = base64.b64decode(_res.stdout.strip().strip("'")).decode('utf-8')
         return password
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _grafana_spinner.fail(f"Failed to retrieve Grafana admin password: {e}")
         return ""
 
@@ -58,17 +73,16 @@ def update() -> None:
     """Update Grafana configuration."""
     _grafana_spinner.start("Updating Grafana configuration...")
 
-    _grafana_basedir = os.path.expanduser(grafana_config.get("basedir", "~/.pfo/k8s/pyops/overlays/grafana"))
+    _grafana_basedir = clusters.path(grafana_config.get("basedir", "~/.pfo/k8s/{env}/overlays/grafana"))
 
-    if not os.path.exists(_tempdir):
-        os.makedirs(_tempdir, exist_ok=True)
+    _tempdir = clusters.tempdir() # The active cluster's temp directory
 
-    _heml_update_cmd = ["helm", "upgrade", "grafana", "grafana/grafana", "--namespace", "monitoring", "--values", grafana_values_file]
+    _heml_update_cmd = ["helm", "upgrade", "grafana", CHART, *helm_args()]
 
     try:
-        _res = subprocess.run(_heml_update_cmd, check=True, capture_output=True, text=True)
+        _res = runner.run(_heml_update_cmd, timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_grafana_spinner)
         _grafana_spinner.succeed("Grafana updated successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _grafana_spinner.fail(f"Failed to update Grafana: {e}")
         return
 
@@ -77,11 +91,11 @@ def update() -> None:
 
     # Run kustomize to configure Grafana with any additional resourcess
     try:
-        _res = subprocess.run(["kustomize", "build", _grafana_basedir], check=True, capture_output=True, text=True)
+        _res = runner.run(["kustomize", "build", _grafana_basedir], timeout=runner.BUILD_TIMEOUT)
         with open(os.path.join(_tempdir, "grafana-config.yaml"), "w+") as f:
             f.write(_res.stdout)
         _grafana_spinner.succeed("Grafana configuration file created successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _grafana_spinner.fail(f"Failed to create Grafana configuration file: {e}")
         return
 
@@ -2,65 +2,78 @@ import os
 import subprocess
 
 from halo import Halo
-from k8s import k8s_config, _tempdir
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.monitoring import profiles
+from pfo.monitoring.grafana import REPOSITORY # Loki is in the Grafana Helm repository
+from pfo.k8s import pipeline
+from k8s import k8s_config
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 
 _loki_spinner = Halo(text_color="blue", spinner="dots")
 loki_config = k8s_config.get("loki", {})
+CHART: str = "grafana/loki-stack"
+
+def helm_args() -> list[str]:
+    """The namespace and values the Loki release is installed with."""
+    return ["--namespace", "monitoring", "--values", profiles.values_file("loki")]
 
 def add_repository() -> None:
     """Add the Loki Helm repository."""
     _loki_spinner.start("Adding Loki Helm repository...")
 
     try:
-        _res = subprocess.run(["helm", "repo", "add", "loki", "https://grafana.github.io/loki/charts"], check=True, capture_output=True, text=True)
+        _res = runner.run(["helm", "repo", "add", "loki", "https://grafana.github.io/loki/charts"])
         _loki_spinner.succeed("Loki Helm repository added successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _loki_spinner.fail(f"Failed to add Loki Helm repository: {e}")
 
     if _res.returncode != 0:
         _loki_spinner.fail("Loki Helm repository addition response code was not 0. Please check the Helm output for details.")
 
-def install() -> None:
-    """Install Loki in the Kubernetes cluster."""
+def install() -> bool:
+    """Install Loki in the Kubernetes cluster - returns True if it was installed."""
     _loki_spinner.start("Installing Loki...")
     #add_repository()  # Ensure the Loki Helm repository is added
 
     try:
-        _res = subprocess.run(["helm", "install", "loki-stack", "grafana/loki-stack", "--namespace", "monitoring"], check=True, capture_output=True, text=True)
+        _res = runner.run(["helm", "install", "loki-stack", pipeline.resolve(CHART), *helm_args()], timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=_loki_spinner)
         _loki_spinner.succeed("Loki installed successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _loki_spinner.fail(f"Failed to install Loki: {e}")
+        return False
 
     if _res.returncode != 0:
         _loki_spinner.fail("Loki installation response code was not 0. Please check the Helm output for details.")
+        return False
+
+    return True
 
 def update() -> None:
     """Update Loki configuration."""
     _loki_spinner.start("Updating Loki configuration...")
 
-    _loki_basedir = os.path.expanduser(loki_config.get("basedir", "~/.pfo/k8s/pyops/overlays/loki"))
+    _loki_basedir = clusters.path(loki_config.get("basedir", "~/.pfo/k8s/{env}/overlays/loki"))
 
-    if not os.path.exists(_tempdir):
-        os.makedirs(_tempdir, exist_ok=True)
+    _tempdir = clusters.tempdir() # The active cluster's temp directory
 
     # Create a Loki configuration file
     try:
-        _res = subprocess.run(["kustomize", "build", _loki_basedir], check=True, capture_output=True, text=True)
+        _res = runner.run(["kustomize", "build", _loki_basedir], timeout=runner.BUILD_TIMEOUT)
         with open(os.path.join(_tempdir, "loki-config.yaml"), "w+") as f:
             f.write(_res.stdout)
         _loki_spinner.succeed("Loki configuration file created successfully.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _loki_spinner.fail(f"Failed to create Loki configuration file: {e}")
         return
     
     # Apply the Loki configuration
     try:
-        _res = subprocess.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "loki-config.yaml")], check=True, capture_output=True, text=True)
+        _res = runner.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "loki-config.yaml")], timeout=runner.APPLY_TIMEOUT)
         if _res.returncode != 0:
             _loki_spinner.fail("Loki configuration response code was not 0. Please check the kubectl output for details.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.SubprocessError as e:
         _loki_spinner.fail(f"Failed to apply Loki configuration: {e}")
         return
 
@@ -0,0 +1,92 @@
+# Notes:
+# The monitoring stack (Prometheus, Grafana, Loki) is installed with the values of a resource profile, chosen with
+# "profile" in k8s_config.json["monitoring"] - `lean` (the default) for a laptop running kind, `default` for the charts'
+# own settings, and `load-test` for a cluster that is load tested. The lean and load-test profiles set the scrape
+# interval, retention, replica counts, memory requests and limits, and Loki's chunk settings. The overrides are written
+# to the cluster's temp directory and passed to Helm after the chart's own values file, so they win over it.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import yaml
+
+from typing import Any, Optional
+
+from halo import Halo
+from pfo.shared import clusters
+from pfo.monitoring import monitoring_config
+
+_profiles_spinner = Halo(text_color="blue", spinner="dots")
+
+DEFAULT_PROFILE: str = "lean" # When k8s_config.json does not set one - pfo mostly runs on a laptop
+
+def _resources(request: str, limit: str) -> dict[str, Any]:
+    return {"requests": {"memory": request}, "limits": {"memory": limit}}
+
+def _loki(replicas: int, memory: tuple, idle: str, target_size: int, max_age: str, retention: str, promtail: tuple) -> dict[str, Any]:
+    return {
+        "loki": {
+            "replicas": replicas,
+            "resources": _resources(*memory),
+            "config": {
+                "ingester": {"chunk_idle_period": idle, "chunk_target_size": target_size, "max_chunk_age": max_age},
+                "table_manager": {"retention_deletes_enabled": True, "retention_period": retention},
+            },
+        },
+        "promtail": {"resources": _resources(*promtail)},
+    }
+
+# profile -> chart -> the values it overrides
+PROFILES: dict[str, dict[str, dict[str, Any]]] = {
+    "lean": {
+        "prometheus": {
+            "server": {
+                "global": {"scrape_interval": "60s", "evaluation_interval": "60s"},
+                "retention": "1d",
+                "retentionSize": "1GB",
+                "replicaCount": 1,
+                "resources": _resources("256Mi", "512Mi"),
+            },
+            "alertmanager": {"enabled": False},
+            "prometheus-pushgateway": {"enabled": False},
+        },
+        "grafana": {"replicas": 1, "resources": _resources("128Mi", "256Mi")},
+        "loki": _loki(1, ("128Mi", "256Mi"), "5m", 524288, "30m", "24h", ("64Mi", "128Mi")),
+    },
+    "default": {"prometheus": {}, "grafana": {}, "loki": {}}, # The charts' own settings
+    "load-test": {
+        "prometheus": {
+            "server": {
+                "global": {"scrape_interval": "15s", "evaluation_interval": "15s"},
+                "retention": "3d",
+                "replicaCount": 1,
+                "resources": _resources("1Gi", "4Gi"),
+            },
+            "alertmanager": {"enabled": True},
+            "prometheus-pushgateway": {"enabled": True},
+        },
+        "grafana": {"replicas": 2, "resources": _resources("256Mi", "1Gi")},
+        "loki": _loki(1, ("512Mi", "2Gi"), "1h", 1572864, "2h", "72h", ("128Mi", "512Mi")),
+    },
+}
+
+def name() -> str:
+    """Returns the monitoring profile set in k8s_config.json - DEFAULT_PROFILE if it is not set, or not a profile."""
+    _name = monitoring_config.get("profile", DEFAULT_PROFILE)
+    if _name not in PROFILES:
+        _profiles_spinner.warn(f"Unknown monitoring profile {_name!r} - using {DEFAULT_PROFILE!r} (choose from {', '.join(PROFILES)}).")
+        return DEFAULT_PROFILE
+
+    return _name
+
+def overrides(chart: str, profile: Optional[str] = None) -> dict[str, Any]:
+    """Returns the values the profile (default: the configured one) overrides for the chart - prometheus, grafana or loki."""
+    return PROFILES[profile or name()].get(chart, {})
+
+def values_file(chart: str, profile: Optional[str] = None) -> str:
+    """Writes the profile's overrides for the chart to the active cluster's temp directory, and returns its path."""
+    _file = os.path.join(clusters.tempdir(), f"{chart}-profile-values.yaml")
+    with open(_file, "w") as f:
+        yaml.safe_dump(overrides(chart, profile), f, sort_keys=True)
+
+    return _file
@@ -0,0 +1,39 @@
+import yaml
+
+from unittest.mock import patch
+from pfo.monitoring import profiles
+
+class TestProfiles:
+
+    def test_every_profile_covers_every_chart(self):
+        """Test that each profile but default sets the resources of Prometheus, Grafana and Loki - default sets none."""
+        for _name, _charts in profiles.PROFILES.items():
+            assert set(_charts) == {"prometheus", "grafana", "loki"}, _name
+            if _name == "default":
+                assert _charts == {"prometheus": {}, "grafana": {}, "loki": {}}
+                continue
+            assert _charts["prometheus"]["server"]["resources"]["limits"]["memory"]
+            assert _charts["loki"]["loki"]["config"]["ingester"]["chunk_target_size"] > 0
+
+    def test_default_profile(self):
+        """Test that lean is the profile when k8s_config.json does not set one."""
+        with patch.dict(profiles.monitoring_config, clear=True):
+            assert profiles.name() == "lean"
+
+    def test_name(self):
+        """Test that the configured profile is used, and an unknown one falls back to the default."""
+        with patch.dict(profiles.monitoring_config, {"profile": "lean"}):
+            assert profiles.name() == "lean"
+        with patch.dict(profiles.monitoring_config, {"profile": "tiny"}), patch('pfo.monitoring.profiles._profiles_spinner') as mock_spinner:
+            assert profiles.name() == profiles.DEFAULT_PROFILE
+        mock_spinner.warn.assert_called_once()
+
+    def test_values_file(self, tmp_path):
+        """Test that the overrides are written as a Helm values file."""
+        with patch('pfo.monitoring.profiles.clusters.tempdir', return_value=str(tmp_path)):
+            _file = profiles.values_file("prometheus", "lean")
+
+        with open(_file, "r") as f:
+            _values = yaml.safe_load(f)
+        assert _values["server"]["retention"] == "1d"
+        assert _values["alertmanager"] == {"enabled": False}
@@ -11,9 +11,4 @@ _k8s_config_file = os.path.abspath(os.path.join(BASE, "..", "k8s", "k8s_config.j
 with open(_k8s_config_file, "r") as f:
     k8s_config = json.load(f)
 
-_tempdir = k8s_config.get("base", {}).get("tempdir", "/tmp/pyops")
-
-if not os.path.exists(_tempdir):
-    os.makedirs(_tempdir, exist_ok=True)
-
 from .etc import __ensure_hosts_entries as ensure_hosts_entries
@@ -0,0 +1,170 @@
+# Notes:
+# The build context of a Docker image is only what its Dockerfile needs: the files its COPY and ADD instructions (and
+# RUN --mount=type=bind) read from the context, less what .dockerignore excludes - the Dockerfile's own
+# <Dockerfile>.dockerignore first, as BuildKit does, else the one at the root of the context. .git is never sent,
+# unless the .dockerignore includes it again (!.git). A Dockerfile that copies the whole context, or whose sources
+# are built from variables, gets the whole context - less what is ignored.
+# The context is hashed (path, executable bit and content of every file), and the hash is the cache key of the image
+# - see pfo.k8s.watch - so an image whose context did not change is not built again. The archive is deterministic
+# (no mtimes or owners), and written once per context.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import re
+import json
+import shlex
+import fnmatch
+import hashlib
+import tarfile
+import tempfile
+
+from typing import IO, Optional
+
+from docker.utils.build import PatternMatcher
+
+IGNORE_FILE: str = ".dockerignore"
+LABEL: str = "io.pyflowops.build-context" # The image label with the hash of the context it was built from
+DEFAULT_IGNORES: list[str] = [".git"] # Patterns ignored before the .dockerignore's own - which can include them again
+SPOOL_SIZE: int = 64 * 1024 ** 2 # Archives up to this size are kept in memory
+
+
+def ignore_patterns(root: str, dockerfile: str) -> list[str]:
+    """Returns the .dockerignore patterns of a Dockerfile (relative to root), after the default ones."""
+    _patterns = list(DEFAULT_IGNORES)
+    for _file in (os.path.join(root, f"{dockerfile}{IGNORE_FILE}"), os.path.join(root, IGNORE_FILE)):
+        if os.path.isfile(_file):
+            with open(_file, "r") as f:
+                _patterns.extend(l.strip() for l in f if l.strip() and not l.strip().startswith("#"))
+            break
+
+    return _patterns
+
+
+def _instructions(dockerfile: str) -> list[tuple[str, str]]:
+    """Returns the (instruction, arguments) of a Dockerfile, with the continued lines joined."""
+    _instructions, _line = [], ""
+    for _raw in dockerfile.splitlines():
+        _stripped = _raw.strip()
+        if not _line and (not _stripped or _stripped.startswith("#")):
+            continue
+        if _stripped.endswith("\\"):
+            _line += _stripped[:-1] + " "
+            continue
+        _line += _stripped
+        _parts = _line.split(None, 1)
+        _instructions.append((_parts[0].upper(), _parts[1] if len(_parts) > 1 else ""))
+        _line = ""
+
+    return _instructions
+
+
+def _arguments(arguments: str) -> list[str]:
+    if arguments.startswith("["):
+        try:
+            return [str(a) for a in json.loads(arguments)]
+        except json.JSONDecodeError:
+            pass
+
+    return shlex.split(arguments)
+
+
+def sources(dockerfile: str) -> Optional[list[str]]:
+    """Returns the context paths (or patterns) a Dockerfile reads - None if it reads the whole context, or cannot tell."""
+    _sources = []
+    for _instruction, _args in _instructions(dockerfile):
+        if "<<" in _args and _instruction in ("COPY", "ADD", "RUN"):
+            return None # A heredoc - its lines are not instructions
+        try:
+            _words = _arguments(_args)
+        except ValueError:
+            return None
+        _flags = [w for w in _words if w.startswith("--")]
+        if _instruction == "RUN":
+            for _mount in (f.split("=", 1)[1] for f in _flags if f.startswith("--mount=")):
+                _options = dict(o.split("=", 1) if "=" in o else (o, "") for o in _mount.split(","))
+                if _options.get("type") == "bind" and "from" not in _options:
+                    _sources.append(_options.get("source", _options.get("src", ".")))
+        elif _instruction in ("COPY", "ADD") and not any(f.startswith("--from=") for f in _flags):
+            _sources.extend(w for w in [w for w in _words if not w.startswith("--")][:-1] if not re.match(r"^(https?|git)(://|@)", w))
+
+    _sources = [os.path.normpath(s.lstrip("/")) if s.strip("/") else "." for s in _sources]
+    if any(s == "." or "$" in s for s in _sources):
+        return None
+
+    return _sources
+
+
+def _needed(path: str, patterns: list[str]) -> bool:
+    """Returns True if the path is one of the sources, in a source directory, or matches a source pattern."""
+    _parts = path.split("/")
+    for _pattern in patterns:
+        _depth = len(_pattern.split("/"))
+        if path == _pattern or path.startswith(_pattern + "/") or fnmatch.fnmatchcase("/".join(_parts[:_depth]), _pattern):
+            return True
+
+    return False
+
+
+class Context():
+    """The build context of one Dockerfile - the files it needs, and their hash."""
+
+    def __init__(self, root: str, dockerfile: str) -> None:
+        self.root: str = os.path.abspath(root)
+        # The Dockerfile relative to the root - it has to be in the context
+        self.dockerfile: str = os.path.relpath(os.path.abspath(os.path.join(self.root, dockerfile)), self.root).replace(os.sep, "/")
+        if self.dockerfile.startswith("../"):
+            raise ValueError(f"{dockerfile} is not in the build context {self.root}")
+
+        with open(os.path.join(self.root, self.dockerfile), "r") as f:
+            _sources = sources(f.read())
+        _always = {self.dockerfile, f"{self.dockerfile}{IGNORE_FILE}", IGNORE_FILE}
+
+        _files = []
+        for _path in PatternMatcher(ignore_patterns(self.root, self.dockerfile)).walk(self.root):
+            _path = _path.replace(os.sep, "/")
+            _full = os.path.join(self.root, _path)
+            if os.path.isdir(_full) and not os.path.islink(_full):
+                continue
+            if _path in _always or _sources is None or _needed(_path, _sources):
+                _files.append(_path)
+        self.files: list[str] = sorted(set(_files) | {self.dockerfile})
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        """The sha256 of the context - the path, executable bit and content (or link target) of every file."""
+        if self._digest is None:
+            _hash = hashlib.sha256()
+            for _path in self.files:
+                _full = os.path.join(self.root, _path)
+                _hash.update(_path.encode("utf-8") + b"\0")
+                if os.path.islink(_full):
+                    _hash.update(b"l" + os.readlink(_full).encode("utf-8"))
+                else:
+                    _hash.update(b"x" if os.access(_full, os.X_OK) else b"-")
+                    with open(_full, "rb") as f:
+                        _hash.update(hashlib.file_digest(f, "sha256").digest())
+                _hash.update(b"\0")
+            self._digest = _hash.hexdigest()
+
+        return self._digest
+
+    def archive(self) -> IO[bytes]:
+        """Returns the context as a tar archive, rewound - to stream to the daemon (images.build(fileobj=..., custom_context=True))."""
+        _archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        with tarfile.open(fileobj=_archive, mode="w") as tar:
+            for _path in self.files:
+                _info = tar.gettarinfo(os.path.join(self.root, _path), arcname=_path)
+                if _info is None:
+                    continue # A socket
+                _info.mtime, _info.uid, _info.gid, _info.uname, _info.gname = 0, 0, 0, "", ""
+                if _info.isfile():
+                    with open(os.path.join(self.root, _path), "rb") as f:
+                        tar.addfile(_info, f)
+                else:
+                    tar.addfile(_info)
+        _archive.seek(0)
+
+        return _archive
+
@@ -0,0 +1,124 @@
+# Notes:
+# Change detection for the registered packages (pfo.json) of a repository. Each package gets a content hash of its
+# files, built from the blob ids git already has - the git index, plus `git hash-object` for the few files modified
+# in the working tree or not tracked yet - so no other file has to be read to know whether a package changed.
+# A file belongs to the deepest package it is in. The pfo.json files themselves are left out of the hashes, so a
+# version bump does not count as a change.
+# Hashes can be recorded under a name (i.e. "build") in <git dir>/pfo/changes.json (or another state file), and the
+# packages that changed since then asked for later.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import hashlib
+import subprocess
+
+from typing import Optional
+
+from pfo.shared import runner
+from pfo.shared.files import atomic_write
+from pfo.shared.gitindex import GitIndex
+
+PFO_JSON: str = "pfo.json"
+
+
+class ChangeIndex():
+    """Content hashes of the registered packages of a repository, and the hashes recorded for builds, loads, etc."""
+
+    def __init__(self, index: Optional[GitIndex] = None, path: Optional[str] = None, state_file: Optional[str] = None) -> None:
+        self.index: GitIndex = index or GitIndex(path)
+        self.packages: list[str] = self.index.registered(PFO_JSON)
+        self._packages: set[str] = set(self.packages) # For owner() - one lookup per parent directory of a file
+        # Where the recorded hashes are kept - repositories that are cloned again for every build keep them elsewhere
+        self.file: str = state_file or os.path.join(self.index.git_dir, "pfo", "changes.json")
+        self._hashes: Optional[dict[str, str]] = None
+
+    def owner(self, path: str) -> Optional[str]:
+        """Returns the package the file belongs to - the deepest one it is in."""
+        _directory = os.path.dirname(path)
+        while _directory:
+            if _directory in self._packages:
+                return _directory
+            _directory = os.path.dirname(_directory)
+
+        return "." if "." in self._packages else None
+
+    def _blobs(self, ref: Optional[str] = None) -> dict[str, str]:
+        """Returns path -> blob id of the tracked files - at the ref, or in the working tree."""
+        if ref:
+            try:
+                _out = runner.run(["git", "ls-tree", "-r", "-z", "--full-tree", ref], cwd=self.index.root).stdout
+            except subprocess.CalledProcessError:
+                if ref != "HEAD":
+                    raise
+                _out = "" # No commits yet - every package is new
+
+            return {e.split("\t", 1)[1]: e.split("\t", 1)[0].split()[2] for e in _out.split("\0") if "\t" in e}
+
+        _out = runner.run(["git", "ls-files", "-s", "-z"], cwd=self.index.root).stdout
+        _blobs = {e.split("\t", 1)[1]: e.split("\t", 1)[0].split()[1] for e in _out.split("\0") if "\t" in e}
+
+        # Tracked files changed in the working tree but not staged, and untracked files that are not ignored - their
+        # blob ids are computed, in one call
+        _modified = [f for f in runner.run(["git", "diff-files", "--name-only", "-z"], cwd=self.index.root).stdout.split("\0") if f]
+        _modified += sorted(self.index.files.difference(_blobs))
+        _existing = [f for f in _modified if os.path.isfile(os.path.join(self.index.root, f))]
+        for _file in set(_modified) - set(_existing):
+            _blobs.pop(_file, None) # Deleted
+        if _existing:
+            _ids = runner.run(["git", "hash-object", "--stdin-paths"], cwd=self.index.root, input="\n".join(_existing) + "\n").stdout.split()
+            _blobs.update(zip(_existing, _ids))
+
+        return _blobs
+
+    def hashes(self, ref: Optional[str] = None) -> dict[str, str]:
+        """Returns package path -> content hash of its tracked files, at the ref or in the working tree."""
+        if ref is None and self._hashes is not None:
+            return self._hashes
+
+        _digests = {p: hashlib.sha256() for p in self.packages}
+        for _path, _blob in sorted(self._blobs(ref).items()):
+            if os.path.basename(_path) == PFO_JSON:
+                continue
+            _owner = self.owner(_path)
+            if _owner is not None:
+                _digests[_owner].update(f"{_path}\0{_blob}\n".encode("utf-8"))
+
+        _hashes = {p: d.hexdigest() for p, d in _digests.items()}
+        if ref is None:
+            self._hashes = _hashes
+        return _hashes
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        if not os.path.isfile(self.file):
+            return {}
+
+        try:
+            with open(self.file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def recorded(self, name: str) -> Optional[dict[str, str]]:
+        """Returns the package hashes recorded under the name, if any."""
+        return self._load().get(name)
+
+    def changed(self, since: str = "HEAD") -> list[str]:
+        """Returns the packages whose files changed since the git ref - committed or not."""
+        _current, _before = self.hashes(), self.hashes(since)
+        return [p for p in self.packages if _current.get(p) != _before.get(p)]
+
+    def changed_since_record(self, name: str) -> list[str]:
+        """Returns the packages whose files changed since their hashes were recorded under the name (all, if never)."""
+        _current, _recorded = self.hashes(), self.recorded(name) or {}
+        return [p for p in self.packages if _current.get(p) != _recorded.get(p)]
+
+    def record(self, name: str, packages: Optional[list[str]] = None) -> None:
+        """Records the current hashes of the packages (default: all) under the name, i.e. after they were built."""
+        _data = self._load()
+        _current = self.hashes()
+        _data[name] = {**_data.get(name, {}), **{p: _current[p] for p in (packages if packages is not None else self.packages)}}
+
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        atomic_write(self.file, json.dumps(_data, indent=2, sort_keys=True))
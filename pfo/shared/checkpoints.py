@@ -0,0 +1,82 @@
+# Notes:
+# `pfo k8s --create` provisions a cluster in steps (kind cluster, prereqs, MetalLB, Traefik, ArgoCD, ...). Each step
+# that completes is recorded as a checkpoint in the cluster's state directory (checkpoints.json), with a hash of the
+# inputs it ran with - the rendered template and the component's settings in k8s_config.json.
+# A resumed create skips the steps that completed with the same inputs (and still verify, i.e. their Helm release is
+# deployed), and continues from the first step that did not complete or whose inputs changed. Every step after that
+# one runs again, as it may depend on what changed.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import time
+import hashlib
+
+from typing import Any, Callable, Optional
+
+from halo import Halo
+from pfo.shared import clusters
+from pfo.shared.files import atomic_write
+
+_checkpoints_spinner = Halo(text_color="blue", spinner="dots")
+
+
+def inputs_hash(*inputs: Any) -> str:
+    """Returns a hash of a step's inputs - anything JSON serializable."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Checkpoints():
+    """The completed provisioning steps of a cluster."""
+
+    def __init__(self, cluster: Optional[str] = None, resume: bool = False) -> None:
+        self.cluster: str = cluster or clusters.name()
+        self.file: str = os.path.join(clusters.state_dir(self.cluster), "checkpoints.json")
+        self.resuming: bool = resume # Until the first step that has to run again
+        self.steps: dict[str, dict[str, Any]] = self._load() if resume else {}
+        if not resume:
+            self._save() # A create that does not resume starts over
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not os.path.isfile(self.file):
+            return {}
+
+        try:
+            with open(self.file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        atomic_write(self.file, json.dumps(self.steps, indent=2, sort_keys=True))
+
+    def is_done(self, step: str, inputs: str) -> bool:
+        """Check if the step completed with the same inputs, and every step before it was skipped too."""
+        return self.resuming and self.steps.get(step, {}).get("inputs") == inputs
+
+    def record(self, step: str, inputs: str) -> None:
+        """Records that the step completed with the inputs."""
+        self.steps[step] = {"inputs": inputs, "completed": time.time()}
+        self._save()
+
+    def run(self, step: str, inputs: str, fn: Callable[[], bool], verify: Optional[Callable[[], bool]] = None) -> bool:
+        """Runs the step, unless it can be skipped - it completed with the same inputs and (if given) verify() is True.
+
+        The step is recorded once fn returns True; if fn fails (returns False, or raises), it is not, and a resumed
+        create starts from it.
+
+        Returns:
+            bool: True if the step ran, False if it was skipped.
+        """
+        if self.is_done(step, inputs) and (verify is None or verify()):
+            _checkpoints_spinner.info(f"{self.cluster}: {step} already done - skipping.")
+            return False
+
+        self.resuming = False # Every step after this one runs again
+        self.steps.pop(step, None)
+        self._save()
+
+        if fn():
+            self.record(step, inputs)
+        return True
@@ -0,0 +1,186 @@
+# Notes:
+# Every pfo command that touches a Kind cluster works on the "active" cluster. The active cluster is held in a
+# context variable, so several clusters can be provisioned at the same time from threads (see for_each) without
+# stepping on each other: each one has its own temp directory, overlays directory, kubeconfig and state directory.
+# Paths in k8s_config.json can use {env} for the cluster name, i.e. "~/.pfo/k8s/{env}/overlays/traefik".
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import threading
+import subprocess
+import contextvars
+
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
+
+from pfo.shared import k8s_config
+
+DEFAULT: str = "pyops" # The cluster pfo has always created
+PORT_STEP: int = 100 # Each additional cluster's host ports are shifted by this much, so they don't collide
+
+_active: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("pfo_cluster", default=None)
+_state_lock = threading.Lock() # Clusters created in parallel must not be given the same port offset
+_exported: set[str] = set() # Clusters whose kubeconfig this process tried to export - see ensure_kubeconfig
+_export_lock = threading.Lock()
+
+
+def name() -> str:
+    """Returns the name of the active cluster."""
+    return _active.get() or DEFAULT
+
+
+def is_active() -> bool:
+    """Returns True when a cluster was selected explicitly with use()."""
+    return _active.get() is not None
+
+
+@contextmanager
+def use(cluster: str) -> Iterator[str]:
+    """Makes the cluster the active one for the duration of the with-block (in this thread or task)."""
+    _token = _active.set(cluster)
+    try:
+        yield cluster
+    finally:
+        _active.reset(_token)
+
+
+def path(template: str, cluster: Optional[str] = None) -> str:
+    """Expands a configured path for the cluster - {env} is replaced by the cluster name, ~ by the home directory."""
+    return os.path.expanduser(template.replace("{env}", cluster or name()))
+
+
+def tempdir(cluster: Optional[str] = None, create: bool = True) -> str:
+    """Returns (and creates) the cluster's temp directory, where the built manifests are written."""
+    _dir = path(k8s_config.get("base", {}).get("tempdir", "/tmp/{env}"), cluster)
+    if create:
+        os.makedirs(_dir, exist_ok=True)
+    return _dir
+
+
+def k8s_dir(cluster: Optional[str] = None) -> str:
+    """Returns the cluster's rendered k8s-installs directory (prereqs, base, overlays, kind-config.yaml)."""
+    return path("~/.pfo/k8s/{env}", cluster)
+
+
+def state_dir(cluster: Optional[str] = None, create: bool = True) -> str:
+    """Returns (and creates) the directory with the cluster's state - kubeconfig and cluster.json."""
+    _dir = path("~/.pfo/clusters/{env}", cluster)
+    if create:
+        os.makedirs(_dir, exist_ok=True)
+    return _dir
+
+
+def kubeconfig(cluster: Optional[str] = None) -> str:
+    """Returns the path of the cluster's own kubeconfig file."""
+    return os.path.join(state_dir(cluster), "kubeconfig")
+
+
+def ensure_kubeconfig(cluster: Optional[str] = None) -> str:
+    """Returns the path of the cluster's own kubeconfig - exported from kind first, if the cluster has none yet.
+
+    A cluster created before pfo kept a kubeconfig per cluster only has its context in the user's kubeconfig, so its
+    own one is written from its nodes (`kind export kubeconfig`). This is tried once per process - a cluster that does
+    not exist yet gets its kubeconfig from `kind create cluster`.
+    """
+    from pfo.shared import runner # runner runs every command with env() - imported here, not at the top
+
+    _name = cluster or name()
+    _file = kubeconfig(_name)
+    with _export_lock:
+        if os.path.isfile(_file) or _name in _exported:
+            return _file
+
+        _exported.add(_name)
+        try:
+            # With env passed, runner does not call env() again
+            runner.run(["kind", "export", "kubeconfig", "--name", _name, "--kubeconfig", _file], env=dict(os.environ))
+        except (subprocess.SubprocessError, OSError):
+            pass # The cluster does not exist (yet), or kind is not installed
+
+    return _file
+
+
+def context(cluster: Optional[str] = None) -> str:
+    """Returns the kube context name kind gives the cluster."""
+    return f"kind-{cluster or name()}"
+
+
+def env(base: Optional[dict[str, str]] = None) -> Optional[dict[str, str]]:
+    """Returns the environment for kind, kubectl and helm of the active cluster - None when no cluster is active.
+
+    With KUBECONFIG pointing to the cluster's own kubeconfig, commands for different clusters can run at the same
+    time without switching the shared current-context.
+    """
+    if not is_active():
+        return None
+
+    return {**(os.environ if base is None else base), "KUBECONFIG": ensure_kubeconfig()}
+
+
+def load_state(cluster: Optional[str] = None) -> dict[str, Any]:
+    """Returns the cluster's recorded state (cluster.json), or an empty dict."""
+    _file = os.path.join(state_dir(cluster), "cluster.json")
+    if not os.path.isfile(_file):
+        return {}
+
+    with open(_file, "r") as f:
+        return json.load(f)
+
+
+def save_state(state: dict[str, Any], cluster: Optional[str] = None) -> None:
+    """Writes the cluster's state (cluster.json)."""
+    with open(os.path.join(state_dir(cluster), "cluster.json"), "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def known() -> list[str]:
+    """Returns the names of the clusters pfo has state for."""
+    _root = os.path.expanduser(os.path.join("~", ".pfo", "clusters"))
+    if not os.path.isdir(_root):
+        return []
+
+    return sorted(d for d in os.listdir(_root) if os.path.isfile(os.path.join(_root, d, "cluster.json")))
+
+
+def port_offset(cluster: Optional[str] = None) -> int:
+    """Returns the host port offset of the cluster - 0 for the default cluster, a free multiple of PORT_STEP otherwise.
+
+    The offset is recorded in the cluster's state, so it stays the same for the life of the cluster.
+    """
+    _name = cluster or name()
+    with _state_lock:
+        _state = load_state(_name)
+        if "port_offset" in _state:
+            return _state["port_offset"]
+
+        _taken = {load_state(c).get("port_offset") for c in known() if c != _name}
+        _offset = 0 if _name == DEFAULT and 0 not in _taken else PORT_STEP
+        while _offset in _taken:
+            _offset += PORT_STEP
+
+        save_state({**_state, "name": _name, "port_offset": _offset}, _name)
+        return _offset
+
+
+def for_each(clusters: list[str], fn: Callable[[], Any], max_workers: int = 4) -> dict[str, Any]:
+    """Runs fn once per cluster, concurrently, with that cluster active.
+
+    Returns:
+        dict: cluster name -> fn's return value, or the exception it raised.
+    """
+    def _one(cluster: str) -> Any:
+        with use(cluster):
+            try:
+                return fn()
+            except (Exception, SystemExit) as e: # Some steps exit() on failure - that must only end this cluster
+                return e
+
+    if len(clusters) == 1:
+        return {clusters[0]: _one(clusters[0])}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pfo-cluster") as pool:
+        _futures = {c: pool.submit(contextvars.copy_context().run, _one, c) for c in clusters}
+        return {c: f.result() for c, f in _futures.items()}
@@ -7,6 +7,7 @@ import time
 
 from halo import Halo
 from src.config import MetaData
+from pfo.shared import runner
 
 metadata = MetaData()
 spinner = Halo(spinner="dots")
@@ -180,10 +181,14 @@ def update_cli():
         spinner.info(f"Updating the CLI to the latest version...v{__latest_version}")
 
         _cmd = "curl -sSf https://raw.githubusercontent.com/PyFlowOps/pfo-cli/refs/heads/main/.install/install.sh | bash -l"
-        res = subprocess.run(_cmd, shell=True, capture_output=True)
+        try:
+            res = runner.run(_cmd, shell=True, check=False, timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=spinner)
+        except subprocess.TimeoutExpired as e:
+            spinner.fail(f"Error updating the CLI...{e}")
+            exit()
 
         if res.returncode != 0:
-            spinner.fail(f"Error updating the CLI...{res.stdout.decode('utf-8')}")
+            spinner.fail(f"Error updating the CLI...{res.stdout}")
             exit()
 
         if not os.path.isdir(metadata.rootdir):
@@ -10,10 +10,103 @@ import os
 
 from halo import Halo
 from pfo.shared import k8s_config
+from pfo.shared.files import atomic_write
 
 # This function is used to ensure that the correct entries in the /etc/hosts file are present.
 spinner = Halo(spinner="dots")
 
+class HostsFile():
+    """Model of a hosts file - parsed once into a hostname -> IP index.
+
+    Lines may carry several aliases ("127.0.0.1 localhost localhost.localdomain") and trailing comments. The entries
+    pfo manages live in a single block between BEGIN and END markers, which is rewritten as a whole, so the rest of
+    the file is never touched.
+    """
+    BEGIN: str = "# pfo - managed by pfo-cli, do not edit this block"
+    END: str = "# end pfo"
+
+    def __init__(self, path: str = "/etc/hosts") -> None:
+        self.path: str = path
+        self.lines: list[str] = []
+        self.index: dict[str, str] = {} # hostname -> IP address of the first line naming it (what the resolver uses)
+        self.managed: dict[str, str] = {} # hostname -> IP address, inside the pfo block
+        self._block: tuple[int, int]|None = None # Line numbers of the BEGIN and END markers
+
+        with open(self.path, "r") as f:
+            self.parse(f.read())
+
+    def parse(self, contents: str) -> None:
+        """Builds the hostname index and finds the managed block."""
+        self.lines = contents.splitlines()
+        self.index, self.managed, self._block = {}, {}, None
+        _begin = None
+
+        for i, line in enumerate(self.lines):
+            _stripped = line.strip()
+            if _stripped == self.BEGIN:
+                _begin = i
+                continue
+            if _stripped == self.END and _begin is not None:
+                self._block = (_begin, i)
+                continue
+
+            _fields = _stripped.split("#", 1)[0].split()
+            if len(_fields) < 2:
+                continue
+
+            _ip, _names = _fields[0], _fields[1:]
+            for _name in _names:
+                self.index.setdefault(_name.lower(), _ip)
+                if _begin is not None and self._block is None:
+                    self.managed[_name.lower()] = _ip
+
+    def resolve(self, hostname: str) -> str|None:
+        """Returns the IP address the hosts file gives for hostname, if any."""
+        return self.index.get(hostname.lower())
+
+    def diff(self, wanted: dict[str, str]) -> dict[str, str]:
+        """Returns the wanted entries (hostname -> IP) that are missing, or resolve to a different IP address."""
+        return {h: ip for h, ip in wanted.items() if self.resolve(h) != ip}
+
+    def shadowed(self, wanted: dict[str, str]) -> dict[str, str]:
+        """Returns the wanted entries that an unmanaged line already maps to another IP address.
+
+        Those lines come first for the resolver, so the managed block cannot fix them - they have to be edited by hand.
+        """
+        return {h: self.resolve(h) for h in self.diff(wanted) if self.resolve(h) is not None and h.lower() not in self.managed}
+
+    def render(self, wanted: dict[str, str]) -> str:
+        """Returns the file contents with the managed block holding the current managed and the wanted entries."""
+        _entries = {**self.managed, **{h.lower(): ip for h, ip in wanted.items()}}
+        _by_ip: dict[str, list[str]] = {}
+        for _host, _ip in _entries.items():
+            _by_ip.setdefault(_ip, []).append(_host)
+
+        _block = [self.BEGIN] + [f"{ip} {' '.join(sorted(hosts))}" for ip, hosts in sorted(_by_ip.items())] + [self.END]
+
+        if self._block is not None:
+            _lines = self.lines[:self._block[0]] + _block + self.lines[self._block[1] + 1:]
+        else:
+            _lines = self.lines + ([""] if self.lines and self.lines[-1].strip() else []) + _block
+
+        return "\n".join(_lines) + "\n"
+
+    def apply(self, wanted: dict[str, str]) -> dict[str, str]:
+        """Writes the wanted entries into the managed block, in one atomic write.
+
+        Returns:
+            dict[str, str]: The entries that were added or changed - nothing is written if this is empty.
+        """
+        _shadowed = self.shadowed(wanted)
+        _changes = {h: ip for h, ip in self.diff(wanted).items() if h not in _shadowed}
+        if not _changes:
+            return {}
+
+        _contents = self.render({h: ip for h, ip in wanted.items() if h not in _shadowed})
+        atomic_write(self.path, _contents)
+        self.parse(_contents)
+        return _changes
+
 def __get_host_ipaddress():
     """
     Get the IP address of the host machine.
@@ -42,60 +135,47 @@ def __assert_host_file() -> str:
     
     return hosts_file_path
     
-def __get_host_entries_needed():
+def __get_host_entries_needed() -> dict[str, str]:
     """
-    Get the host entries that need to be added to the /etc/hosts file.
+    Get the host entries that need to be present in the /etc/hosts file.
     
     Return:
-      A list of tuples (ip_address, hostname) that need to be added.
-    """
-    return k8s_config.get("base", {}).get("hosts", [])
-
-def __get_current_host_file_contents():
-    """
-    Get the current contents of the /etc/hosts file.
-    Return:
-        A list of lines in the /etc/hosts file.
+      A dict of hostname -> IP address.
     """
-    hosts_file = __assert_host_file()
-
-    with open(hosts_file, 'r') as file:
-        contents = file.readlines()
-
-    return contents
+    _ip = __get_host_ipaddress()
+    return {host: _ip for host in k8s_config.get("base", {}).get("hosts", [])}
 
 def __host_entries_needed_not_in_current_file() -> list[str]:
     """
-    Get the host entries that are not present in the current /etc/hosts file.
+    Get the host entries that are missing from the current /etc/hosts file, or point to another IP address.
     Return:
-        A list of strings (without the IP address) that need to be added.
+        A list of hostnames (without the IP address) that need to be added.
         If no entries are needed, return an empty list.
     """
-    current_contents = __get_current_host_file_contents() # These are the current lines in the /etc/hosts file
-    needed_entries = __get_host_entries_needed()
-
-    current_contents_to_compare = [line.strip().split()[-1] for line in current_contents if line.strip() and not line.startswith("#")]  # Get the hostnames from the current file
-
-    not_in_current = [entry for entry in needed_entries if entry not in current_contents_to_compare]
-
-    return not_in_current if not_in_current else []
+    return list(HostsFile(__assert_host_file()).diff(__get_host_entries_needed()))
 
 def __add_needed_hosts_to_hosts_file():
     """
-    Add the needed host entries to the /etc/hosts file.
+    Add the needed host entries to the managed pfo block of the /etc/hosts file, in one atomic write.
     """
-    hosts_file = __assert_host_file()
-    host_ipaddress = __get_host_ipaddress()  # Get the host IP address
-    hosts_entries_to_add = __host_entries_needed_not_in_current_file() # This is the list of entries that need to be added
+    hosts = HostsFile(__assert_host_file())
+    needed = __get_host_entries_needed()
 
-    if not hosts_entries_to_add:
+    for host, ip in hosts.shadowed(needed).items():
+        spinner.warn(f"{host} resolves to {ip} in {hosts.path} - please edit that line by hand.")
+
+    try:
+        added = hosts.apply(needed)
+    except OSError as e:
+        spinner.fail(f"Failed to update {hosts.path}: {e}")
+        return
+
+    if not added:
         spinner.info("No host entries to add.")
         return
 
-    with open(hosts_file, 'a') as file:
-        for entry in hosts_entries_to_add:
-            file.write(f"{host_ipaddress} {entry}\n")
-            spinner.info(f"Added {entry} for IP Address  to {hosts_file}")
+    for entry, ip in added.items():
+        spinner.info(f"Added {entry} for IP Address {ip} to {hosts.path}")
 
     spinner.succeed("Host entries added successfully.")
     return
@@ -109,18 +189,17 @@ def __ensure_hosts_entries():
     hosts_entries_to_add = __host_entries_needed_not_in_current_file()
 
     if not hosts_entries_to_add:
-        spinner.info("No host entries needed -- to /etc/hosts.")
+        spinner.info("No host entries needed.")
         return
     else:
         spinner.start("Ensuring host entries...")
-        for i in hosts_entries_to_add:
-            # Here we would add the needed hosts to the /etc/hosts file
-            # For now, we will just print the entries that would be added
-            print(f"Please add the line -- {i} -- to /etc/hosts")
-        
-        # This function is currently under construction
-        # We will want to implement the actual addition of hosts to the /etc/hosts file
-        #__add_needed_hosts_to_hosts_file()
+        if k8s_config.get("base", {}).get("manage_hosts", False):
+            # The whole diff is written into the managed pfo block at once - this needs write access to /etc/hosts
+            __add_needed_hosts_to_hosts_file()
+        else:
+            _ip = __get_host_ipaddress()
+            for i in hosts_entries_to_add:
+                print(f"Please add the line -- {_ip} {i} -- to /etc/hosts")
 
     spinner.succeed("Hosts entries ensured successfully.")
     return
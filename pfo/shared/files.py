@@ -0,0 +1,34 @@
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import errno
+import tempfile
+
+def atomic_write(path: str, data: str) -> None:
+    """Writes data to path atomically - readers see either the old or the new contents, never a partial file.
+
+    The data is written to a temporary file in the same directory, which then replaces the original. The original
+    file mode is kept. Files that cannot be replaced (i.e. bind-mounted /etc/hosts in a container) are rewritten in
+    place with a single write instead.
+    """
+    _dir = os.path.dirname(os.path.abspath(path))
+    _mode = os.stat(path).st_mode & 0o7777 if os.path.exists(path) else 0o644
+
+    _tmp = None
+    try:
+        fd, _tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=_dir)
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(_tmp, _mode)
+        os.replace(_tmp, path)
+    except OSError as e:
+        if _tmp and os.path.exists(_tmp):
+            os.remove(_tmp)
+        if e.errno not in (errno.EBUSY, errno.EXDEV, errno.EACCES, errno.EPERM) or not os.access(path, os.W_OK):
+            raise
+
+        with open(path, "w") as f:
+            f.write(data)
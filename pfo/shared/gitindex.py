@@ -0,0 +1,83 @@
+# Notes:
+# A snapshot of the files git knows about in a repository - read once with `git ls-files`, instead of walking the
+# tree with os.listdir/isdir/exists calls. Registration uses it to find the packages of a monorepo, their Docker
+# images (docker/<image>/Dockerfile) and manifest directories in one pass.
+# Files that are tracked, or untracked and not ignored, are included - ignored files (build output, virtualenvs,
+# node_modules) never are, which is also what keeps the scan fast in large repositories.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import posixpath
+
+from typing import Optional
+
+from pfo.shared import runner
+
+# Files that make a directory a package, when looking for the packages of a monorepo
+PACKAGE_MARKERS: tuple = ("pyproject.toml", "setup.py", "package.json", "go.mod", "Cargo.toml", "pfo.json")
+# Directories that hold parts of a package, never packages of their own
+PACKAGE_PARTS: tuple = ("docker", "manifests", "node_modules", ".github")
+
+
+class GitIndex():
+    """The files of a git repository, as git sees them, indexed by directory."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        _path = os.path.abspath(path or os.getcwd())
+        _res = runner.run(["git", "rev-parse", "--show-toplevel", "--absolute-git-dir", "--show-prefix"], cwd=_path).stdout.split("\n")
+
+        self.root: str = os.path.abspath(_res[0].strip())
+        self.git_dir: str = _res[1].strip() # Where pfo keeps its own per-repository state
+        self.prefix: str = _res[2].strip().rstrip("/") if len(_res) > 2 else "" # The path's directory, relative to root
+        self.files: set[str] = set(
+            f for f in runner.run(["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"], cwd=self.root).stdout.split("\0") if f
+        )
+        self.dirs: dict[str, set[str]] = {} # directory -> names of its entries (files and directories)
+        for _file in self.files:
+            _dir, _name = posixpath.split(_file)
+            while True:
+                self.dirs.setdefault(_dir, set()).add(_name)
+                if not _dir:
+                    break
+                _dir, _name = posixpath.split(_dir)
+
+    def _rel(self, path: str) -> str:
+        _path = posixpath.normpath(path.strip("/") or ".")
+        return "" if _path == "." else _path
+
+    def exists(self, path: str) -> bool:
+        """Check if the file or directory (relative to the repository root) exists."""
+        _path = self._rel(path)
+        return _path in self.files or _path in self.dirs
+
+    def isdir(self, path: str) -> bool:
+        """Check if the directory (relative to the repository root) has any files."""
+        return self._rel(path) in self.dirs
+
+    def listdir(self, path: str) -> list[str]:
+        """Returns the names of the entries of the directory (relative to the repository root)."""
+        return sorted(self.dirs.get(self._rel(path), ()))
+
+    def docker_images(self, package_path: str) -> dict[str, Optional[str]]:
+        """Returns the images of the package - the directories in its docker/ directory, and their Dockerfile (or None)."""
+        _docker = posixpath.join(self._rel(package_path), "docker")
+        return {
+            _image: "Dockerfile" if posixpath.join(_docker, _image, "Dockerfile") in self.files else None
+            for _image in self.listdir(_docker) if self.isdir(posixpath.join(_docker, _image))
+        }
+
+    def packages(self) -> list[str]:
+        """Returns the package directories of the repository (relative to its root) - the root itself is not one."""
+        _packages = []
+        for _dir, _entries in self.dirs.items():
+            if not _dir or any(p in PACKAGE_PARTS for p in _dir.split("/")):
+                continue
+            if _entries.intersection(PACKAGE_MARKERS) or self.isdir(posixpath.join(_dir, "docker")):
+                _packages.append(_dir)
+
+        return sorted(_packages)
+
+    def registered(self, pfo_json: str = "pfo.json") -> list[str]:
+        """Returns the directories of the registered packages - the ones with a pfo.json ("." for the root)."""
+        return sorted(posixpath.dirname(f) or "." for f in self.files if posixpath.basename(f) == pfo_json)
@@ -0,0 +1,152 @@
+# Notes:
+# The pfo.json of a package, read through one loader. The file is validated against SCHEMA when it is read, so a
+# missing key or a wrong type is reported at once - with every problem in the file - instead of as a KeyError in the
+# middle of a build. Loaded files are memoized by path, modification time and size: reading the same pfo.json again
+# costs one os.stat call, and a file changed on disk is always read again.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import re
+import json
+import threading
+
+from typing import Any, Optional
+
+PFO_JSON: str = "pfo.json"
+
+# key -> (type(s), required) - nested dicts are described the same way, "*" matches every key of a dict
+SCHEMA: dict[str, Any] = {
+    "name": (str, True),
+    "version": (str, True),
+    "package_path": (str, False),
+    "repo": ((str, type(None)), False),
+    "registrant": (dict, False),
+    "changelog": (dict, False),
+    "docker": ({
+        "*": ({
+            "base_path": (str, False),
+            "image": (str, True),
+            "repo_path": (str, True),
+            "dockerfile": ((str, type(None)), True), # None when the image directory has no Dockerfile yet
+        }, False),
+    }, False),
+    "k8s": ({
+        "name": (str, False),
+        "manifest_path": (str, False),
+        "labels": (dict, False),
+        "deploy": (bool, False),
+        "argocd": (dict, False),
+    }, False),
+}
+VERSION_PATTERN: str = r"\d+\.\d+\.\d+"
+
+_cache: dict[str, tuple[tuple[int, int], "PfoConfig"]] = {} # path -> ((mtime_ns, size), config)
+_cache_lock = threading.Lock()
+
+
+class PfoConfigError(ValueError):
+    """A pfo.json that is not valid JSON, or does not match the schema."""
+
+    def __init__(self, source: str, errors: list[str]) -> None:
+        self.source: str = source
+        self.errors: list[str] = errors
+        super().__init__(f"{source} is not a valid pfo.json: {'; '.join(errors)}")
+
+
+def _type_name(types: Any) -> str:
+    _types = types if isinstance(types, tuple) else (types,)
+    return " or ".join("null" if t is type(None) else t.__name__ for t in _types)
+
+
+def _validate(data: Any, schema: dict[str, Any], where: str) -> list[str]:
+    if not isinstance(data, dict):
+        return [f"{where or 'the file'} must be an object"]
+
+    _errors = []
+    _entries = {k: schema["*"] for k in data} if "*" in schema else schema
+    for _key, (_type, _required) in _entries.items():
+        _where = f"{where}.{_key}" if where else _key
+        if _key not in data:
+            if _required:
+                _errors.append(f"{_where} is missing")
+        elif isinstance(_type, dict):
+            _errors.extend(_validate(data[_key], _type, _where))
+        elif not isinstance(data[_key], _type):
+            _errors.append(f"{_where} must be {_type_name(_type)}")
+
+    return _errors
+
+
+def validate(data: Any) -> list[str]:
+    """Returns the problems of the pfo.json data - an empty list when it is valid."""
+    _errors = _validate(data, SCHEMA, "")
+    if not _errors and not re.fullmatch(VERSION_PATTERN, data["version"]):
+        _errors.append(f"version must look like 1.2.3, not {data['version']!r}")
+
+    return _errors
+
+
+class PfoConfig():
+    """A validated pfo.json."""
+
+    def __init__(self, data: dict[str, Any], source: str = PFO_JSON) -> None:
+        _errors = validate(data)
+        if _errors:
+            raise PfoConfigError(source, _errors)
+
+        self.source: str = source # Where the data was read from - a path, or owner/repo for configs read from GitHub
+        self.data: dict[str, Any] = data
+        self.name: str = data["name"]
+        self.version: str = data["version"]
+        self.package_path: str = data.get("package_path", ".")
+        self.repo: Optional[str] = data.get("repo")
+        self.docker: dict[str, dict[str, Any]] = data.get("docker", {})
+        self.k8s: dict[str, Any] = data.get("k8s", {})
+
+    def __repr__(self) -> str:
+        return f"PfoConfig({self.name} {self.version} <{self.source}>)"
+
+    @classmethod
+    def parse(cls, contents: str, source: str = PFO_JSON) -> "PfoConfig":
+        """Returns the config of the pfo.json contents.
+
+        Raises:
+            PfoConfigError: The contents are not valid JSON, or do not match the schema.
+        """
+        try:
+            _data = json.loads(contents)
+        except json.JSONDecodeError as e:
+            raise PfoConfigError(source, [f"invalid JSON: {e}"]) from e
+
+        return cls(_data, source)
+
+
+def load(path: str) -> PfoConfig:
+    """Returns the config of the pfo.json file (or of the directory's pfo.json), read once per change of the file.
+
+    Raises:
+        FileNotFoundError: There is no such file.
+        PfoConfigError: The file is not valid JSON, or does not match the schema.
+    """
+    _path = os.path.abspath(os.path.join(path, PFO_JSON) if os.path.isdir(path) else path)
+    _stat = os.stat(_path)
+    _key = (_stat.st_mtime_ns, _stat.st_size)
+
+    with _cache_lock:
+        _cached = _cache.get(_path)
+    if _cached is not None and _cached[0] == _key:
+        return _cached[1]
+
+    with open(_path, "r") as f:
+        _config = PfoConfig.parse(f.read(), source=_path)
+
+    with _cache_lock:
+        _cache[_path] = (_key, _config)
+    return _config
+
+
+def clear_cache() -> None:
+    """Forgets every loaded file."""
+    with _cache_lock:
+        _cache.clear()
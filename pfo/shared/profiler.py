@@ -0,0 +1,171 @@
+# Notes:
+# This module records timing spans for a single pfo invocation when `pfo --profile` is used.
+# Spans are recorded for imports, MetaData setup, every subprocess (through pfo.shared.runner), every HTTP call
+# (requests/docker) and every time.sleep, and are printed as a sorted summary when the CLI exits.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Optional
+
+_spans: list[dict[str, Any]] = []
+_lock = threading.Lock()
+_origin: float = time.perf_counter() # All span start times are relative to this
+_output: Optional[str] = None # Chrome trace-event JSON file, written at exit
+_hooks_installed: bool = False
+
+# The CLI flag is parsed by click after every module has been imported, so we check argv here in order to
+# record the import and setup spans as well.
+_enabled: bool = any(i == "--profile" or i.startswith("--profile-output") for i in sys.argv[1:])
+
+
+def enabled() -> bool:
+    """Returns True if profiling is enabled for this invocation."""
+    return _enabled
+
+
+def enable(output: Optional[str] = None) -> None:
+    """Enables profiling, installs the sleep/HTTP hooks and prints the report when the CLI exits.
+
+    Args:
+        output (str): Optional path to write a Chrome trace-event JSON file to.
+    """
+    global _enabled, _output
+    _enabled = True
+    if output:
+        _output = output
+
+    _install_hooks()
+
+
+def add_span(name: str, category: str, start: float, duration: float) -> None:
+    """Records a finished span. `start` is a time.perf_counter() value."""
+    if not _enabled:
+        return
+
+    with _lock:
+        _spans.append({
+            "name": name,
+            "cat": category,
+            "start": start - _origin,
+            "duration": duration,
+            "tid": threading.get_ident(),
+        })
+
+
+@contextmanager
+def span(name: str, category: str = "pfo"):
+    """Context manager recording the time spent in the block as a span."""
+    _t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, category, _t0, time.perf_counter() - _t0)
+
+
+def spans() -> list[dict[str, Any]]:
+    """Returns a copy of the recorded spans."""
+    with _lock:
+        return list(_spans)
+
+
+def _install_hooks() -> None:
+    """Wraps time.sleep and requests so that sleeps and HTTP calls are recorded as spans."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    _sleep = time.sleep
+
+    def _profiled_sleep(seconds: float) -> None:
+        with span(f"sleep {seconds}s", "sleep"):
+            _sleep(seconds)
+
+    time.sleep = _profiled_sleep
+
+    try:
+        import requests
+    except ImportError:
+        return
+
+    _request = requests.Session.request
+
+    def _profiled_request(self, method, url, *args, **kwargs):
+        with span(f"{method.upper()} {url}", "http"):
+            return _request(self, method, url, *args, **kwargs)
+
+    requests.Session.request = _profiled_request
+
+
+def summary(width: int = 30) -> str:
+    """Returns the flame-style summary of the recorded spans - categories, then names, sorted by total time."""
+    _data = spans()
+    if not _data:
+        return "pfo profile: no spans recorded."
+
+    _wall = max(i["start"] + i["duration"] for i in _data)
+    _by_cat: dict[str, dict[str, list[float]]] = {}
+    for i in _data:
+        _by_cat.setdefault(i["cat"], {}).setdefault(i["name"], []).append(i["duration"])
+
+    _cat_totals = {c: sum(sum(d) for d in names.values()) for c, names in _by_cat.items()}
+    _lines = [f"pfo profile -- wall time {_wall:.2f}s (spans may overlap when steps run concurrently)"]
+
+    for _cat in sorted(_cat_totals, key=_cat_totals.get, reverse=True):
+        _total = _cat_totals[_cat]
+        _bar = "#" * max(1, int(width * _total / _wall)) if _wall else ""
+        _lines.append(f"  {_cat:<12} {_total:9.2f}s {100 * _total / _wall:6.1f}%  {_bar}")
+
+        _names = _by_cat[_cat]
+        for _name in sorted(_names, key=lambda n: sum(_names[n]), reverse=True):
+            _ntotal = sum(_names[_name])
+            _label = _name if len(_name) <= 60 else f"{_name[:57]}..."
+            _lines.append(f"    {_label:<60} {_ntotal:9.2f}s  x{len(_names[_name])}")
+
+    return "\n".join(_lines)
+
+
+def write_chrome_trace(path: str) -> None:
+    """Writes the recorded spans as Chrome trace-event JSON (load it in chrome://tracing or Perfetto)."""
+    _events = [
+        {
+            "name": i["name"],
+            "cat": i["cat"],
+            "ph": "X",
+            "ts": round(i["start"] * 1_000_000),
+            "dur": round(i["duration"] * 1_000_000),
+            "pid": os.getpid(),
+            "tid": i["tid"],
+        }
+        for i in spans()
+    ]
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, f)
+
+
+def report() -> None:
+    """Prints the summary to stderr, and writes the Chrome trace if an output file was given."""
+    if not _enabled:
+        return
+
+    print("\n" + summary(), file=sys.stderr)
+
+    if _output:
+        write_chrome_trace(_output)
+        print(f"pfo profile: Chrome trace written to {_output}", file=sys.stderr)
+
+
+# Most commands end with exit(), so the report is printed from an atexit handler
+atexit.register(report)
+
+if _enabled:
+    _install_hooks()
@@ -0,0 +1,253 @@
+# Notes:
+# This module is the single entry point for running external tooling (kind, kubectl, kustomize, helm, docker, gh, git).
+# Every command gets a timeout, can stream its output line by line into a Halo spinner, and is recorded in the
+# command trace so that slow steps can be found and profiled.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import json
+import time
+import asyncio
+import threading
+import subprocess
+import contextvars
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from halo import Halo
+from pfo.shared import profiler
+from pfo.shared import clusters
+
+# Default timeouts (seconds) for the different kinds of commands we run
+DEFAULT_TIMEOUT: int = 300
+APPLY_TIMEOUT: int = 300 # kubectl apply, kubectl create, etc.
+BUILD_TIMEOUT: int = 300 # kustomize build, helm template, etc.
+INSTALL_TIMEOUT: int = 900 # helm install/upgrade, kind create cluster, etc.
+
+# When streaming, only the tail of each output stream is kept in memory
+MAX_STREAM_LINES: int = 500
+
+_trace: list[dict[str, Any]] = []
+_trace_lock = threading.Lock()
+_trace_file: Optional[str] = os.environ.get("PFO_TRACE_FILE", None) # JSON lines trace, one entry per command
+
+
+def set_trace_file(path: Optional[str]) -> None:
+    """Sets the file that each command's trace entry is appended to (JSON lines). None disables it."""
+    global _trace_file
+    _trace_file = path
+
+
+def trace() -> list[dict[str, Any]]:
+    """Returns a copy of the trace entries recorded so far."""
+    with _trace_lock:
+        return list(_trace)
+
+
+def reset_trace() -> None:
+    """Clears the recorded trace entries."""
+    with _trace_lock:
+        _trace.clear()
+
+
+def write_trace(path: str) -> None:
+    """Writes the recorded trace entries to a JSON file."""
+    with open(path, "w") as f:
+        json.dump(trace(), f, indent=2)
+        f.write("\n")
+
+
+def _cmd_repr(cmd: Any) -> list[str]:
+    """Returns the command as a list of strings, for the trace."""
+    if isinstance(cmd, str):
+        return [cmd]
+
+    return [str(i) for i in cmd]
+
+
+def _record(cmd: Any, start: float, duration: float, returncode: Optional[int], timed_out: bool = False) -> dict[str, Any]:
+    """Records the timing of a command in the trace."""
+    _entry = {
+        "cmd": _cmd_repr(cmd),
+        "start": start,
+        "duration": round(duration, 6),
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "thread": threading.current_thread().name,
+    }
+
+    with _trace_lock:
+        _trace.append(_entry)
+        if _trace_file:
+            with open(_trace_file, "a") as f:
+                f.write(json.dumps(_entry) + "\n")
+
+    # The profiler groups commands by the tool that was run (kind, helm, kubectl, ...)
+    _category = os.path.basename(_entry["cmd"][0]) if not isinstance(cmd, str) else "shell"
+    profiler.add_span(" ".join(_entry["cmd"][:4]), _category, time.perf_counter() - duration, duration)
+
+    return _entry
+
+
+def _stream_pipe(pipe: Any, lines: deque, spinner: Optional[Halo], label: str) -> None:
+    """Reads a pipe line by line, keeping only the tail and updating the spinner text."""
+    for line in iter(pipe.readline, ""):
+        lines.append(line)
+        if spinner is not None and line.strip():
+            spinner.text = f"{label}{line.strip()[:100]}"
+
+    pipe.close()
+
+
+def _run_streaming(cmd: Any, timeout: Optional[float], spinner: Optional[Halo], **kwargs) -> subprocess.CompletedProcess:
+    """Runs a command, streaming stdout/stderr line by line instead of buffering all of the output."""
+    _stdout: deque = deque(maxlen=MAX_STREAM_LINES)
+    _stderr: deque = deque(maxlen=MAX_STREAM_LINES)
+    _base_text = spinner.text if spinner is not None else ""
+    _label = f"{_base_text.strip()} | " if _base_text and _base_text.strip() else ""
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, **kwargs)
+    _readers = [
+        threading.Thread(target=_stream_pipe, args=(proc.stdout, _stdout, spinner, _label), daemon=True),
+        threading.Thread(target=_stream_pipe, args=(proc.stderr, _stderr, spinner, _label), daemon=True),
+    ]
+    for t in _readers:
+        t.start()
+
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        for t in _readers:
+            t.join()
+        raise subprocess.TimeoutExpired(cmd, timeout, output="".join(_stdout), stderr="".join(_stderr))
+
+    for t in _readers:
+        t.join()
+
+    if spinner is not None:
+        spinner.text = _base_text # Put the spinner text back once the output is done streaming
+
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout="".join(_stdout), stderr="".join(_stderr))
+
+
+def run(
+    cmd: Any,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    check: bool = True,
+    stream: bool = False,
+    spinner: Optional[Halo] = None,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """Runs a command with a timeout and records it in the trace.
+
+    Args:
+        cmd (list|str): The command to run. Strings are only supported together with shell=True.
+        timeout (float): Seconds before the command is killed and subprocess.TimeoutExpired is raised. None disables it.
+        check (bool): Raise subprocess.CalledProcessError if the command returns non-zero.
+        stream (bool): Stream the output line by line (into the spinner, if given) and only keep the tail of it.
+        spinner (Halo): The spinner to stream the output into.
+        **kwargs: Passed through to subprocess (cwd, env, shell, input, ...).
+
+    Returns:
+        subprocess.CompletedProcess: The completed process, stdout and stderr as text.
+    """
+    _start = time.time()
+    _t0 = time.perf_counter()
+    if "env" not in kwargs and clusters.is_active():
+        kwargs["env"] = clusters.env() # KUBECONFIG of the active cluster
+
+    try:
+        if stream:
+            res = _run_streaming(cmd, timeout=timeout, spinner=spinner, **kwargs)
+        else:
+            res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        _record(cmd, _start, time.perf_counter() - _t0, None, timed_out=True)
+        raise
+
+    _record(cmd, _start, time.perf_counter() - _t0, res.returncode)
+
+    if check and res.returncode != 0:
+        raise subprocess.CalledProcessError(res.returncode, cmd, output=res.stdout, stderr=res.stderr)
+
+    return res
+
+
+async def run_async(cmd: Any, timeout: Optional[float] = DEFAULT_TIMEOUT, check: bool = True, **kwargs) -> subprocess.CompletedProcess:
+    """Runs a command on the asyncio event loop with a timeout and records it in the trace.
+
+    Args:
+        cmd (list|str): The command to run. A string is run through the shell.
+        timeout (float): Seconds before the command is killed and subprocess.TimeoutExpired is raised.
+        check (bool): Raise subprocess.CalledProcessError if the command returns non-zero.
+        **kwargs: Passed through to asyncio.create_subprocess_exec/shell (cwd, env, ...).
+    """
+    _start = time.time()
+    _t0 = time.perf_counter()
+    _input = kwargs.pop("input", None)
+    if "env" not in kwargs and clusters.is_active():
+        kwargs["env"] = clusters.env() # KUBECONFIG of the active cluster
+
+    if isinstance(cmd, str):
+        proc = await asyncio.create_subprocess_shell(cmd, stdin=subprocess.PIPE if _input else None, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    else:
+        proc = await asyncio.create_subprocess_exec(*cmd, stdin=subprocess.PIPE if _input else None, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+
+    try:
+        _out, _err = await asyncio.wait_for(proc.communicate(_input.encode("utf-8") if _input else None), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        _record(cmd, _start, time.perf_counter() - _t0, None, timed_out=True)
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    _record(cmd, _start, time.perf_counter() - _t0, proc.returncode)
+    res = subprocess.CompletedProcess(cmd, proc.returncode, stdout=_out.decode("utf-8"), stderr=_err.decode("utf-8"))
+
+    if check and res.returncode != 0:
+        raise subprocess.CalledProcessError(res.returncode, cmd, output=res.stdout, stderr=res.stderr)
+
+    return res
+
+
+async def _gather(cmds: list, limit: int, **kwargs) -> list:
+    """Runs the commands concurrently on the event loop, with at most `limit` running at once."""
+    _sem = asyncio.Semaphore(limit)
+
+    async def _one(cmd: Any) -> subprocess.CompletedProcess:
+        async with _sem:
+            return await run_async(cmd, **kwargs)
+
+    return await asyncio.gather(*[_one(c) for c in cmds], return_exceptions=True)
+
+
+def gather(cmds: list, limit: int = 4, **kwargs) -> list:
+    """Runs the commands concurrently with asyncio.
+
+    Returns:
+        list: One entry per command, in order - a CompletedProcess, or the exception raised for that command.
+    """
+    return asyncio.run(_gather(list(cmds), limit, **kwargs))
+
+
+def run_many(cmds: list, max_workers: int = 4, **kwargs) -> list:
+    """Runs the commands concurrently in a thread pool (supports stream=True and spinners).
+
+    Returns:
+        list: One entry per command, in order - a CompletedProcess, or the exception raised for that command.
+    """
+    def _one(cmd: Any) -> Any:
+        try:
+            return run(cmd, **kwargs)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pfo-run") as pool:
+        # Each command runs in a copy of the caller's context, so it targets the same active cluster
+        _futures = [pool.submit(contextvars.copy_context().run, _one, cmd) for cmd in cmds]
+        return [f.result() for f in _futures]
@@ -0,0 +1,187 @@
+# Notes:
+# The cookiecutter templates pfo renders (i.e. pyflowops/k8s-installs) are kept in a local cache, instead of cloning
+# the template repository on every render. Each template has a bare mirror in ~/.pfo/.templates/<name>.git, which is
+# fetched incrementally, and the tree of the commit being rendered is exported next to it (<name>@<sha>).
+# Renders are stamped with the commit and the extra_context they were made from, so a render that would produce the
+# same output is skipped - and local edits to the rendered files survive until a new template commit arrives.
+# A mirror fetched less than FETCH_TTL seconds ago is not fetched again, a template pinned to a commit SHA that is in
+# the mirror is never fetched, and with PFO_OFFLINE=1 (or offline=True) only the mirror is used.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import re
+import json
+import time
+import shutil
+import tarfile
+import tempfile
+import threading
+import subprocess
+
+from typing import Any, Optional
+
+from halo import Halo
+from pfo.shared import runner
+
+STAMP_FILE: str = ".pfo-template.json" # Written into every rendered directory
+FETCH_TTL: int = 300 # Seconds a fetched mirror counts as up to date - scaffolding several apps in a row fetches once
+
+_templates_spinner = Halo(text_color="blue", spinner="dots")
+_locks: dict[str, threading.Lock] = {} # One lock per mirror - parallel clusters render the same template
+_locks_lock = threading.Lock()
+
+
+def _root() -> str:
+    return os.path.join(os.path.expanduser("~"), ".pfo", ".templates")
+
+def _name(url: str) -> str:
+    return url.rstrip("/").split("/")[-1].removesuffix(".git")
+
+def _lock(url: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(_name(url), threading.Lock())
+
+def mirror_dir(url: str) -> str:
+    """Returns the path of the template's bare mirror."""
+    return os.path.join(_root(), f"{_name(url)}.git")
+
+def _fetched_marker(url: str) -> str:
+    return os.path.join(mirror_dir(url), "pfo-fetched")
+
+def is_offline() -> bool:
+    """Check if pfo was told not to reach the template repositories (PFO_OFFLINE=1)."""
+    return os.environ.get("PFO_OFFLINE", "").lower() in ("1", "true", "yes")
+
+def is_fresh(url: str, ttl: int = FETCH_TTL) -> bool:
+    """Check if the mirror was fetched less than ttl seconds ago."""
+    _marker = _fetched_marker(url)
+    return os.path.isfile(_marker) and time.time() - os.path.getmtime(_marker) < ttl
+
+def _has_commit(url: str, ref: str) -> bool:
+    """Check if ref is a full commit SHA that is already in the mirror - a pinned revision never changes."""
+    if not re.fullmatch(r"[0-9a-f]{40}", ref) or not os.path.isdir(mirror_dir(url)):
+        return False
+
+    return runner.run(["git", "-C", mirror_dir(url), "cat-file", "-e", f"{ref}^{{commit}}"], check=False).returncode == 0
+
+def mirror(url: str, fetch: bool = True) -> str:
+    """Creates or incrementally fetches the bare mirror of the template repository.
+
+    When the fetch fails (i.e. offline) and there is a mirror already, it is used as it is.
+
+    Returns:
+        str: The path of the bare mirror.
+    """
+    _dir = mirror_dir(url)
+    if not os.path.isdir(_dir):
+        os.makedirs(_root(), exist_ok=True)
+        _tmp = tempfile.mkdtemp(prefix=f".{_name(url)}.", dir=_root())
+        try:
+            runner.run(["git", "clone", "--mirror", "--quiet", url, _tmp], timeout=runner.INSTALL_TIMEOUT)
+            os.replace(_tmp, _dir)
+        finally:
+            shutil.rmtree(_tmp, ignore_errors=True)
+        open(_fetched_marker(url), "w").close()
+        return _dir
+
+    if not fetch:
+        return _dir
+
+    try:
+        runner.run(["git", "-C", _dir, "fetch", "--prune", "--quiet", "origin"], timeout=runner.INSTALL_TIMEOUT)
+        open(_fetched_marker(url), "w").close()
+    except subprocess.SubprocessError as e:
+        _templates_spinner.warn(f"Could not fetch {url}, using the cached template: {e}")
+
+    return _dir
+
+def resolve(url: str, ref: str = "main") -> str:
+    """Returns the commit SHA the ref (branch, tag or SHA) points to in the mirror."""
+    return runner.run(["git", "-C", mirror_dir(url), "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"]).stdout.strip()
+
+def export(url: str, sha: str) -> str:
+    """Exports the tree of the commit from the mirror, once per commit - older exports are removed.
+
+    Returns:
+        str: The directory with the template files.
+    """
+    _dir = os.path.join(_root(), f"{_name(url)}@{sha}")
+    if os.path.isdir(_dir):
+        return _dir
+
+    _tmp = tempfile.mkdtemp(prefix=f".{_name(url)}@", dir=_root())
+    try:
+        _tar = os.path.join(_tmp, "template.tar")
+        runner.run(["git", "-C", mirror_dir(url), "archive", "--format=tar", f"--output={_tar}", sha], timeout=runner.BUILD_TIMEOUT)
+        with tarfile.open(_tar) as tar:
+            tar.extractall(os.path.join(_tmp, "tree"), filter="data")
+        os.replace(os.path.join(_tmp, "tree"), _dir)
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
+
+    for _old in os.listdir(_root()):
+        if _old.startswith(f"{_name(url)}@") and _old != os.path.basename(_dir):
+            shutil.rmtree(os.path.join(_root(), _old), ignore_errors=True)
+
+    return _dir
+
+def checkout(url: str, ref: str = "main", offline: bool = False) -> tuple[str, str]:
+    """Brings the template's mirror up to date (when needed) and exports the ref.
+
+    Args:
+        url (str): The template repository.
+        ref (str): The branch, tag or commit SHA to render - a commit SHA pins the template.
+        offline (bool): Only use the mirror, even if it is out of date (also PFO_OFFLINE=1).
+
+    Returns:
+        tuple: The directory with the template files, and the commit SHA they are from.
+
+    Raises:
+        FileNotFoundError: Offline, and the template was never fetched.
+        subprocess.CalledProcessError: The template could not be fetched, or the ref is not in it.
+    """
+    with _lock(url):
+        if offline or is_offline():
+            if not os.path.isdir(mirror_dir(url)):
+                raise FileNotFoundError(f"The template {url} is not cached yet - run once without offline mode.")
+            _fetch = False
+        else:
+            _fetch = not is_fresh(url, FETCH_TTL) and not _has_commit(url, ref)
+
+        mirror(url, fetch=_fetch)
+        _sha = resolve(url, ref)
+        return export(url, _sha), _sha
+
+def stamp(sha: str, extra_context: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """The stamp of a render - the template commit and the context it was rendered with."""
+    return {"sha": sha, "extra_context": extra_context or {}}
+
+def is_current(directory: str, expected: dict[str, Any]) -> bool:
+    """Check if the directory was rendered from the same template commit and context."""
+    _file = os.path.join(directory, STAMP_FILE)
+    if not os.path.isfile(_file):
+        return False
+
+    try:
+        with open(_file, "r") as f:
+            return json.load(f) == json.loads(json.dumps(expected))
+    except (OSError, json.JSONDecodeError):
+        return False
+
+def read_stamp(directory: str) -> Optional[dict[str, Any]]:
+    """Returns what the directory was rendered from, if it was rendered from a template."""
+    _file = os.path.join(directory, STAMP_FILE)
+    if not os.path.isfile(_file):
+        return None
+
+    try:
+        with open(_file, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def write_stamp(directory: str, value: dict[str, Any]) -> None:
+    """Records what the directory was rendered from."""
+    with open(os.path.join(directory, STAMP_FILE), "w") as f:
+        json.dump(value, f, indent=2, sort_keys=True)
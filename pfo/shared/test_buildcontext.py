@@ -0,0 +1,111 @@
+import os
+import tarfile
+import docker
+import pytest
+
+from pfo.shared import buildcontext
+from pfo.shared.buildcontext import Context
+from pfo.testing import FakeDockerDaemon
+
+def _write(root, files):
+    for _path, _contents in files.items():
+        (root / _path).parent.mkdir(parents=True, exist_ok=True)
+        (root / _path).write_text(_contents)
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with two images - api copies its own directory and the shared library, docs the whole repo."""
+    _root = tmp_path / "repo"
+    _write(_root, {
+        ".git/HEAD": "ref: refs/heads/main\n",
+        ".dockerignore": "# Not in any image\n**/*.pyc\nnode_modules\n",
+        "README.md": "repo\n",
+        "lib/shared.py": "shared\n",
+        "lib/shared.pyc": "",
+        "docker/api/Dockerfile": "FROM python:3.12\nCOPY --chown=app docker/api/ /app/\nCOPY lib/*.py \\\n  /app/lib/\nCOPY --from=builder /out /out\nRUN --mount=type=bind,source=requirements.txt,target=/tmp/r.txt pip install -r /tmp/r.txt\n",
+        "docker/api/main.py": "api\n",
+        "docker/docs/Dockerfile": "FROM nginx\nCOPY . /usr/share/nginx/html\n",
+        "node_modules/left-pad/index.js": "",
+        "requirements.txt": "requests\n",
+    })
+    return _root
+
+class TestSources:
+
+    def test_sources(self):
+        """Test that the context paths are read from COPY, ADD and bind mounts - not from other stages or URLs."""
+        _dockerfile = (
+            "# syntax=docker/dockerfile:1\n"
+            "FROM python:3.12 AS builder\n"
+            'COPY ["src/", "./pkg/", "/app/"]\n'
+            "ADD https://example.com/a.tgz /tmp/\n"
+            "COPY --from=builder /out /out\n"
+            "RUN --mount=type=bind,src=setup.py,target=/s pip install .\n"
+            "RUN --mount=type=cache,target=/root/.cache true\n"
+        )
+        assert buildcontext.sources(_dockerfile) == ["src", "pkg", "setup.py"]
+
+    @pytest.mark.parametrize("line", ["COPY . /app", "COPY ./ /app", "ADD $SRC /app", "RUN --mount=type=bind,target=/src make", "COPY <<EOF /app/run.sh"])
+    def test_whole_context(self, line):
+        """Test that a Dockerfile that reads the whole context, or one that cannot be told, gets the whole context."""
+        assert buildcontext.sources(f"FROM scratch\n{line}\n") is None
+
+class TestContext:
+
+    def test_files(self, repo):
+        """Test that a context has only the files its Dockerfile needs, less the ignored ones and .git."""
+        assert Context(str(repo), "docker/api/Dockerfile").files == [
+            ".dockerignore", "docker/api/Dockerfile", "docker/api/main.py", "lib/shared.py", "requirements.txt",
+        ]
+        assert Context(str(repo), "docker/docs/Dockerfile").files == [
+            ".dockerignore", "README.md", "docker/api/Dockerfile", "docker/api/main.py", "docker/docs/Dockerfile", "lib/shared.py", "requirements.txt",
+        ]
+
+    def test_dockerfile_ignore(self, repo):
+        """Test that a Dockerfile's own .dockerignore is used instead of the root one, and can include .git again."""
+        _write(repo, {"docker/docs/Dockerfile.dockerignore": "docker\n!.git\n!docker/docs/Dockerfile\n"})
+        _files = Context(str(repo), "docker/docs/Dockerfile").files
+        assert ".git/HEAD" in _files and "lib/shared.pyc" in _files and "node_modules/left-pad/index.js" in _files
+        assert "docker/api/main.py" not in _files and "docker/docs/Dockerfile" in _files
+
+    def test_digest(self, repo):
+        """Test that the digest follows the needed files' contents - not their mtimes, or the files the image does not need."""
+        _digest = Context(str(repo), "docker/api/Dockerfile").digest
+        os.utime(repo / "lib" / "shared.py", (0, 0))
+        (repo / "README.md").write_text("changed\n")
+        assert Context(str(repo), "docker/api/Dockerfile").digest == _digest
+
+        (repo / "lib" / "shared.py").write_text("changed\n")
+        assert Context(str(repo), "docker/api/Dockerfile").digest != _digest
+
+    def test_archive(self, repo):
+        """Test that the archive has the context's files, and is the same for the same context."""
+        _context = Context(str(repo), "docker/api/Dockerfile")
+        with _context.archive() as _first, tarfile.open(fileobj=_first) as tar:
+            assert tar.getnames() == _context.files
+            assert tar.extractfile("lib/shared.py").read() == b"shared\n"
+            assert {m.mtime for m in tar.getmembers()} == {0}
+            _first.seek(0)
+            _bytes = _first.read()
+
+        os.utime(repo / "docker" / "api" / "main.py", (1, 1))
+        with Context(str(repo), "docker/api/Dockerfile").archive() as _second:
+            assert _second.read() == _bytes
+
+    def test_outside_context(self, repo):
+        """Test that a Dockerfile outside of the context is an error."""
+        with pytest.raises(ValueError):
+            Context(str(repo / "docker" / "api"), "../docs/Dockerfile")
+
+    def test_build(self, repo, tmp_path):
+        """Test that docker-py builds the streamed context - the same context gives the same image."""
+        _context = Context(str(repo), "docker/api/Dockerfile")
+        with FakeDockerDaemon(str(tmp_path / "docker.sock")) as daemon:
+            client = docker.DockerClient(base_url=daemon.base_url)
+            _images = []
+            for _tag in ("pfo/api:local", "pfo/api:again"):
+                with _context.archive() as _archive:
+                    _image, _ = client.images.build(fileobj=_archive, custom_context=True, dockerfile=_context.dockerfile, tag=_tag)
+                _images.append(_image.id)
+
+        assert _images[0] == _images[1]
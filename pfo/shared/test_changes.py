@@ -0,0 +1,112 @@
+import json
+import time
+import subprocess
+import pytest
+
+from unittest.mock import MagicMock
+
+from pfo.shared.changes import ChangeIndex
+from pfo.shared.gitindex import GitIndex
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True).stdout.strip()
+
+def _write(root, files):
+    for _path, _contents in files.items():
+        (root / _path).parent.mkdir(parents=True, exist_ok=True)
+        (root / _path).write_text(_contents)
+
+def _commit(repo, message="Update"):
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=pfo", "-c", "user.email=pfo@example.com", "commit", "-q", "-m", message)
+
+@pytest.fixture
+def monorepo(tmp_path):
+    _root = tmp_path / "monorepo"
+    _root.mkdir()
+    _git(_root, "init", "-q")
+    _write(_root, {
+        "pfo.json": "{}",
+        "README.md": "root\n",
+        "services/api/pfo.json": "{}",
+        "services/api/main.py": "api\n",
+        "services/api/plugins/auth/pfo.json": "{}",
+        "services/api/plugins/auth/auth.py": "auth\n",
+        "services/web/pfo.json": "{}",
+        "services/web/index.js": "web\n",
+    })
+    _commit(_root, "Initial")
+    return _root
+
+class TestChangeIndex:
+
+    def test_hashes(self, monorepo):
+        """Test that every registered package gets a hash, and a file belongs to the deepest package it is in."""
+        _changes = ChangeIndex(path=str(monorepo))
+
+        assert _changes.packages == [".", "services/api", "services/api/plugins/auth", "services/web"]
+        assert _changes.owner("services/api/plugins/auth/auth.py") == "services/api/plugins/auth"
+        assert _changes.owner("services/api/main.py") == "services/api"
+        assert _changes.owner("README.md") == "."
+        assert len(set(_changes.hashes().values())) == 4
+
+    def test_owner_scales(self, tmp_path):
+        """Test that a file's package is looked up by its directories - not by going through every package."""
+        _packages = [f"services/s{i}" for i in range(2000)]
+        _changes = ChangeIndex(MagicMock(registered=MagicMock(return_value=_packages), git_dir=str(tmp_path)))
+        _files = [f"services/s{i % 2000}/src/module{i}.py" for i in range(20000)]
+
+        _start = time.perf_counter()
+        _owners = [_changes.owner(f) for f in _files]
+
+        assert time.perf_counter() - _start < 1.0
+        assert _owners[:2] == ["services/s0", "services/s1"]
+        assert _changes.owner("README.md") is None # No package at the root
+
+    def test_unchanged(self, monorepo):
+        """Test that nothing changed in a clean working tree, and pfo.json edits (i.e. bumps) do not count."""
+        (monorepo / "services/web/pfo.json").write_text('{"version": "0.0.2"}')
+
+        assert ChangeIndex(path=str(monorepo)).changed() == []
+
+    def test_working_tree_changes(self, monorepo):
+        """Test that unstaged, staged, deleted and new files are changes of their package only."""
+        (monorepo / "services/api/plugins/auth/auth.py").write_text("auth v2\n")
+        (monorepo / "services/web/index.js").unlink()
+        _write(monorepo, {"README.md": "root v2\n"})
+        _git(monorepo, "add", "README.md")
+
+        assert ChangeIndex(path=str(monorepo)).changed() == [".", "services/api/plugins/auth", "services/web"]
+
+    def test_since(self, monorepo):
+        """Test that the packages changed since a git ref include the committed changes."""
+        _base = _git(monorepo, "rev-parse", "HEAD")
+        _write(monorepo, {"services/api/main.py": "api v2\n"})
+        _commit(monorepo)
+
+        _changes = ChangeIndex(path=str(monorepo))
+        assert _changes.changed() == []
+        assert _changes.changed(since=_base) == ["services/api"]
+
+    def test_no_commits(self, tmp_path):
+        """Test that every package of a repository without commits is new."""
+        _write(tmp_path, {"pfo.json": "{}", "main.py": "\n"})
+        _git(tmp_path, "init", "-q")
+
+        assert ChangeIndex(GitIndex(str(tmp_path))).changed() == ["."]
+
+    def test_record(self, monorepo, tmp_path):
+        """Test that the packages changed since a recorded state are found, and all of them when none was recorded."""
+        _changes = ChangeIndex(path=str(monorepo))
+        assert _changes.changed_since_record("build") == _changes.packages
+
+        _changes.record("build", ["services/web"])
+        assert json.load(open(_changes.file))["build"] == {"services/web": _changes.hashes()["services/web"]}
+        assert _changes.file.startswith(_git(monorepo, "rev-parse", "--absolute-git-dir"))
+
+        (monorepo / "services/web/index.js").write_text("web v2\n")
+        _changes = ChangeIndex(path=str(monorepo), state_file=str(tmp_path / "changes.json"))
+        _changes.record("build")
+        (monorepo / "services/web/index.js").write_text("web v3\n")
+
+        assert ChangeIndex(path=str(monorepo), state_file=str(tmp_path / "changes.json")).changed_since_record("build") == ["services/web"]
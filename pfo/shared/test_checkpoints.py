@@ -0,0 +1,73 @@
+import json
+import pytest
+
+from unittest.mock import MagicMock, patch
+
+from pfo.shared import clusters
+from pfo.shared.checkpoints import Checkpoints, inputs_hash
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+def _steps(checkpoints, names, fail=None):
+    """Runs the steps in order, stopping at the one that fails - returns the steps that ran."""
+    _ran = []
+    for _name in names:
+        def _fn(name=_name):
+            _ran.append(name)
+            if name == fail:
+                raise RuntimeError(f"{name} failed")
+            return True
+        try:
+            checkpoints.run(_name, inputs_hash(_name), _fn)
+        except RuntimeError:
+            break
+    return _ran
+
+@patch('pfo.shared.checkpoints._checkpoints_spinner', MagicMock())
+class TestCheckpoints:
+
+    def test_resume_from_failed_step(self):
+        """Test that a resumed run skips the completed steps, and continues from the one that failed."""
+        assert _steps(Checkpoints("dev"), ["cluster", "metallb", "traefik", "grafana"], fail="traefik") == ["cluster", "metallb", "traefik"]
+        assert sorted(json.load(open(Checkpoints("dev", resume=True).file))) == ["cluster", "metallb"]
+
+        assert _steps(Checkpoints("dev", resume=True), ["cluster", "metallb", "traefik", "grafana"]) == ["traefik", "grafana"]
+
+    def test_changed_inputs_run_again(self):
+        """Test that a step whose inputs changed runs again - and every step after it."""
+        _steps(Checkpoints("dev"), ["cluster", "metallb", "traefik"])
+        _checkpoints = Checkpoints("dev", resume=True)
+
+        assert _checkpoints.run("cluster", inputs_hash("cluster"), MagicMock(return_value=True)) is False
+        assert _checkpoints.run("metallb", inputs_hash("metallb", "v0.15"), MagicMock(return_value=True)) is True
+        assert _checkpoints.run("traefik", inputs_hash("traefik"), MagicMock(return_value=True)) is True
+
+    def test_failed_step_not_recorded(self):
+        """Test that a step that reports a failure (returns False) is not recorded, and a resumed run starts from it."""
+        _checkpoints = Checkpoints("dev")
+        _checkpoints.run("cluster", inputs_hash("cluster"), MagicMock(return_value=True))
+        _checkpoints.run("metallb", inputs_hash("metallb"), MagicMock(return_value=False))
+
+        assert list(Checkpoints("dev", resume=True).steps) == ["cluster"]
+        assert _steps(Checkpoints("dev", resume=True), ["cluster", "metallb"]) == ["metallb"]
+
+    def test_verify(self):
+        """Test that a completed step that does not verify (i.e. its Helm release is gone) runs again."""
+        _steps(Checkpoints("dev"), ["grafana"])
+        _fn = MagicMock()
+
+        Checkpoints("dev", resume=True).run("grafana", inputs_hash("grafana"), _fn, verify=lambda: False)
+
+        _fn.assert_called_once()
+
+    def test_without_resume_starts_over(self):
+        """Test that a create that does not resume runs every step, and the clusters' checkpoints are separate."""
+        _steps(Checkpoints("dev"), ["cluster", "metallb"])
+        _steps(Checkpoints("qa"), ["cluster"])
+
+        assert _steps(Checkpoints("dev"), ["cluster", "metallb"]) == ["cluster", "metallb"]
+        assert Checkpoints("qa", resume=True).file.startswith(clusters.state_dir("qa"))
+        assert list(Checkpoints("qa", resume=True).steps) == ["cluster"]
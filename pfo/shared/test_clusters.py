@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import subprocess
+import pytest
+
+from unittest.mock import patch
+
+from pfo.shared import clusters
+from pfo.shared import runner
+
+_py = sys.executable
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+class TestActiveCluster:
+
+    def test_default_cluster(self):
+        """Test that the default cluster is used when none was selected."""
+        assert clusters.name() == clusters.DEFAULT
+        assert clusters.is_active() is False
+        assert clusters.env() is None
+
+    def test_use(self):
+        """Test that use() selects the cluster only for the with-block."""
+        with clusters.use("dev"):
+            assert clusters.name() == "dev"
+            assert clusters.context() == "kind-dev"
+            assert clusters.env()["KUBECONFIG"] == clusters.kubeconfig("dev")
+
+        assert clusters.name() == clusters.DEFAULT
+
+    def test_path(self, home):
+        """Test that {env} and ~ are expanded for the active cluster."""
+        with clusters.use("dev"):
+            assert clusters.path("~/.pfo/k8s/{env}/overlays") == os.path.join(str(home), ".pfo", "k8s", "dev", "overlays")
+
+        assert clusters.path("/tmp/{env}", "qa") == "/tmp/qa"
+
+    def test_for_each_isolates_clusters(self):
+        """Test that each cluster sees itself as the active cluster, while they run at the same time."""
+        _barrier = threading.Barrier(3, timeout=5)
+
+        def _fn():
+            _barrier.wait() # All three are running at once
+            return clusters.name(), clusters.path("~/.pfo/k8s/{env}"), clusters.tempdir(create=False)
+
+        _results = clusters.for_each(["a", "b", "c"], _fn)
+
+        assert {n: r[0] for n, r in _results.items()} == {"a": "a", "b": "b", "c": "c"}
+        assert len({r[1] for r in _results.values()}) == 3
+        assert len({r[2] for r in _results.values()}) == 3
+
+    def test_for_each_failure(self):
+        """Test that a failure for one cluster is returned, and does not stop the others."""
+        def _fn():
+            if clusters.name() == "bad":
+                exit(1)
+            return True
+
+        _results = clusters.for_each(["good", "bad"], _fn)
+
+        assert _results["good"] is True
+        assert isinstance(_results["bad"], SystemExit)
+
+class TestPortOffset:
+
+    def test_default_cluster_keeps_ports(self):
+        """Test that the default cluster is published on the unshifted ports."""
+        assert clusters.port_offset(clusters.DEFAULT) == 0
+
+    def test_offsets_are_unique_and_stable(self):
+        """Test that every cluster gets its own offset, which does not change."""
+        _offsets = [clusters.port_offset(c) for c in (clusters.DEFAULT, "dev", "qa")]
+
+        assert _offsets == [0, clusters.PORT_STEP, 2 * clusters.PORT_STEP]
+        assert clusters.port_offset("dev") == clusters.PORT_STEP
+        assert clusters.known() == sorted([clusters.DEFAULT, "dev", "qa"])
+
+class TestRunnerEnvironment:
+
+    def test_active_cluster_kubeconfig(self):
+        """Test that commands run for the active cluster see its kubeconfig."""
+        _cmd = [_py, "-c", "import os; print(os.environ.get('KUBECONFIG', ''))"]
+
+        with clusters.use("dev"):
+            assert runner.run(_cmd).stdout.strip() == clusters.kubeconfig("dev")
+            assert runner.run_many([_cmd])[0].stdout.strip() == clusters.kubeconfig("dev")
+
+class TestKubeconfig:
+
+    @pytest.fixture(autouse=True)
+    def exported(self, monkeypatch):
+        monkeypatch.setattr(clusters, "_exported", set())
+
+    def test_export_missing_kubeconfig(self):
+        """Test that a cluster without its own kubeconfig (created before pfo kept one) gets it exported from kind, once."""
+        def _export(cmd, **kwargs):
+            with open(cmd[cmd.index("--kubeconfig") + 1], "w") as f:
+                f.write("apiVersion: v1\n")
+            return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+        with clusters.use("old"), patch.object(runner, "run", side_effect=_export) as mock_run:
+            assert clusters.env()["KUBECONFIG"] == clusters.kubeconfig("old")
+            clusters.env()
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0] == ["kind", "export", "kubeconfig", "--name", "old", "--kubeconfig", clusters.kubeconfig("old")]
+        assert os.path.isfile(clusters.kubeconfig("old"))
+
+    def test_export_failure(self):
+        """Test that a cluster that does not exist yet is tried once, and keeps its own (future) kubeconfig."""
+        with clusters.use("new"), patch.object(runner, "run", side_effect=subprocess.CalledProcessError(1, ["kind"])) as mock_run:
+            assert clusters.env()["KUBECONFIG"] == clusters.kubeconfig("new")
+            assert clusters.env()["KUBECONFIG"] == clusters.kubeconfig("new")
+
+        mock_run.assert_called_once()
+
+    def test_existing_kubeconfig(self):
+        """Test that a cluster with its own kubeconfig is left alone."""
+        with open(clusters.kubeconfig("dev"), "w") as f:
+            f.write("apiVersion: v1\n")
+
+        with clusters.use("dev"), patch.object(runner, "run") as mock_run:
+            clusters.env()
+
+        mock_run.assert_not_called()
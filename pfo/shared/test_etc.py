@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from pfo.shared import ensure_hosts_entries
+from pfo.shared.etc import HostsFile
 
 class TestEnsureHostsEntries:
     
@@ -43,3 +44,63 @@ class TestEnsureHostsEntries:
         mock_spinner.info.assert_not_called()
         mock_spinner.start.assert_called_once_with("Ensuring host entries...")
         mock_spinner.succeed.assert_called_once_with("Hosts entries ensured successfully.")
+
+class TestHostsFile:
+
+    _contents = "\n".join([
+        "# Corporate hosts file",
+        "127.0.0.1 localhost localhost.localdomain # loopback",
+        "::1 localhost",
+        "10.0.0.5 argocd.pyflowops.local",
+        "",
+    ])
+
+    @pytest.fixture
+    def hosts_file(self, tmp_path):
+        _path = tmp_path / "hosts"
+        _path.write_text(self._contents)
+        return str(_path)
+
+    def test_parse_aliases_and_comments(self, hosts_file):
+        """Test that every alias is indexed and comments are ignored."""
+        hosts = HostsFile(hosts_file)
+
+        assert hosts.resolve("localhost") == "127.0.0.1"
+        assert hosts.resolve("localhost.localdomain") == "127.0.0.1"
+        assert hosts.resolve("loopback") is None
+        assert hosts.resolve("argocd.pyflowops.local") == "10.0.0.5"
+
+    def test_diff(self, hosts_file):
+        """Test that the diff holds missing entries and entries pointing to another IP address."""
+        hosts = HostsFile(hosts_file)
+        wanted = {"localhost": "127.0.0.1", "argocd.pyflowops.local": "127.0.0.1", "grafana.pyflowops.local": "127.0.0.1"}
+
+        assert hosts.diff(wanted) == {"argocd.pyflowops.local": "127.0.0.1", "grafana.pyflowops.local": "127.0.0.1"}
+        assert hosts.shadowed(wanted) == {"argocd.pyflowops.local": "10.0.0.5"}
+
+    def test_apply_writes_managed_block_once(self, hosts_file):
+        """Test that apply adds the managed block, keeps the rest of the file and is idempotent."""
+        hosts = HostsFile(hosts_file)
+        wanted = {"grafana.pyflowops.local": "127.0.0.1", "loki.pyflowops.local": "127.0.0.1"}
+
+        assert hosts.apply(wanted) == wanted
+
+        contents = open(hosts_file).read()
+        assert contents.startswith(self._contents)
+        assert contents.count(HostsFile.BEGIN) == 1
+        assert "127.0.0.1 grafana.pyflowops.local loki.pyflowops.local" in contents
+
+        assert HostsFile(hosts_file).apply(wanted) == {}
+        assert open(hosts_file).read() == contents
+
+    def test_apply_updates_managed_block(self, hosts_file):
+        """Test that a changed IP address replaces the entry inside the managed block."""
+        HostsFile(hosts_file).apply({"grafana.pyflowops.local": "127.0.0.1"})
+
+        hosts = HostsFile(hosts_file)
+        assert hosts.apply({"grafana.pyflowops.local": "172.18.0.2"}) == {"grafana.pyflowops.local": "172.18.0.2"}
+
+        contents = open(hosts_file).read()
+        assert contents.count(HostsFile.BEGIN) == 1
+        assert "172.18.0.2 grafana.pyflowops.local" in contents
+        assert "127.0.0.1 grafana.pyflowops.local" not in contents
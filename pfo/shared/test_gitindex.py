@@ -0,0 +1,61 @@
+import subprocess
+import pytest
+
+from pfo.shared.gitindex import GitIndex
+
+def _files(root, paths):
+    for _path in paths:
+        (root / _path).parent.mkdir(parents=True, exist_ok=True)
+        (root / _path).write_text("")
+
+@pytest.fixture
+def monorepo(tmp_path):
+    _root = tmp_path / "monorepo"
+    _root.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=_root, check=True)
+    _files(_root, [
+        "pyproject.toml",
+        ".gitignore",
+        "services/api/pyproject.toml",
+        "services/api/docker/api/Dockerfile",
+        "services/api/docker/worker/entrypoint.sh",
+        "services/api/manifests/base/kustomization.yaml",
+        "services/web/package.json",
+        "services/web/node_modules/left-pad/package.json",
+        "tools/ops/docker/ops/Dockerfile",
+        "docs/index.md",
+    ])
+    (_root / ".gitignore").write_text("node_modules/\n")
+    subprocess.run(["git", "add", "services/api", "pyproject.toml"], cwd=_root, check=True) # The rest is untracked
+    return _root
+
+class TestGitIndex:
+
+    def test_root_and_prefix(self, monorepo):
+        """Test that the repository root and the path's prefix are read from git."""
+        _index = GitIndex(str(monorepo / "services" / "api"))
+
+        assert _index.root == str(monorepo)
+        assert _index.prefix == "services/api"
+        assert GitIndex(str(monorepo)).prefix == ""
+
+    def test_lookups(self, monorepo):
+        """Test that tracked and untracked files are indexed, and ignored ones are not."""
+        _index = GitIndex(str(monorepo))
+
+        assert _index.isdir("services/api/manifests")
+        assert _index.exists("services/web/package.json")
+        assert not _index.exists("services/web/node_modules/left-pad/package.json")
+        assert _index.listdir("services") == ["api", "web"]
+        assert _index.listdir(".") == _index.listdir("")
+
+    def test_docker_images(self, monorepo):
+        """Test that each docker/<image> directory is found, with its Dockerfile if it has one."""
+        _index = GitIndex(str(monorepo))
+
+        assert _index.docker_images("services/api") == {"api": "Dockerfile", "worker": None}
+        assert _index.docker_images("docs") == {}
+
+    def test_packages(self, monorepo):
+        """Test that the packages of the monorepo are found, and the parts of packages are not."""
+        assert GitIndex(str(monorepo)).packages() == ["services/api", "services/web", "tools/ops"]
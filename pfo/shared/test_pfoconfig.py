@@ -0,0 +1,83 @@
+import os
+import json
+import pytest
+
+from unittest.mock import patch
+
+from pfo.shared import pfoconfig
+from pfo.shared.pfoconfig import PfoConfig, PfoConfigError
+
+VALID = {
+    "name": "api",
+    "package_path": "services/api",
+    "repo": "git@github.com:pyflowops/monorepo.git",
+    "version": "0.1.0",
+    "docker": {"api": {"base_path": "docker", "image": "api", "repo_path": "docker/api", "dockerfile": "Dockerfile"}},
+    "k8s": {"name": "api", "manifest_path": "manifests", "labels": {}, "deploy": False},
+}
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    pfoconfig.clear_cache()
+    yield
+    pfoconfig.clear_cache()
+
+def _write(path, data):
+    path.write_text(json.dumps(data) if not isinstance(data, str) else data)
+    return path
+
+class TestPfoConfig:
+
+    def test_valid(self):
+        """Test that a valid config is exposed through typed attributes."""
+        _config = PfoConfig(VALID)
+
+        assert (_config.name, _config.version, _config.package_path) == ("api", "0.1.0", "services/api")
+        assert _config.docker["api"]["dockerfile"] == "Dockerfile"
+        assert PfoConfig({"name": "tool", "version": "1.0.0"}).docker == {}
+
+    def test_every_problem_is_reported(self):
+        """Test that all of the problems of a config are reported together."""
+        _data = {**VALID, "version": 1, "docker": {"api": {"image": "api", "dockerfile": None}}, "k8s": {"deploy": "yes"}}
+        del _data["name"]
+
+        with pytest.raises(PfoConfigError) as e:
+            PfoConfig(_data, source="services/api/pfo.json")
+
+        assert e.value.errors == [
+            "name is missing", "version must be str", "docker.api.repo_path is missing", "k8s.deploy must be bool",
+        ]
+        assert str(e.value).startswith("services/api/pfo.json is not a valid pfo.json")
+
+    @pytest.mark.parametrize("contents", ["{", "[]", json.dumps({**VALID, "version": "1.0"})])
+    def test_invalid_contents(self, contents):
+        """Test that invalid JSON, a non-object and a malformed version are rejected."""
+        with pytest.raises(PfoConfigError):
+            PfoConfig.parse(contents)
+
+class TestLoad:
+
+    def test_memoized(self, tmp_path):
+        """Test that a file is parsed once, and a directory resolves to its pfo.json."""
+        _file = _write(tmp_path / "pfo.json", VALID)
+
+        with patch.object(PfoConfig, "parse", wraps=PfoConfig.parse) as mock_parse:
+            _config = pfoconfig.load(str(_file))
+            assert pfoconfig.load(str(tmp_path)) is _config
+
+        mock_parse.assert_called_once()
+
+    def test_reloaded_when_changed(self, tmp_path):
+        """Test that a file changed on disk is read again."""
+        _file = _write(tmp_path / "pfo.json", VALID)
+        assert pfoconfig.load(str(_file)).version == "0.1.0"
+
+        _write(_file, {**VALID, "version": "0.2.0"})
+        os.utime(_file, ns=(0, 0)) # A different modification time, whatever the file system's resolution is
+
+        assert pfoconfig.load(str(_file)).version == "0.2.0"
+
+    def test_missing(self, tmp_path):
+        """Test that a missing file is not cached, and raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            pfoconfig.load(str(tmp_path / "pfo.json"))
@@ -0,0 +1,62 @@
+import json
+import time
+import pytest
+
+from pfo.shared import profiler
+
+@pytest.fixture
+def profiling(monkeypatch):
+    """Enables the profiler with an empty span list, without installing the global hooks."""
+    monkeypatch.setattr(profiler, "_enabled", True)
+    monkeypatch.setattr(profiler, "_spans", [])
+    yield profiler
+
+class TestSpans:
+
+    def test_add_span_ignored_when_disabled(self, monkeypatch):
+        """Test that nothing is recorded unless profiling is enabled."""
+        monkeypatch.setattr(profiler, "_enabled", False)
+        monkeypatch.setattr(profiler, "_spans", [])
+
+        profiler.add_span("kind create cluster", "kind", time.perf_counter(), 1.0)
+
+        assert profiler.spans() == []
+
+    def test_span_context_manager_records_duration(self, profiling):
+        """Test that the span context manager records the block."""
+        with profiling.span("render", "pfo"):
+            pass
+
+        _spans = profiling.spans()
+        assert len(_spans) == 1
+        assert _spans[0]["name"] == "render"
+        assert _spans[0]["cat"] == "pfo"
+        assert _spans[0]["duration"] >= 0
+
+class TestReport:
+
+    def test_summary_sorted_by_total_time(self, profiling):
+        """Test that categories and names are sorted by their total time."""
+        _now = time.perf_counter()
+        profiling.add_span("helm install traefik", "helm", _now, 2.0)
+        profiling.add_span("sleep 30s", "sleep", _now, 30.0)
+        profiling.add_span("kubectl apply -f", "kubectl", _now, 1.0)
+        profiling.add_span("kubectl apply -f", "kubectl", _now, 1.5)
+
+        _lines = profiling.summary().splitlines()
+        _categories = [l.split()[0] for l in _lines[1:] if not l.startswith("    ")]
+
+        assert _categories == ["sleep", "kubectl", "helm"]
+        assert any("x2" in l for l in _lines)
+
+    def test_write_chrome_trace(self, profiling, tmp_path):
+        """Test that spans are written as complete ("X") trace events in microseconds."""
+        profiling.add_span("kind create cluster", "kind", profiler._origin + 1.0, 0.5)
+        _file = tmp_path / "trace.json"
+
+        profiling.write_chrome_trace(str(_file))
+
+        _events = json.loads(_file.read_text())["traceEvents"]
+        assert _events[0]["ph"] == "X"
+        assert _events[0]["ts"] == 1_000_000
+        assert _events[0]["dur"] == 500_000
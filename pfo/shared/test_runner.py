@@ -0,0 +1,105 @@
+import sys
+import json
+import pytest
+import subprocess
+
+from unittest.mock import MagicMock
+from pfo.shared import runner
+
+_py = sys.executable
+
+class TestRun:
+
+    def setup_method(self):
+        runner.reset_trace()
+
+    def test_run_returns_completed_process(self):
+        """Test that run returns the text output of the command."""
+        res = runner.run([_py, "-c", "print('hello')"])
+
+        assert res.returncode == 0
+        assert res.stdout.strip() == "hello"
+
+    def test_run_raises_on_failure_when_check(self):
+        """Test that a non-zero return code raises CalledProcessError."""
+        with pytest.raises(subprocess.CalledProcessError):
+            runner.run([_py, "-c", "import sys; sys.exit(3)"])
+
+    def test_run_no_raise_without_check(self):
+        """Test that check=False returns the failed process instead of raising."""
+        res = runner.run([_py, "-c", "import sys; sys.exit(3)"], check=False)
+
+        assert res.returncode == 3
+
+    def test_run_timeout(self):
+        """Test that a command running past its timeout is killed and recorded as timed out."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run([_py, "-c", "import time; time.sleep(5)"], timeout=0.2)
+
+        assert runner.trace()[-1]["timed_out"] is True
+
+    def test_run_records_trace(self):
+        """Test that each command is recorded with its duration and return code."""
+        runner.run([_py, "-c", "pass"])
+
+        _entry = runner.trace()[-1]
+        assert _entry["cmd"] == [_py, "-c", "pass"]
+        assert _entry["returncode"] == 0
+        assert _entry["duration"] >= 0
+
+    def test_run_writes_trace_file(self, tmp_path):
+        """Test that trace entries are appended to the trace file as JSON lines."""
+        _file = tmp_path / "trace.jsonl"
+        runner.set_trace_file(str(_file))
+        try:
+            runner.run([_py, "-c", "pass"])
+            runner.run([_py, "-c", "pass"])
+        finally:
+            runner.set_trace_file(None)
+
+        _lines = _file.read_text().splitlines()
+        assert len(_lines) == 2
+        assert json.loads(_lines[0])["returncode"] == 0
+
+class TestRunStreaming:
+
+    def test_stream_updates_spinner(self):
+        """Test that streamed output lines are pushed into the spinner text."""
+        _spinner = MagicMock()
+        _spinner.text = "Installing"
+
+        res = runner.run([_py, "-c", "print('one'); print('two')"], stream=True, spinner=_spinner)
+
+        assert res.stdout.splitlines() == ["one", "two"]
+        assert _spinner.text == "Installing"
+
+    def test_stream_keeps_only_the_tail(self, monkeypatch):
+        """Test that only the last MAX_STREAM_LINES lines are kept in memory."""
+        monkeypatch.setattr(runner, "MAX_STREAM_LINES", 3)
+
+        res = runner.run([_py, "-c", "[print(i) for i in range(10)]"], stream=True)
+
+        assert res.stdout.splitlines() == ["7", "8", "9"]
+
+class TestConcurrency:
+
+    def test_run_many_keeps_order_and_returns_exceptions(self):
+        """Test that run_many returns results in order, with failures as exceptions."""
+        _cmds = [
+            [_py, "-c", "print(1)"],
+            [_py, "-c", "import sys; sys.exit(1)"],
+            [_py, "-c", "print(3)"],
+        ]
+
+        res = runner.run_many(_cmds, max_workers=3)
+
+        assert res[0].stdout.strip() == "1"
+        assert isinstance(res[1], subprocess.CalledProcessError)
+        assert res[2].stdout.strip() == "3"
+
+    def test_gather_runs_with_asyncio(self):
+        """Test that gather runs the commands on the event loop and applies timeouts."""
+        res = runner.gather([[_py, "-c", "print('a')"], [_py, "-c", "import time; time.sleep(5)"]], timeout=0.5)
+
+        assert res[0].stdout.strip() == "a"
+        assert isinstance(res[1], subprocess.TimeoutExpired)
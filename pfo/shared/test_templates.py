@@ -0,0 +1,96 @@
+import os
+import subprocess
+import pytest
+
+from unittest.mock import patch
+
+from pfo.shared import templates
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True).stdout.strip()
+
+def _commit(repo, name, contents):
+    (repo / name).write_text(contents)
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=pfo", "-c", "user.email=pfo@example.com", "commit", "-q", "-m", f"Update {name}")
+    return _git(repo, "rev-parse", "HEAD")
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    _repo = tmp_path / "k8s-installs"
+    _repo.mkdir()
+    _git(_repo, "init", "-q", "-b", "main")
+    _commit(_repo, "kind-config.yaml", "kind: Cluster\n")
+    return _repo
+
+class TestTemplates:
+
+    def test_checkout(self, upstream):
+        """Test that the template is mirrored once, and exported at the ref's commit."""
+        _dir, _sha = templates.checkout(f"file://{upstream}")
+
+        assert _sha == _git(upstream, "rev-parse", "HEAD")
+        assert open(os.path.join(_dir, "kind-config.yaml")).read() == "kind: Cluster\n"
+        assert os.path.isdir(templates.mirror_dir(f"file://{upstream}"))
+
+    def test_incremental_fetch(self, upstream, monkeypatch):
+        """Test that a new upstream commit is fetched into the existing mirror, and the old export is removed."""
+        monkeypatch.setattr(templates, "FETCH_TTL", 0)
+        _old_dir, _old_sha = templates.checkout(f"file://{upstream}")
+        _new_sha = _commit(upstream, "kind-config.yaml", "kind: Cluster\nname: new\n")
+
+        _dir, _sha = templates.checkout(f"file://{upstream}")
+
+        assert _sha == _new_sha != _old_sha
+        assert "name: new" in open(os.path.join(_dir, "kind-config.yaml")).read()
+        assert not os.path.exists(_old_dir)
+
+    def test_fetched_once_in_a_row(self, upstream):
+        """Test that a mirror fetched moments ago is not fetched again."""
+        _url = f"file://{upstream}"
+        _, _sha = templates.checkout(_url)
+        _commit(upstream, "kind-config.yaml", "kind: Cluster\nname: new\n")
+
+        assert templates.checkout(_url)[1] == _sha
+
+    def test_pinned_revision(self, upstream, monkeypatch):
+        """Test that a template pinned to a commit SHA in the mirror is used without fetching."""
+        monkeypatch.setattr(templates, "FETCH_TTL", 0)
+        _url = f"file://{upstream}"
+        _, _pinned = templates.checkout(_url)
+        _commit(upstream, "kind-config.yaml", "kind: Cluster\nname: new\n")
+
+        with patch.object(templates, "mirror", wraps=templates.mirror) as mock_mirror:
+            _dir, _sha = templates.checkout(_url, _pinned)
+
+        assert _sha == _pinned
+        mock_mirror.assert_called_once_with(_url, fetch=False)
+        assert open(os.path.join(_dir, "kind-config.yaml")).read() == "kind: Cluster\n"
+
+    def test_offline_without_cache(self, upstream):
+        """Test that offline mode fails clearly when the template was never fetched."""
+        with pytest.raises(FileNotFoundError):
+            templates.checkout(f"file://{upstream}", offline=True)
+
+    def test_offline_uses_mirror(self, upstream, tmp_path, monkeypatch):
+        """Test that the cached template is used when the repository cannot be reached."""
+        monkeypatch.setattr(templates, "FETCH_TTL", 0)
+        _url = f"file://{upstream}"
+        _, _sha = templates.checkout(_url)
+        upstream.rename(tmp_path / "gone")
+
+        _dir, _offline_sha = templates.checkout(_url)
+
+        assert _offline_sha == _sha
+        assert os.path.isfile(os.path.join(_dir, "kind-config.yaml"))
+
+    def test_stamp(self, tmp_path):
+        """Test that a render is current only for the same commit and context."""
+        _stamp = templates.stamp("abc123", {"namespace": "pyops"})
+        templates.write_stamp(str(tmp_path), _stamp)
+
+        assert templates.is_current(str(tmp_path), _stamp) is True
+        assert templates.is_current(str(tmp_path), templates.stamp("def456", {"namespace": "pyops"})) is False
+        assert templates.is_current(str(tmp_path), templates.stamp("abc123", {"namespace": "dev"})) is False
+        assert templates.is_current(str(tmp_path / "missing"), _stamp) is False
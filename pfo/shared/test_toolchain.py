@@ -0,0 +1,68 @@
+import os
+import stat
+import pytest
+
+from unittest.mock import patch
+
+from pfo.shared import toolchain
+
+def _tool(bin_dir, name, output="v1.2.3\n", returncode=0):
+    _path = bin_dir / name
+    _path.write_text(f"#!/bin/sh\necho \"$0 $@\" >> \"{bin_dir}/calls\"\nprintf '{output}'\nexit {returncode}\n")
+    _path.chmod(_path.stat().st_mode | stat.S_IXUSR)
+    return _path
+
+def _calls(bin_dir):
+    _file = bin_dir / "calls"
+    return _file.read_text().splitlines() if _file.exists() else []
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    _bin = tmp_path / "bin"
+    _bin.mkdir()
+    monkeypatch.setenv("PATH", str(_bin))
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    return _bin
+
+class TestToolchain:
+
+    def test_which(self, bin_dir):
+        """Test that tools are located on PATH without running anything."""
+        _tool(bin_dir, "kind")
+
+        assert toolchain.which("kind") == str(bin_dir / "kind")
+        assert toolchain.is_installed("helm") is False
+        assert _calls(bin_dir) == []
+
+    def test_version_is_cached(self, bin_dir):
+        """Test that a tool is run once for its version, and again only after the binary changed."""
+        _helm = _tool(bin_dir, "helm", output="v3.15.2+gabc\n")
+
+        assert toolchain.version("helm") == "v3.15.2+gabc"
+        assert toolchain.version("helm") == "v3.15.2+gabc"
+        assert len(_calls(bin_dir)) == 1
+
+        _tool(bin_dir, "helm", output="v3.16.0\n")
+        os.utime(_helm, ns=(0, 0))
+
+        assert toolchain.version("helm") == "v3.16.0"
+        assert len(_calls(bin_dir)) == 2
+
+    def test_failing_tool(self, bin_dir):
+        """Test that a tool that fails to print its version is found, but not usable."""
+        _tool(bin_dir, "docker", output="Cannot run\n", returncode=1)
+
+        assert toolchain.check("docker") == {"tool": "docker", "path": str(bin_dir / "docker"), "version": None, "ok": False}
+
+    def test_doctor(self, bin_dir):
+        """Test that the whole toolchain is checked concurrently, in order."""
+        for _name in ("kind", "kubectl", "kustomize", "helm", "gh"):
+            _tool(bin_dir, _name, output=f"{_name} version 1.0.0\n")
+
+        with patch.object(toolchain, "ThreadPoolExecutor", wraps=toolchain.ThreadPoolExecutor) as mock_pool:
+            _results = toolchain.doctor()
+
+        mock_pool.assert_called_once_with(max_workers=6)
+        assert [r["tool"] for r in _results] == list(toolchain.TOOLS)
+        assert [r["ok"] for r in _results] == [True, True, True, True, True, False]
+        assert _results[0]["version"] == "1.0.0"
@@ -0,0 +1,115 @@
+# Notes:
+# The external tools pfo drives (kind, kubectl, kustomize, helm, gh, docker) are located in-process with shutil.which,
+# instead of spawning `command -v <tool>` - a shell builtin, which is not an executable on most systems.
+# Their versions are captured once and cached in ~/.pfo/toolchain.json, keyed by the binary's path, modification time
+# and size - a tool is only run again for its version after it was upgraded (or moved). `pfo doctor` checks the whole
+# toolchain concurrently.
+# This file is part of the PyFlowOps project, which is licensed under the Apache License 2.0.
+# See the LICENSE file for more details.
+
+import os
+import re
+import json
+import shutil
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from pfo.shared import runner
+from pfo.shared.files import atomic_write
+
+# tool -> the arguments that print its version (client only - none of them needs a cluster or a daemon)
+TOOLS: dict[str, list[str]] = {
+    "kind": ["version"],
+    "kubectl": ["version", "--client"],
+    "kustomize": ["version"],
+    "helm": ["version", "--short"],
+    "gh": ["--version"],
+    "docker": ["--version"],
+}
+VERSION_TIMEOUT: int = 10 # Seconds a tool gets to print its version
+VERSION_PATTERN: str = r"v?\d+\.\d+(?:\.\d+)?(?:[-+][\w.-]+)?"
+
+_cache_lock = threading.Lock() # Tools are checked from threads (see doctor)
+
+
+def _cache_file() -> str:
+    return os.path.join(os.path.expanduser("~"), ".pfo", "toolchain.json")
+
+
+def _load_cache() -> dict[str, dict[str, Any]]:
+    try:
+        with open(_cache_file(), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def which(tool: str) -> Optional[str]:
+    """Returns the path of the tool's executable on PATH, or None."""
+    return shutil.which(tool)
+
+
+def is_installed(tool: str) -> bool:
+    """Check if the tool is on PATH."""
+    return which(tool) is not None
+
+
+def _fingerprint(path: str) -> dict[str, Any]:
+    _stat = os.stat(path)
+    return {"mtime_ns": _stat.st_mtime_ns, "size": _stat.st_size}
+
+
+def version(tool: str) -> Optional[str]:
+    """Returns the version of the tool, or None if it is not installed (or did not print a version).
+
+    The version is read from the cache when the binary did not change since it was captured.
+    """
+    _path = which(tool)
+    if _path is None:
+        return None
+
+    _path = os.path.realpath(_path) # Package managers upgrade a tool by replacing what the symlink points to
+    _fingerprint_now = _fingerprint(_path)
+    with _cache_lock:
+        _cached = _load_cache().get(_path)
+    if _cached is not None and _cached.get("fingerprint") == _fingerprint_now:
+        return _cached.get("version")
+
+    try:
+        _res = runner.run([_path, *TOOLS.get(tool, ["--version"])], timeout=VERSION_TIMEOUT, check=False)
+        _match = re.search(VERSION_PATTERN, f"{_res.stdout}\n{_res.stderr}")
+        _version = _match.group(0) if _match and _res.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        _version = None
+
+    with _cache_lock:
+        _cache = _load_cache()
+        _cache[_path] = {"tool": tool, "fingerprint": _fingerprint_now, "version": _version}
+        try:
+            os.makedirs(os.path.dirname(_cache_file()), exist_ok=True)
+            atomic_write(_cache_file(), json.dumps(_cache, indent=2, sort_keys=True))
+        except OSError:
+            pass # The cache is an optimization - the version was still found
+
+    return _version
+
+
+def check(tool: str) -> dict[str, Any]:
+    """Returns what was found for the tool - its path and version, and whether it is usable."""
+    _path = which(tool)
+    _version = version(tool) if _path else None
+    return {"tool": tool, "path": _path, "version": _version, "ok": _path is not None and _version is not None}
+
+
+def doctor(tools: Optional[list[str]] = None, max_workers: int = 8) -> list[dict[str, Any]]:
+    """Checks the tools (default: the whole toolchain) concurrently.
+
+    Returns:
+        list: One check() result per tool, in the order of the tools.
+    """
+    _tools = list(tools or TOOLS)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(_tools)))) as pool:
+        return list(pool.map(check, _tools))
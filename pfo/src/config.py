@@ -1,8 +1,10 @@
 import configparser
 import os
+import time
 import virtualenv
 
 from halo import Halo
+from pfo.shared import profiler
 
 spinner = Halo(text="Loading configuration...", spinner="dots")
 
@@ -20,6 +22,7 @@ class MetaData:
     _template_repo: str = "base-repo-template"
 
     def __init__(self):
+        _t0 = time.perf_counter()
         self.config_path: str = (
             self._config_path()
         )  # The root folder of the config file (config.ini)
@@ -40,7 +43,8 @@ class MetaData:
 
         ### Python and Pip Executables
         # We need to install a python environment in the root directory
-        virtualenv.cli_run(["--python=python3.12.6", f"{self.rootdir}/.python"])
+        with profiler.span("virtualenv ~/.pfo/.python", "setup"):
+            virtualenv.cli_run(["--python=python3.12.6", f"{self.rootdir}/.python"])
         
         self.python_executable: str = (
             os.path.join(self.rootdir, ".python", "bin", "python")
@@ -61,6 +65,7 @@ class MetaData:
         self.local_github_repo_template: str = (
             self._local_github_repo_template()
         )
+        profiler.add_span("MetaData()", "setup", _t0, time.perf_counter() - _t0)
 
     def __str__(self) -> str:
         """Returns the string representation of the MetaData class."""
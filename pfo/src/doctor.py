@@ -0,0 +1,40 @@
+import time
+
+import click
+from halo import Halo
+from pfo.shared import toolchain
+
+__author__ = "Philip De Lorenzo"
+
+spinner = Halo(text_color="blue", spinner="dots")
+
+
+@click.command()
+@click.option(
+    "--tool",
+    "tools",
+    required=False,
+    multiple=True,
+    type=click.Choice(list(toolchain.TOOLS)),
+    help=f"Only checks this tool - can be given more than once (default: the whole toolchain)",
+)
+def doctor(**params: dict) -> None:
+    """Checks the toolchain pfo needs - kind, kubectl, kustomize, helm, gh and docker."""
+    _t0 = time.perf_counter()
+    _results = toolchain.doctor(list(params.get("tools") or ()) or None)
+    _elapsed = time.perf_counter() - _t0
+
+    for _result in _results:
+        if _result["ok"]:
+            spinner.succeed(f"{_result['tool']} {_result['version']} ({_result['path']})")
+        elif _result["path"]:
+            spinner.warn(f"{_result['tool']} did not report a version ({_result['path']})")
+        else:
+            spinner.fail(f"{_result['tool']} is not installed - it was not found on PATH")
+
+    _missing = [r["tool"] for r in _results if not r["ok"]]
+    if _missing:
+        spinner.fail(f"Toolchain checked in {_elapsed:.2f}s - {len(_missing)} of {len(_results)} tools need attention: {', '.join(_missing)}")
+        exit(1)
+
+    spinner.succeed(f"Toolchain checked in {_elapsed:.2f}s - all {len(_results)} tools are ready.")
@@ -7,7 +7,9 @@ import gnupg
 import os
 import base64
 import json
+import re
 import time
+import hashlib
 import docker
 import subprocess
 import shutil
@@ -17,6 +19,7 @@ import yaml
 
 from cookiecutter.main import cookiecutter
 from typing import Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from git import Repo
 from click_option_group import optgroup
 from halo import Halo
@@ -25,10 +28,25 @@ from shared.commands import DefaultCommandGroup
 from src.config import MetaData
 from pfo.k8s import metallb
 from pfo.k8s import traefik
-from pfo.k8s import _tempdir
+from pfo.k8s import snapshot
+from pfo.k8s import plan
+from pfo.k8s import kindconfig
+from pfo.k8s import pipeline
+from pfo.k8s import images
+from pfo.k8s import watch
+from pfo.k8s import components as cluster_components
 from pfo import argocd
 
 from pfo.shared import ensure_hosts_entries
+from pfo.shared import runner
+from pfo.shared import clusters
+from pfo.shared import templates
+from pfo.shared.changes import ChangeIndex
+from pfo.shared.checkpoints import Checkpoints, inputs_hash
+from pfo.shared.files import atomic_write
+from pfo.shared import pfoconfig
+from pfo.shared import buildcontext
+from pfo.shared.pfoconfig import PfoConfig, PfoConfigError
 
 from pfo import monitoring
 from src.tools import print_help_msg
@@ -40,6 +58,8 @@ metadata = MetaData()
 config_data = metadata.config_data
 spinner = Halo(text_color="blue", spinner="dots")
 
+CONTEXT_LABEL: str = buildcontext.LABEL # The hash of the build context a local image was built from
+
 @click.group(cls=DefaultCommandGroup, invoke_without_command=True)
 @optgroup.group(f"Kubernetes CRUD Commands", help=f"Kubnernetes (Kind) cluster administration")
 @optgroup.option(
@@ -48,11 +68,17 @@ spinner = Halo(text_color="blue", spinner="dots")
     is_flag=True,
     help=f"Creates the Kubernetes cluster (Kind) with the latest manifests",
 )
+@optgroup.option(
+    "--resume",
+    required=False,
+    is_flag=True,
+    help=f"With --create, skips the steps a previous (failed) create completed, and continues from the first one that did not",
+)
 @optgroup.option(
     "--delete",
     required=False,
     is_flag=True,
-    help=f"Deletes the Kubernetes cluster (Kind) and all associated resources in the local namespace",
+    help=f"Deletes the Kubernetes cluster (Kind) and all associated resources",
 )
 @optgroup.option(
     "--delete-all",
@@ -65,6 +91,45 @@ spinner = Halo(text_color="blue", spinner="dots")
     required=False,
     help=f"This updates the Kubernetes cluster (Kind) to the latest manifests",
 )
+@optgroup.option(
+    "--plan",
+    required=False,
+    is_flag=True,
+    help=f"Shows what --update would create and change in the Kubernetes cluster (Kind), without changing it",
+)
+@optgroup.option(
+    "--snapshot",
+    required=False,
+    is_flag=True,
+    help=f"Saves a snapshot of the provisioned Kubernetes cluster (Kind), which --create and --restore start from",
+)
+@optgroup.option(
+    "--restore",
+    required=False,
+    is_flag=True,
+    help=f"Recreates the Kubernetes cluster (Kind) from its snapshot, applying only what changed since",
+)
+@optgroup.option(
+    "--components",
+    required=False,
+    multiple=True,
+    help=f"The components to install or update, comma separated - i.e. metallb,traefik,argocd (default: the ones enabled in k8s_config.json, or the ones the cluster was created with)",
+)
+@optgroup.option(
+    "--name",
+    required=False,
+    multiple=True,
+    default=(clusters.DEFAULT,),
+    show_default=True,
+    help=f"The Kind cluster(s) to act on - repeat it to create, update or delete several clusters at the same time",
+)
+@optgroup.group(f"Development", help=f"Inner dev loop of a package against the Kubernetes cluster (Kind)")
+@optgroup.option(
+    "--watch",
+    required=False,
+    is_flag=True,
+    help=f"Run in a package: rebuilds the image of a docker directory that changed, loads it into the cluster and restarts the deployments that run it",
+)
 @optgroup.group(f"Kubernetes Cluster Data", help=f"Kubnernetes (Kind) cluster information")
 @optgroup.option(
     "--info",
@@ -83,6 +148,14 @@ def k8s(**params: dict) -> None:
     _pubkey = os.path.join(os.path.expanduser("~"), ".pfo", "keys", "pfo.pub")
     _privkey = os.path.join(os.path.expanduser("~"), ".pfo", "keys", "pfo")
     
+    _names: tuple = tuple(dict.fromkeys(params.get("name") or (clusters.DEFAULT,))) # --name dev --name dev is one cluster
+    _components: tuple = params.get("components") or ()
+    try:
+        cluster_components.parse(_components) # Reported before anything is created
+    except ValueError as e:
+        spinner.fail(str(e))
+        exit(1)
+
     # These are the keys that will be used for encryption and decryption of the project data
     if params.get("create", False):
         spinner.start("Creating Kind cluster...\n\n")
@@ -96,19 +169,19 @@ def k8s(**params: dict) -> None:
         if not argocd.keys.check_ssh_key_exists():
             argocd.keys.add_ssh_key_to_github()
 
-        cluster = Cluster(env="pyops")
-        cluster.create() # Create the Kind cluster
-
-        argocd.argocd_deployment_readiness() # Wait for the ArgoCD server to be ready
-
-        Cluster.cluster_info() # Display the cluster information
+        if not _for_each_cluster(_names, lambda: _create(resume=params.get("resume", False), components=_components), "create"):
+            exit(1)
+        for _name in _names:
+            with clusters.use(_name):
+                Cluster.cluster_info() # Display the cluster information
         spinner.succeed("Complete!")
         exit()
 
     if params.get("delete", False):
         # Deletes the Kind cluster and all associated resources in the local namespace
-        spinner.start("Deleting Kind cluster (local namespace)...\n\n")
-        Cluster.delete()
+        spinner.start("Deleting Kind cluster...\n\n")
+        if not _for_each_cluster(_names, lambda: Cluster(env=clusters.name()).delete(), "delete"):
+            exit(1)
         spinner.succeed("Complete!")
         exit()
 
@@ -119,153 +192,527 @@ def k8s(**params: dict) -> None:
         spinner.succeed("Complete!")
         exit()
     
+    if params.get("snapshot", False):
+        spinner.start("Saving Kind cluster snapshot...\n\n")
+        if not _for_each_cluster(_names, lambda: Cluster(env=clusters.name()).snapshot(), "snapshot"):
+            exit(1)
+        spinner.succeed("Complete!")
+        exit()
+
+    if params.get("restore", False):
+        spinner.start("Restoring Kind cluster...\n\n")
+        if not _for_each_cluster(_names, lambda: _restore(_components), "restore"):
+            exit(1)
+        for _name in _names:
+            with clusters.use(_name):
+                Cluster.cluster_info()
+        spinner.succeed("Complete!")
+        exit()
+
     if params.get("info", False):
-        Cluster.cluster_info()
+        for _name in _names:
+            with clusters.use(_name):
+                Cluster.cluster_info(_components)
         spinner.succeed("Complete!")
         exit()
 
+    if params.get("plan", False):
+        spinner.start("Planning the Kind cluster update...\n\n")
+        if not _for_each_cluster(_names, lambda: _plan(_components), "plan"):
+            exit(1)
+        spinner.succeed("Complete! Run --update within the next few minutes to apply this plan.")
+        exit()
+
     if params.get("update", False):
         spinner.start("Updating Kind cluster...\n\n")
-        cluster = Cluster(env="pyops")
-        cluster.update()
-        cluster.rollout_restart_deployment() # Rollout restart the deployment in the Kind cluster
+        if not _for_each_cluster(_names, lambda: _update(_components), "update"):
+            exit(1)
         spinner.succeed("Complete!")
         exit()
 
-    if not any(params.values()):
+    if params.get("watch", False):
+        if len(_names) > 1:
+            spinner.fail("--watch acts on one cluster - pass one --name.")
+            exit(1)
+        with clusters.use(_names[0]):
+            if not _watch():
+                exit(1)
+        exit()
+
+    if not any(v for k, v in params.items() if k not in ("name", "components")):
         print_help_msg(k8s)
 
+def _create(resume: bool = False, components: tuple = ()) -> bool:
+    """Creates and provisions the active cluster."""
+    cluster = Cluster(env=clusters.name())
+    cluster.create(resume=resume, components=components) # Create the Kind cluster
+    if "argocd" in cluster.components:
+        argocd.argocd_deployment_readiness() # Wait for the ArgoCD server to be ready
+    return True
+
+def _restore(components: tuple = ()) -> bool:
+    """Restores the active cluster from its snapshot."""
+    cluster = Cluster(env=clusters.name())
+    if not cluster.restore(components=components):
+        return False
+    if "argocd" in cluster.components:
+        argocd.argocd_deployment_readiness() # Wait for the ArgoCD server to be ready
+    return True
+
+def _plan(components: tuple = ()) -> bool:
+    """Plans the update of the active cluster, and prints what it would change."""
+    _result = plan.make(cluster_components.selected(components))
+    plan.print_summary(_result)
+    return not any("error" in c for c in _result["components"].values())
+
+def _watch() -> bool:
+    """Watches the package in the current directory, and keeps its images in the active cluster up to date."""
+    try:
+        _config = pfoconfig.load(os.getcwd())
+    except FileNotFoundError:
+        spinner.fail("There is no pfo.json in this directory - run --watch in a package.")
+        return False
+    except PfoConfigError as e:
+        spinner.fail(str(e))
+        return False
+
+    if not _config.docker:
+        spinner.fail(f"{_config.name} has no docker images to watch.")
+        return False
+
+    try:
+        watch.Watcher(_config, os.getcwd(), clusters.name()).run()
+    except KeyboardInterrupt:
+        spinner.info("Stopped watching.")
+    return True
+
+def _update(components: tuple = ()) -> bool:
+    """Updates the active cluster to the latest manifests."""
+    cluster = Cluster(env=clusters.name())
+    cluster.update(components=components)
+    cluster.rollout_restart_deployment() # Rollout restart the deployment in the Kind cluster
+    return True
+
+def _for_each_cluster(names: tuple, fn: Any, action: str) -> bool:
+    """Runs fn for each named cluster, concurrently, and reports the clusters it failed for.
+
+    Returns:
+        bool: True if fn succeeded for every cluster.
+    """
+    _results = clusters.for_each(list(names), fn)
+    _failed = [n for n, r in _results.items() if r is False or isinstance(r, BaseException)]
+    for _name in _failed:
+        _reason = _results[_name]
+        spinner.fail(f"Failed to {action} Kind cluster {_name}" + (f": {_reason}" if isinstance(_reason, Exception) else "."))
+
+    return not _failed
+
+_MEMORY_UNITS: dict[str, int] = {
+    "B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+    "kB": 1000, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+}
+
+def _memory_bytes(usage: str) -> int|None:
+    """Parses a memory size printed by `docker stats` - i.e. 1.2GiB - into bytes."""
+    _match = re.fullmatch(r"\s*([\d.]+)\s*([A-Za-z]+)\s*", usage)
+    if not _match or _match.group(2) not in _MEMORY_UNITS:
+        return None
+
+    return int(float(_match.group(1)) * _MEMORY_UNITS[_match.group(2)])
+
+def _format_bytes(size: int) -> str:
+    """Formats a size in bytes - i.e. 1288490188 -> 1.2GiB."""
+    for _unit in ("TiB", "GiB", "MiB", "KiB"):
+        if size >= _MEMORY_UNITS[_unit]:
+            return f"{size / _MEMORY_UNITS[_unit]:.1f}{_unit}"
+
+    return f"{size}B"
+
 class Cluster():
     """Class for managing Kubernetes clusters (Kind)."""
     def __init__(self, env: str = "local") -> None:
         self.env: str = env
-        self.temp: str = "/tmp/.pfo"
-        self._k8s_dir: str = os.path.join(metadata.rootdir, "k8s") # Directory for the Kubernetes manifests
+        self.temp: str = clusters.tempdir(env, create=False) # Where this cluster's repos are cloned and its manifests built
+        self._k8s_dir: str = clusters.k8s_dir(env) # Directory for this cluster's Kubernetes manifests
         self.argocd_dir: str = os.path.join(metadata.rootdir, "argocd") # Directory for the ArgoCD manifests
         self._kind_config: str = os.path.join(self._k8s_dir, "kind-config.yaml")
-        self._repos_with_pfo: dict[str, Any] = {} # Dictionary to hold repos with pfo.json configs
+        self._kind_template: str = os.path.join(clusters.state_dir(env, create=False), "kind-config.template.yaml") # The template's Kind config
+        self._repos_with_pfo: dict[str, PfoConfig] = {} # Dictionary to hold repos with (validated) pfo.json configs
         self.epoch_tag: str = str(time.time()).split(".")[0] # Epoch timestamp for tagging resources
+        self._deployed: tuple[set[str], set[str]]|None = None # Deployed Helm releases and namespaces - see __is_deployed
+        self.components: list[str] = [] # The components this run installs or updates - see pfo.k8s.components
 
     @property
     def repo_owner(self) -> str|None:
         try:
-            res = subprocess.run(["gh", "repo", "view", "--json", "owner"], capture_output=True, text=True, check=True).stdout # This is a json string output
-        except subprocess.CalledProcessError as e:
+            res = runner.run(["gh", "repo", "view", "--json", "owner"]).stdout # This is a json string output
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to get repo owner: {e}")
+            return None
         
         return json.loads(res)["owner"]["login"] if res else None
     
-    def create(self) -> None:
-        """Creates the Kubernetes cluster."""
-        if self.__cluster_exists() is False: # Check if the Kind cluster already exists
-            self.__create_kind_cluster() # Create the Kind cluster
-        else:
-            spinner.info(f"Kind cluster {self.env} already exists. Use --update to update the cluster.")
-        
-        # Now we will create/update the base Kubernetes manifests for the project
+    def create(self, resume: bool = False, components: tuple = ()) -> None:
+        """Creates the Kubernetes cluster.
+
+        Every step is recorded as a checkpoint - with resume, the steps a previous create completed with the same inputs
+        are skipped, and the create continues from the first step that did not complete (see pfo.shared.checkpoints).
+        Only the selected components are installed - the ones named, else the ones enabled in k8s_config.json.
+        The host-side work (builds, manifest downloads, Helm charts) runs while the kind nodes boot - see pfo.k8s.pipeline.
+        """
+        # Create/update the base Kubernetes manifests for the project first - the Kind config is part of them
         # These manifests are coming from pyflowops/k8s-installs.git
         self.set_configs_and_manifests()
-        self.__install_k8s_prereqs() # Install the base Kubernetes prerequisites - ArgoCD Namespace, etc.
-
-        metallb.install() # Install MetalLB in the Kind cluster
-        spinner.start("Waiting for MetalLB to be installed and ready...")
-        time.sleep(30)  # Wait for MetalLB to be installed and ready
-        spinner.succeed("MetalLB ready for configuration!")
-        metallb.update() # Update MetalLB in the Kind cluster
-        traefik.install() # Install Traefik in the Kind cluster
-        time.sleep(3)
-        argocd.install() # Install ArgoCD in the Kind cluster
-        time.sleep(3)
-        argocd.project_readiness() # Wait for the ArgoCD server to be ready
+
+        _checkpoints = Checkpoints(self.env, resume=resume)
+        self.components = cluster_components.selected(components, recorded=False, cluster=self.env)
+        cluster_components.record(self.components, self.env)
+        _components = set(self.components) # Everything selected is installed on a new cluster
+
+        def _start_cluster() -> bool:
+            nonlocal _components
+            if self.__cluster_exists() is False: # Check if the Kind cluster already exists
+                if snapshot.exists(self.env) and snapshot.restore(self.env):
+                    # The snapshot is a provisioned cluster - only what changed in k8s_config.json since needs installing
+                    _components = snapshot.changed_components(self.env) & set(self.components)
+                    for _component in set(self.components) - _components:
+                        _checkpoints.record(_component, self.__step_inputs(_component))
+                else:
+                    self.__create_kind_cluster() # Create the Kind cluster
+            else:
+                spinner.info(f"Kind cluster {self.env} already exists. Use --update to update the cluster.")
+            return self.__cluster_exists()
+
+        _pipeline = pipeline.Pipeline(self._k8s_dir, self.components, self.env).start()
+        try:
+            _checkpoints.run("cluster", self.__step_inputs("cluster"), _start_cluster, verify=self.__cluster_exists)
+            self.__prefetch_images()
+            self.__provision(_components, _checkpoints)
+        finally:
+            _pipeline.stop()
+
+    def __prefetch_images(self) -> None:
+        """Prefetches the images of every manifest the create applies into the Kind nodes - see pfo.k8s.images."""
+        _index = images.index(pipeline.manifests(), self.env)
+        if not _index:
+            return
+
+        spinner.start(f"Prefetching {len(_index)} images into the Kind nodes...")
+        _results = images.prefetch(_index, self.env)
+        _failed = {i: r for i, r in _results.items() if r.startswith("failed")}
+        for _image, _result in _failed.items():
+            spinner.warn(f"{_image} could not be prefetched ({_result.removeprefix('failed: ')}) - its pods pull it themselves.")
+        spinner.succeed(f"{len(_results) - len(_failed)} of {len(_index)} images are in the Kind nodes.")
+
+    def __step_inputs(self, step: str) -> str:
+        """Returns the hash of what a provisioning step depends on - the rendered template, and the component's settings."""
+        return inputs_hash(step, templates.read_stamp(self._k8s_dir), snapshot.component_hashes().get(step))
+
+    def __is_deployed(self, release: str|None = None, namespace: str|None = None) -> bool:
+        """Check if the Helm release is deployed, and the namespace exists - both are read once, with one call each."""
+        if self._deployed is None:
+            try:
+                _releases = json.loads(runner.run(["helm", "list", "--all-namespaces", "--deployed", "-o", "json"]).stdout or "[]")
+                _namespaces = runner.run(["kubectl", "get", "namespaces", "-o", "jsonpath={.items[*].metadata.name}"]).stdout.split()
+                self._deployed = ({r["name"] for r in _releases}, set(_namespaces))
+            except (subprocess.SubprocessError, json.JSONDecodeError, TypeError, KeyError):
+                self._deployed = (set(), set()) # Nothing can be verified - the steps run again
+
+        return (release is None or release in self._deployed[0]) and (namespace is None or namespace in self._deployed[1])
+
+    def __exists(self, kind: str, name: str, namespace: str) -> bool:
+        """Check if the object exists in the cluster."""
+        try:
+            return runner.run(["kubectl", "get", kind, name, "-n", namespace, "-o", "name"], check=False).returncode == 0
+        except subprocess.SubprocessError:
+            return False
+
+    def __provision(self, components: set[str], checkpoints: Checkpoints|None = None) -> None:
+        """Installs the given components, then the base and overlay manifests.
+
+        With checkpoints, the steps that already completed are skipped - see create().
+        """
+        def _step(name: str, fn: Any, verify: Any) -> None:
+            if checkpoints is None:
+                fn()
+            else:
+                checkpoints.run(name, self.__step_inputs(name), fn, verify=verify)
+
+        def _metallb() -> bool:
+            if not metallb.install(): # Install MetalLB in the Kind cluster
+                return False
+            spinner.start("Waiting for MetalLB to be installed and ready...")
+            time.sleep(30)  # Wait for MetalLB to be installed and ready
+            spinner.succeed("MetalLB ready for configuration!")
+            return metallb.update(manifest=pipeline.built("metallb")) # Update MetalLB in the Kind cluster - built while the nodes booted, on create
+
+        def _traefik() -> bool:
+            _installed = traefik.install() # Install Traefik in the Kind cluster
+            time.sleep(3)
+            return _installed
+
+        def _argocd() -> bool:
+            if not argocd.install(): # Install ArgoCD in the Kind cluster
+                return False
+            time.sleep(3)
+            argocd.project_readiness() # Wait for the ArgoCD server to be ready
+            return True
+
+        # Every step returns True once it completed, and has a cheap check that what it installed is still there
+        _step("prereqs", self.__install_k8s_prereqs, verify=lambda: self.__is_deployed(namespace="argocd")) # Install the base Kubernetes prerequisites - ArgoCD Namespace, etc.
+
+        if "metallb" in components:
+            _step("metallb", _metallb, verify=lambda: self.__is_deployed(namespace="metallb-system"))
+        if "traefik" in components:
+            _step("traefik", _traefik, verify=lambda: self.__is_deployed(release="traefik"))
+        if "argocd" in components:
+            _step("argocd", _argocd, verify=lambda: self.__exists("deployment", "argocd-server", "argocd"))
         
-        # IMPORTANT - We need to ensure that we have TLS certificates for the ArgoCD installations
-        argocd.tls.install() # Install the TLS certificates for ArgoCD
+            # IMPORTANT - We need to ensure that we have TLS certificates for the ArgoCD installations
+            _step("argocd-tls", argocd.tls.install, verify=argocd.tls.is_installed) # Install the TLS certificates for ArgoCD
         # This installs the base and overlays manifestss
 
         # Let's install and deploy the monitoring stack
-        monitoring.prometheus.install()
-        monitoring.grafana.install() # Install Grafana in the Kind cluster
-        monitoring.loki.install() # Install Loki in the Kind cluster
+        if "prometheus" in components:
+            _step("prometheus", monitoring.prometheus.install, verify=lambda: self.__is_deployed(release="prometheus"))
+        if "grafana" in components:
+            _step("grafana", monitoring.grafana.install, verify=lambda: self.__is_deployed(release="grafana")) # Install Grafana in the Kind cluster
+        if "loki" in components:
+            _step("loki", monitoring.loki.install, verify=lambda: self.__is_deployed(release="loki-stack")) # Install Loki in the Kind cluster
 
-        self.kustomize_build() # Build the Kubernetes manifests using kustomize and apply them
+        _step("manifests", self.kustomize_build, verify=lambda: "argocd" not in components or self.__exists("secret", "argocd-server-tls", "argocd")) # Build the Kubernetes manifests using kustomize and apply them
 
-        argocd.restart_argocd() # Restart the ArgoCD server to pick up the new TLS configuration
-        time.sleep(5)
-        argocd.argocd_server_wait()  # Wait for the ArgoCD server to be ready
+        if "argocd" in components:
+            argocd.restart_argocd() # Restart the ArgoCD server to pick up the new TLS configuration
+            time.sleep(5)
+            argocd.argocd_server_wait()  # Wait for the ArgoCD server to be ready
 
         self.__set_context() # Set the Kind cluster context
+
+    def snapshot(self) -> bool:
+        """Saves a snapshot of the provisioned Kind cluster."""
+        if self.__cluster_exists() is False:
+            spinner.fail(f"Kind cluster {self.env} does not exist - create it first with --create.")
+            return False
+
+        return snapshot.save(self.env, cluster_components.selected(cluster=self.env)) # The components it was created with
+
+    def restore(self, components: tuple = ()) -> bool:
+        """Recreates the Kind cluster from its snapshot, and installs the selected components it lacks or that changed since."""
+        if not snapshot.exists(self.env):
+            spinner.fail(f"There is no snapshot for Kind cluster {self.env} - save one with --snapshot.")
+            return False
+
+        self.components = cluster_components.selected(components, cluster=self.env) # Read before the state is deleted
+        if self.__cluster_exists():
+            _error, _ = self.__delete_cluster() # The snapshot replaces the running cluster
+            if _error:
+                spinner.fail(f"Failed to delete Kind cluster {self.env}: {_error}")
+                return False
+
+        self.set_configs_and_manifests()
+        if not snapshot.restore(self.env):
+            return False
+
+        cluster_components.record(self.components, self.env)
+        _changed = snapshot.changed_components(self.env) & set(self.components)
+        if _changed:
+            spinner.info(f"Not in the snapshot or changed since: {', '.join(sorted(_changed))}")
+        self.__provision(_changed)
+        return True
     
     @staticmethod
-    def delete_all() -> None:
-        """Deletes the Kubernetes cluster."""
-        _cmd = ["kind get clusters | xargs -t -n1 kind delete cluster --name"]
+    def delete_all(max_workers: int = 4) -> None:
+        """Deletes all Kind clusters concurrently, and their local state."""
         try:
-            subprocess.run(_cmd, shell=True, check=True, capture_output=True, text=True)
-            spinner.succeed("All Kind clusters deleted successfully!")
-        except subprocess.CalledProcessError as e:
-            spinner.fail(f"Failed to delete Kind clusters: {e}")
+            _clusters = runner.run(["kind", "get", "clusters"]).stdout.split()
+        except subprocess.SubprocessError as e:
+            spinner.fail(f"Failed to list Kind clusters: {e}")
             return
 
-    @staticmethod
-    def delete() -> None:
-        """Deletes the Kubernetes cluster."""
-        _cmd = ["kind delete cluster --name local"]
+        if not _clusters:
+            spinner.info("No Kind clusters to delete.")
+            return
+
+        spinner.start(f"Deleting {len(_clusters)} Kind cluster(s): {', '.join(_clusters)}...")
+        _failed: list[str] = []
+        _pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pfo-delete")
+        _futures = {_pool.submit(Cluster(env=_name).__delete_cluster): _name for _name in _clusters}
+
         try:
-            subprocess.run(_cmd, shell=True, check=True, capture_output=True, text=True)
-            spinner.succeed("Kind cluster deleted successfully - local namespace!")
-        except subprocess.CalledProcessError as e:
-            spinner.fail(f"Failed to delete Kind clusters: {e}")
+            for _future in as_completed(_futures):
+                _name = _futures[_future]
+                _error, _seconds = _future.result()
+                if _error:
+                    _failed.append(_name)
+                    spinner.fail(f"Kind cluster {_name} could not be deleted ({_seconds:.1f}s): {_error}")
+                else:
+                    spinner.succeed(f"Kind cluster {_name} deleted ({_seconds:.1f}s)")
+        except KeyboardInterrupt:
+            # Deletions already running are finished by kind, the queued ones are dropped
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _kept = [_futures[f] for f in _futures if f.cancelled()]
+            spinner.warn(f"Cancelled - clusters not deleted: {', '.join(_kept) if _kept else 'none'}")
+            return
+
+        _pool.shutdown()
+        if _failed:
+            spinner.fail(f"Failed to delete Kind clusters: {', '.join(_failed)}")
             return
+
+        argocd.tls.clean() # The ArgoCD TLS certificate and key belong to the deleted cluster(s)
+        spinner.succeed("All Kind clusters deleted successfully!")
+
+    def delete(self) -> bool:
+        """Deletes the Kubernetes cluster, and its local state."""
+        _error, _seconds = self.__delete_cluster()
+        if _error:
+            spinner.fail(f"Failed to delete Kind cluster {self.env}: {_error}")
+            return False
+
+        self.__clean_tls()
+        spinner.succeed(f"Kind cluster {self.env} deleted successfully ({_seconds:.1f}s)!")
+        return True
+
+    def __clean_tls(self) -> None:
+        """Removes the ArgoCD TLS certificate and key, once no other cluster uses them - every cluster shares them.
+
+        Snapshots keep their own copy, and put it back when they are restored.
+        """
+        try:
+            # The user's environment - the deleted cluster's kubeconfig is gone
+            _remaining = set(runner.run(["kind", "get", "clusters"], env=dict(os.environ)).stdout.split()) | set(clusters.known())
+        except (subprocess.SubprocessError, OSError):
+            return # Which clusters are left cannot be told - the certificate stays
+
+        if _remaining - {self.env}:
+            spinner.info(f"The ArgoCD TLS certificate is kept for {', '.join(sorted(_remaining - {self.env}))}.")
+            return
+
+        argocd.tls.clean()
+
+    def __delete_cluster(self) -> tuple[str|None, float]:
+        """Deletes this Kind cluster and removes its temp directory and rendered manifests.
+
+        Returns:
+            tuple: The error message (None on success), and the seconds it took.
+        """
+        _start = time.perf_counter()
+        try:
+            runner.run(["kind", "delete", "cluster", "--name", self.env], timeout=runner.INSTALL_TIMEOUT)
+        except subprocess.CalledProcessError as e:
+            return (e.stderr or str(e)).strip(), time.perf_counter() - _start
+        except subprocess.SubprocessError as e:
+            return str(e), time.perf_counter() - _start
+
+        # kind removes the cluster's kubeconfig context itself - the rest of the local state is ours
+        for _dir in (clusters.tempdir(self.env, create=False), self._k8s_dir, clusters.state_dir(self.env, create=False)):
+            shutil.rmtree(_dir, ignore_errors=True)
+
+        return None, time.perf_counter() - _start
     
     @staticmethod
-    def cluster_info() -> None:
+    def memory_footprint(cluster: str|None = None) -> dict[str, int]:
+        """Returns the memory each node container of the Kind cluster uses, in bytes - empty if it cannot be read."""
+        _name = cluster or clusters.name()
+        try:
+            _nodes = runner.run(["kind", "get", "nodes", "--name", _name]).stdout.split()
+            if not _nodes:
+                return {}
+            _stats = runner.run(["docker", "stats", "--no-stream", "--format", "{{.Name}}\t{{.MemUsage}}", *_nodes]).stdout
+        except subprocess.SubprocessError:
+            return {}
+
+        _footprint = {}
+        for _line in _stats.splitlines():
+            _node, _, _usage = _line.partition("\t")
+            _bytes = _memory_bytes(_usage.split("/")[0])
+            if _bytes is not None:
+                _footprint[_node.strip()] = _bytes
+
+        return _footprint
+
+    @staticmethod
+    def cluster_info(components: tuple = ()) -> None:
         info_spinner = Halo(text_color="yellow", spinner="dots")
         try:
-            res = subprocess.run(["kubectl", "cluster-info", "--context", f"kind-pyops"], check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
+            res = runner.run(["kubectl", "cluster-info", "--context", clusters.context()])
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to retrieve Kind cluster info: {e}")
             return
 
         if res.returncode != 0:
             spinner.fail(f"Failed to retrieve Kind cluster info: {res.stderr}")
             return
+        _offset = clusters.port_offset() # Clusters other than the default one are published on shifted host ports
         print("\n")
-        spinner.info("Kubernetes cluster information:")
-        spinner.info("**" * 20)
-        info_spinner.info("ArgoCD URL: https://argocd.pyflowops.local:30443")
-        info_spinner.info("ArgoCD Username: admin")
-        info_spinner.info(f"ArgoCD Password: {argocd.admin_password()}")
-        spinner.info("**" * 20)
-        print("\n")
+        spinner.info(f"Kubernetes cluster information ({clusters.name()}):")
         spinner.info("**" * 20)
-        info_spinner.info("Prometheus URL: http://prometheus.pyflowops.local:30080")
-        info_spinner.info("Grafana URL: http://grafana.pyflowops.local:30080")
-        info_spinner.info("Grafana Username: admin")
-        info_spinner.info(f"Grafana Password: {monitoring.grafana_admin_password()}")
-        spinner.info("**" * 20)
-        print("\n")
+        _footprint = Cluster.memory_footprint()
+        if _footprint:
+            _nodes = ", ".join(f"{n} {_format_bytes(b)}" for n, b in sorted(_footprint.items()))
+            info_spinner.info(f"Memory Footprint: {_format_bytes(sum(_footprint.values()))} ({_nodes})")
+            spinner.info("**" * 20)
+        _components = cluster_components.selected(components) # Only what the cluster has
+        if "argocd" in _components:
+            info_spinner.info(f"ArgoCD URL: https://argocd.pyflowops.local:{30443 + _offset}")
+            info_spinner.info("ArgoCD Username: admin")
+            info_spinner.info(f"ArgoCD Password: {argocd.admin_password()}")
+            spinner.info("**" * 20)
+            print("\n")
+        if "prometheus" in _components or "grafana" in _components:
+            spinner.info("**" * 20)
+            if "prometheus" in _components:
+                info_spinner.info(f"Prometheus URL: http://prometheus.pyflowops.local:{30080 + _offset}")
+            info_spinner.info(f"Monitoring Profile: {monitoring.profiles.name()}")
+            if "grafana" in _components:
+                info_spinner.info(f"Grafana URL: http://grafana.pyflowops.local:{30080 + _offset}")
+                info_spinner.info("Grafana Username: admin")
+                info_spinner.info(f"Grafana Password: {monitoring.grafana_admin_password()}")
+            spinner.info("**" * 20)
+            print("\n")
         ensure_hosts_entries()  # Ensure that the host entries are present in the /etc/hosts file
         print("\n")
 
-    def update(self) -> None:
-        """Updates the Kubernetes cluster."""
+    def update(self, components: tuple = ()) -> None:
+        """Updates the Kubernetes cluster.
+
+        Only the selected components are updated - the ones named, else the ones the cluster was created with.
+        A plan made moments ago (pfo k8s --plan) is reused - the components it found unchanged are skipped, and the
+        overlays it rendered are applied without being built again.
+        """
+        _plan = plan.load()
+        self.components = cluster_components.selected(components, cluster=self.env)
+
+        def _planned(component: str) -> dict|None:
+            _entry = plan.planned(_plan, component)
+            if plan.is_unchanged(_entry):
+                spinner.info(f"{component} is up to date (planned) - skipping.")
+            return _entry
+
         # We need to install the base prerequisites for the Kubernetes cluster, and other applications like Traefik and ArgoCD, etc.
-        metallb.update() # Update MetalLB in the Kind cluster
-        traefik.update()
-        argocd.update()
+        if "metallb" in self.components and not plan.is_unchanged(_metallb := _planned("metallb")):
+            metallb.update(manifest=_metallb["manifest"] if _metallb else None) # Update MetalLB in the Kind cluster
+        if "traefik" in self.components and not plan.is_unchanged(_planned("traefik")):
+            traefik.update()
+        if "argocd" in self.components and not plan.is_unchanged(_argocd := _planned("argocd")):
+            argocd.update(manifest=_argocd["manifest"] if _argocd else None)
         #monitoring.prometheus.update() # Update Prometheus in the Kind cluster
-        monitoring.grafana.update() # Update Grafana in the Kind cluster
+        if "grafana" in self.components and not plan.is_unchanged(_planned("grafana")):
+            monitoring.grafana.update() # Update Grafana in the Kind cluster
         #monitoring.loki.update() # Update Loki in the Kind cluster
+        plan.clear() # The cluster changed - the plan is out of date
 
         # IMPORTANT - We need to ensure that we have TLS certificates for the ArgoCD installations
         #argocd.tls.install() # Install the TLS certificates for ArgoCD
 
         # Now we will add the ArgoCD SSH private key to the Kubernetes secrets
         # If the secret is a Repository Secret, we will add the private key to the secretsw
-        argocd.add_ssh_key() # Add the private key to the secrets
-        argocd.restart_argocd() # Restart the ArgoCD server to pick up the new TLS configuration
-        time.sleep(5)  # Wait for a few seconds to ensure the ArgoCD server is restarted
-        argocd.argocd_server_wait()  # Wait for the ArgoCD server to be ready
+        if "argocd" in self.components:
+            argocd.add_ssh_key() # Add the private key to the secrets
+            argocd.restart_argocd() # Restart the ArgoCD server to pick up the new TLS configuration
+            time.sleep(5)  # Wait for a few seconds to ensure the ArgoCD server is restarted
+            argocd.argocd_server_wait()  # Wait for the ArgoCD server to be ready
         spinner.succeed("Kind cluster updated successfully!")
 
     ### Manifests creation/update methods
@@ -273,43 +720,90 @@ class Cluster():
         """Gets the Kubernetes config and manifests for the project.
         
         This function gets the data from the k8s_installs git repository in PyFlowOps, which contains the base Kubernetes manifests and configurations.
-        It will clone the repository to a temporary directory and create the necessary Kubernetes namespace for the project.
+        The template comes from the local template cache (see pfo.shared.templates), and is only rendered again when a
+        new template commit arrived or the context changed - local edits to the manifests survive otherwise.
+        The template is rendered into the cluster's state directory, and moved to ~/.pfo/k8s/<cluster> - the manifests of
+        other clusters are left alone. The Kind config is generated from the template's one - see __write_kind_config.
         """
         k8s_remote = "https://github.com/pyflowops/k8s-installs.git"
+        _context = {"namespace": self.env}
 
-        if os.path.exists(os.path.join(metadata.rootdir, "k8s")):
-            shutil.rmtree(os.path.join(metadata.rootdir, "k8s"))  # Remove the existing k8s directory
+        try:
+            _template, _sha = templates.checkout(k8s_remote, "main")
+        except (subprocess.SubprocessError, OSError) as e:
+            spinner.fail(f"Failed to get the Kubernetes manifests template: {e}")
+            return
+
+        _stamp = templates.stamp(_sha, {**_context, "port_offset": clusters.port_offset(self.env)})
+        if templates.is_current(self._k8s_dir, _stamp) and os.path.isfile(self._kind_template):
+            spinner.info(f"Kubernetes manifests for {self.env} are up to date (k8s-installs@{_sha[:7]}).")
+            self.__write_kind_config()
+            return
+
+        _render_dir = os.path.join(clusters.state_dir(self.env), "render")
+        shutil.rmtree(_render_dir, ignore_errors=True)
 
         try:
             cookiecutter(
-                k8s_remote,
-                checkout="main",
+                _template,
                 directory="kind-cluster",
                 no_input=True,
-                extra_context={
-                    "namespace": self.env
-                },
-                output_dir=os.path.join(metadata.rootdir),
+                extra_context=_context,
+                output_dir=_render_dir,
             )
         except Exception as e:
             spinner.fail(f"Failed to create Kubernetes manifests: {e}")
             return
 
-    def run_command(self, cmd: list) -> None:
+        shutil.rmtree(self._k8s_dir, ignore_errors=True) # Remove this cluster's existing manifests
+        shutil.move(os.path.join(_render_dir, "k8s", self.env), self._k8s_dir)
+        shutil.move(os.path.join(_render_dir, "k8s", "kind-config.yaml"), self._kind_template)
+        shutil.rmtree(_render_dir, ignore_errors=True)
+        templates.write_stamp(self._k8s_dir, _stamp)
+        self.__write_kind_config()
+
+    def __write_kind_config(self) -> None:
+        """Generates kind-config.yaml from the template's Kind config, sized to the machine (see pfo.k8s.kindconfig).
+
+        It has its own stamp - when only the machine or the kind settings changed, only kind-config.yaml is written
+        again, and the rendered manifests (and their local edits) are left alone. The host ports of the Kind config are
+        shifted by the cluster's port offset.
+        """
+        with open(self._kind_template, "r") as f:
+            _template = f.read()
+        _kind = kindconfig.inputs()
+        _stamp = {"template": hashlib.sha256(_template.encode("utf-8")).hexdigest(), "port_offset": clusters.port_offset(self.env), **_kind}
+        _stamp_file = os.path.join(clusters.state_dir(self.env), "kind-config.json")
+        if os.path.isfile(self._kind_config) and os.path.isfile(_stamp_file):
+            with open(_stamp_file, "r") as f:
+                if json.load(f) == json.loads(json.dumps(_stamp)):
+                    return
+
+        _kind_config = kindconfig.generate(yaml.safe_load(_template), _kind["settings"], _kind["resources"])
+        with open(self._kind_config, "w") as f:
+            yaml.dump(self.__offset_host_ports(_kind_config, _stamp["port_offset"]), f, default_flow_style=False)
+        atomic_write(_stamp_file, json.dumps(_stamp, indent=2, sort_keys=True))
+
+    @staticmethod
+    def __offset_host_ports(kind_config: dict, offset: int) -> dict:
+        """Shifts the hostPort of every extraPortMapping in the Kind config, so several clusters can run side by side."""
+        if offset:
+            for _node in kind_config.get("nodes", []):
+                for _mapping in _node.get("extraPortMappings", []):
+                    if "hostPort" in _mapping:
+                        _mapping["hostPort"] += offset
+
+        return kind_config
+
+    def run_command(self, cmd: list, timeout: float = runner.DEFAULT_TIMEOUT) -> None:
         try:
-            res = subprocess.run(
-                cmd,
-                check=True,
-                shell=True,
-                capture_output=True,
-                text=True
-            )
+            res = runner.run(cmd, timeout=timeout, stream=True, spinner=spinner)
             if res.returncode == 0:
                 pass
             else:
                 spinner.fail(f"Command {cmd} failed!")
                 spinner.fail(f"ERROR -  {res.stderr}")
-        except subprocess.CalledProcessError as e:
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Command {cmd} failed!")
             spinner.fail(f"ERROR -  {e}")
 
@@ -325,72 +819,86 @@ class Cluster():
             time.sleep(2)  # Wait for a few seconds before rolling out the deployment
             spinner.start(f"Rolling out deployment {dep_name} in the {self.env} namespace...\n\n")
             try:
-                subprocess.run(_cmd, check=True, capture_output=True, text=True)
+                runner.run(_cmd, timeout=runner.APPLY_TIMEOUT)
                 spinner.succeed(f"Deployment {dep_name} rolled out successfully!")
-            except subprocess.CalledProcessError as e:
+            except subprocess.SubprocessError as e:
                 spinner.fail(f"Failed to rollout deployment {dep_name}: {e}")
 
-    def kustomize_build(self) -> None:
+    def kustomize_build(self) -> bool:
+        """Builds and applies the base and overlays manifests - returns True if both were applied."""
         # Let's install the base manifests using kustomize and kubectl
-        self.__kustomize_base_build()  # Build the base manifests using kustomize
+        _applied = self.__kustomize_base_build()  # Build the base manifests using kustomize
         time.sleep(10)  # Wait for a few seconds before applying the overlays
-        self.__kustomize_overlays_build()  # Build the overlays manifests using kustomize
+        return self.__kustomize_overlays_build() and _applied  # Build the overlays manifests using kustomize
 
-    def __kustomize_base_build(self) -> None:
-        """Builds the base Kubernetes manifests using kustomize and applies them to the cluster."""
-        __base = os.path.join(metadata.rootdir, "k8s", self.env, "base")
+    def __kustomize_base_build(self) -> bool:
+        """Builds the base Kubernetes manifests using kustomize and applies them to the cluster - returns True if they were applied."""
+        __base = os.path.join(self._k8s_dir, "base")
         if not os.path.exists(__base):
             spinner.fail(f"Base directory {__base} does not exist. Cannot build base manifests.")
-            return
+            return False
         
-        try:
-            _res = subprocess.run(["kustomize", "build", __base], check=True, capture_output=True, text=True)
-            with open(os.path.join(_tempdir, "base-config.yaml"), "w+") as f:
-                f.write(_res.stdout)
-            spinner.succeed("Base configuration file created successfully.")
-        except subprocess.CalledProcessError as e:
-            spinner.fail(f"Failed to update Base configuration: {e}")
-            return
+        _config = pipeline.built("base") # Built while the nodes booted, on create
+        if _config is None:
+            _config = os.path.join(clusters.tempdir(self.env), "base-config.yaml")
+            try:
+                _res = runner.run(["kustomize", "build", __base], timeout=runner.BUILD_TIMEOUT)
+                with open(_config, "w+") as f:
+                    f.write(_res.stdout)
+                spinner.succeed("Base configuration file created successfully.")
+            except subprocess.SubprocessError as e:
+                spinner.fail(f"Failed to update Base configuration: {e}")
+                return False
 
         time.sleep(.5) # Wait for a short time before applying the base configuration
         try:
-            _res = subprocess.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "base-config.yaml")], check=True, capture_output=True, text=True)
+            _res = runner.run(["kubectl", "apply", "-f", _config], timeout=runner.APPLY_TIMEOUT)
             if _res.returncode != 0:
                 spinner.fail(f"Failed to apply Base configuration: {_res.stderr}")
-                return
-        except subprocess.CalledProcessError as e:
+                return False
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to apply Base configuration: {e}")
-            return
+            return False
+
+        return True
     
-    def __kustomize_overlays_build(self) -> None:
-        """Builds the overlays Kubernetes manifests using kustomize and applies them to the cluster."""
-        __overlays = os.path.join(metadata.rootdir, "k8s", self.env, "overlays")
+    def __kustomize_overlays_build(self) -> bool:
+        """Builds the overlays Kubernetes manifests using kustomize and applies them to the cluster - returns True if they were applied."""
+        __overlays = os.path.join(self._k8s_dir, "overlays")
         if not os.path.exists(__overlays):
             spinner.fail(f"Overlays directory {__overlays} does not exist. Cannot build overlays manifests.")
-            return
+            return False
 
-        try:
-            _res = subprocess.run(["kustomize", "build", __overlays], check=True, capture_output=True, text=True)
-            with open(os.path.join(_tempdir, "overlays-config.yaml"), "w+") as f:
-                f.write(_res.stdout)
-            spinner.succeed("Overlays configuration file created successfully.")
-        except subprocess.CalledProcessError as e:
-            spinner.fail(f"Failed to update Overlays configuration: {e}")
-            return
+        _config = pipeline.built("overlays") # Built while the nodes booted, on create
+        if _config is None:
+            _config = os.path.join(clusters.tempdir(self.env), "overlays-config.yaml")
+            # The overlays of the components that are not installed are left out
+            _components = self.components or cluster_components.selected(cluster=self.env)
+            __overlays = cluster_components.overlays(__overlays, _components, os.path.join(self._k8s_dir, ".overlays-selected"))
+            try:
+                _res = runner.run(["kustomize", "build", __overlays], timeout=runner.BUILD_TIMEOUT)
+                with open(_config, "w+") as f:
+                    f.write(_res.stdout)
+                spinner.succeed("Overlays configuration file created successfully.")
+            except subprocess.SubprocessError as e:
+                spinner.fail(f"Failed to update Overlays configuration: {e}")
+                return False
         time.sleep(.5) # Wait for a short time before applying the overlays configuration
         try:
-            _res = subprocess.run(["kubectl", "apply", "-f", os.path.join(_tempdir, "overlays-config.yaml")], check=True, capture_output=True, text=True)
+            _res = runner.run(["kubectl", "apply", "-f", _config], timeout=runner.APPLY_TIMEOUT)
             if _res.returncode != 0:
                 spinner.fail(f"Failed to apply Overlays configuration: {_res.stderr}")
-                return
-        except subprocess.CalledProcessError as e:
+                return False
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to apply Overlays configuration: {e}")
-            return
+            return False
+
+        return True
 
     def __cluster_exists(self) -> bool:
         """Checks if the Kubernetes cluster is running."""
         try:
-            res = subprocess.run(["kind", "get", "clusters"], capture_output=True, text=True, check=True)
+            res = runner.run(["kind", "get", "clusters"])
             if self.env in res.stdout:
                 return True
         except Exception as e:
@@ -404,8 +912,8 @@ class Cluster():
             spinner.fail(f"Kind config file not found at {self._kind_config}. Please ensure it exists.")
             return 
         try:
-            res = subprocess.run(["kind", "create", "cluster", "--config", self._kind_config, "--name", self.env], check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
+            res = runner.run(["kind", "create", "cluster", "--config", self._kind_config, "--name", self.env], timeout=runner.INSTALL_TIMEOUT, stream=True, spinner=spinner)
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to create Kind cluster: {e}")
             return
         
@@ -414,30 +922,33 @@ class Cluster():
         else:
             spinner.fail(f"Failed to create Kind cluster {self.env}.")
         
-    def __install_k8s_prereqs(self) -> None:
+    def __install_k8s_prereqs(self) -> bool:
+        """Builds the prerequisite manifests (the ArgoCD namespace, ...) and applies them - returns True if they were applied."""
         # Let's install the base manifests using kustomize and kubectl
-        __prereqs = os.path.join(metadata.rootdir, "k8s", self.env, "prereqs")
+        __prereqs = os.path.join(self._k8s_dir, "prereqs")
 
         _c1 = ["kustomize", "build", __prereqs]  # Build the base manifests using kustomize
-        _temp_dir = os.path.join("/tmp", self.env)
-        if not os.path.exists(_temp_dir):
-            os.makedirs(_temp_dir, exist_ok=True)
+        _temp_dir = clusters.tempdir(self.env)
+        _built = pipeline.built("prereqs") # Built while the nodes booted, on create
+        _config = _built or os.path.join(_temp_dir, "prereqs-config.yaml")
 
-        try:
-            _resp = subprocess.run(_c1, check=True, capture_output=True, text=True)  # Run the command to build the base manifests
-            with open(os.path.join(_temp_dir, "prereqs-config.yaml"), "w+") as f:
-                f.write(_resp.stdout)
-        except subprocess.CalledProcessError as e:
-            spinner.fail(f"Failed to build base Kubernetes prereqs: {e}")
-            return
+        if not _built:
+            try:
+                _resp = runner.run(_c1, timeout=runner.BUILD_TIMEOUT)  # Run the command to build the base manifests
+                with open(_config, "w+") as f:
+                    f.write(_resp.stdout)
+            except subprocess.SubprocessError as e:
+                spinner.fail(f"Failed to build base Kubernetes prereqs: {e}")
+                return False
             
         try:
-            subprocess.run(["kubectl", "apply", "-f", os.path.join(_temp_dir, "prereqs-config.yaml")], check=True, capture_output=True, text=True)  # Apply the base manifests to the Kind cluster
-        except subprocess.CalledProcessError as e:
+            runner.run(["kubectl", "apply", "-f", _config], timeout=runner.APPLY_TIMEOUT)  # Apply the base manifests to the Kind cluster
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to apply base Kubernetes prereqs: {e}")
-            return
+            return False
         
         spinner.succeed("Base Kubernetes prerequisites installed successfully!")
+        return True
 
     def __load_image(self, image_name: str, nodes: str) -> None:
         """Loads a Docker image from the local filesystem to the kind cluster.
@@ -448,8 +959,8 @@ class Cluster():
         """
         # ONLY *:local images can be loaded into Kind clusters, so we will use the local tag
         if image_name.endswith(":local"):
-            _cmd = [f"kind load docker-image {image_name} --name {self.env} --nodes {nodes} -v 5"]
-            self.run_command(cmd=_cmd) # Run the command to load the Docker image
+            _cmd = ["kind", "load", "docker-image", image_name, "--name", self.env, "--nodes", nodes, "-v", "5"]
+            self.run_command(cmd=_cmd, timeout=runner.INSTALL_TIMEOUT) # Run the command to load the Docker image
             return
         
         spinner.info(f"Only images with the ':local' tag can be loaded into Kind clusters. - disregarding tag: {image_name.split(':')[-1]}")
@@ -475,11 +986,12 @@ class Cluster():
         """Gets the deployments in the Kubernetes cluster."""
         _cmd = ["kubectl", "get", "deployments", "--namespace", self.env, "-o", "json"]
         try:
-            res = subprocess.run(_cmd, check=True, capture_output=True, text=True)
+            res = runner.run(_cmd)
             _alldata = json.loads(res.stdout)
             _deps = [i["metadata"]["name"] for i in _alldata["items"]]
-        except subprocess.CalledProcessError as e:
+        except subprocess.SubprocessError as e:
             spinner.fail(f"Failed to get deployments: {e}")
+            return None
         
         return _deps if _deps else None
 
@@ -498,79 +1010,113 @@ class Cluster():
         except Exception as e:
             spinner.fail(f"Error: {e}")
 
-    def __build_and_load_docker_images(self, pfo_config: Any) -> None:
-        # Now we need to get the docker image from the repo - it should now be cloned to /tmp/.pfo/<repo>
+    def __change_indexes(self, pfo_config: PfoConfig) -> tuple[ChangeIndex|None, ChangeIndex|None]:
+        """Returns the change indexes of the cloned repo - for its builds (shared by all clusters) and its loads into this cluster.
+
+        The repo is cloned again for every build, so the recorded hashes are kept outside of it.
+        """
+        try:
+            _index = ChangeIndex(path=os.path.join(self.temp, pfo_config.name)).index
+        except subprocess.SubprocessError as e:
+            spinner.warn(f"Change detection is not available, building every image: {e}")
+            return None, None
+
+        _builds = os.path.join(os.path.expanduser("~"), ".pfo", "changes", f"{pfo_config.name}.json")
+        _loads = os.path.join(clusters.state_dir(self.env), "changes", f"{pfo_config.name}.json")
+        return ChangeIndex(_index, state_file=_builds), ChangeIndex(_index, state_file=_loads)
+
+    def __build_and_load_docker_images(self, pfo_config: PfoConfig) -> None:
+        # Now we need to get the docker image from the repo - it should now be cloned to the cluster's temp directory
         # We need to get the artifact (docker image) for this project and add it to the manifest(s)
         spinner.start("Building Docker images and loading them into the Kind cluster...\n\n")
         client = self.__docker_connection()
-        _version = pfo_config.get("version", "latest")
+        _version = pfo_config.version
 
         if not client:
             spinner.fail("Docker client connection failed. Cannot build images.")
             return
-        
+
+        # Packages whose files did not change since their images were last built (or loaded) are skipped
+        _builds, _loads = self.__change_indexes(pfo_config)
+        _package = os.path.normpath(pfo_config.package_path)
+        _tracked = _builds is not None and _package in _builds.packages
+        _unchanged_build = _tracked and _package not in _builds.changed_since_record("build")
+        _unchanged_load = _tracked and _package not in _loads.changed_since_record("load")
+        _built, _failed = False, False
+        _contexts: dict[str, str] = {} # context hash -> the image built from it
+
         # Build phase
-        for _, _img_data in pfo_config["docker"].items():
+        for _, _img_data in pfo_config.docker.items():
             try:
+                if _unchanged_build and self.__image_exists(client, f"{_img_data['image']}:local"):
+                    spinner.info(f"Docker image {_img_data['image']}:local is up to date - no changes since it was built.")
+                    continue
+
+                _built = True
                 # In order to build the Documentation site for your PyFlowOps project, there is some preliminary code that needs to be run
-                if pfo_config.get("name", None) == "documentation":
-                    _pip_cmd = [metadata.python_pip, "install", "-r", os.path.join(self.temp, pfo_config["name"], "requirements.txt")]
-                    _pipresp = subprocess.run(
-                        _pip_cmd,
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
+                if pfo_config.name == "documentation":
+                    _pip_cmd = [metadata.python_pip, "install", "-r", os.path.join(self.temp, pfo_config.name, "requirements.txt")]
+                    _pipresp = runner.run(_pip_cmd, timeout=runner.BUILD_TIMEOUT, stream=True, spinner=spinner)
                     if _pipresp.returncode != 0:
-                        spinner.fail(f"Error installing requirements: {_resp.stderr}")
+                        spinner.fail(f"Error installing requirements: {_pipresp.stderr}")
                         return
                     
-                    _pycmd = [metadata.python_executable, os.path.join(self.temp, pfo_config["name"], "scripts", "build-docs-src.py")]
-                    _resp = subprocess.run(
-                        _pycmd,
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
+                    _pycmd = [metadata.python_executable, os.path.join(self.temp, pfo_config.name, "scripts", "build-docs-src.py")]
+                    _resp = runner.run(_pycmd, timeout=runner.BUILD_TIMEOUT, stream=True, spinner=spinner)
                 
                     if _resp.returncode != 0:
                         spinner.fail(f"Error building documentation source: {_resp.stderr}")
                         return
                     
                     # For the documentation site, we need to build the release notes to the site
-                    _rncmd = [metadata.python_executable, os.path.join(self.temp, pfo_config["name"], "docs", "scripts", "release-notes.py")]
-                    _rnresp = subprocess.run(
-                        _rncmd,
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
-
-                    #_rndata = open(os.path.join(self.temp, pfo_config["name"], "docs", "src", "about", "release-notes.md"), "r").read()
+                    _rncmd = [metadata.python_executable, os.path.join(self.temp, pfo_config.name, "docs", "scripts", "release-notes.py")]
+                    _rnresp = runner.run(_rncmd, timeout=runner.BUILD_TIMEOUT, stream=True, spinner=spinner)
+
+                    #_rndata = open(os.path.join(self.temp, pfo_config.name, "docs", "src", "about", "release-notes.md"), "r").read()
                     if _rnresp.returncode != 0:
                         spinner.fail(f"Error building release notes: {_rnresp.stderr}")
                         return
                 
-                image, build_logs = client.images.build(
-                    path=os.path.join(self.temp, pfo_config["name"]),
-                    dockerfile=str(os.path.join(self.temp, pfo_config["name"], _img_data["repo_path"], _img_data["dockerfile"])),
-                    tag=f"{_img_data['image']}:local",
-                    rm=True,
-                    pull=True,
-                    nocache=True,
-                    buildargs={"CACHE_BREAKER": str(time.time())}
-                )
+                # Only the files the Dockerfile needs are sent, and the context's hash is the image's cache key
+                _context = buildcontext.Context(os.path.join(self.temp, pfo_config.name), os.path.join(_img_data["repo_path"], _img_data["dockerfile"] or "Dockerfile"))
+                _message = "built successfully!"
+                if _context.digest in _contexts: # The same Dockerfile and files as an image built before - the same image
+                    client.images.get(_contexts[_context.digest]).tag(_img_data["image"], tag="local")
+                    _message = f"is {_contexts[_context.digest]} - the same build context."
+                elif self.__image_context(client, f"{_img_data['image']}:local") == _context.digest:
+                    _message = "is up to date - its build context did not change."
+                else:
+                    with _context.archive() as _archive:
+                        image, build_logs = client.images.build(
+                            fileobj=_archive,
+                            custom_context=True,
+                            dockerfile=_context.dockerfile,
+                            tag=f"{_img_data['image']}:local",
+                            rm=True,
+                            pull=True,
+                            labels={CONTEXT_LABEL: _context.digest},
+                            buildargs={"CACHE_BREAKER": _context.digest}
+                        )
+                _contexts[_context.digest] = f"{_img_data['image']}:local"
                 _img = client.images.get(f"{_img_data['image']}:local")
                 _img.tag(f"{_img_data['image']}", tag=_version) # Tag the image with the version
 
-                spinner.succeed(f"Docker image {_img_data['image']}:local built successfully!")
+                spinner.succeed(f"Docker image {_img_data['image']}:local {_message}")
             except Exception as e:
-                spinner.fail(f"Error: {e} - The Docker image {pfo_config["name"]}:local could not be built.")
+                spinner.fail(f"Error: {e} - The Docker image {pfo_config.name}:local could not be built.")
+                _failed = True
+        if _tracked and _built and not _failed:
+            _builds.record("build", [_package])
 
         # Load phase
-        for _, _img_data in pfo_config["docker"].items():
+        if _unchanged_load and not _built:
+            spinner.info(f"The Docker images of {pfo_config.name} are already loaded into the Kind cluster.")
+            return
+
+        _loaded = True
+        for _, _img_data in pfo_config.docker.items():
             try:
-                _wkrs = subprocess.run(["kind", "get", "nodes", "--name", self.env], capture_output=True, text=True, check=True)
+                _wkrs = runner.run(["kind", "get", "nodes", "--name", self.env])
                 _wknodes = ','.join([i for i in _wkrs.stdout.strip().split("\n") if "control-plane" not in i]) # Get the list of worker nodes, convert to a comma-separated string
 
                 if _wkrs.returncode != 0:
@@ -581,13 +1127,38 @@ class Cluster():
                 spinner.succeed(f"Docker image {_img_data['image']}:local loaded successfully!")
             except Exception as e:
                 spinner.fail(f"Error: {e}")
+                _loaded = False
+        if _tracked and _loaded and not _failed:
+            _loads.record("load", [_package])
+
+    def __image_context(self, client: docker.DockerClient, image_name: str) -> str|None:
+        """Returns the hash of the build context the image was built from - None if it does not exist, or has none."""
+        try:
+            return ((client.images.get(image_name).attrs.get("Config") or {}).get("Labels") or {}).get(CONTEXT_LABEL)
+        except docker.errors.ImageNotFound:
+            return None
+
+    def __image_exists(self, client: docker.DockerClient, image_name: str) -> bool:
+        """Check if the Docker image is in the local Docker daemon."""
+        try:
+            client.images.get(image_name)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
 
     def __set_context(self) -> None:
-        res = subprocess.run(["kubectl", "config", "set-context", "--current", f"--namespace={self.env}"], check=True, capture_output=True, text=True)
-        if res.returncode == 0:
-            spinner.succeed("Kind cluster context set successfully!")
-        else:
-            spinner.fail("Failed to set Kind cluster context.")
+        try:
+            runner.run(["kubectl", "config", "set-context", "--current", f"--namespace={self.env}"])
+            if clusters.is_active():
+                # The cluster was provisioned with its own kubeconfig - make it reachable from the user's kubeconfig too
+                _user_env = dict(os.environ)
+                runner.run(["kind", "export", "kubeconfig", "--name", self.env], env=_user_env)
+                runner.run(["kubectl", "config", "set-context", clusters.context(self.env), f"--namespace={self.env}"], env=_user_env)
+        except subprocess.SubprocessError as e:
+            spinner.fail(f"Failed to set Kind cluster context: {e}")
+            return
+
+        spinner.succeed("Kind cluster context set successfully!")
     
     def __docker_connection(self) -> docker.DockerClient|None:
         """Returns a Docker client connection."""
@@ -621,7 +1192,7 @@ class Cluster():
             return None
     
     def __current_repo_list(self, owner: str) -> list|None:
-        res = subprocess.run(["gh", "repo", "list", owner, "--json", "name"], capture_output=True, text=True, check=True)
+        res = runner.run(["gh", "repo", "list", owner, "--json", "name"])
         if res.returncode == 0:
             repos = [i["name"] for i in json.loads(res.stdout)] #json.loads(res.stdout)
         else:
@@ -631,12 +1202,15 @@ class Cluster():
     
     def __get_pfo_configs_for_repo(self, owner: str, repo: str) -> dict|None:
         try:
-            res = subprocess.run(["gh", "api", f"/repos/{owner}/{repo}/contents/pfo.json"], capture_output=True, text=True, check=True)
+            res = runner.run(["gh", "api", f"/repos/{owner}/{repo}/contents/pfo.json"])
             if res.returncode == 0:
                 b64_content = json.loads(res.stdout)["content"]
-                pfo_content = json.loads(base64.b64decode(b64_content).decode("utf-8"))
+                pfo_content = PfoConfig.parse(base64.b64decode(b64_content).decode("utf-8"), source=f"{owner}/{repo}/pfo.json")
                 self._repos_with_pfo.update({repo: pfo_content})
-        except subprocess.CalledProcessError:
+        except PfoConfigError as e:
+            spinner.warn(f"Skipping {repo}: {e}") # Reported now, not halfway through building its images
+            return None
+        except subprocess.SubprocessError:
             return None
 
 
@@ -1,5 +1,4 @@
 import os
-import json
 import subprocess
 from typing import Any
 
@@ -10,12 +9,18 @@ from click_option_group import optgroup
 from halo import Halo
 from shared.commands import DefaultCommandGroup
 from src.config import MetaData
+from pfo.shared.gitindex import GitIndex
+from pfo.shared.changes import ChangeIndex
+from pfo.shared import pfoconfig
 from src.tools import (
     assert_pfo_config_file,
+    bump_all,
     bump_version,
     deregister,
     print_help_msg,
     register,
+    register_all,
+    unregistered_packages,
 )
 
 __author__ = "Philip De Lorenzo"
@@ -34,6 +39,13 @@ spinner = Halo(text_color="blue", spinner="dots")
     is_flag=True,
     help=f"This registers the package to be managed by pfo",
 )
+@optgroup.option(
+    "--all",
+    "all_packages",
+    required=False,
+    is_flag=True,
+    help=f"Registers (--register) or bumps (--major/--minor/--patch) every package in the repository at once",
+)
 @optgroup.option(
     "--deregister",
     required=False,
@@ -65,11 +77,41 @@ spinner = Halo(text_color="blue", spinner="dots")
     is_flag=True,
     help=f"This bumps the version by a patch release",
 )
+@optgroup.option(
+    "--since",
+    required=False,
+    type=str,
+    help=f"With --all, only bumps the packages that changed since this git ref (i.e. the last release tag) - with --changed, the ref to compare with",
+)
+@optgroup.group(f"Change Detection", help=f"Packages with changes")
+@optgroup.option(
+    "--changed",
+    required=False,
+    is_flag=True,
+    help=f"Lists the registered packages with changes since --since (default: HEAD), one per line",
+)
 def package(**params: dict) -> None:
     """Functions applicable to package management, microservices and Docker images.
 
     This section will begin the process of creating a new package, updating the package (version), or releasing the package.
     """
+    if params["register"] and params.get("all_packages"):
+        _index = GitIndex(os.getcwd()) # One read of the git index for the whole repository
+        _packages = unregistered_packages(_index)
+        if not _packages:
+            spinner.info("Every package in the repository is already registered with pfo.")
+            exit()
+
+        click.echo("\n".join(f"  {p}" for p in _packages))
+        _value = click.prompt(f"Register these {len(_packages)} packages? y|n", type=str)
+        if _value.lower() == "y":
+            _registered = register_all(_packages, index=_index)
+            spinner.succeed(f"{len(_registered)} packages registered!")
+        else:
+            spinner.info("Registration aborted.")
+
+        exit()
+
     if params["register"]:
         _value = click.prompt(f"Are you sure? y|n", type=str)
         if _value.lower() == "y":
@@ -94,14 +136,39 @@ def package(**params: dict) -> None:
 
         exit()  # To be removed later when functions are working
 
+    if params.get("changed"):
+        try:
+            _changed = ChangeIndex(path=os.getcwd()).changed(since=params.get("since") or "HEAD")
+        except subprocess.SubprocessError as e:
+            spinner.fail(f"Failed to find the changed packages: {e}")
+            exit(1)
+
+        if _changed:
+            click.echo("\n".join(_changed))
+        exit()
+
+    _bump = next((t for t in ("major", "minor", "patch") if params.get(t)), None)
+    if _bump and params.get("all_packages"):
+        try:
+            _bumped = bump_all(_bump, since=params.get("since"))
+        except (OSError, ValueError, KeyError, subprocess.SubprocessError) as e:
+            spinner.fail(f"Failed to bump the packages - no pfo.json was changed: {e}")
+            exit(1)
+
+        for _package, (_old, _new) in _bumped.items():
+            spinner.info(f"{_package}: {_old} -> {_new}")
+        spinner.succeed(f"{_bump.capitalize()} version augmented for {len(_bumped)} packages...")
+        exit()
+
     if assert_pfo_config_file():
+        try:
+            _config = pfoconfig.load(os.getcwd()) # Validated before anything is changed
+        except pfoconfig.PfoConfigError as e:
+            spinner.fail(str(e))
+            exit(1)
+
         if params["version"]:
-            _pfo_file_data = os.path.join(os.getcwd(), "pfo.json")
-            with open(_pfo_file_data, "r") as f:
-                data = json.load(f)
-                version = data["version"]
-            
-            print(version)
+            print(_config.version)
             exit()
 
         if params["major"]:
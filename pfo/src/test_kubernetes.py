@@ -0,0 +1,359 @@
+import os
+import yaml
+import subprocess
+import pytest
+
+from unittest.mock import patch, MagicMock
+from src.kubernetes import Cluster, _watch
+from pfo.shared import clusters
+from pfo.k8s import snapshot # The same module object that src.kubernetes uses
+
+
+def _kind(clusters: list, failing: tuple = ()):
+    """Returns a fake runner.run answering `kind get clusters` and `kind delete cluster`."""
+    def _run(cmd, **kwargs):
+        if cmd[:3] == ["kind", "get", "clusters"]:
+            return subprocess.CompletedProcess(cmd, 0, stdout="\n".join(clusters), stderr="")
+        if cmd[:3] == ["kind", "delete", "cluster"] and cmd[-1] in failing:
+            raise subprocess.CalledProcessError(1, cmd, output="", stderr=f"ERROR: failed to delete cluster {cmd[-1]}")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    return _run
+
+
+class TestDelete:
+
+    @patch('src.kubernetes.shutil.rmtree')
+    @patch('src.kubernetes.argocd.tls.clean')
+    @patch('src.kubernetes.spinner')
+    def test_delete_all(self, mock_spinner, mock_tls_clean, mock_rmtree):
+        """Test that every cluster is deleted once, and its local state removed."""
+        with patch('src.kubernetes.runner.run', side_effect=_kind(["pyops", "dev", "qa"])) as mock_run:
+            Cluster.delete_all()
+
+        _deleted = sorted(c.args[0][-1] for c in mock_run.call_args_list if c.args[0][:3] == ["kind", "delete", "cluster"])
+        assert _deleted == ["dev", "pyops", "qa"]
+        assert [c.args[0][:3] for c in mock_run.call_args_list].count(["kind", "get", "clusters"]) == 1
+        assert mock_rmtree.call_count == 9
+        mock_tls_clean.assert_called_once()
+        mock_spinner.succeed.assert_called_with("All Kind clusters deleted successfully!")
+
+    @patch('src.kubernetes.shutil.rmtree')
+    @patch('src.kubernetes.argocd.tls.clean')
+    @patch('src.kubernetes.spinner')
+    def test_delete_all_partial_failure(self, mock_spinner, mock_tls_clean, mock_rmtree):
+        """Test that a failing cluster is reported, and does not stop the others."""
+        with patch('src.kubernetes.runner.run', side_effect=_kind(["pyops", "dev"], failing=("dev",))):
+            Cluster.delete_all()
+
+        mock_spinner.fail.assert_called_with("Failed to delete Kind clusters: dev")
+        assert any("pyops" in str(c) for c in mock_spinner.succeed.call_args_list)
+        assert mock_rmtree.call_count == 3
+        mock_tls_clean.assert_not_called()
+
+    @patch('src.kubernetes.spinner')
+    def test_delete_all_no_clusters(self, mock_spinner):
+        """Test that nothing is deleted when there are no clusters."""
+        with patch('src.kubernetes.runner.run', side_effect=_kind([])) as mock_run:
+            Cluster.delete_all()
+
+        assert mock_run.call_count == 1
+        mock_spinner.info.assert_called_once_with("No Kind clusters to delete.")
+
+    @patch('src.kubernetes.shutil.rmtree')
+    @patch('src.kubernetes.argocd.tls.clean')
+    @patch('src.kubernetes.spinner')
+    def test_delete_uses_cluster_name(self, mock_spinner, mock_tls_clean, mock_rmtree):
+        """Test that delete removes the cluster it was created for."""
+        with patch('src.kubernetes.runner.run', side_effect=_kind(["pyops"])) as mock_run, \
+             patch('src.kubernetes.clusters.known', return_value=[]):
+            Cluster(env="pyops").delete()
+
+        assert mock_run.call_args_list[0].args[0] == ["kind", "delete", "cluster", "--name", "pyops"]
+        mock_tls_clean.assert_called_once()
+
+    @patch('src.kubernetes.shutil.rmtree')
+    @patch('src.kubernetes.argocd.tls.clean')
+    @patch('src.kubernetes.spinner')
+    def test_delete_keeps_shared_tls(self, mock_spinner, mock_tls_clean, mock_rmtree):
+        """Test that the ArgoCD TLS certificate is kept while another cluster - running, or with pfo state - uses it."""
+        with patch('src.kubernetes.runner.run', side_effect=_kind(["pyops"])), patch('src.kubernetes.clusters.known', return_value=[]):
+            Cluster(env="dev").delete()
+        with patch('src.kubernetes.runner.run', side_effect=_kind([])), patch('src.kubernetes.clusters.known', return_value=["qa"]):
+            Cluster(env="dev").delete()
+
+        mock_tls_clean.assert_not_called()
+
+
+class TestCluster:
+
+    def test_clusters_isolated(self, tmp_path, monkeypatch):
+        """Test that clusters created at the same time keep their manifests and cloned repos apart."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        _results = clusters.for_each(["a", "b"], lambda: Cluster(env=clusters.name()))
+
+        assert _results["a"].temp == clusters.tempdir("a", create=False)
+        assert _results["a"].temp != _results["b"].temp
+        assert _results["a"]._k8s_dir != _results["b"]._k8s_dir
+
+
+class TestSetConfigsAndManifests:
+
+    @pytest.fixture
+    def cluster(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        return Cluster(env="pyops")
+
+    @patch('src.kubernetes.spinner')
+    def test_render_skipped_when_current(self, mock_spinner, cluster):
+        """Test that the manifests are rendered once per template commit, and local edits survive otherwise."""
+        from pfo.testing import fake_cookiecutter
+        _render = MagicMock(side_effect=fake_cookiecutter)
+
+        with patch('src.kubernetes.templates.checkout', return_value=("k8s-installs", "a" * 40)), patch('src.kubernetes.cookiecutter', _render):
+            cluster.set_configs_and_manifests()
+            with open(os.path.join(cluster._k8s_dir, "base", "kustomization.yaml"), "w") as f:
+                f.write("resources: [edited.yaml]\n")
+            cluster.set_configs_and_manifests()
+
+        assert _render.call_count == 1
+        assert open(os.path.join(cluster._k8s_dir, "base", "kustomization.yaml")).read() == "resources: [edited.yaml]\n"
+
+        with patch('src.kubernetes.templates.checkout', return_value=("k8s-installs", "b" * 40)), patch('src.kubernetes.cookiecutter', _render):
+            cluster.set_configs_and_manifests()
+
+        assert _render.call_count == 2
+        assert open(os.path.join(cluster._k8s_dir, "base", "kustomization.yaml")).read() == "resources: []\n"
+        assert os.path.isfile(cluster._kind_config)
+
+    @patch('src.kubernetes.spinner')
+    def test_kind_config_regenerated_alone(self, mock_spinner, cluster):
+        """Test that a change of the machine only writes kind-config.yaml again - the manifests and their edits stay."""
+        from pfo.testing import fake_cookiecutter
+        _render = MagicMock(side_effect=fake_cookiecutter)
+        _GiB = 1024 ** 3
+
+        with patch('src.kubernetes.templates.checkout', return_value=("k8s-installs", "a" * 40)), patch('src.kubernetes.cookiecutter', _render):
+            with patch('src.kubernetes.kindconfig.resources', return_value={"cpus": 16, "memory": 32 * _GiB}):
+                cluster.set_configs_and_manifests()
+            with open(os.path.join(cluster._k8s_dir, "overlays", "kustomization.yaml"), "w") as f:
+                f.write("resources: [edited.yaml]\n")
+            _workers = lambda: [n["role"] for n in yaml.safe_load(open(cluster._kind_config))["nodes"]].count("worker")
+            assert _workers() == 3
+
+            with patch('src.kubernetes.kindconfig.resources', return_value={"cpus": 4, "memory": 8 * _GiB}):
+                cluster.set_configs_and_manifests()
+
+        assert _render.call_count == 1
+        assert _workers() == 1
+        assert open(os.path.join(cluster._k8s_dir, "overlays", "kustomization.yaml")).read() == "resources: [edited.yaml]\n"
+
+
+class TestKustomizeBuild:
+
+    @patch('src.kubernetes.time.sleep')
+    @patch('src.kubernetes.spinner')
+    def test_overlays_of_selected_components(self, mock_spinner, mock_sleep, tmp_path, monkeypatch):
+        """Test that the overlays of components that are not installed (argocd here) are not built or applied."""
+        from pfo.testing import fake_cookiecutter
+        monkeypatch.setenv("HOME", str(tmp_path))
+        _cluster = Cluster(env="pyops")
+        with patch('src.kubernetes.templates.checkout', return_value=("k8s-installs", "a" * 40)), patch('src.kubernetes.cookiecutter', fake_cookiecutter):
+            _cluster.set_configs_and_manifests()
+        _cluster.components = ["metallb", "traefik", "prometheus", "grafana", "loki"]
+
+        _built = {}
+        def _run(cmd, **kwargs):
+            if cmd[:2] == ["kustomize", "build"]:
+                _built[os.path.basename(cmd[2].rstrip("/"))] = yaml.safe_load(open(os.path.join(cmd[2], "kustomization.yaml")))
+            return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+        with patch('src.kubernetes.runner.run', side_effect=_run), patch('src.kubernetes.clusters.tempdir', return_value=str(tmp_path)):
+            _cluster.kustomize_build()
+
+        assert _built[".overlays-selected"]["resources"] == ["metallb", "monitoring"]
+        assert "overlays" not in _built
+
+
+class TestCreate:
+
+    @pytest.fixture
+    def provision(self, tmp_path, monkeypatch):
+        """Mocks every provisioning step of Cluster.create, and records the order they ran in."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        _ran = []
+        _mocks = {
+            "prereqs": "src.kubernetes.Cluster._Cluster__install_k8s_prereqs",
+            "metallb": "src.kubernetes.metallb.install",
+            "traefik": "src.kubernetes.traefik.install",
+            "argocd": "src.kubernetes.argocd.install",
+            "argocd-tls": "src.kubernetes.argocd.tls.install",
+            "prometheus": "src.kubernetes.monitoring.prometheus.install",
+            "grafana": "src.kubernetes.monitoring.grafana.install",
+            "loki": "src.kubernetes.monitoring.loki.install",
+            "manifests": "src.kubernetes.Cluster.kustomize_build",
+        }
+        _patches = [patch(t, side_effect=lambda *a, s=s: _ran.append(s) or True) for s, t in _mocks.items()]
+        _patches += [
+            patch('src.kubernetes.Cluster.set_configs_and_manifests'),
+            patch('src.kubernetes.pipeline.Pipeline'),
+            patch('src.kubernetes.Cluster._Cluster__cluster_exists', return_value=True),
+            patch('src.kubernetes.Cluster._Cluster__set_context'),
+            patch('src.kubernetes.metallb.update'),
+            patch('src.kubernetes.argocd.project_readiness'),
+            patch('src.kubernetes.argocd.tls.is_installed', return_value=True),
+            patch('src.kubernetes.argocd.restart_argocd'),
+            patch('src.kubernetes.argocd.argocd_server_wait'),
+            patch('src.kubernetes.time.sleep'),
+            patch('src.kubernetes.spinner'),
+            patch('pfo.shared.checkpoints._checkpoints_spinner'),
+        ]
+        for _patch in _patches:
+            _patch.start()
+        yield _ran
+        for _patch in _patches:
+            _patch.stop()
+
+    def _releases(self, releases):
+        _stdout = {"helm": '[' + ", ".join(f'{{"name": "{r}"}}' for r in releases) + ']', "kubectl": "metallb-system argocd"}
+        return lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, stdout=_stdout[cmd[0]], stderr="")
+
+    def test_resume_after_failure(self, provision):
+        """Test that a resumed create skips the verified steps, and continues from the step that failed."""
+        with patch('src.kubernetes.monitoring.grafana.install', side_effect=RuntimeError("helm timed out")), pytest.raises(RuntimeError):
+            Cluster(env="pyops").create()
+        assert provision == ["prereqs", "metallb", "traefik", "argocd", "argocd-tls", "prometheus"]
+
+        provision.clear()
+        with patch('src.kubernetes.runner.run', side_effect=self._releases(["traefik", "prometheus"])):
+            Cluster(env="pyops").create(resume=True)
+
+        assert provision == ["grafana", "loki", "manifests"]
+
+    def test_resume_after_reported_failure(self, provision):
+        """Test that a step that caught its own error (returned False) is not checkpointed, and a resumed create runs it again."""
+        with patch('src.kubernetes.argocd.install', side_effect=lambda: provision.append("argocd") or False):
+            Cluster(env="pyops").create()
+        assert "manifests" in provision # The create went on - the step reported the failure
+
+        provision.clear()
+        with patch('src.kubernetes.runner.run', side_effect=self._releases(["traefik", "prometheus", "grafana", "loki-stack"])):
+            Cluster(env="pyops").create(resume=True)
+
+        assert provision == ["argocd", "argocd-tls", "prometheus", "grafana", "loki", "manifests"]
+
+    def test_resume_reinstalls_missing_release(self, provision):
+        """Test that a completed step whose Helm release is gone runs again, with the steps after it."""
+        Cluster(env="pyops").create()
+        provision.clear()
+
+        with patch('src.kubernetes.runner.run', side_effect=self._releases(["prometheus", "grafana", "loki-stack"])):
+            Cluster(env="pyops").create(resume=True)
+
+        assert provision == ["traefik", "argocd", "argocd-tls", "prometheus", "grafana", "loki", "manifests"]
+
+    def test_selected_components(self, provision):
+        """Test that only the selected components are installed, and the selection is recorded for the cluster."""
+        Cluster(env="pyops").create(components=("metallb,traefik",))
+
+        assert provision == ["prereqs", "metallb", "traefik", "manifests"]
+        assert clusters.load_state("pyops")["components"] == ["metallb", "traefik"]
+
+
+class TestRestore:
+
+    @patch('src.kubernetes.spinner')
+    def test_partial_snapshot_into_larger_selection(self, mock_spinner, tmp_path, monkeypatch):
+        """Test that restoring a snapshot of a metallb-only cluster with every component installs the ones it lacks."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        _manifest = {"nodes": [], "components": snapshot.component_hashes(), "installed": ["metallb"]}
+        with patch('src.kubernetes.snapshot.exists', return_value=True), \
+             patch('src.kubernetes.snapshot.restore', return_value=True), \
+             patch('src.kubernetes.snapshot.load', return_value=_manifest), \
+             patch('src.kubernetes.Cluster._Cluster__cluster_exists', return_value=False), \
+             patch('src.kubernetes.Cluster.set_configs_and_manifests'), \
+             patch('src.kubernetes.Cluster._Cluster__provision') as mock_provision:
+            assert Cluster(env="pyops").restore(components=("all",)) is True
+
+        mock_provision.assert_called_once_with({"traefik", "argocd", "prometheus", "grafana", "loki"})
+
+
+class TestUpdate:
+
+    @patch('src.kubernetes.time.sleep')
+    @patch('src.kubernetes.argocd')
+    @patch('src.kubernetes.monitoring')
+    @patch('src.kubernetes.traefik')
+    @patch('src.kubernetes.metallb')
+    @patch('src.kubernetes.spinner')
+    def test_update_reuses_plan(self, mock_spinner, mock_metallb, mock_traefik, mock_monitoring, mock_argocd, mock_sleep, tmp_path, monkeypatch):
+        """Test that an update skips the components the plan found unchanged, and applies the overlays it rendered."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        _entries = {
+            "metallb": {"created": 0, "changed": 0, "manifest": "metallb.yaml"},
+            "traefik": {"created": 0, "changed": 2, "manifest": "traefik.yaml"},
+            "argocd": {"created": 1, "changed": 0, "manifest": "argocd.yaml"},
+        }
+        with patch('src.kubernetes.plan.load', return_value={"components": _entries}), \
+             patch('src.kubernetes.plan.planned', side_effect=lambda p, c: p["components"].get(c)), \
+             patch('src.kubernetes.plan.clear') as mock_clear:
+            Cluster(env="pyops").update()
+
+        mock_metallb.update.assert_not_called()
+        mock_traefik.update.assert_called_once_with()
+        mock_argocd.update.assert_called_once_with(manifest="argocd.yaml")
+        mock_monitoring.grafana.update.assert_called_once_with() # Not planned - updated as usual
+        mock_clear.assert_called_once()
+
+    @patch('src.kubernetes.time.sleep')
+    @patch('src.kubernetes.argocd')
+    @patch('src.kubernetes.monitoring')
+    @patch('src.kubernetes.traefik')
+    @patch('src.kubernetes.metallb')
+    @patch('src.kubernetes.spinner')
+    def test_update_recorded_components(self, mock_spinner, mock_metallb, mock_traefik, mock_monitoring, mock_argocd, mock_sleep, tmp_path, monkeypatch):
+        """Test that an update only touches the components the cluster was created with."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        clusters.save_state({"components": ["metallb", "traefik"]}, "pyops")
+        with patch('src.kubernetes.plan.load', return_value=None), patch('src.kubernetes.plan.clear'):
+            Cluster(env="pyops").update()
+
+        mock_metallb.update.assert_called_once_with(manifest=None)
+        mock_traefik.update.assert_called_once_with()
+        mock_argocd.update.assert_not_called()
+        mock_argocd.restart_argocd.assert_not_called()
+        mock_monitoring.grafana.update.assert_not_called()
+
+
+class TestWatch:
+
+    @patch('src.kubernetes.watch.Watcher')
+    @patch('src.kubernetes.spinner')
+    def test_invalid_pfo_json(self, mock_spinner, mock_watcher, tmp_path, monkeypatch):
+        """Test that --watch reads pfo.json through the shared loader, and reports an invalid one before watching."""
+        (tmp_path / "pfo.json").write_text('{"name": "api"}')
+        monkeypatch.chdir(tmp_path)
+
+        assert _watch() is False
+        assert "version" in mock_spinner.fail.call_args[0][0]
+        mock_watcher.assert_not_called()
+
+
+class TestMemoryFootprint:
+
+    def test_memory_footprint(self):
+        """Test that the memory of each node container is read from docker stats."""
+        _stdout = {
+            "kind": "pyops-control-plane\npyops-worker\n",
+            "docker": "pyops-control-plane\t1.5GiB / 7.6GiB\npyops-worker\t512MiB / 7.6GiB\n",
+        }
+        with patch('src.kubernetes.runner.run', side_effect=lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, stdout=_stdout[cmd[0]], stderr="")):
+            _footprint = Cluster.memory_footprint("pyops")
+
+        assert _footprint == {"pyops-control-plane": int(1.5 * 1024 ** 3), "pyops-worker": 512 * 1024 ** 2}
+
+    def test_memory_footprint_no_cluster(self):
+        """Test that a cluster without nodes has no footprint, and docker is not asked."""
+        with patch('src.kubernetes.runner.run', return_value=subprocess.CompletedProcess([], 0, stdout="", stderr="")) as mock_run:
+            assert Cluster.memory_footprint("pyops") == {}
+        assert mock_run.call_count == 1
@@ -1,5 +1,8 @@
 import os
+import json
 import tempfile
+import subprocess
+import git
 import pytest
 import socket
 
@@ -8,6 +11,9 @@ from src.tools import assert_pfo_config_file
 from src.tools import mac_only
 from src.tools import network_check
 from src.tools import deregister
+from src.tools import register, register_all, unregistered_packages
+from src.tools import GitIndex, atomic_write, bump_all
+from pfo.shared.pfoconfig import PfoConfigError
 
 
 class TestAssertPfoConfigFile:
@@ -300,3 +306,105 @@ class TestDeregister:
             mock_join.assert_called_once_with('/absolute/current/dir', 'pfo.json')
 
 
+
+
+@pytest.fixture
+def monorepo(tmp_path, monkeypatch):
+    _root = tmp_path / "monorepo"
+    for _path in ("services/api/pyproject.toml", "services/api/docker/api/Dockerfile", "services/api/manifests/kustomization.yaml", "services/web/package.json"):
+        (_root / _path).parent.mkdir(parents=True, exist_ok=True)
+        (_root / _path).write_text("")
+    subprocess.run(["git", "init", "-q"], cwd=_root, check=True)
+    subprocess.run(["git", "config", "user.name", "Registrant"], cwd=_root, check=True)
+    subprocess.run(["git", "config", "user.email", "registrant@example.com"], cwd=_root, check=True)
+    subprocess.run(["git", "remote", "add", "origin", "git@github.com:pyflowops/monorepo.git"], cwd=_root, check=True)
+    monkeypatch.chdir(_root)
+    return _root
+
+
+class TestRegister:
+
+    def test_register(self, monorepo, monkeypatch):
+        """Test that the package is registered with its images and manifests."""
+        monkeypatch.chdir(monorepo / "services" / "api")
+
+        register()
+
+        _data = json.load(open(monorepo / "services" / "api" / "pfo.json"))
+        assert _data["name"] == "api"
+        assert _data["package_path"] == "services/api"
+        assert _data["repo"] == "git@github.com:pyflowops/monorepo.git"
+        assert _data["registrant"] == {"user": "Registrant", "email": "registrant@example.com"}
+        assert _data["docker"]["api"]["dockerfile"] == "Dockerfile"
+        assert _data["k8s"]["manifest_path"] == "manifests"
+
+    def test_register_all(self, monorepo):
+        """Test that every unregistered package is registered in one pass, and registered ones are skipped."""
+        (monorepo / "services" / "web" / "pfo.json").write_text("{}")
+
+        with patch('src.tools.GitIndex', wraps=GitIndex) as mock_index:
+            _registered = register_all()
+
+        assert _registered == ["services/api"]
+        assert mock_index.call_count == 1
+        assert json.load(open(monorepo / "services" / "web" / "pfo.json")) == {}
+        assert unregistered_packages() == []
+
+
+class TestBumpAll:
+
+    @pytest.fixture
+    def registered(self, monorepo):
+        register_all()
+        subprocess.run(["git", "add", "-A"], cwd=monorepo, check=True)
+        subprocess.run(["git", "commit", "-q", "-m", "Register"], cwd=monorepo, check=True)
+        return monorepo
+
+    def _version(self, repo, package):
+        return json.load(open(repo / package / "pfo.json"))["version"]
+
+    def test_bump_all(self, registered):
+        """Test that every registered package is bumped in one pass, from one read of the git config."""
+        with patch('src.tools.git.Repo', wraps=git.Repo) as mock_repo:
+            _bumped = bump_all("minor")
+
+        assert _bumped == {"services/api": ("0.0.1", "0.1.0"), "services/web": ("0.0.1", "0.1.0")}
+        assert mock_repo.call_count == 1
+        assert self._version(registered, "services/web") == "0.1.0"
+        assert json.load(open(registered / "services" / "api" / "pfo.json"))["changelog"]["user"] == "Registrant"
+
+    def test_bump_since(self, registered):
+        """Test that only the packages changed since the ref are bumped."""
+        (registered / "services" / "web" / "index.js").write_text("console.log('changed')\n")
+        subprocess.run(["git", "add", "-A"], cwd=registered, check=True)
+
+        _bumped = bump_all("patch", since="HEAD")
+
+        assert list(_bumped) == ["services/web"]
+        assert self._version(registered, "services/api") == "0.0.1"
+
+    def test_failed_write_restores(self, registered):
+        """Test that a failing write leaves every pfo.json as it was."""
+        _before = {p: open(registered / p / "pfo.json").read() for p in ("services/api", "services/web")}
+        _writes = []
+
+        def _atomic_write(path, data):
+            _writes.append(path)
+            if len(_writes) == 2:
+                raise OSError("disk full")
+            atomic_write(path, data)
+
+        with patch('src.tools.atomic_write', side_effect=_atomic_write), pytest.raises(OSError):
+            bump_all("major")
+
+        assert {p: open(registered / p / "pfo.json").read() for p in _before} == _before
+
+    def test_invalid_pfo_json(self, registered):
+        """Test that an invalid pfo.json is reported before any package is bumped."""
+        _web = registered / "services" / "web" / "pfo.json"
+        _web.write_text(json.dumps({**json.load(open(_web)), "version": "one"}))
+
+        with pytest.raises(PfoConfigError, match="version"):
+            bump_all("patch")
+
+        assert self._version(registered, "services/api") == "0.0.1"
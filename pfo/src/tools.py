@@ -3,7 +3,6 @@ import json
 import platform
 import shutil
 import socket
-import subprocess
 import time
 from typing import Any
 
@@ -11,6 +10,10 @@ import click
 import git
 from halo import Halo
 from src.config import MetaData
+from pfo.shared.gitindex import GitIndex
+from pfo.shared.changes import ChangeIndex
+from pfo.shared.files import atomic_write
+from pfo.shared.pfoconfig import PfoConfig
 
 metadata = MetaData()
 
@@ -105,34 +108,44 @@ def register() -> None:
         # TODO: Add a prompt to ask if the user wants to update the package data
         exit()
 
-    # Let's initialize the git repository
-    _path_to_root = subprocess.run(
-        ["git", "rev-parse", "--show-cdup"],
-        stdout=subprocess.PIPE,
-        universal_newlines=True,
-    ).stdout.strip()
-
-    _package_path = subprocess.run(
-        ["git", "rev-parse", "--show-prefix"],
-        stdout=subprocess.PIPE,
-        universal_newlines=True,
-    ).stdout.strip()
-    
-    # If the output is essentially nothing, then we are at the root of the repository
-    if (not _package_path) or (_package_path == "") or (_package_path == "\n"):
-        _package_path = "."
-
-    if (_path_to_root != "") or (_path_to_root != "\n") or (_path_to_root != None):
-        _root = os.path.abspath(os.path.join(os.getcwd(), _path_to_root.strip()))
-    else:
-        _root = os.path.abspath(os.getcwd())
+    # The git index is read once - the package's docker images and manifests are looked up in it
+    _index = GitIndex(os.getcwd())
+    __write_registration(_index, _index.prefix or ".", __git_identity(_index.root))
 
-    _name = os.path.basename(os.path.join(_root, _package_path)) if not os.path.isdir(".git") else os.path.basename(os.getcwd())
-    _path = os.path.abspath(os.getcwd())
-    _base_version = metadata.base_version
 
-    # Let's get github information for the package
-    repo = git.Repo(_root)
+def register_all(packages: list[str]|None = None, index: GitIndex|None = None) -> list[str]:
+    """Registers every package of the repository that is not registered yet, in one pass.
+
+    Args:
+        packages (list): The package paths to register (relative to the repository root) - default: all of them.
+        index (GitIndex): The already read repository, if there is one.
+
+    Returns:
+        list: The package paths that were registered.
+    """
+    _index = index or GitIndex(os.getcwd())
+    _identity = __git_identity(_index.root) # Read once for all of the packages
+    _registered = []
+
+    for _package in packages if packages is not None else unregistered_packages(_index):
+        __write_registration(_index, _package, _identity)
+        _registered.append(_package)
+
+    return _registered
+
+
+def unregistered_packages(index: GitIndex|None = None) -> list[str]:
+    """Returns the package paths of the repository (relative to its root) without a pfo.json."""
+    _index = index or GitIndex(os.getcwd())
+    return [
+        p for p in _index.packages()
+        if not _index.exists(f"{p}/{metadata.pfo_json_file}") and not os.path.exists(os.path.join(_index.root, p, metadata.pfo_json_file))
+    ]
+
+
+def __git_identity(root: str) -> dict[str, str|None]:
+    """Returns the git user, email and origin URL of the repository - the registrant of its packages."""
+    repo = git.Repo(root, search_parent_directories=True)
     __r = repo.config_reader()
 
     try:
@@ -148,20 +161,37 @@ def register() -> None:
         _user_email = None
 
     _remote = repo.remotes.origin  # Let's get the remote origin URL
+    return {"user": _user_name, "email": _user_email, "repo": _remote.url}
+
+
+def __write_registration(index: GitIndex, package_path: str, identity: dict[str, str|None]) -> str:
+    """Writes the pfo.json of the package.
+
+    Args:
+        index (GitIndex): The repository the package is in.
+        package_path (str): The package directory, relative to the repository root ("." for the root).
+        identity (dict): The registrant - see __git_identity.
+
+    Returns:
+        str: The path of the pfo.json file.
+    """
+    _path = os.path.join(index.root, package_path) if package_path != "." else index.root
+    _name = os.path.basename(os.path.abspath(_path))
+    _base_version = metadata.base_version
 
     # Let's write the data to the .pfo file
     _pfo_file = os.path.join(_path, metadata.pfo_json_file)
     _data: dict[str, Any] = {
         "name": _name,
-        "package_path": _package_path,
-        "repo": _remote.url,
+        "package_path": package_path,
+        "repo": identity["repo"],
         "version": _base_version,
     }  # Base data instatiation
 
     # Let's add user data to the registration - who was the actor that registered the package
     _data["registrant"] = {}
-    _data["registrant"]["user"] = _user_name
-    _data["registrant"]["email"] = _user_email
+    _data["registrant"]["user"] = identity["user"]
+    _data["registrant"]["email"] = identity["email"]
 
     # We need to add a docker section to the registration
     _data["docker"] = {}
@@ -184,21 +214,17 @@ def register() -> None:
     #   }
     # }
     # If the docker folder does not exist, it will not add anything to the docker section. docker: {}
-    if os.path.exists(os.path.join(_path, "docker")):
-        for _name in os.listdir(os.path.join(_path, "docker")):
-            if os.path.isdir(os.path.join(_path, "docker", _name)):
-                _data["docker"][_name] = {}
-                _data["docker"][_name]["base_path"] = "docker"
-                _data["docker"][_name]["image"] = f"{_name}"
-                _data["docker"][_name]["repo_path"] = f"docker/{_name}"
-
-                if os.path.exists(os.path.join(_path, "docker", _name, "Dockerfile")):
-                    _data["docker"][_name]["dockerfile"] = "Dockerfile"
-                else:
-                    spinner.warn(
-                        f"No Dockerfile found in docker/{_name}, defaulting to 'Dockerfile' for the dockerfile name."
-                    )
-                    _data["docker"][_name]["dockerfile"] = None
+    for _image, _dockerfile in index.docker_images(package_path).items():
+        _data["docker"][_image] = {}
+        _data["docker"][_image]["base_path"] = "docker"
+        _data["docker"][_image]["image"] = f"{_image}"
+        _data["docker"][_image]["repo_path"] = f"docker/{_image}"
+
+        if _dockerfile is None:
+            spinner.warn(
+                f"No Dockerfile found in {package_path}/docker/{_image}, defaulting to 'Dockerfile' for the dockerfile name."
+            )
+        _data["docker"][_image]["dockerfile"] = _dockerfile
 
     # Let's add the kubernetes data to the registration
     _data["k8s"] = {}
@@ -215,7 +241,7 @@ def register() -> None:
     } # This will hold the ArgoCD application data
 
     _data["k8s"]["name"] = _name
-    _data["k8s"]["manifest_path"] = "manifests" if os.path.exists(os.path.join(_path, "manifests")) else "" # Default namespace
+    _data["k8s"]["manifest_path"] = "manifests" if index.isdir(f"{package_path}/manifests") else "" # Default namespace
     _data["k8s"]["labels"] = {}
     _data["k8s"]["labels"]["app.kubernetes.io/name"] = _name
     _data["k8s"]["deploy"] = False  # Default to not deploy
@@ -225,6 +251,8 @@ def register() -> None:
         file.write(_json_data)
         file.write("\n")
 
+    return _pfo_file
+
 
 def deregister() -> None:
     """This function removes the package from pfo management."""
@@ -240,36 +268,9 @@ def deregister() -> None:
         exit()
 
 
-def bump_version(type: str) -> None:
-    """This function bumps the version of the package.
-
-    Args:
-        type (str): The type of version bump to perform. (major, minor, patch)
-    """
-    # Let's get github information for the package
-    _path = os.path.abspath(os.getcwd())
-    repo = git.Repo(_path)
-    __r = repo.config_reader()
-
-    try:
-        _user_name = __r.get_value("user", "name")
-    except:
-        spinner.warn("Cannot pull the user from the git config file...")
-        _user_name = None
-
-    try:
-        _user_email = __r.get_value("user", "email")
-    except:
-        spinner.warn("Cannot pull the email from the git config file...")
-        _user_email = None
-
-    _remote = repo.remotes.origin  # Let's get the remote origin URL
-
-    with open(metadata.pfo_json_file, "r") as file:
-        _data = json.load(file)
-
-    _version = _data["version"]
-    _version_augment = list(map(int, _version.split(".")))
+def bumped_version(version: str, type: str) -> str:
+    """Returns the version bumped by a major, minor or patch release."""
+    _version_augment = list(map(int, version.split(".")))
 
     # To augment the version, we need to increase the version by 1
     # Major is at index 0, Minor is at index 1, and Patch is at index 2
@@ -284,23 +285,94 @@ def bump_version(type: str) -> None:
     elif type == "patch":
         _version_augment[2] += 1
 
-    spinner.info(
-        f"Version augmented from {_version} to {'.'.join(map(str, _version_augment))}"
-    )
-    _data["version"] = ".".join(map(str, _version_augment))
+    return ".".join(map(str, _version_augment))
 
-    # Let's write the data to the .pfo file
-    _pfo_file = os.path.join(os.getcwd(), metadata.pfo_json_file)
+
+def __bump_contents(contents: str, type: str, identity: dict[str, str|None], source: str) -> tuple[str, str, str]:
+    """Bumps the version in the contents of a pfo.json file.
+
+    Returns:
+        tuple: The old version, the new version and the new contents.
+
+    Raises:
+        PfoConfigError: The contents are not a valid pfo.json.
+    """
+    _data = PfoConfig.parse(contents, source).data
+    _version = _data["version"]
+    _data["version"] = bumped_version(_version, type)
 
     # Let's add the change user, email, and date to the registration
     _data["changelog"] = {}
-    _data["changelog"]["user"] = _user_name
-    _data["changelog"]["email"] = _user_email
+    _data["changelog"]["user"] = identity["user"]
+    _data["changelog"]["email"] = identity["email"]
     _data["changelog"]["date"] = time.strftime("%Y-%m-%d %H:%M:%S")
 
     _json_data = json.dumps(_data, indent=2)
-    with open(_pfo_file, "w") as file:
-        file.write(_json_data)
+    return _version, _data["version"], _json_data + ("\n" if contents.endswith("\n") else "")
+
+
+def bump_version(type: str) -> None:
+    """This function bumps the version of the package.
+
+    Args:
+        type (str): The type of version bump to perform. (major, minor, patch)
+    """
+    # Let's get github information for the package
+    _identity = __git_identity(os.path.abspath(os.getcwd()))
+
+    # Let's write the data to the .pfo file
+    _pfo_file = os.path.join(os.getcwd(), metadata.pfo_json_file)
+    with open(_pfo_file, "r") as file:
+        _version, _new_version, _contents = __bump_contents(file.read(), type, _identity, _pfo_file)
+
+    spinner.info(
+        f"Version augmented from {_version} to {_new_version}"
+    )
+    atomic_write(_pfo_file, _contents)
+
+
+def bump_all(type: str, since: str|None = None, index: GitIndex|None = None) -> dict[str, tuple[str, str]]:
+    """Bumps the version of every registered package of the repository, in one pass.
+
+    The git config is read once, every pfo.json is bumped in memory first, then written - if a write fails, the files
+    already written are restored, so the repository never ends up half bumped.
+
+    Args:
+        type (str): The type of version bump to perform. (major, minor, patch)
+        since (str): Only bump the packages with changes since this git ref (i.e. the last release tag).
+        index (GitIndex): The already read repository, if there is one.
+
+    Returns:
+        dict: package path -> (old version, new version), for the packages that were bumped.
+    """
+    _index = index or GitIndex(os.getcwd())
+    _packages = _index.registered(metadata.pfo_json_file)
+    if since:
+        _packages = ChangeIndex(_index).changed(since=since)
+
+    _identity = __git_identity(_index.root) # Read once for all of the packages
+    _writes: list[tuple[str, str, str]] = [] # (file, old contents, new contents)
+    _bumped: dict[str, tuple[str, str]] = {}
+
+    for _package in _packages:
+        _pfo_file = os.path.join(_index.root, _package, metadata.pfo_json_file)
+        with open(_pfo_file, "r") as file:
+            _contents = file.read()
+        _version, _new_version, _new_contents = __bump_contents(_contents, type, _identity, _pfo_file)
+        _writes.append((_pfo_file, _contents, _new_contents))
+        _bumped[_package] = (_version, _new_version)
+
+    _written: list[tuple[str, str, str]] = []
+    try:
+        for _write in _writes:
+            atomic_write(_write[0], _write[2])
+            _written.append(_write)
+    except OSError:
+        for _pfo_file, _contents, _ in _written:
+            atomic_write(_pfo_file, _contents)
+        raise
+
+    return _bumped
 
 
 def mac_only() -> bool:
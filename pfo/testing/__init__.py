@@ -0,0 +1,10 @@
+"""
+Test fixtures for pfo - fake cluster toolchain, Docker daemon and template rendering that work without a network.
+
+These are used by the benchmarks (pfo/benchmarks) and by tests that need to run the cluster commands offline. To run
+the CLI itself against the fakes, see pfo/testing/offline.py.
+"""
+from .toolchain import FakeToolchain
+from .docker_daemon import FakeDockerDaemon
+from .k8s_installs import fake_cookiecutter
+from .home import seed_home
@@ -0,0 +1,294 @@
+"""
+Fake kind, kubectl, kustomize, helm, gh, docker and doppler executables for the pfo benchmarks and tests.
+
+This script is not imported by pfo. FakeToolchain writes one small shell wrapper per tool into its bin directory, and each
+wrapper runs this script with the tool name as the first argument. It only uses the standard library, so it starts
+quickly and behaves the same under any interpreter.
+
+The toolchain root directory (PFO_FAKE_TOOLCHAIN) holds:
+    config.json  - latencies (seconds) and injected failures, keyed by "<tool> <subcommand>", "<tool>" or "default"
+    state.json   - the fake cluster state (kind clusters, how many times each injected failure has fired)
+    calls.jsonl  - one JSON line per invocation
+    applied/     - a copy of every manifest applied with `kubectl apply -f <file>`, numbered in the order applied
+"""
+import os
+import sys
+import json
+import time
+import base64
+import fcntl
+
+ROOT = os.environ["PFO_FAKE_TOOLCHAIN"]
+_config_file = os.path.join(ROOT, "config.json")
+_state_file = os.path.join(ROOT, "state.json")
+_calls_file = os.path.join(ROOT, "calls.jsonl")
+
+_MANIFEST = """apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: pfo-fake
+  namespace: default
+data:
+  fake: "true"
+"""
+
+
+def _load(path: str, default: dict) -> dict:
+    if not os.path.isfile(path):
+        return default
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _subcommand(args: list) -> str:
+    """Returns the first two positional arguments, i.e. 'create cluster', 'apply', 'repo add'."""
+    _pos = [a for a in args if not a.startswith("-")]
+    return " ".join(_pos[:2])
+
+
+def _lookup(table: dict, tool: str, args: list, default=None):
+    """Finds the most specific entry for this invocation: '<tool> <sub1> <sub2>', '<tool> <sub1>', '<tool>', 'default'."""
+    _words = _subcommand(args).split()
+    for i in range(len(_words), -1, -1):
+        _key = " ".join([tool] + _words[:i])
+        if _key in table:
+            return table[_key]
+
+    return table.get("default", default)
+
+
+def _with_state(fn):
+    """Runs fn(state) with the state file locked, and saves the state it returns."""
+    with open(os.path.join(ROOT, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = _load(_state_file, {"clusters": []})
+        state, out = fn(state)
+        with open(_state_file, "w") as f:
+            json.dump(state, f)
+        return out
+
+
+def _flag(args: list, name: str, default: str = "") -> str:
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+
+    for a in args:
+        if a.startswith(f"{name}="):
+            return a.split("=", 1)[1]
+
+    return default
+
+
+def _write_kubeconfig(path: str, name: str) -> None:
+    """Writes the cluster's kubeconfig, as kind does for create cluster and export kubeconfig (if a file is set)."""
+    if not path or os.pathsep in path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"apiVersion: v1\nkind: Config\ncurrent-context: kind-{name}\n")
+
+
+def _kind(args: list) -> tuple[int, str]:
+    _sub = _subcommand(args)
+    _name = _flag(args, "--name", "kind")
+
+    if _sub == "get clusters":
+        return 0, "\n".join(_with_state(lambda s: (s, s["clusters"])))
+    if _sub == "create cluster":
+        def _create(s):
+            if _name in s["clusters"]:
+                return s, 1
+            s["clusters"].append(_name)
+            return s, 0
+        _rc = _with_state(_create)
+        if _rc == 0:
+            _write_kubeconfig(_flag(args, "--kubeconfig", os.environ.get("KUBECONFIG", "")), _name)
+        return _rc, f"Creating cluster \"{_name}\" ...\n"
+    if _sub == "delete cluster":
+        _with_state(lambda s: ({**s, "clusters": [c for c in s["clusters"] if c != _name]}, None))
+        return 0, f"Deleting cluster \"{_name}\" ...\n"
+    if _sub == "get nodes":
+        return 0, f"{_name}-control-plane\n{_name}-worker\n"
+    if _sub == "get kubeconfig":
+        return 0, f"apiVersion: v1\nkind: Config\ncurrent-context: kind-{_name}\n"
+    if _sub == "export kubeconfig":
+        if _name not in _with_state(lambda s: (s, s["clusters"])):
+            return 1, ""
+        _write_kubeconfig(_flag(args, "--kubeconfig", os.environ.get("KUBECONFIG", "")), _name)
+        return 0, ""
+
+    return 0, ""
+
+
+def _kubectl(args: list) -> tuple[int, str]:
+    _sub = _subcommand(args)
+
+    if _sub.startswith("get") and "jsonpath" in " ".join(args):
+        return 0, "'" + base64.b64encode(b"fake-password").decode("utf-8") + "'"
+    if _sub.startswith("get") and "json" in args:
+        return 0, json.dumps({"items": []})
+    if _sub.startswith("cluster-info"):
+        return 0, "Kubernetes control plane is running at https://127.0.0.1:6443\n"
+    if _sub.startswith("apply"):
+        _file = _flag(args, "-f")
+        if os.path.isfile(_file):
+            _n = _with_state(lambda s: ({**s, "applied": s.get("applied", 0) + 1}, s.get("applied", 0) + 1))
+            os.makedirs(os.path.join(ROOT, "applied"), exist_ok=True)
+            with open(_file, "r") as src, open(os.path.join(ROOT, "applied", f"{_n:04d}-{os.path.basename(_file)}"), "w") as dst:
+                dst.write(src.read())
+        return 0, "configmap/pfo-fake configured\n"
+
+    return 0, ""
+
+
+def _gh(args: list) -> tuple[int, str]:
+    _sub = _subcommand(args)
+
+    if _sub == "repo view":
+        return 0, json.dumps({"owner": {"login": "pyflowops"}})
+    if _sub == "repo list":
+        return 0, json.dumps([])
+    if _sub == "ssh-key list":
+        return 0, "argocd_github\tssh-ed25519 AAAA\t2025-01-01\t1\tauthentication\n"
+    if _sub.startswith("api"):
+        return 0, json.dumps({})
+
+    return 0, ""
+
+
+def _docker(args: list) -> tuple[int, str]:
+    _sub = _subcommand(args)
+
+    if _sub.startswith("inspect"):
+        _nodes = [a for a in args[1:] if not a.startswith("-")]
+        return 0, json.dumps([{
+            "Name": f"/{n}",
+            "Config": {"Hostname": n, "Labels": {"io.x-k8s.kind.cluster": n.rsplit("-", 2)[0], "io.x-k8s.kind.role": "control-plane" if n.endswith("control-plane") else "worker"}},
+            "HostConfig": {"PortBindings": {"6443/tcp": [{"HostIp": "127.0.0.1", "HostPort": "6443"}]} if n.endswith("control-plane") else {}},
+            "NetworkSettings": {"Networks": {"kind": {"IPAddress": f"172.18.0.{i + 2}"}}},
+        } for i, n in enumerate(_nodes)])
+    if _sub.startswith("stats"):
+        _nodes = [a for a in args[1:] if not a.startswith("-") and not a.startswith("{{")]
+        return 0, "".join(f"{n}\t{'1.1GiB' if n.endswith('control-plane') else '512MiB'} / 7.6GiB\n" for n in _nodes)
+    if _sub.startswith("create"):
+        # A node container created with kind's labels makes the cluster show up in `kind get clusters`
+        _labels = [a.split("=", 1)[1] for a in args if a.startswith("io.x-k8s.kind.cluster=")]
+        if _labels:
+            _with_state(lambda s: ({**s, "clusters": sorted(set(s["clusters"]) | set(_labels))}, None))
+        return 0, "0123456789ab\n"
+
+    return _generic(args)
+
+
+def _resources(directory: str) -> list:
+    """Returns the resources (and bases) a kustomization lists - read line by line, so the fake needs no YAML parser."""
+    for _name in ("kustomization.yaml", "kustomization.yml", "Kustomization"):
+        if os.path.isfile(os.path.join(directory, _name)):
+            with open(os.path.join(directory, _name), "r") as f:
+                _lines = f.read().splitlines()
+            break
+    else:
+        return []
+
+    _resources, _listing = [], False
+    for _line in _lines:
+        if _line.strip() in ("resources:", "bases:"):
+            _listing = True
+        elif _listing and _line.lstrip().startswith("- "):
+            _resources.append(_line.lstrip()[2:].strip().strip("'\""))
+        elif _line.strip() and not _line.startswith(" "):
+            _listing = False
+
+    return _resources
+
+
+def _documents(directory: str) -> list:
+    """Returns the documents of a kustomization's resource files, and of the kustomizations it includes."""
+    _docs = []
+    for _resource in _resources(directory):
+        _path = os.path.join(directory, _resource)
+        if os.path.isdir(_path):
+            _docs.extend(_documents(_path))
+        elif os.path.isfile(_path):
+            with open(_path, "r") as f:
+                _docs.append(f.read())
+
+    return _docs
+
+
+def _kustomize(args: list) -> tuple[int, str]:
+    """kustomize build <directory> prints the fake manifest, then the resources of the directory's kustomization."""
+    _pos = [a for a in args if not a.startswith("-")]
+    if _pos[:1] == ["build"] and len(_pos) > 1 and os.path.isdir(_pos[1]):
+        return 0, "---\n".join([_MANIFEST, *_documents(_pos[1])])
+
+    return _generic(args)
+
+
+def _generic(args: list) -> tuple[int, str]:
+    if args and args[0] in ("version", "--version"):
+        return 0, "v0.0.0-fake\n"
+    if args and args[0] in ("build", "template"):
+        return 0, _MANIFEST
+
+    return 0, ""
+
+
+_TOOLS = {
+    "kind": _kind,
+    "kubectl": _kubectl,
+    "kustomize": _kustomize,
+    "helm": _generic,
+    "gh": _gh,
+    "docker": _docker,
+    "doppler": lambda args: (0, "{}"),
+}
+
+
+def _injected_failure(config: dict, tool: str, args: list) -> dict | None:
+    """Returns the failure to inject for this invocation, if any - each failure fires `count` times (-1: always)."""
+    _failures = config.get("failures", {})
+    _words = _subcommand(args).split()
+    _key = next((" ".join([tool] + _words[:i]) for i in range(len(_words), -1, -1) if " ".join([tool] + _words[:i]) in _failures), None)
+    if _key is None:
+        return None
+
+    def _fire(s):
+        _fired = s.setdefault("failures", {}).get(_key, 0)
+        _count = _failures[_key].get("count", 1)
+        if _count != -1 and _fired >= _count:
+            return s, None
+        s["failures"][_key] = _fired + 1
+        return s, _failures[_key]
+
+    return _with_state(_fire)
+
+
+def main() -> int:
+    tool, args = sys.argv[1], sys.argv[2:]
+    _start = time.time()
+    _config = _load(_config_file, {})
+
+    _latency = float(_lookup(_config.get("latency", {}), tool, args, 0.0))
+    if _latency:
+        time.sleep(_latency)
+
+    _failure = _injected_failure(_config, tool, args)
+    if _failure:
+        returncode, out = _failure.get("returncode", 1), _failure.get("stdout", "")
+        sys.stderr.write(_failure.get("stderr", f"{tool}: injected failure\n"))
+    else:
+        returncode, out = _TOOLS.get(tool, _generic)(args)
+
+    if out:
+        sys.stdout.write(out)
+
+    with open(_calls_file, "a") as f:
+        f.write(json.dumps({"tool": tool, "args": args, "start": _start, "duration": time.time() - _start, "returncode": returncode}) + "\n")
+
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
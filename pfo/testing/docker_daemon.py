@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import socketserver
+
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Optional
+
+# Docker Engine API paths may carry a version prefix, i.e. /v1.45/build
+_version_prefix = re.compile(r"^/v[0-9.]+")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers the small part of the Docker Engine API that pfo uses - ping, version, build and image inspect/tag."""
+    protocol_version = "HTTP/1.1"
+    server: "_UnixHTTPServer"
+
+    def address_string(self) -> str:
+        return "docker.sock"
+
+    def log_message(self, format: str, *args) -> None:
+        return None # Keep the test output clean
+
+    def _reply(self, status: int, body: Any = None, content_type: str = "application/json") -> None:
+        _data = body if isinstance(body, bytes) else json.dumps(body if body is not None else {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(_data)))
+        self.send_header("Api-Version", self.server.daemon.api_version)
+        self.end_headers()
+        self.wfile.write(_data)
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            _chunks = []
+            while True:
+                _size = int(self.rfile.readline().strip() or b"0", 16)
+                if _size == 0:
+                    self.rfile.readline()
+                    break
+                _chunks.append(self.rfile.read(_size))
+                self.rfile.readline()
+            return b"".join(_chunks)
+
+        return self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+    def _handle(self, method: str) -> None:
+        _path, _, _query = self.path.partition("?")
+        _path = _version_prefix.sub("", _path)
+        _body = self._body()
+        _daemon = self.server.daemon
+        _daemon._record(method, _path, _query, len(_body))
+
+        _latency = _daemon.latency.get(f"{method} {_path}", _daemon.latency.get("default", 0.0))
+        if _latency:
+            time.sleep(_latency)
+
+        if _path == "/_ping":
+            return self._reply(200, b"OK", "text/plain")
+        if _path == "/version":
+            return self._reply(200, {"Version": "0.0.0-fake", "ApiVersion": _daemon.api_version, "MinAPIVersion": "1.24", "Os": "linux", "Arch": "amd64"})
+        if _path == "/build" and method == "POST":
+            return self._build(_query, _body)
+        if _path.startswith("/images/") and _path.endswith("/json"):
+            return self._inspect(_path[len("/images/"):-len("/json")])
+        if _path.startswith("/images/") and _path.endswith("/tag") and method == "POST":
+            return self._reply(201, b"", "text/plain")
+
+        return self._reply(404, {"message": f"page not found: {method} {_path}"})
+
+    def _build(self, query: str, body: bytes) -> None:
+        _daemon = self.server.daemon
+        _params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        _tag = _params.get("t", "").replace("%3A", ":").replace("%2F", "/")
+        _image_id = "sha256:" + hashlib.sha256(body).hexdigest()
+
+        if _daemon.fail_builds:
+            _stream = [{"errorDetail": {"message": "injected build failure"}, "error": "injected build failure"}]
+        else:
+            _daemon.images[_image_id] = _tag
+            if _tag:
+                _daemon.images[_tag] = _image_id
+            _stream = [
+                {"stream": "Step 1/1 : FROM scratch\n"},
+                {"aux": {"ID": _image_id}},
+                {"stream": f"Successfully built {_image_id[7:19]}\n"},
+            ]
+
+        self._reply(200, b"".join(json.dumps(i).encode("utf-8") + b"\r\n" for i in _stream))
+
+    def _inspect(self, name: str) -> None:
+        _images = self.server.daemon.images
+        _name = name.replace("%3A", ":").replace("%2F", "/")
+        _ids = [i for i in _images if i.startswith("sha256:")]
+        _id = _images.get(_name) if not _name.startswith("sha256:") else None
+        _id = _id or next((i for i in _ids if i == _name or i[7:].startswith(_name.removeprefix("sha256:"))), None)
+        if _id is None:
+            return self._reply(404, {"message": f"No such image: {_name}"})
+
+        return self._reply(200, {"Id": _id, "RepoTags": [_images.get(_id) or _name], "Size": 0})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_HEAD(self) -> None:
+        self._handle("HEAD")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    daemon: "FakeDockerDaemon"
+
+
+class FakeDockerDaemon:
+    """A Docker daemon stand-in on a unix socket, for docker.DockerClient(base_url="unix://<socket>").
+
+    Builds never run anything - the image ID is the hash of the build context, so identical contexts give identical
+    images. Every request is recorded in self.requests.
+    """
+    api_version: str = "1.45"
+
+    def __init__(self, socket_path: str, latency: Optional[dict[str, float]] = None) -> None:
+        self.socket_path: str = os.path.abspath(socket_path)
+        self.latency: dict[str, float] = latency or {} # i.e. {"default": 0.0, "POST /build": 0.5}
+        self.images: dict[str, str] = {} # image ID -> tag, and tag -> image ID
+        self.requests: list[dict[str, Any]] = []
+        self.fail_builds: bool = False
+        self._lock = threading.Lock()
+        self._server: Optional[_UnixHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"unix://{self.socket_path}"
+
+    def _record(self, method: str, path: str, query: str, size: int) -> None:
+        with self._lock:
+            self.requests.append({"method": method, "path": path, "query": query, "size": size, "time": time.time()})
+
+    def builds(self) -> list[dict[str, Any]]:
+        """Returns the recorded build requests."""
+        return [r for r in self.requests if r["method"] == "POST" and r["path"] == "/build"]
+
+    def start(self) -> "FakeDockerDaemon":
+        """Starts serving on the socket, in a background thread."""
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        self._server = _UnixHTTPServer(self.socket_path, _Handler)
+        self._server.daemon = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and removes the socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def __enter__(self) -> "FakeDockerDaemon":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
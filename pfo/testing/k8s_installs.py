@@ -0,0 +1,54 @@
+import os
+
+# The minimal tree that Cluster.create() expects from the pyflowops/k8s-installs.git cookiecutter template
+_FILES: dict[str, str] = {
+    "kind-config.yaml": """kind: Cluster
+apiVersion: kind.x-k8s.io/v1alpha4
+nodes:
+  - role: control-plane
+    extraPortMappings:
+      - containerPort: 30080
+        hostPort: 30080
+      - containerPort: 30443
+        hostPort: 30443
+  - role: worker
+""",
+    "{ns}/prereqs/kustomization.yaml": "resources: []\n",
+    "{ns}/base/kustomization.yaml": "resources: []\n",
+    "{ns}/overlays/kustomization.yaml": "resources:\n  - metallb\n  - argocd\n  - monitoring\n",
+    "{ns}/overlays/metallb/kustomization.yaml": "resources: []\n",
+    "{ns}/overlays/argocd/kustomization.yaml": "resources:\n  - argocd-ssl-certs.yaml\n",
+    "{ns}/overlays/argocd/argocd-ssl-certs.yaml": """apiVersion: v1
+kind: Secret
+metadata:
+  name: argocd-server-tls
+  namespace: argocd
+type: kubernetes.io/tls
+data:
+  tls.crt: ""
+  tls.key: ""
+""",
+    "{ns}/overlays/traefik/traefik-values.yaml": "ports: {}\n",
+    "{ns}/overlays/monitoring/kustomization.yaml": "resources: []\n",
+    "{ns}/overlays/monitoring/prometheus-values.yaml": "{}\n",
+    "{ns}/overlays/monitoring/grafana-values.yaml": "{}\n",
+    "{ns}/overlays/monitoring/loki-values.yaml": "{}\n",
+}
+
+
+def fake_cookiecutter(template: str, checkout: str = "main", directory: str = "", no_input: bool = True, extra_context: dict = None, output_dir: str = ".", **kwargs) -> str:
+    """Drop-in replacement for cookiecutter() that renders a minimal k8s-installs tree without any network access.
+
+    Returns:
+        str: The path to the rendered project directory (<output_dir>/k8s).
+    """
+    _ns = (extra_context or {}).get("namespace", "pyops")
+    _project = os.path.join(output_dir, "k8s")
+
+    for _rel, _contents in _FILES.items():
+        _path = os.path.join(_project, _rel.format(ns=_ns))
+        os.makedirs(os.path.dirname(_path), exist_ok=True)
+        with open(_path, "w") as f:
+            f.write(_contents)
+
+    return _project
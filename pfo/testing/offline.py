@@ -0,0 +1,69 @@
+"""
+Runs pfo offline against the fake toolchain - for the end-to-end tests and the benchmarks.
+
+    PATH=<toolchain>/bin:$PATH python pfo/testing/offline.py k8s --create
+
+pfo checks for macOS and for a network connection while it is imported, so this bootstrap has to run before pfo is
+imported. That is why this file only uses the standard library at the top level, and why it is run as a script (or
+imported as a plain `offline` module with pfo/testing on sys.path) rather than as pfo.testing.offline.
+"""
+import os
+import sys
+import time
+import socket
+import platform
+
+_repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class OfflineSocket(socket.socket):
+    """Socket that pretends the network check succeeded - the fake toolchain never needs the network."""
+
+    def connect(self, address):
+        return None
+
+
+def import_pfo():
+    """Imports pfo with the macOS and network checks satisfied, so it runs on any machine offline."""
+    _system, _socket = platform.system, socket.socket
+    platform.system = lambda: "Darwin"
+    socket.socket = OfflineSocket
+    if _repo_root not in sys.path:
+        sys.path.insert(0, _repo_root)
+
+    try:
+        import pfo
+    finally:
+        platform.system, socket.socket = _system, _socket
+
+    return pfo
+
+
+def patch_cluster_flow(sleep_scale: float = 0.0) -> None:
+    """Replaces the parts of the cluster flow that the fake toolchain cannot cover.
+
+    - the k8s-installs cookiecutter template is rendered locally (pfo.testing.fake_cookiecutter), without a mirror
+    - the ArgoCD server health check gets a 200
+    - the fixed sleeps are scaled by sleep_scale (0 skips them)
+    """
+    from unittest.mock import MagicMock
+    from src import kubernetes
+    from pfo.argocd import functions as argocd_functions
+    from pfo.testing import fake_cookiecutter
+
+    _sleep = time.sleep
+    time.sleep = lambda s: _sleep(s * sleep_scale) if sleep_scale else None
+
+    kubernetes.cookiecutter = fake_cookiecutter
+    kubernetes.templates.checkout = lambda url, ref="main": (url, f"{ref}-offline")
+    argocd_functions.requests.get = lambda *a, **kw: MagicMock(status_code=200)
+
+
+def main(args: list) -> None:
+    pfo = import_pfo()
+    patch_cluster_flow(float(os.environ.get("PFO_SLEEP_SCALE", "0")))
+    pfo.cli.main(args, prog_name="pfo")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
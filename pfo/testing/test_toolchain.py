@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+import yaml
+import docker
+import pytest
+
+from pfo.testing import FakeToolchain, FakeDockerDaemon, seed_home
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+_offline = os.path.join(BASE, "offline.py")
+
+@pytest.fixture
+def toolchain(tmp_path):
+    _toolchain = FakeToolchain(str(tmp_path / "toolchain"), latency={"default": 0.0}).install()
+    yield _toolchain
+    _toolchain.clean()
+
+def _run(toolchain, *cmd):
+    return subprocess.run(list(cmd), env=toolchain.env(), capture_output=True, text=True)
+
+class TestFakeToolchain:
+
+    def test_invocations_are_recorded(self, toolchain):
+        """Test that every invocation of a fake tool is recorded with its arguments."""
+        _run(toolchain, "kind", "get", "clusters")
+        _run(toolchain, "kubectl", "apply", "-f", "a.yaml")
+
+        assert [c["tool"] for c in toolchain.calls()] == ["kind", "kubectl"]
+        assert toolchain.call_count("kubectl apply") == 1
+        assert toolchain.call_count("kind create cluster") == 0
+
+    def test_kind_cluster_state(self, toolchain):
+        """Test that the fake kind keeps track of the clusters it created and deleted."""
+        _run(toolchain, "kind", "create", "cluster", "--name", "pyops")
+
+        assert _run(toolchain, "kind", "get", "clusters").stdout.split() == ["pyops"]
+        assert _run(toolchain, "kind", "create", "cluster", "--name", "pyops").returncode == 1
+
+        _run(toolchain, "kind", "delete", "cluster", "--name", "pyops")
+        assert _run(toolchain, "kind", "get", "clusters").stdout.split() == []
+
+    def test_latency(self, toolchain):
+        """Test that the most specific latency entry applies."""
+        toolchain.set_latency("helm install", 0.3)
+
+        _t0 = time.perf_counter()
+        _run(toolchain, "helm", "repo", "add", "x", "https://example.com")
+        _fast = time.perf_counter() - _t0
+        _t0 = time.perf_counter()
+        _run(toolchain, "helm", "install", "x", "x/x")
+        _slow = time.perf_counter() - _t0
+
+        assert _slow >= 0.3
+        assert _slow > _fast
+
+    def test_failure_injection(self, toolchain):
+        """Test that an injected failure fires the configured number of times, then the tool succeeds again."""
+        toolchain.fail("helm install", returncode=2, stderr="Error: boom\n", count=1)
+
+        _res = _run(toolchain, "helm", "install", "traefik", "traefik/traefik")
+        assert _res.returncode == 2
+        assert "Error: boom" in _res.stderr
+
+        assert _run(toolchain, "helm", "install", "traefik", "traefik/traefik").returncode == 0
+        assert _run(toolchain, "helm", "upgrade", "traefik", "traefik/traefik").returncode == 0
+
+    def test_failure_injection_always(self, toolchain):
+        """Test that count=-1 fails every invocation."""
+        toolchain.fail("kubectl", count=-1)
+
+        assert all(_run(toolchain, "kubectl", "apply", "-f", "a.yaml").returncode == 1 for _ in range(3))
+
+    def test_duplicate_calls(self, toolchain):
+        """Test that repeated identical calls are reported, and polling calls are not."""
+        for _ in range(2):
+            _run(toolchain, "kubectl", "apply", "-f", "a.yaml")
+            _run(toolchain, "kubectl", "get", "pods")
+
+        assert toolchain.duplicate_calls() == {"kubectl apply -f a.yaml": 2}
+
+class TestFakeDockerDaemon:
+
+    def test_build_and_inspect(self, tmp_path):
+        """Test that docker-py can build and look up images against the fake daemon."""
+        (tmp_path / "ctx").mkdir()
+        (tmp_path / "ctx" / "Dockerfile").write_text("FROM scratch\n")
+
+        with FakeDockerDaemon(str(tmp_path / "docker.sock")) as daemon:
+            client = docker.DockerClient(base_url=daemon.base_url)
+            assert client.ping() is True
+
+            image, _ = client.images.build(path=str(tmp_path / "ctx"), tag="pfo/api:1.0.0")
+            assert client.images.get("pfo/api:1.0.0").id == image.id
+            assert len(daemon.builds()) == 1
+
+            with pytest.raises(docker.errors.ImageNotFound):
+                client.images.get("pfo/missing:1.0.0")
+
+    def test_failed_build(self, tmp_path):
+        """Test that a build failure is reported to docker-py as a BuildError."""
+        (tmp_path / "ctx").mkdir()
+        (tmp_path / "ctx" / "Dockerfile").write_text("FROM scratch\n")
+
+        with FakeDockerDaemon(str(tmp_path / "docker.sock")) as daemon:
+            daemon.fail_builds = True
+            client = docker.DockerClient(base_url=daemon.base_url)
+
+            with pytest.raises(docker.errors.BuildError):
+                client.images.build(path=str(tmp_path / "ctx"), tag="pfo/api:1.0.0")
+
+class TestCreateFlow:
+    """End-to-end `pfo k8s --create` against the fake toolchain, without a network or a Docker daemon."""
+
+    # Generous bound - the fake tools answer instantly, so this only fails if something loops or waits for real
+    MAX_SECONDS = 120
+
+    @pytest.fixture
+    def home(self, tmp_path):
+        return seed_home(str(tmp_path / "home"))
+
+    def _create(self, toolchain, home, *args):
+        _env = toolchain.env()
+        _env["HOME"] = home
+        _t0 = time.perf_counter()
+        _res = subprocess.run([sys.executable, _offline, "k8s", "--create", *args], env=_env, capture_output=True, text=True, timeout=600)
+        return _res, time.perf_counter() - _t0
+
+    def test_create(self, toolchain, home):
+        """Test that the create flow completes, creates the cluster once and makes no redundant calls."""
+        _res, _seconds = self._create(toolchain, home)
+
+        assert _res.returncode == 0, _res.stdout + _res.stderr
+        assert _seconds < self.MAX_SECONDS
+        assert toolchain.call_count("kind create cluster") == 1
+        assert toolchain.call_count("helm install") >= 1
+        assert toolchain.duplicate_calls() == {}
+
+    def test_create_existing_cluster(self, toolchain, home):
+        """Test that a second create reuses the existing cluster."""
+        self._create(toolchain, home)
+        toolchain.reset_calls()
+
+        _res, _ = self._create(toolchain, home)
+
+        assert _res.returncode == 0, _res.stdout + _res.stderr
+        assert toolchain.call_count("kind create cluster") == 0
+
+    def test_create_helm_failure(self, toolchain, home):
+        """Test that a failing helm install is reported."""
+        toolchain.fail("helm install", stderr="Error: INSTALLATION FAILED\n", count=-1)
+
+        _res, _ = self._create(toolchain, home)
+
+        assert any(c["returncode"] != 0 for c in toolchain.calls("helm"))
+        assert "Failed" in _res.stdout + _res.stderr
+
+    def test_resume_after_apply_failure(self, toolchain, home):
+        """Test that a step whose kubectl apply failed is not checkpointed, and --resume runs it again."""
+        toolchain.fail("kubectl apply", stderr="error: connection refused\n") # The first apply - the prereqs
+        self._create(toolchain, home)
+        with open(os.path.join(home, ".pfo", "clusters", "pyops", "checkpoints.json")) as f:
+            assert "prereqs" not in json.load(f)
+        toolchain.reset_calls()
+
+        _res, _ = self._create(toolchain, home, "--resume")
+
+        assert _res.returncode == 0, _res.stdout + _res.stderr
+        assert any(a.endswith("prereqs-config.yaml") for c in toolchain.calls("kubectl") if c["args"][:1] == ["apply"] for a in c["args"])
+        with open(os.path.join(home, ".pfo", "clusters", "pyops", "checkpoints.json")) as f:
+            assert "prereqs" in json.load(f)
+
+    def test_create_applies_tls(self, toolchain, home):
+        """Test that the overlays applied carry the ArgoCD certificate the argocd-tls step wrote after they were prefetched."""
+        _res, _ = self._create(toolchain, home)
+
+        assert _res.returncode == 0, _res.stdout + _res.stderr
+        _secrets = [d for m in toolchain.applied() for d in yaml.safe_load_all(m) if d and d.get("metadata", {}).get("name") == "argocd-server-tls"]
+        assert _secrets
+        assert all(s["data"]["tls.crt"] and s["data"]["tls.key"] for s in _secrets)
+
+    def test_kubeconfig_migration(self, toolchain, home):
+        """Test that a cluster created before pfo kept a kubeconfig per cluster gets its own one, and --info works."""
+        subprocess.run(["kind", "create", "cluster", "--name", "pyops"], env=toolchain.env(), check=True) # No KUBECONFIG - the user's one
+        _kubeconfig = os.path.join(home, ".pfo", "clusters", "pyops", "kubeconfig")
+        assert not os.path.exists(_kubeconfig)
+
+        _env = toolchain.env()
+        _env["HOME"] = home
+        _res = subprocess.run([sys.executable, _offline, "k8s", "--info"], env=_env, capture_output=True, text=True, timeout=600)
+
+        assert _res.returncode == 0, _res.stdout + _res.stderr
+        assert os.path.isfile(_kubeconfig)
+        assert toolchain.call_count("kind export kubeconfig") == 1
+        assert "Failed to retrieve" not in _res.stdout + _res.stderr
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import stat
+import shutil
+
+from typing import Any, Optional
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+_fake_tool = os.path.join(BASE, "_fake_tool.py")
+
+
+class FakeToolchain:
+    """Local stand-ins for the cluster toolchain (kind, kubectl, kustomize, helm, gh, docker, doppler).
+
+    The fake executables are written to <root>/bin, so putting that directory first on PATH (see env()) makes every
+    pfo subprocess call hit the fakes instead of the real tools. Each invocation is recorded in <root>/calls.jsonl.
+    """
+    tools: tuple = ("kind", "kubectl", "kustomize", "helm", "gh", "docker", "doppler")
+
+    def __init__(self, root: str, latency: Optional[dict[str, float]] = None, failures: Optional[dict[str, dict]] = None) -> None:
+        self.root: str = os.path.abspath(root)
+        self.bin: str = os.path.join(self.root, "bin")
+        self.config_file: str = os.path.join(self.root, "config.json")
+        self.calls_file: str = os.path.join(self.root, "calls.jsonl")
+        self.state_file: str = os.path.join(self.root, "state.json")
+        self.latency: dict[str, float] = latency or {} # i.e. {"default": 0.01, "kind create cluster": 2.0}
+        self.failures: dict[str, dict] = failures or {} # i.e. {"helm install": {"returncode": 1, "stderr": "...", "count": 1}}
+
+    def install(self) -> "FakeToolchain":
+        """Writes the fake executables and the configuration."""
+        os.makedirs(self.bin, exist_ok=True)
+
+        for tool in self.tools:
+            _path = os.path.join(self.bin, tool)
+            with open(_path, "w") as f:
+                f.write("#!/bin/sh\n")
+                f.write(f"PFO_FAKE_TOOLCHAIN=\"{self.root}\" exec \"{sys.executable}\" \"{_fake_tool}\" {tool} \"$@\"\n")
+            os.chmod(_path, os.stat(_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        self.save()
+        return self
+
+    def save(self) -> None:
+        """Writes the current configuration, so the fakes pick it up on their next invocation."""
+        with open(self.config_file, "w") as f:
+            json.dump({"latency": self.latency, "failures": self.failures}, f, indent=2)
+
+    def set_latency(self, key: str, seconds: float) -> None:
+        """Sets the latency for 'default', a tool ('helm') or a subcommand ('kind create cluster')."""
+        self.latency[key] = seconds
+        self.save()
+
+    def fail(self, key: str, returncode: int = 1, stderr: str = "", count: int = 1) -> None:
+        """Makes the next `count` invocations matching `key` ('helm', 'helm install', ...) fail. count=-1 fails every time."""
+        self.failures[key] = {"returncode": returncode, "stderr": stderr or f"{key}: injected failure\n", "count": count}
+        self.save()
+
+    def env(self, base: Optional[dict[str, str]] = None) -> dict[str, str]:
+        """Returns a copy of the environment with the fake tools first on PATH."""
+        _env = dict(os.environ if base is None else base)
+        _env["PATH"] = f"{self.bin}{os.pathsep}{_env.get('PATH', '')}"
+        _env["PFO_FAKE_TOOLCHAIN"] = self.root
+        _env.pop("DOPPLER_TOKEN", None) # Never talk to the real Doppler from a benchmark or test
+        return _env
+
+    def calls(self, tool: Optional[str] = None) -> list[dict[str, Any]]:
+        """Returns the recorded invocations, optionally only for one tool."""
+        if not os.path.isfile(self.calls_file):
+            return []
+
+        with open(self.calls_file, "r") as f:
+            _calls = [json.loads(line) for line in f if line.strip()]
+
+        return [c for c in _calls if tool is None or c["tool"] == tool]
+
+    def applied(self) -> list[str]:
+        """Returns the content of every manifest applied with `kubectl apply -f`, in the order applied."""
+        _dir = os.path.join(self.root, "applied")
+        if not os.path.isdir(_dir):
+            return []
+
+        _applied = []
+        for _name in sorted(os.listdir(_dir)):
+            with open(os.path.join(_dir, _name), "r") as f:
+                _applied.append(f.read())
+
+        return _applied
+
+    def call_count(self, prefix: str) -> int:
+        """Returns how many invocations start with the given command, i.e. call_count("kind create cluster")."""
+        _words = prefix.split()
+        return len([c for c in self.calls() if [c["tool"], *c["args"]][:len(_words)] == _words])
+
+    def duplicate_calls(self, ignore: tuple = ("kubectl get", "kubectl wait", "kind get", "gh ssh-key list")) -> dict[str, int]:
+        """Returns the invocations that were made more than once with identical arguments.
+
+        Read-only polling commands (the `ignore` prefixes) are expected to repeat, and are left out.
+        """
+        _counts: dict[str, int] = {}
+        for c in self.calls():
+            _cmd = " ".join([c["tool"], *c["args"]])
+            if not any(_cmd.startswith(i) for i in ignore):
+                _counts[_cmd] = _counts.get(_cmd, 0) + 1
+
+        return {k: v for k, v in _counts.items() if v > 1}
+
+    def total_time(self) -> float:
+        """Returns the summed duration of all recorded invocations."""
+        return sum(c["duration"] for c in self.calls())
+
+    def reset_calls(self) -> None:
+        """Clears the recorded invocations."""
+        if os.path.isfile(self.calls_file):
+            os.remove(self.calls_file)
+
+    def clean(self) -> None:
+        """Removes the toolchain root directory."""
+        shutil.rmtree(self.root, ignore_errors=True)